@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Admission Control for MT5 Crash/Boom Scalping EA Backend
+Bounded work queue, token-bucket rate limits and route priorities
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+# Route priorities
+CRITICAL = 'critical'
+LOW = 'low'
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """Whether a token is there to take (caller holds the controller lock)"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + max(now - self.updated, 0.0) * self.rate)
+        self.updated = max(now, self.updated)
+        return self.tokens >= 1
+
+class AdmissionController:
+    """Decides whether a request runs, waits in the bounded queue or is shed
+
+    A client or symbol rate of 0 turns that limit off. Rate tokens are only
+    spent by requests that are admitted, so a request shed for capacity does
+    not also count against its client's or symbol's rate.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 16, queue_timeout: float = 1.0,
+                 client_rate: float = 0.0, client_burst: float = 5,
+                 symbol_rate: float = 0.0, symbol_burst: float = 5, max_buckets: int = 10000):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.symbol_rate = symbol_rate
+        self.symbol_burst = symbol_burst
+        self.max_buckets = max_buckets
+
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_in_flight = 0
+        self.peak_queued = 0
+        self.admitted = {CRITICAL: 0, LOW: 0}
+        self.shed = {}
+        self.client_buckets = {}
+        self.symbol_buckets = {}
+        self.condition = threading.Condition()
+
+    def acquire(self, priority: str = CRITICAL, client: Optional[str] = None,
+                symbol: Optional[str] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """Admit a request, returning None on success or the reason it was shed
+
+        Critical requests wait in the bounded queue for at most `timeout`
+        seconds (default queue_timeout) before being shed.
+        """
+        with self.condition:
+            now = time.monotonic()
+            buckets = []
+            if client is not None and self.client_rate > 0:
+                buckets.append(('client_rate', self._bucket(self.client_buckets, client, self.client_rate,
+                                                            self.client_burst, now)))
+            if symbol is not None and self.symbol_rate > 0:
+                buckets.append(('symbol_rate', self._bucket(self.symbol_buckets, symbol, self.symbol_rate,
+                                                            self.symbol_burst, now)))
+            for reason, bucket in buckets:
+                if not bucket.available(now):
+                    return self._shed(reason)
+
+            # Low-priority routes only run on spare capacity and never queue
+            if self.in_flight < self.max_concurrent and (priority == CRITICAL or self.queued == 0):
+                return self._admit(priority, buckets)
+            if priority != CRITICAL:
+                return self._shed('busy')
+            if self.queued >= self.max_queue:
+                return self._shed('queue_full')
+
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            try:
+                ready = self.condition.wait_for(lambda: self.in_flight < self.max_concurrent,
+                                                timeout=self.queue_timeout if timeout is None
+                                                else min(timeout, self.queue_timeout))
+            finally:
+                self.queued -= 1
+            if not ready:
+                return self._shed('queue_timeout')
+            return self._admit(priority, buckets)
+
+    def release(self):
+        """Free the slot taken by an admitted request"""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def _admit(self, priority: str, buckets) -> Optional[str]:
+        # Another request from the same client or symbol may have taken the token while this one queued
+        now = time.monotonic()
+        for reason, bucket in buckets:
+            if not bucket.available(now):
+                self.condition.notify()  # pass the free slot on to the next waiter
+                return self._shed(reason)
+        for _, bucket in buckets:
+            bucket.tokens -= 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.admitted[priority] = self.admitted.get(priority, 0) + 1
+        return None
+
+    def _shed(self, reason: str) -> str:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        return reason
+
+    def _bucket(self, buckets: Dict, key: str, rate: float, burst: float, now: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self.max_buckets:
+                # Full buckets carry no state worth keeping
+                for stale in [k for k, b in buckets.items() if now - b.updated > burst / rate]:
+                    del buckets[stale]
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def stats(self) -> Dict:
+        """Limits, current load and admission/shed counters"""
+        with self.condition:
+            return {
+                'limits': {
+                    'max_concurrent': self.max_concurrent,
+                    'max_queue': self.max_queue,
+                    'queue_timeout_seconds': self.queue_timeout,
+                    'client_rate_per_second': self.client_rate,
+                    'client_burst': self.client_burst,
+                    'symbol_rate_per_second': self.symbol_rate,
+                    'symbol_burst': self.symbol_burst,
+                },
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'peak_in_flight': self.peak_in_flight,
+                'peak_queued': self.peak_queued,
+                'admitted': dict(self.admitted),
+                'shed': dict(self.shed),
+                'tracked_clients': len(self.client_buckets),
+                'tracked_symbols': len(self.symbol_buckets),
+            }
@@ -9,13 +9,42 @@ import json
 import logging
 import requests
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_file
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
+import contextvars
 import threading
 import time
+from local_recommender import LocalRecommender
+from timeframes import TimeframeStore, TIMEFRAMES, BAR_FIELDS, bars_from_price_data
+from tick_ingest import TickIngestor, check_prices
+from shard_pool import ShardPool, publish, worker_index
+from admission import AdmissionController, CRITICAL, LOW
+from openai_dispatcher import OpenAIDispatcher, parse_priorities
+from request_capture import RequestCapture
+from profiling import Profiler, PROFILE_MODES
+from tracing import tracer
+from outcome_scoring import OutcomeScorer, merge_snapshots
+from market_data import MarketDataPlane
+from socket_server import SocketServer
+from regime_detector import RegimeDetector
+from history_store import HistoryStore, dataset_columns, time_column
+from price_ingest import PriceData, PriceDataError, parse_price_data
+from spike_index import SpikeLibrary
+from spike_hazard import HAZARD_HORIZONS, SpikeHazard
+from indicators import EntryFilters, IndicatorEngine
+from memory_monitor import memory_tracker
+from precompute_scheduler import PrecomputeScheduler
+from history_export import (
+    EXPORT_CHUNK_ROWS, EXPORT_FORMATS, SPIKE_COLUMNS, SeriesView, decimate_bars, decimate_ticks,
+    decimation_factor, dtype_header, encode, iter_spikes, select_columns
+)
+from spike_metrics import (
+    ThresholdSweepCache, RETRACEMENT_HORIZON, max_retracement, recovery_profile, retracement_curves, spike_indices
+)
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Configure logging
 logging.basicConfig(
@@ -48,13 +77,91 @@ load_config()
 # Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'your-openai-api-key-here')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4')
+OPENAI_STREAM = os.getenv('OPENAI_STREAM', 'false').lower() == 'true'
+RECOMMENDER_ENGINE = os.getenv('RECOMMENDER_ENGINE', 'openai').lower()
+OPENAI_FAST_MODEL = os.getenv('OPENAI_FAST_MODEL', 'gpt-3.5-turbo')
+MT5_DEADLINE_MS = int(os.getenv('MT5_DEADLINE_MS', 3000))
+DEADLINE_MARGIN_MS = int(os.getenv('DEADLINE_MARGIN_MS', 300))
+TICK_BUFFER_SIZE = int(os.getenv('TICK_BUFFER_SIZE', 100000))
+TICK_SPIKE_THRESHOLD = float(os.getenv('TICK_SPIKE_THRESHOLD', 50))
+SWEEP_WINDOW = int(os.getenv('SWEEP_WINDOW', 1000))
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+ANALYSIS_WINDOW = int(os.getenv('ANALYSIS_WINDOW', 1000))
+REGIME_TRIGGER = os.getenv('REGIME_TRIGGER', 'true').lower() == 'true'
+REGIME_MAX_AGE_SECONDS = float(os.getenv('REGIME_MAX_AGE_SECONDS', 7200))
+REGIME_RETRY_SECONDS = float(os.getenv('REGIME_RETRY_SECONDS', 60))
+REGIME_THRESHOLD = float(os.getenv('REGIME_THRESHOLD', 8.0))
+REGIME_RATE_THRESHOLD = float(os.getenv('REGIME_RATE_THRESHOLD', 6.0))
+HISTORY_DIR = os.getenv('HISTORY_DIR', '')
+SIMILAR_SPIKES = int(os.getenv('SIMILAR_SPIKES', 20))
+RSI_PERIOD = int(os.getenv('RSI_PERIOD', 14))
+RSI_OVERBOUGHT = float(os.getenv('RSI_OVERBOUGHT', 70))
+RSI_OVERSOLD = float(os.getenv('RSI_OVERSOLD', 30))
+EMA_PERIOD = int(os.getenv('EMA_PERIOD', 20))
+ATR_PERIOD = int(os.getenv('ATR_PERIOD', 14))
+EA_FILTERS = {f.strip().lower() for f in os.getenv('EA_FILTERS', 'rsi,trend').split(',') if f.strip()}
+PRECOMPUTE_INTERVAL = float(os.getenv('PRECOMPUTE_INTERVAL', 60))
+PRECOMPUTE_MIN_INTERVAL = float(os.getenv('PRECOMPUTE_MIN_INTERVAL', 15))
+PRECOMPUTE_MAX_INTERVAL = float(os.getenv('PRECOMPUTE_MAX_INTERVAL', 600))
+PRECOMPUTE_IDLE_SECONDS = float(os.getenv('PRECOMPUTE_IDLE_SECONDS', 3600))
+PRECOMPUTE_DEADLINE_MS = int(os.getenv('PRECOMPUTE_DEADLINE_MS', 20000))
+PRECOMPUTE_SYMBOLS = [s.strip() for s in os.getenv('PRECOMPUTE_SYMBOLS', '').split(',') if s.strip()]
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', 8))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 16))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS', 500))
+CLIENT_RATE_PER_SECOND = float(os.getenv('CLIENT_RATE_PER_SECOND', 0))
+CLIENT_BURST = float(os.getenv('CLIENT_BURST', 5))
+SYMBOL_RATE_PER_SECOND = float(os.getenv('SYMBOL_RATE_PER_SECOND', 0))
+SYMBOL_BURST = float(os.getenv('SYMBOL_BURST', 5))
+OPENAI_MAX_CONCURRENT = int(os.getenv('OPENAI_MAX_CONCURRENT', 4))
+OPENAI_MAX_QUEUE = int(os.getenv('OPENAI_MAX_QUEUE', 64))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 3))
+OPENAI_BACKOFF_BASE_MS = int(os.getenv('OPENAI_BACKOFF_BASE_MS', 500))
+OPENAI_BACKOFF_MAX_MS = int(os.getenv('OPENAI_BACKOFF_MAX_MS', 8000))
+OPENAI_SYMBOL_PRIORITY = os.getenv('OPENAI_SYMBOL_PRIORITY', '')
+CAPTURE_DIR = os.getenv('CAPTURE_DIR', '')
+CAPTURE_MAX_MB = int(os.getenv('CAPTURE_MAX_MB', 50))
+CAPTURE_MAX_FILES = int(os.getenv('CAPTURE_MAX_FILES', 10))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 100))
+PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'false').lower() == 'true'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.01))
+TRACE_BUFFER = int(os.getenv('TRACE_BUFFER', 200))
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+TRACEMALLOC_FRAMES = int(os.getenv('TRACEMALLOC_FRAMES', 0))
 SERVER_PORT = int(os.getenv('SERVER_PORT', 5001))
 SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SOCKET_PORT = int(os.getenv('SOCKET_PORT', 0))
 
 # Global storage for analysis results
 analysis_cache = {}
 last_analysis_time = {}
 analysis_lock = threading.Lock()
+timeframe_store = TimeframeStore()
+sweep_cache = ThresholdSweepCache()
+market_data = MarketDataPlane(timeframe_store)
+regime_detector = RegimeDetector(max_age=REGIME_MAX_AGE_SECONDS, threshold=REGIME_THRESHOLD,
+                                 rate_threshold=REGIME_RATE_THRESHOLD)
+history_store = HistoryStore(HISTORY_DIR) if HISTORY_DIR else None
+history_seeded = set()  # symbols already seeded from the history store
+tick_ingestor = TickIngestor(TICK_BUFFER_SIZE, TICK_SPIKE_THRESHOLD, on_bars=timeframe_store.ingest_bars)
+# The EA's CheckRSIFilter/CheckTrendFilter, applied when scoring recommendations
+entry_filters = EntryFilters(RSI_PERIOD, EMA_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD,
+                             use_rsi='rsi' in EA_FILTERS, use_trend='trend' in EA_FILTERS)
+outcome_scorer = OutcomeScorer(filters=entry_filters)
+indicator_engine = IndicatorEngine(entry_filters, ATR_PERIOD)
+shard_pool = None  # Started in __main__ when SHARD_WORKERS > 0
+socket_server = None  # Started in __main__ when SOCKET_PORT > 0
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS / 1000.0,
+    CLIENT_RATE_PER_SECOND, CLIENT_BURST, SYMBOL_RATE_PER_SECOND, SYMBOL_BURST
+)
+profiler = Profiler(PROFILE_DIR, PROFILE_MAX_FILES, allow_header=PROFILE_HEADER)
+# Spans finished in shard workers are forwarded to the routing process, which keeps the traces
+tracer.configure(TRACE_SAMPLE_RATE, TRACE_BUFFER, TRACE_FILE, forward=lambda record: publish('span', record))
+if TRACEMALLOC_FRAMES > 0:
+    memory_tracker.start(TRACEMALLOC_FRAMES)  # before shard workers fork, so they trace too
+request_capture = RequestCapture(CAPTURE_DIR, CAPTURE_MAX_MB * 1024 * 1024, CAPTURE_MAX_FILES) if CAPTURE_DIR else None
 
 class SpikeAnalyzer:
     """Handles spike detection and analysis"""
@@ -63,58 +170,182 @@ class SpikeAnalyzer:
         self.min_spike_size = 50  # pips
         self.spike_threshold_percent = 1.0
         
-    def detect_spikes(self, price_data: List[float]) -> List[Dict]:
-        """Detect spikes in price data"""
+    def detect_spikes(self, closes: np.ndarray, times: Optional[np.ndarray] = None) -> List[Dict]:
+        """Detect spikes in a close-price array"""
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) < 3:
+            return []
+        
+        indices = self._spike_indices(closes)
+        
+        # Measure every spike at once rather than rescanning per spike
+        recovery = recovery_profile(closes, indices, self.min_spike_size * 0.1, times=times)
+        retracement = max_retracement(closes, indices)
+        
         spikes = []
+        for k, i in enumerate(indices):
+            spikes.append({
+                'timestamp': datetime.now().isoformat(),
+                'price': float(closes[i]),
+                'spike_size': float(abs(closes[i] - closes[i-1])),
+                'is_crash': bool(closes[i] < closes[i-1]),
+                'bar_index': int(i),
+                'recovery_time': int(recovery['seconds'][k]),
+                'recovery_bars': int(recovery['bars'][k]),
+                'recovered': bool(recovery['recovered'][k]),
+                'max_retracement': float(retracement[k])
+            })
         
-        if len(price_data) < 3:
-            return spikes
-            
-        for i in range(1, len(price_data) - 1):
-            current_price = price_data[i]
-            prev_price = price_data[i-1]
-            next_price = price_data[i+1]
-            
-            # Calculate price changes
-            change_to_current = abs(current_price - prev_price)
-            change_from_current = abs(next_price - current_price)
-            
-            # Detect spike (sudden large movement followed by reversal)
-            if (change_to_current > self.min_spike_size and 
-                change_from_current > change_to_current * 0.5):
-                
-                spike = {
-                    'timestamp': datetime.now().isoformat(),
-                    'price': current_price,
-                    'spike_size': change_to_current,
-                    'is_crash': current_price < prev_price,
-                    'recovery_time': self._calculate_recovery_time(price_data, i),
-                    'max_retracement': self._calculate_max_retracement(price_data, i)
-                }
-                spikes.append(spike)
-                
         return spikes
     
-    def _calculate_recovery_time(self, price_data: List[float], spike_index: int) -> int:
-        """Calculate time to recover from spike"""
-        spike_price = price_data[spike_index]
+    def spike_profiles(self, closes: np.ndarray, horizon: int = RETRACEMENT_HORIZON,
+                       times: Optional[np.ndarray] = None) -> Dict:
+        """Recovery distribution and max-retracement curve over horizons 1..N for all spikes"""
+        closes = np.asarray(closes, dtype=np.float64)
+        indices = self._spike_indices(closes) if len(closes) >= 3 else np.empty(0, dtype=np.int64)
+        curves = retracement_curves(closes, indices, horizon)
+        recovery = recovery_profile(closes, indices, self.min_spike_size * 0.1, times=times)
+        recovered_seconds = recovery['seconds'][recovery['recovered']]
         
-        for i in range(spike_index + 1, min(spike_index + 100, len(price_data))):
-            if abs(price_data[i] - spike_price) < self.min_spike_size * 0.1:
-                return 60  # Default 1 minute recovery time
-        
-        return 300  # Default 5 minutes if no recovery detected
+        return {
+            'spikes': int(len(indices)),
+            'recovered': int(recovery['recovered'].sum()),
+            'recovery_seconds': {
+                'median': float(np.median(recovered_seconds)) if len(recovered_seconds) else None,
+                'p90': float(np.percentile(recovered_seconds, 90)) if len(recovered_seconds) else None,
+            },
+            'horizons': list(range(1, horizon + 1)),
+            'retracement_mean': np.round(curves.mean(axis=0), 4).tolist() if len(indices) else [],
+            'retracement_median': np.round(np.median(curves, axis=0), 4).tolist() if len(indices) else [],
+            'retracement_p90': np.round(np.percentile(curves, 90, axis=0), 4).tolist() if len(indices) else [],
+        }
+    
+    def _spike_indices(self, closes: np.ndarray) -> np.ndarray:
+        """Bars with a sudden large movement followed by a follow-through of at least half"""
+        return spike_indices(closes, self.min_spike_size)
+
+# Numeric recommendation fields the EA needs before it can trade
+NUMERIC_RECOMMENDATION_FIELDS = (
+    "spike_threshold",
+    "cooldown_seconds",
+    "stop_loss_pips",
+    "take_profit_pips",
+    "risk_score",
+    "confidence",
+)
+
+class StreamingFieldExtractor:
+    """Incrementally extracts top-level fields of a JSON object from streamed text"""
     
-    def _calculate_max_retracement(self, price_data: List[float], spike_index: int) -> float:
-        """Calculate maximum retracement after spike"""
-        spike_price = price_data[spike_index]
-        max_retracement = 0
+    def __init__(self):
+        self.fields = {}
+        self.complete = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token = []
+        self._key = None
+        self._expect_value = False
         
-        for i in range(spike_index + 1, min(spike_index + 50, len(price_data))):
-            retracement = abs(price_data[i] - spike_price)
-            max_retracement = max(max_retracement, retracement)
+    def feed(self, text: str) -> Dict:
+        """Consume the next chunk of text and return the fields parsed so far"""
+        for ch in text:
+            if self.complete:
+                break
+            if not self._started:
+                # Skip any prose or code fences before the object starts
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._depth == 1:
+                    self._token.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._finish_string()
+                continue
             
-        return max_retracement
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token = ['"']
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_scalar()
+                    self.complete = True
+                elif self._depth == 1:
+                    # Nested values are not extracted, just skipped
+                    self._reset_pair()
+            elif self._depth == 1:
+                if ch == ':':
+                    self._expect_value = True
+                elif ch == ',':
+                    self._finish_scalar()
+                elif self._expect_value and not ch.isspace():
+                    self._token.append(ch)
+        
+        return self.fields
+    
+    def has_fields(self, names) -> bool:
+        """Check whether all named fields have been fully parsed"""
+        return all(name in self.fields for name in names)
+    
+    def _finish_string(self):
+        try:
+            value = json.loads(''.join(self._token))
+        except ValueError:
+            value = None
+        self._token = []
+        
+        if self._expect_value:
+            if self._key is not None:
+                self.fields[self._key] = value
+            self._reset_pair()
+        else:
+            self._key = value
+    
+    def _finish_scalar(self):
+        if self._expect_value and self._token and self._key is not None:
+            try:
+                self.fields[self._key] = json.loads(''.join(self._token))
+            except ValueError:
+                pass
+        self._reset_pair()
+    
+    def _reset_pair(self):
+        self._token = []
+        self._key = None
+        self._expect_value = False
+
+# Analysis tiers, best first
+ANALYSIS_TIERS = ("primary", "fast", "local", "default")
+
+def resolve_deadline(headers) -> Optional[float]:
+    """Work out the caller's response deadline in seconds, if it has one"""
+    deadline_ms = headers.get('X-Deadline-Ms')
+    if deadline_ms:
+        try:
+            return max(float(deadline_ms) - DEADLINE_MARGIN_MS, 0) / 1000.0
+        except ValueError:
+            logger.warning(f"Ignoring invalid X-Deadline-Ms header: {deadline_ms}")
+    
+    # MT5 WebRequest gives up after 3000 ms
+    client_type = headers.get('X-Client-Type', '') or headers.get('User-Agent', '')
+    if 'mt5' in client_type.lower() or 'metatrader' in client_type.lower():
+        return max(MT5_DEADLINE_MS - DEADLINE_MARGIN_MS, 0) / 1000.0
+    
+    return None
 
 class AIAnalyzer:
     """Handles OpenAI integration and analysis"""
@@ -122,22 +353,126 @@ class AIAnalyzer:
     def __init__(self):
         self.api_key = OPENAI_API_KEY
         self.model = OPENAI_MODEL
+        self.fast_model = OPENAI_FAST_MODEL
+        self.stream = OPENAI_STREAM
+        self.engine = RECOMMENDER_ENGINE
+        self.local_recommender = LocalRecommender()
         self.base_url = "https://api.openai.com/v1/chat/completions"
+        # Shard workers each run their own dispatcher, so they split the upstream cap
+        concurrency = max(OPENAI_MAX_CONCURRENT // SHARD_WORKERS, 1) if SHARD_WORKERS > 0 else OPENAI_MAX_CONCURRENT
+        self.dispatcher = OpenAIDispatcher(
+            concurrency, OPENAI_MAX_QUEUE, OPENAI_MAX_RETRIES,
+            OPENAI_BACKOFF_BASE_MS / 1000.0, OPENAI_BACKOFF_MAX_MS / 1000.0,
+            priorities=parse_priorities(OPENAI_SYMBOL_PRIORITY)
+        )
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ai-tier")
         
-    def analyze_spikes(self, spikes: List[Dict], market_data: Dict) -> Dict:
-        """Analyze spikes using OpenAI"""
-        if not spikes:
-            return self._get_default_recommendations()
+    def analyze_spikes(self, spikes: List[Dict], market_data: Dict,
+                       deadline: Optional[float] = None, on_late_result=None) -> Dict:
+        """Analyze spikes using OpenAI, racing model tiers when a deadline is given"""
+        with tracer.span('fallback'):
+            fallback = self._get_fallback_recommendations(spikes, market_data)
+        if not spikes or self.engine == 'local':
+            return fallback
             
         # Prepare analysis prompt
-        prompt = self._create_analysis_prompt(spikes, market_data)
+        with tracer.span('prompt') as span:
+            prompt = self._create_analysis_prompt(spikes, market_data)
+            span.set(chars=len(prompt))
+        symbol = market_data.get('symbol')
         
-        try:
-            response = self._call_openai(prompt)
-            return self._parse_ai_response(response)
-        except Exception as e:
-            logger.error(f"AI analysis failed: {e}")
-            return self._get_default_recommendations()
+        if deadline is not None:
+            return self._analyze_hedged(prompt, deadline, fallback, on_late_result, symbol)
+        
+        recommendations = self._run_tier(prompt, self.model, on_late_result, symbol)
+        if recommendations is None:
+            return fallback
+        recommendations["tier"] = "primary"
+        return recommendations
+    
+    def model_for(self, tier: str) -> str:
+        """Model behind a result tier, for per-model outcome scoring"""
+        if tier == "primary":
+            return self.model
+        if tier == "fast":
+            return self.fast_model
+        return tier
+    
+    def _get_fallback_recommendations(self, spikes: List[Dict], market_data: Dict) -> Dict:
+        """Local statistical recommendations, or the defaults when there is nothing to go on"""
+        recommendations = self.local_recommender.recommend(spikes, market_data.get('bar_count', 0),
+                                                           market_data.get('similar_spikes'),
+                                                           market_data.get('spike_hazard'),
+                                                           market_data.get('indicators'))
+        if recommendations is None:
+            recommendations = self._get_default_recommendations()
+            recommendations["tier"] = "default"
+        else:
+            recommendations["tier"] = "local"
+        return recommendations
+    
+    def _run_tier(self, prompt: str, model: str, on_update=None, symbol: Optional[str] = None,
+                  deadline: Optional[float] = None) -> Optional[Dict]:
+        """Run one model tier, returning None if it fails or gets no dispatcher slot by `deadline`"""
+        # Results carry their tier so late and streamed updates can be ranked against each other
+        tier = "primary" if model == self.model else "fast"
+        with tracer.span('tier', model=model, stream=self.stream) as span:
+            try:
+                if self.stream:
+                    return self._analyze_streaming(prompt, model, on_update, symbol, deadline, tier)
+                response = self._call_openai(prompt, model, symbol, deadline)
+                with tracer.span('parse'):
+                    recommendations = self._extract_recommendations(response)
+                recommendations["tier"] = tier
+                return recommendations
+            except Exception as e:
+                logger.error(f"AI analysis with {model} failed: {e}")
+                span.set(error=str(e))
+                return None
+    
+    def _analyze_hedged(self, prompt: str, deadline: float, fallback: Dict, on_late_result=None,
+                        symbol: Optional[str] = None) -> Dict:
+        """Race the primary and fast models, returning the best answer ready by the deadline"""
+        started = time.monotonic()
+        # A tier still queued for a dispatcher slot at the deadline gives up instead of holding
+        # an executor thread; one already sent may run on and deliver a late result
+        expires = started + deadline
+        # Each tier thread runs in a copy of this context so its spans join the trace
+        primary = self.executor.submit(contextvars.copy_context().run,
+                                       self._run_tier, prompt, self.model, on_late_result, symbol, expires)
+        futures = {primary: "primary"}
+        if self.fast_model and self.fast_model != self.model:
+            futures[self.executor.submit(contextvars.copy_context().run, self._run_tier,
+                                         prompt, self.fast_model, on_late_result, symbol, expires)] = "fast"
+        
+        best, best_tier = fallback, fallback["tier"]
+        pending = set(futures)
+        while pending and best_tier != "primary":
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                tier = futures[future]
+                result = future.result()
+                if result is not None and ANALYSIS_TIERS.index(tier) < ANALYSIS_TIERS.index(best_tier):
+                    best, best_tier = result, tier
+        
+        best["tier"] = best_tier
+        best["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        
+        # Let the slow model keep going and update the cache when it lands
+        if best_tier != "primary" and not primary.done() and on_late_result is not None:
+            def deliver_late(future):
+                result = future.result()
+                if result is not None:
+                    result["tier"] = "primary"
+                    result["late"] = True
+                    on_late_result(result)
+            primary.add_done_callback(deliver_late)
+        
+        logger.info(f"Hedged analysis answered from {best_tier} tier in {best['elapsed_ms']} ms")
+        return best
     
     def _create_analysis_prompt(self, spikes: List[Dict], market_data: Dict) -> str:
         """Create analysis prompt for OpenAI"""
@@ -169,6 +504,11 @@ SPIKE ANALYSIS:
 
 RECENT SPIKE DETAILS (last 10):
 {self._format_spike_details(spikes[-10:])}
+{self._format_timeframes(market_data.get('timeframes', {}))}
+{self._format_indicators(market_data.get('indicators'))}
+{self._format_threshold_sweep(market_data.get('threshold_sweep'))}
+{self._format_similar_spikes(market_data.get('similar_spikes'))}
+{self._format_spike_hazard(market_data.get('spike_hazard'))}
 
 Please provide recommendations in the following JSON format:
 {{
@@ -196,22 +536,23 @@ Focus on:
         details = []
         for spike in spikes:
             direction = "CRASH" if spike['is_crash'] else "BOOM"
+            recovery = f"{spike['recovery_time']}s" if spike.get('recovered', True) else f">{spike['recovery_time']}s"
             details.append(
                 f"- {direction}: {spike['spike_size']:.1f} pips, "
-                f"Recovery: {spike['recovery_time']}s, "
+                f"Recovery: {recovery}, "
                 f"Retracement: {spike['max_retracement']:.1f} pips"
             )
         return "\n".join(details)
     
-    def _call_openai(self, prompt: str) -> str:
-        """Call OpenAI API"""
+    def _build_request(self, prompt: str, model: Optional[str] = None) -> Tuple[Dict, Dict]:
+        """Build headers and body for a chat completion request"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
         data = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": [
                 {"role": "system", "content": "You are an expert forex trading analyst. Provide concise, actionable recommendations."},
                 {"role": "user", "content": prompt}
@@ -219,39 +560,200 @@ Focus on:
             "temperature": 0.3,
             "max_tokens": 1000
         }
+        return headers, data
+    
+    def _format_timeframes(self, timeframes: Dict) -> str:
+        """Format higher-timeframe context for prompt"""
+        if not timeframes:
+            return ""
+        details = ["HIGHER TIMEFRAMES:"]
+        for timeframe, stats in timeframes.items():
+            details.append(
+                f"- {timeframe}: close {stats['close']:.2f}, "
+                f"change {stats['change']:+.2f} over {stats['bars']} bars, "
+                f"avg range {stats['avg_range']:.2f}, max range {stats['max_range']:.2f}"
+            )
+        return "\n".join(details) + "\n"
+    
+    def _format_threshold_sweep(self, sweep: Optional[Dict]) -> str:
+        """Format how spike counts change with the threshold for prompt"""
+        if not sweep or not any(sweep['jumps']):
+            return ""
+        details = ["SPIKE THRESHOLD SWEEP (threshold: jumps / spikes / reversal rate / mean retracement):"]
+        rows = [i for i, jumps in enumerate(sweep['jumps']) if jumps > 0]
+        step = max(1, -(-len(rows) // 10))
+        for i in rows[::step]:
+            details.append(
+                f"- {sweep['thresholds'][i]:.1f}: {sweep['jumps'][i]} / {sweep['spikes'][i]} / "
+                f"{sweep['reversal_rate'][i] * 100:.0f}% / {sweep['mean_retracement'][i]:.1f}"
+            )
+        return "\n".join(details) + "\n"
+    
+    def _format_similar_spikes(self, similar: Optional[Dict]) -> str:
+        """Format how the closest past spike setups played out for prompt"""
+        if not similar:
+            return ""
+        recovery = similar['median_recovery_bars']
+        next_spike = similar['median_next_spike_bars']
+        details = [
+            f"SIMILAR PAST SETUPS ({similar['neighbours']} nearest of {similar['indexed']} historical spikes "
+            f"to the latest one):",
+            f"- Recovered: {similar['recovered_rate'] * 100:.0f}%"
+            + (f", median {recovery:.0f} bars" if recovery is not None else ""),
+            f"- Retracement: 20th percentile {similar['retracement_p20']:.1f}, median {similar['retracement_p50']:.1f} pips",
+            f"- Median move back after 10 bars: {similar['median_reversion']:+.1f} pips",
+        ]
+        if next_spike is not None:
+            details.append(f"- Median bars to the next spike: {next_spike:.0f}")
+        for match in similar['matches']:
+            when = datetime.fromtimestamp(match['time']).strftime('%Y-%m-%d %H:%M')
+            details.append(
+                f"- {when}: {match['size']:.1f} pips, retracement {match['max_retracement']:.1f}, "
+                f"{'recovered in ' + str(match['recovery_bars']) + ' bars' if match['recovered'] else 'no recovery'}"
+            )
+        return "\n".join(details) + "\n"
+    
+    def _format_spike_hazard(self, hazard: Optional[Dict]) -> str:
+        """Format spike arrival probabilities for prompt"""
+        if not hazard:
+            return ""
+        chances = ", ".join(f"{k} bars {p * 100:.0f}%" for k, p in hazard['probabilities'].items())
+        return (
+            f"SPIKE ARRIVAL (from {hazard['gaps_observed']} gaps, mean {hazard['mean_gap_bars']:.0f} bars):\n"
+            f"- {hazard['bars_since_spike']} bars since the last spike; chance of a spike within {chances}\n"
+            f"- Expected bars to the next spike: {hazard['expected_bars_to_spike']:.0f}; "
+            f"a quarter of gaps are shorter than {hazard['cooldown_bars']} bars\n"
+        )
+    
+    def _format_indicators(self, indicators: Optional[Dict]) -> str:
+        """Format the latest bar's indicators and the EA's entry filters for prompt"""
+        if not indicators or indicators['rsi'] is None or indicators['ema'] is None:
+            return ""
+        periods = indicators['periods']
+        lines = [
+            "INDICATORS (M1, as computed by MT5):",
+            f"- RSI({periods['rsi']}): {indicators['rsi']:.1f}",
+            f"- EMA({periods['ema']}): {indicators['ema']:.2f}, price {indicators['trend'].replace('_', ' ')}",
+        ]
+        if indicators['atr'] is not None:
+            lines.append(f"- ATR({periods['atr']}): {indicators['atr']:.2f} pips")
+        lines.append(
+            f"- EA entry filters now: buy after a crash spike {'allowed' if indicators['buy_after_crash'] else 'blocked'}, "
+            f"sell after a boom spike {'allowed' if indicators['sell_after_boom'] else 'blocked'}"
+        )
+        return "\n".join(lines) + "\n"
+    
+    def _call_openai(self, prompt: str, model: Optional[str] = None, symbol: Optional[str] = None,
+                     deadline: Optional[float] = None) -> str:
+        """Call OpenAI API"""
+        headers, data = self._build_request(prompt, model)
         
-        response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
+        # The dispatcher caps concurrency and retries rate-limited calls
+        result = self.dispatcher.post_json(self.base_url, headers, data, symbol=symbol, deadline=deadline)
         return result['choices'][0]['message']['content']
     
+    def _call_openai_streaming(self, prompt: str, model: Optional[str] = None, symbol: Optional[str] = None,
+                               deadline: Optional[float] = None):
+        """Call OpenAI API in streaming mode, yielding content chunks as they arrive"""
+        headers, data = self._build_request(prompt, model)
+        data["stream"] = True
+        
+        # The dispatcher slot is held until the stream is drained or closed
+        with self.dispatcher.request(self.base_url, headers, data, symbol=symbol, stream=True,
+                                     deadline=deadline) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                chunk = json.loads(payload)
+                choices = chunk.get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+    
+    def _analyze_streaming(self, prompt: str, model: Optional[str] = None, on_update=None,
+                           symbol: Optional[str] = None, deadline: Optional[float] = None,
+                           tier: str = "primary") -> Dict:
+        """Return as soon as the numeric fields are streamed, filling in reasoning later"""
+        extractor = StreamingFieldExtractor()
+        chunks = self._call_openai_streaming(prompt, model, symbol, deadline)
+        
+        for content in chunks:
+            extractor.feed(content)
+            if extractor.has_fields(NUMERIC_RECOMMENDATION_FIELDS) or extractor.complete:
+                break
+        
+        if not extractor.fields:
+            raise ValueError("Streaming AI response contained no recommendation fields")
+        
+        recommendations = self._build_recommendations(extractor.fields)
+        recommendations["tier"] = tier
+        if extractor.complete:
+            return recommendations
+        
+        # Numeric fields are ready; let the rest of the completion land in the background
+        recommendations["reasoning"] = "Reasoning pending (streaming)"
+        recommendations["reasoning_pending"] = True
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._finish_streaming, extractor, chunks, recommendations, on_update),
+            daemon=True
+        ).start()
+        return recommendations
+    
+    def _finish_streaming(self, extractor: StreamingFieldExtractor, chunks, recommendations: Dict, on_update=None):
+        """Drain the remaining stream and update the cached recommendations in place"""
+        with tracer.span('stream_remainder'):
+            try:
+                for content in chunks:
+                    extractor.feed(content)
+                    if extractor.complete:
+                        break
+            except Exception as e:
+                logger.error(f"Streaming AI response failed after numeric fields: {e}")
+        
+        # The same dict object is stored in analysis_cache, so updating it fills the cache
+        with analysis_lock:
+            recommendations["market_trend"] = extractor.fields.get("market_trend", recommendations["market_trend"])
+            recommendations["reasoning"] = extractor.fields.get("reasoning", "Analysis unavailable")
+            recommendations["reasoning_pending"] = False
+        logger.info("Streaming AI response completed, reasoning cached")
+        if on_update is not None:
+            on_update(recommendations)
+    
     def _parse_ai_response(self, response: str) -> Dict:
         """Parse AI response and extract recommendations"""
         try:
-            # Extract JSON from response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            json_str = response[start:end]
-            
-            recommendations = json.loads(json_str)
-            
-            # Validate and set defaults
-            return {
-                "spike_threshold": float(recommendations.get("spike_threshold", 50)),
-                "cooldown_seconds": int(recommendations.get("cooldown_seconds", 300)),
-                "stop_loss_pips": float(recommendations.get("stop_loss_pips", 20)),
-                "take_profit_pips": float(recommendations.get("take_profit_pips", 40)),
-                "risk_score": float(recommendations.get("risk_score", 5)),
-                "confidence": float(recommendations.get("confidence", 70)),
-                "market_trend": recommendations.get("market_trend", "Neutral"),
-                "reasoning": recommendations.get("reasoning", "Analysis unavailable"),
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._extract_recommendations(response)
         except Exception as e:
             logger.error(f"Failed to parse AI response: {e}")
             return self._get_default_recommendations()
     
+    def _extract_recommendations(self, response: str) -> Dict:
+        """Extract the JSON recommendations from a completion, raising if it is unusable"""
+        start = response.find('{')
+        end = response.rfind('}') + 1
+        json_str = response[start:end]
+        
+        recommendations = json.loads(json_str)
+        return self._build_recommendations(recommendations)
+    
+    def _build_recommendations(self, recommendations: Dict) -> Dict:
+        """Validate parsed fields and fill in defaults"""
+        return {
+            "spike_threshold": float(recommendations.get("spike_threshold", 50)),
+            "cooldown_seconds": int(recommendations.get("cooldown_seconds", 300)),
+            "stop_loss_pips": float(recommendations.get("stop_loss_pips", 20)),
+            "take_profit_pips": float(recommendations.get("take_profit_pips", 40)),
+            "risk_score": float(recommendations.get("risk_score", 5)),
+            "confidence": float(recommendations.get("confidence", 70)),
+            "market_trend": recommendations.get("market_trend", "Neutral"),
+            "reasoning": recommendations.get("reasoning", "Analysis unavailable"),
+            "timestamp": datetime.now().isoformat()
+        }
+    
     def _get_default_recommendations(self) -> Dict:
         """Get default recommendations when AI analysis fails"""
         return {
@@ -268,8 +770,546 @@ Focus on:
 
 # Initialize analyzers
 spike_analyzer = SpikeAnalyzer()
+spike_library = SpikeLibrary(spike_analyzer.min_spike_size)
+spike_hazard = SpikeHazard(spike_analyzer.min_spike_size)
 ai_analyzer = AIAnalyzer()
 
+def get_threshold_sweep(symbol: str, window: int, thresholds: Optional[List[float]] = None) -> Optional[Dict]:
+    """Threshold sweep over the latest M1 window for a symbol, served from cache when unchanged"""
+    with tracer.span('threshold_sweep', window=window):
+        bars = timeframe_store.get_bars(symbol, 'M1', window)
+        if len(bars['close']) < 3:
+            return None
+        return sweep_cache.get(symbol, bars['close'], bars['time'][-1], thresholds)
+
+def dispatch(symbol: str, fn, *args):
+    """Run per-symbol work on the shard worker that owns the symbol, or in-process"""
+    if shard_pool is not None:
+        context = tracer.current_context()
+        if context is not None:
+            return shard_pool.call(symbol, traced_call, context, fn, *args)
+        return shard_pool.call(symbol, fn, *args)
+    return fn(*args)
+
+def traced_call(context: tuple, fn, *args):
+    """Continue the caller's trace inside a shard worker"""
+    with tracer.resume(context, 'shard', shard=worker_index()):
+        return fn(*args)
+
+def run_analysis(symbol: str, price_data: PriceData, market_info: Dict, deadline: Optional[float] = None,
+                 last_bar_time: Optional[int] = None, refresh_ahead: float = 0.0) -> Tuple[Optional[Dict], int, Dict]:
+    """Merge posted bars into the symbol's series and return the analysis for its latest bar
+
+    Returns (recommendations, spikes analyzed, info). Recommendations are None when
+    the server has no bars for the symbol, or older ones than the client reports,
+    and the client has to post its bars. `refresh_ahead` starts a new regime epoch
+    if the current one would expire within that many seconds.
+    """
+    if history_store is not None and symbol not in history_seeded:
+        seed_from_history(symbol)
+
+    # Keep the canonical M1 history and derived higher timeframes up to date
+    with tracer.span('ingest_bars', bars=len(price_data)) as span:
+        merged = market_data.ingest(symbol, bars_from_price_data(price_data)) if price_data else 0
+        span.set(merged=merged)
+    
+    bar_range = market_data.bar_range(symbol)
+    if bar_range is None or (last_bar_time is not None and last_bar_time > bar_range[1]):
+        return None, 0, {'need_bars': True, 'bar_time': bar_range[1] if bar_range else None}
+    bar_time = bar_range[1]
+    
+    # A new analysis is due on a new bar, or with regime detection only on a shift or
+    # once the last one is too old; every terminal on the symbol shares it
+    key = bar_time
+    if REGIME_TRIGGER:
+        with tracer.span('regime') as span:
+            update_regime(symbol)
+            # Detectors still learning their baseline cannot flag a shift, so analyze per bar until then
+            if regime_detector.warm(symbol):
+                epoch, trigger = regime_detector.epoch(symbol, ahead=refresh_ahead)
+                key = ('regime', epoch)
+                span.set(epoch=epoch, trigger=trigger)
+            else:
+                span.set(trigger='warmup')
+    result, status = market_data.analysis(
+        symbol, key, lambda: analyze_latest_bar(symbol, bar_time, key, market_info, deadline),
+        timeout=deadline if deadline is not None else 30.0
+    )
+    if result is None:
+        return None, 0, {'pending': True, 'bar_time': bar_time}
+    recommendations, spikes_analyzed, analyzed_bar_time = result
+    return recommendations, spikes_analyzed, {'bar_time': bar_time, 'analysis': status,
+                                              'analyzed_bar_time': analyzed_bar_time}
+
+def seed_from_history(symbol: str) -> int:
+    """Load a symbol's latest imported M1 bars (see import_history.py) the first time it is seen"""
+    with analysis_lock:
+        if symbol in history_seeded:
+            return 0
+        history_seeded.add(symbol)
+    with tracer.span('seed_history') as span:
+        bars = history_store.open(symbol, 'm1')
+        count = min(len(bars['time']), timeframe_store.max_m1_bars)
+        span.set(bars=count)
+        if count == 0:
+            return 0
+        timeframe_store.ingest_bars(symbol, {f: np.array(bars[f][-count:]) for f in BAR_FIELDS})
+    logger.info(f"Seeded {symbol} with {count} imported M1 bars")
+    return count
+
+def analyze_latest_bar(symbol: str, bar_time: int, key, market_info: Dict,
+                       deadline: Optional[float] = None) -> Tuple[Dict, int, int]:
+    """Detect spikes over the canonical window and produce recommendations for one symbol
+
+    Returns (recommendations, spikes analyzed, bar time analyzed).
+    """
+    bars = timeframe_store.get_bars(symbol, 'M1', ANALYSIS_WINDOW)
+    closes = bars['close'].tolist()
+    
+    # Score earlier recommendations against the bars that arrived since
+    with tracer.span('outcome_scoring'):
+        update_outcomes(symbol)
+    
+    # Detect spikes
+    with tracer.span('detect_spikes') as span:
+        spikes = spike_analyzer.detect_spikes(closes, times=bars['time'])
+        span.set(spikes=len(spikes))
+    logger.info(f"Detected {len(spikes)} spikes")
+    
+    with tracer.span('market_context'):
+        timeframes = timeframe_store.summarize(symbol)
+        threshold_sweep = get_threshold_sweep(symbol, SWEEP_WINDOW)
+    
+    # RSI, EMA, ATR and volatility as the EA computes them, advanced by the new bars only
+    with tracer.span('indicators'):
+        indicators = indicator_engine.update(symbol, bars)
+    
+    # Outcomes of the past spikes whose setups look most like the latest one
+    similar_spikes = None
+    if SIMILAR_SPIKES > 0:
+        with tracer.span('similar_spikes') as span:
+            span.set(indexed=update_from_m1(symbol, spike_library))
+            similar_spikes = spike_library.similar(symbol, bars['time'], bars['close'], SIMILAR_SPIKES)
+    
+    # Chance of the next spike arriving soon, from the symbol's inter-arrival distribution
+    with tracer.span('spike_hazard'):
+        hazard = get_spike_hazard(symbol)
+    
+    regime_epoch = key[1] if isinstance(key, tuple) else None
+    
+    def on_late_result(late: Dict):
+        rank = ANALYSIS_TIERS.index(late.get('tier', 'default'))
+        
+        def replaces(shared) -> bool:
+            # A slower tier landing after a better one, or a streamed update of the
+            # result already shared, leaves the shared analysis as it is
+            current = shared[0]
+            return current is not late and rank <= ANALYSIS_TIERS.index(current.get('tier', 'default'))
+        
+        if market_data.upgrade(symbol, key, (late, len(spikes), bar_time), replaces):
+            if regime_epoch is not None:
+                regime_detector.retry(symbol, regime_epoch, None)
+            # The late result takes over from the newest bar, so bars already scored stay with the fallback
+            issued_at = max((market_data.bar_range(symbol) or (0, bar_time))[1], bar_time)
+            outcome_scorer.record(symbol, late, issued_at, ai_analyzer.model_for(late.get('tier', 'default')),
+                                  round((time.perf_counter() - started) * 1000, 1))
+        cache_late_result(symbol, late)
+    
+    # Perform AI analysis
+    started = time.perf_counter()
+    with tracer.span('analyze_spikes') as span:
+        recommendations = ai_analyzer.analyze_spikes(spikes, {
+            'symbol': symbol,
+            'current_price': closes[-1] if closes else 0,
+            'spread': market_info.get('spread', 0),
+            'volatility': market_info.get('volatility') or (indicators or {}).get('volatility') or 0,
+            'bar_count': len(closes),
+            'indicators': indicators,
+            'timeframes': timeframes,
+            'threshold_sweep': threshold_sweep,
+            'similar_spikes': similar_spikes,
+            'spike_hazard': hazard
+        }, deadline=deadline, on_late_result=on_late_result)
+        span.set(tier=recommendations.get('tier'))
+    
+    tier = recommendations.get('tier', 'default')
+    # Local statistics standing in for a failed or late LLM call should not hold the epoch until
+    # max_age; a late primary result cancels the retry
+    if regime_epoch is not None and tier in ('local', 'default') and ai_analyzer.engine != 'local':
+        regime_detector.retry(symbol, regime_epoch, REGIME_RETRY_SECONDS)
+    outcome_scorer.record(symbol, recommendations, bar_time, ai_analyzer.model_for(tier),
+                          round((time.perf_counter() - started) * 1000, 1))
+    return recommendations, len(spikes), bar_time
+
+def update_from_m1(symbol: str, model) -> int:
+    """Feed new M1 bars to a per-symbol spike model, starting from the imported history the first time"""
+    added = 0
+    if symbol not in model and history_store is not None:
+        stored = history_store.open(symbol, 'm1')
+        if len(stored['time']):
+            added = model.update(symbol, stored['time'], stored['close'])
+    bars = timeframe_store.get_bars(symbol, 'M1', timeframe_store.max_m1_bars)
+    return added + model.update(symbol, bars['time'], bars['close'])
+
+def get_spike_hazard(symbol: str, since: Optional[int] = None, horizons=HAZARD_HORIZONS) -> Optional[Dict]:
+    """Spike arrival probabilities for a symbol held by this process"""
+    update_from_m1(symbol, spike_hazard)
+    return spike_hazard.lookup(symbol, since, horizons)
+
+def get_indicators(symbol: str) -> Optional[Dict]:
+    """Indicators on a symbol's latest M1 bar held by this process"""
+    return indicator_engine.update(symbol, timeframe_store.get_bars(symbol, 'M1', ANALYSIS_WINDOW))
+
+def update_outcomes(symbol: str) -> int:
+    """Score recommendations for a symbol against its stored M1 bars"""
+    return outcome_scorer.update(symbol, timeframe_store.get_bars(symbol, 'M1', timeframe_store.max_m1_bars))
+
+def update_regime(symbol: str) -> List[Dict]:
+    """Run the regime detectors over M1 bars that arrived since the last update"""
+    return regime_detector.update(symbol, timeframe_store.get_bars(symbol, 'M1', timeframe_store.max_m1_bars))
+
+def get_regime_state(symbol: str) -> Optional[Dict]:
+    """Regime detector state for a symbol held by this process"""
+    update_regime(symbol)
+    return regime_detector.stats(symbol).get(symbol)
+
+def get_outcomes(symbol: Optional[str] = None, limit: int = 20) -> Dict:
+    """Outcome counters held by this process, with recent history for one symbol"""
+    if symbol is not None:
+        update_outcomes(symbol)
+        return {'snapshot': outcome_scorer.snapshot(symbol), 'history': outcome_scorer.history(symbol, limit)}
+    for name in list(outcome_scorer.symbols):
+        update_outcomes(name)
+    return {'snapshot': outcome_scorer.snapshot()}
+
+def get_memory_snapshot(top: int = 10) -> Dict:
+    """Memory snapshot of this process, with the size of the per-symbol state it holds"""
+    snapshot = memory_tracker.snapshot(top)
+    snapshot['state'] = {
+        'm1_symbols': len(timeframe_store.m1),
+        'm1_bars': sum(len(bars['time']) for bars in list(timeframe_store.m1.values())),
+        'spike_index_rows': sum(index['rows'] for index in spike_library.stats().values()),
+        'hazard_symbols': len(spike_hazard.symbols),
+        'outcome_symbols': len(outcome_scorer.symbols),
+    }
+    return snapshot
+
+def set_memory_tracking(frames: int) -> bool:
+    """Start tracemalloc with `frames` frames per allocation, or stop it when 0"""
+    if frames > 0:
+        memory_tracker.start(frames)
+    else:
+        memory_tracker.stop()
+    return memory_tracker.tracing
+
+def log_file_bytes() -> Dict[str, int]:
+    """Current size of every file the server logs to"""
+    sizes = {}
+    for handler in logging.getLogger().handlers:
+        path = getattr(handler, 'baseFilename', None)
+        if path and os.path.isfile(path):
+            sizes[os.path.basename(path)] = os.path.getsize(path)
+    return sizes
+
+def get_market_data_stats() -> Dict:
+    """Bar merge, analysis sharing, regime and spike model counters held by this process"""
+    return {'market_data': market_data.stats(), 'regime': regime_detector.stats(),
+            'spike_index': spike_library.stats(), 'spike_hazard': spike_hazard.stats(),
+            'indicators': indicator_engine.stats(), 'openai_dispatcher': ai_analyzer.dispatcher.stats(),
+            'threshold_sweep_cache': {'hits': sweep_cache.hits, 'misses': sweep_cache.misses}}
+
+def sum_worker_counters(workers: List[Dict]) -> Dict:
+    """Add up per-worker counters; retry limits and pause times take the largest value"""
+    totals = {}
+    for counters in workers:
+        for key, value in counters.items():
+            if key in ('max_retries', 'paused_for_seconds'):
+                totals[key] = max(totals.get(key, value), value)
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+def profile_call(mode: str, label: str, fn, *args):
+    """Run fn under the profiler where the work actually happens (shard worker or in-process)"""
+    return profiler.run(mode, label, fn, *args)
+
+def cache_late_result(symbol: str, recommendations: Dict):
+    """Store recommendations that completed after the response was sent"""
+    # Shard workers hand late results to the routing process, which owns the cache
+    if publish('late_result', symbol, recommendations):
+        return
+    
+    with analysis_lock:
+        cached = analysis_cache.get(symbol)
+        if cached is None:
+            return
+        current = cached['recommendations']
+        rank = ANALYSIS_TIERS.index(recommendations.get('tier', 'default'))
+        upgraded = current is not recommendations and rank <= ANALYSIS_TIERS.index(current.get('tier', 'default'))
+        if current is not recommendations and not upgraded:
+            return
+        cached['recommendations'] = recommendations
+        bar_time = cached.get('bar_time')
+    logger.info(f"Late {recommendations.get('tier')}-tier analysis cached for {symbol}")
+    # Terminals already got the faster answer; send them the better one
+    if upgraded and socket_server is not None:
+        socket_server.push(symbol, {**recommendations, 'bar_time': bar_time, 'analysis': 'late'})
+
+def handle_shard_event(kind: str, *args):
+    """Apply events pushed by shard workers"""
+    if kind == 'late_result':
+        cache_late_result(*args)
+    elif kind == 'span':
+        tracer.store(*args)
+
+def ingest_tick_batch(symbol: str, time_msc, bid, ask) -> Dict:
+    """Ingest one tick batch into this process's tick state"""
+    result = tick_ingestor.ingest(symbol, time_msc, bid, ask)
+    update_outcomes(symbol)
+    update_regime(symbol)
+    return result
+
+def ingest_packed_ticks(symbol: str, payload: bytes) -> Dict:
+    """Ingest packed tick records into this process's tick state"""
+    result = tick_ingestor.ingest_packed(symbol, payload)
+    update_outcomes(symbol)
+    update_regime(symbol)
+    return result
+
+def get_tick_state(symbol: str) -> Optional[Dict]:
+    """Tick buffer state held by this process"""
+    return tick_ingestor.stats(symbol)
+
+def get_timeframe_bars(symbol: str, timeframe: str, count: int) -> Dict:
+    """Resampled bars held by this process"""
+    return timeframe_store.get_bars(symbol, timeframe, count)
+
+def history_view(symbol: str, dataset: str) -> SeriesView:
+    """Imported history of a dataset followed by the newer bars held in memory"""
+    stored = history_store.open(symbol, dataset) if history_store is not None else None
+    segments = [stored] if stored is not None else []
+    timeframe = dataset.upper()
+    if timeframe == 'M1' or timeframe in TIMEFRAMES:
+        live = dispatch(symbol, get_timeframe_bars, symbol, timeframe, timeframe_store.max_m1_bars)
+        if stored is not None and len(stored['time']):
+            newer = live['time'] > stored['time'][-1]
+            live = {f: values[newer] for f, values in live.items()}
+        segments.append(live)
+    return SeriesView(segments, time_column(dataset), dataset_columns(dataset))
+
+def get_spike_profiles(symbol: str, window: int, horizon: int) -> Optional[Dict]:
+    """Spike profiles over the M1 history held by this process"""
+    bars = timeframe_store.get_bars(symbol, 'M1', window)
+    if len(bars['close']) < 3:
+        return None
+    profile = spike_analyzer.spike_profiles(bars['close'], horizon, times=bars['time'])
+    return {"window": int(len(bars['close'])), **profile}
+
+def analyze_symbol(symbol: str, price_data: PriceData, market_info: Dict, last_bar_time: Optional[int] = None,
+                   deadline: Optional[float] = None, client: Optional[str] = None,
+                   profile_mode: Optional[str] = None) -> Tuple[int, Dict, Optional[str]]:
+    """Admit, run (or share) and cache one analysis request from HTTP or the socket endpoint
+
+    Returns (status code, response body, profile name or None).
+    """
+    # Shed instead of piling more LLM calls onto a saturated server
+    queued_at = time.monotonic()
+    with tracer.span('admission') as span:
+        reason = admission.acquire(CRITICAL, client, symbol, timeout=deadline)
+        span.set(shed_reason=reason)
+    if reason is not None:
+        return (*shed_payload(symbol, reason), None)
+    try:
+        if deadline is not None:
+            deadline = max(deadline - (time.monotonic() - queued_at), 0.0)
+        
+        profile_name = None
+        if profile_mode is None:
+            recommendations, spikes_analyzed, info = dispatch(
+                symbol, run_analysis, symbol, price_data, market_info, deadline, last_bar_time
+            )
+        else:
+            (recommendations, spikes_analyzed, info), profile_name = dispatch(
+                symbol, profile_call, profile_mode, symbol, run_analysis,
+                symbol, price_data, market_info, deadline, last_bar_time
+            )
+        if info.get('need_bars'):
+            return 409, {'success': False, 'error': f'No current price history for {symbol}; send price_data',
+                         'need_bars': True, 'bar_time': info['bar_time']}, profile_name
+        if info.get('pending'):
+            # Another terminal's analysis of this bar is still running past our deadline
+            return (*shed_payload(symbol, 'analysis_pending'), profile_name)
+        
+        body = store_analysis(symbol, recommendations, spikes_analyzed, info, client)
+        precompute.track(symbol, market_info, hit=info['analysis'] == 'shared')
+        logger.info(f"Analysis completed for {symbol}")
+        return 200, body, profile_name
+    finally:
+        admission.release()
+
+def store_analysis(symbol: str, recommendations: Dict, spikes_analyzed: int, info: Dict,
+                   origin: Optional[str] = None) -> Dict:
+    """Cache an analysis for /recommendations and push a newly computed one to socket subscribers"""
+    with tracer.span('cache_store'), analysis_lock:
+        analysis_cache[symbol] = {
+            'recommendations': recommendations,
+            'spikes_analyzed': spikes_analyzed,
+            'bar_time': info['bar_time'],
+            'last_analysis': datetime.now().isoformat()
+        }
+        last_analysis_time[symbol] = datetime.now()
+    body = {**recommendations, 'bar_time': info['bar_time'], 'analysis': info['analysis'],
+            'analyzed_bar_time': info['analyzed_bar_time']}
+    if info['analysis'] == 'computed' and socket_server is not None:
+        socket_server.push(symbol, body, origin=origin)
+    return body
+
+def precompute_symbol(symbol: str, market_info: Dict, refresh_ahead: float) -> str:
+    """Background analysis of a tracked symbol on spare capacity; returns its status or why it did not run"""
+    # Without regime epochs an analysis is keyed on the latest bar, which only a client can post,
+    # so a background run would just share the one already there
+    if not REGIME_TRIGGER:
+        return 'regime_off'
+    # Low priority: never queues, never takes a client's or symbol's rate tokens
+    reason = admission.acquire(LOW)
+    if reason is not None:
+        return reason
+    trace_id, root = tracer.begin('precompute', None, symbol=symbol)
+    try:
+        # Bounded like a client request, so a stuck LLM call cannot hold the scheduler thread
+        recommendations, spikes_analyzed, info = dispatch(
+            symbol, run_analysis, symbol, parse_price_data(None), market_info,
+            PRECOMPUTE_DEADLINE_MS / 1000.0, None, refresh_ahead
+        )
+        if info.get('need_bars'):
+            return 'need_bars'
+        if info.get('pending'):
+            return 'pending'
+        store_analysis(symbol, recommendations, spikes_analyzed, info)
+        return info['analysis']
+    finally:
+        if root is not None:
+            root.__exit__(None, None, None)
+        admission.release()
+
+precompute = PrecomputeScheduler(precompute_symbol, PRECOMPUTE_INTERVAL or 60.0, PRECOMPUTE_MIN_INTERVAL,
+                                 PRECOMPUTE_MAX_INTERVAL, idle_seconds=PRECOMPUTE_IDLE_SECONDS)
+
+def socket_analyze(message: Dict, client: str) -> Tuple[int, Dict]:
+    """Handle an analyze message from a socket connection the same way as POST /analyze"""
+    last_bar_time = message.get('last_bar_time')
+    if last_bar_time is not None:
+        try:
+            last_bar_time = int(last_bar_time)
+        except (TypeError, ValueError):
+            return 400, {'success': False, 'error': 'last_bar_time must be a unix time in seconds'}
+    # Socket clients are EA terminals: the MT5 deadline applies unless they send their own
+    deadline = resolve_deadline({'X-Deadline-Ms': str(message.get('deadline_ms') or ''), 'X-Client-Type': 'mt5'})
+    try:
+        price_data = parse_price_data(message.get('price_data'))
+    except PriceDataError as e:
+        return 400, {'success': False, 'error': str(e)}
+    symbol = message['symbol']
+    trace_id, root = tracer.begin('socket_analyze', message.get('trace_id'), force=bool(message.get('trace')),
+                                  symbol=symbol)
+    try:
+        status, body, _ = analyze_symbol(symbol, price_data, message.get('market_info') or {},
+                                         last_bar_time, deadline, client)
+    finally:
+        if root is not None:
+            root.__exit__(None, None, None)
+    return status, body
+
+# Endpoints gated by the admission controller; /analyze admits itself once the symbol is known
+ROUTE_PRIORITIES = {
+    'ingest_ticks': CRITICAL,
+    'get_recommendations': CRITICAL,
+    'get_tick_stats': LOW,
+    'get_thresholds': LOW,
+    'get_profiles': LOW,
+    'get_timeframes': LOW,
+    'get_stats': LOW,
+    'get_outcome_summary': LOW,
+    'get_symbol_outcomes': LOW,
+    'get_regime': LOW,
+    'get_history': LOW,
+    'get_spikes': LOW,
+    'get_hazard': LOW,
+    'get_symbol_indicators': LOW,
+}
+
+def client_id() -> str:
+    """Identify the caller for per-client rate limits"""
+    return request.headers.get('X-Client-Id') or request.remote_addr or 'unknown'
+
+def shed_payload(symbol: Optional[str], reason: str, label: Optional[str] = None) -> Tuple[int, Dict]:
+    """Status and body for a shed request: the last cached recommendation, or 503 without one"""
+    logger.warning(f"Shedding request for {symbol or label}: {reason}")
+    if symbol is not None:
+        with analysis_lock:
+            cached = analysis_cache.get(symbol)
+            if cached is not None:
+                return 200, {**cached['recommendations'], 'shed': True, 'shed_reason': reason,
+                             'cached_at': cached['last_analysis']}
+    return 503, {'success': False, 'error': 'Server busy', 'shed': True, 'shed_reason': reason}
+
+def shed_response(symbol: Optional[str], reason: str):
+    """Flask response for a shed request, with Retry-After when nothing is cached"""
+    status, body = shed_payload(symbol, reason, request.path)
+    response = jsonify(body)
+    if status == 503:
+        response.headers['Retry-After'] = '1'
+    return response, status
+
+# Endpoints that start a trace (sampled at TRACE_SAMPLE_RATE, or forced with X-Trace: 1)
+TRACED_ENDPOINTS = {'analyze_market', 'ingest_ticks'}
+
+@app.before_request
+def start_trace():
+    """Open the root span for traced endpoints"""
+    if request.endpoint not in TRACED_ENDPOINTS:
+        return None
+    g.trace_id, g.trace_span = tracer.begin(
+        request.endpoint, request.headers.get('X-Trace-Id'),
+        force=request.headers.get('X-Trace') == '1', path=request.path
+    )
+    return None
+
+@app.after_request
+def echo_trace_id(response):
+    """Return the trace ID so a slow response can be looked up in /traces"""
+    trace_id = g.get('trace_id')
+    if trace_id is not None:
+        response.headers['X-Trace-Id'] = trace_id
+        if g.trace_span is not None:
+            g.trace_span.set(status=response.status_code)
+    return response
+
+@app.teardown_request
+def end_trace(error=None):
+    """Close the root span"""
+    span = g.pop('trace_span', None)
+    if span is not None:
+        span.__exit__(type(error) if error else None, error, None)
+
+@app.before_request
+def admit_request():
+    """Apply route priorities so background reads cannot starve trading requests"""
+    priority = ROUTE_PRIORITIES.get(request.endpoint)
+    if priority is None:
+        return None
+    reason = admission.acquire(priority)
+    if reason is not None:
+        return shed_response(None, reason)
+    g.admitted = True
+    return None
+
+@app.teardown_request
+def release_request(error=None):
+    """Free the admission slot held by this request"""
+    if g.pop('admitted', False):
+        admission.release()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -286,62 +1326,66 @@ def analyze_market():
         # Get raw data and clean it to handle null terminators
         raw_data = request.get_data()
         logger.info(f"Raw request data: {raw_data[:200]}...")  # First 200 chars
+        if request_capture is not None:
+            request_capture.record(request.path, raw_data, request.headers)
         
-        # Clean the data by removing null terminators and other invalid characters
-        cleaned_data = raw_data.decode('utf-8', errors='ignore').rstrip('\x00')
-        logger.info(f"Cleaned data: {cleaned_data[:200]}...")  # First 200 chars
-        
-        # Try to parse JSON
-        try:
-            # First try the cleaned data
-            data = json.loads(cleaned_data)
-            logger.info(f"Parsed JSON data from cleaned data: {data}")
-        except Exception as json_error:
-            logger.error(f"JSON parsing failed with cleaned data: {json_error}")
-            # Fallback to Flask's built-in JSON parsing
+        with tracer.span('decode', bytes=len(raw_data)):
+            # Clean the data by removing null terminators and other invalid characters
+            cleaned_data = raw_data.decode('utf-8', errors='ignore').rstrip('\x00')
+            logger.info(f"Cleaned data: {cleaned_data[:200]}...")  # First 200 chars
+            
+            # Try to parse JSON
             try:
-                data = request.get_json()
-                logger.info(f"Parsed JSON data from Flask: {data}")
-            except Exception as flask_json_error:
-                logger.error(f"Flask JSON parsing also failed: {flask_json_error}")
-                logger.error(f"Raw data that failed to parse: {raw_data}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Invalid JSON: {str(json_error)}'
-                }), 400
+                # First try the cleaned data
+                data = json.loads(cleaned_data)
+                logger.info(f"Parsed JSON data from cleaned data: {data}")
+            except Exception as json_error:
+                logger.error(f"JSON parsing failed with cleaned data: {json_error}")
+                # Fallback to Flask's built-in JSON parsing
+                try:
+                    data = request.get_json()
+                    logger.info(f"Parsed JSON data from Flask: {data}")
+                except Exception as flask_json_error:
+                    logger.error(f"Flask JSON parsing also failed: {flask_json_error}")
+                    logger.error(f"Raw data that failed to parse: {raw_data}")
+                    return jsonify({
+                        'success': False,
+                        'error': f'Invalid JSON: {str(json_error)}'
+                    }), 400
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
         symbol = data.get('symbol', 'Unknown')
-        price_data = data.get('price_data', [])
+        try:
+            price_data = parse_price_data(data.get('price_data'))
+        except PriceDataError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         market_info = data.get('market_info', {})
+        # Terminals whose bars the server already holds may send only the last bar time they saw
+        last_bar_time = data.get('last_bar_time')
+        if last_bar_time is not None:
+            try:
+                last_bar_time = int(last_bar_time)
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'last_bar_time must be a unix time in seconds'}), 400
         
         logger.info(f"Received analysis request for {symbol} with {len(price_data)} price points")
+        if g.get('trace_span') is not None:
+            g.trace_span.set(symbol=symbol)
         
-        # Detect spikes
-        spikes = spike_analyzer.detect_spikes(price_data)
-        logger.info(f"Detected {len(spikes)} spikes")
-        
-        # Perform AI analysis
-        recommendations = ai_analyzer.analyze_spikes(spikes, {
-            'symbol': symbol,
-            'current_price': price_data[-1]['close'] if price_data else 0,
-            'spread': market_info.get('spread', 0),
-            'volatility': market_info.get('volatility', 0)
-        })
-        
-        # Cache results
-        with analysis_lock:
-            analysis_cache[symbol] = {
-                'recommendations': recommendations,
-                'spikes_analyzed': len(spikes),
-                'last_analysis': datetime.now().isoformat()
-            }
-            last_analysis_time[symbol] = datetime.now()
-        
-        logger.info(f"Analysis completed for {symbol}")
-        return jsonify(recommendations)
+        deadline = resolve_deadline(request.headers)
+        profile_mode = profiler.requested(symbol, request.headers.get('X-Profile'))
+        status, body, profile_name = analyze_symbol(
+            symbol, price_data, market_info, last_bar_time, deadline, client_id(), profile_mode
+        )
+        with tracer.span('respond'):
+            response = jsonify(body)
+        if status == 503:
+            response.headers['Retry-After'] = '1'
+        if profile_name is not None:
+            response.headers['X-Profile-Id'] = profile_name
+        return response, status
         
     except Exception as e:
         logger.error(f"Analysis error: {e}")
@@ -351,17 +1395,268 @@ def analyze_market():
 def get_recommendations(symbol):
     """Get cached recommendations for a symbol"""
     with analysis_lock:
-        if symbol in analysis_cache:
-            return jsonify(analysis_cache[symbol])
+        cached = analysis_cache.get(symbol)
+        response = jsonify(cached) if cached is not None else None
+    precompute.read(symbol, hit=cached is not None)
+    if response is not None:
+        return response
+    return jsonify({"error": "No analysis available for symbol"}), 404
+
+@app.route('/ticks', methods=['POST'])
+def ingest_ticks():
+    """Ingest a batch of ticks (time_msc, bid, ask) for one symbol"""
+    try:
+        if request.content_type == 'application/octet-stream':
+            # Packed records, symbol passed as a query parameter
+            symbol = request.args.get('symbol')
+            if not symbol:
+                return jsonify({'success': False, 'error': 'symbol query parameter required'}), 400
+            result = dispatch(symbol, ingest_packed_ticks, symbol, request.get_data())
         else:
-            return jsonify({"error": "No analysis available for symbol"}), 404
+            cleaned_data = request.get_data().decode('utf-8', errors='ignore').rstrip('\x00')
+            data = json.loads(cleaned_data)
+            symbol = data.get('symbol') or request.args.get('symbol')
+            if not symbol:
+                return jsonify({'success': False, 'error': 'symbol is required'}), 400
+            
+            if 'ticks' in data:
+                # Row-oriented: [[time_msc, bid, ask], ...] or [{"time_msc": ..., ...}, ...]
+                rows = data['ticks']
+                if rows and isinstance(rows[0], dict):
+                    rows = [(t['time_msc'], t['bid'], t['ask']) for t in rows]
+                columns = np.array(rows, dtype=np.float64) if len(rows) else np.empty((0, 3))
+                if columns.ndim != 2 or columns.shape[1] != 3:
+                    raise ValueError("each tick row must be [time_msc, bid, ask]")
+                time_msc, bid, ask = columns[:, 0].astype(np.int64), columns[:, 1], columns[:, 2]
+            else:
+                time_msc, bid, ask = data['time_msc'], data['bid'], data['ask']
+            # Checked before dispatch too: a ValueError raised in a shard worker would not come back as one
+            check_prices(np.asarray(bid, dtype=np.float64), np.asarray(ask, dtype=np.float64))
+            result = dispatch(symbol, ingest_tick_batch, symbol, time_msc, bid, ask)
+        
+        if result['spikes']:
+            logger.info(f"Detected {len(result['spikes'])} tick spikes for {symbol}")
+        return jsonify({'success': True, 'symbol': symbol, **result})
+    
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Tick ingestion error: {e}")
+        return jsonify({'success': False, 'error': f'Invalid tick batch: {e}'}), 400
+
+@app.route('/ticks/<symbol>', methods=['GET'])
+def get_tick_stats(symbol):
+    """Get tick buffer state and recent tick spikes for a symbol"""
+    stats = dispatch(symbol, get_tick_state, symbol)
+    if stats is None:
+        return jsonify({"error": "No ticks received for symbol"}), 404
+    return jsonify(stats)
+
+@app.route('/thresholds/<symbol>', methods=['GET'])
+def get_thresholds(symbol):
+    """Get spike counts, reversal rates and mean retracement across a range of thresholds"""
+    window = request.args.get('window', SWEEP_WINDOW, type=int)
+    thresholds = None
+    try:
+        if request.args.get('thresholds'):
+            thresholds = [float(t) for t in request.args['thresholds'].split(',')]
+        elif request.args.get('max'):
+            low = request.args.get('min', 10, type=float)
+            high = request.args.get('max', type=float)
+            steps = request.args.get('steps', 20, type=int)
+            thresholds = np.round(np.linspace(low, high, steps), 4).tolist()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid thresholds: {e}"}), 400
+    
+    sweep = dispatch(symbol, get_threshold_sweep, symbol, window, thresholds)
+    if sweep is None:
+        return jsonify({"error": "Not enough price history for symbol"}), 404
+    return jsonify({"symbol": symbol, **sweep})
+
+@app.route('/profiles/<symbol>', methods=['GET'])
+def get_profiles(symbol):
+    """Get per-spike recovery and max-retracement profiles over the stored M1 history"""
+    window = request.args.get('window', SWEEP_WINDOW, type=int)
+    horizon = request.args.get('horizon', RETRACEMENT_HORIZON, type=int)
+    if window < 1:
+        return jsonify({"error": "window must be >= 1"}), 400
+    if horizon < 1 or horizon > 1000:
+        return jsonify({"error": "horizon must be between 1 and 1000"}), 400
+    
+    profile = dispatch(symbol, get_spike_profiles, symbol, window, horizon)
+    if profile is None:
+        return jsonify({"error": "Not enough price history for symbol"}), 404
+    return jsonify({"symbol": symbol, **profile})
+
+@app.route('/hazard/<symbol>', methods=['GET'])
+def get_hazard(symbol):
+    """Get the probability of a spike within the next k bars given the bars since the last one"""
+    since = request.args.get('since', type=int)
+    horizons = request.args.getlist('k', type=int) or list(HAZARD_HORIZONS)
+    if (since is not None and since < 0) or min(horizons) < 1:
+        return jsonify({"error": "since must be >= 0 and k >= 1"}), 400
+    
+    hazard = dispatch(symbol, get_spike_hazard, symbol, since, horizons)
+    if hazard is None:
+        return jsonify({"error": "Not enough spikes recorded for symbol"}), 404
+    return jsonify({"symbol": symbol, **hazard})
+
+@app.route('/indicators/<symbol>', methods=['GET'])
+def get_symbol_indicators(symbol):
+    """Get RSI, EMA/SMA, ATR and volatility on the latest M1 bar, and whether the EA's filters would pass"""
+    indicators = dispatch(symbol, get_indicators, symbol)
+    if indicators is None:
+        return jsonify({"error": "No M1 bars for symbol"}), 404
+    return jsonify({"symbol": symbol, **indicators})
+
+@app.route('/timeframes/<symbol>', methods=['GET'])
+def get_timeframes(symbol):
+    """Get resampled OHLC bars for a symbol"""
+    timeframe = request.args.get('tf', 'M5').upper()
+    count = request.args.get('count', 100, type=int)
+    if count < 1:
+        return jsonify({"error": "count must be >= 1"}), 400
+    
+    if timeframe != 'M1' and timeframe not in TIMEFRAMES:
+        return jsonify({"error": f"Unsupported timeframe: {timeframe}"}), 400
+    
+    bars = dispatch(symbol, get_timeframe_bars, symbol, timeframe, count)
+    if len(bars['time']) == 0:
+        return jsonify({"error": "No price history available for symbol"}), 404
+    
+    return jsonify({
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "bars": [
+            {"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+            for t, o, h, l, c in zip(bars['time'], bars['open'], bars['high'], bars['low'], bars['close'])
+        ]
+    })
+
+@app.route('/history/<symbol>', methods=['GET'])
+def get_history(symbol):
+    """Stream bars or ticks for a time range as JSON Lines, CSV or packed binary records"""
+    dataset = request.args.get('tf', 'M1').lower()
+    fmt = request.args.get('format', 'jsonl')
+    start = request.args.get('from', type=int)
+    end = request.args.get('to', type=int)
+    max_points = request.args.get('max_points', type=int)
+    fields = request.args.get('fields')
+    
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    stored = history_store.datasets(symbol) if history_store is not None else []
+    if dataset not in stored and dataset.upper() != 'M1' and dataset.upper() not in TIMEFRAMES:
+        return jsonify({"error": f"No {dataset} history for {symbol}"}), 404
+    try:
+        columns = select_columns(dataset_columns(dataset), fields.split(',') if fields else None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if dataset == 'ticks':
+        # Ranges are given in seconds; ticks are keyed by milliseconds
+        start = start * 1000 if start is not None else None
+        end = end * 1000 + 999 if end is not None else None
+    
+    view = history_view(symbol, dataset)
+    if len(view) == 0:
+        return jsonify({"error": "No price history available for symbol"}), 404
+    lo, hi = view.range(start, end)
+    ticks = dataset == 'ticks'
+    factor = decimation_factor(hi - lo, max_points, 2 if ticks else 1)
+    chunks = view.chunks(lo, hi, max(EXPORT_CHUNK_ROWS // factor, 1) * factor)
+    chunks = decimate_ticks(chunks, factor) if ticks else decimate_bars(chunks, factor)
+    
+    response = Response(encode(chunks, fmt, columns), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['X-Rows'] = str(hi - lo)
+    response.headers['X-Decimation'] = str(factor)
+    if fmt == 'binary':
+        response.headers['X-Record-Dtype'] = dtype_header(columns)
+    return response
+
+@app.route('/spikes/<symbol>', methods=['GET'])
+def get_spikes(symbol):
+    """Stream every spike in a time range of the M1 history with its recovery and retracement"""
+    fmt = request.args.get('format', 'jsonl')
+    start = request.args.get('from', type=int)
+    end = request.args.get('to', type=int)
+    min_size = request.args.get('min_size', spike_analyzer.min_spike_size, type=float)
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    
+    view = history_view(symbol, 'm1')
+    if len(view) == 0:
+        return jsonify({"error": "No price history available for symbol"}), 404
+    lo, hi = view.range(start, end)
+    
+    response = Response(encode(iter_spikes(view, lo, hi, min_size), fmt, SPIKE_COLUMNS),
+                        mimetype=EXPORT_FORMATS[fmt])
+    response.headers['X-Rows'] = str(hi - lo)
+    if fmt == 'binary':
+        response.headers['X-Record-Dtype'] = dtype_header(SPIKE_COLUMNS)
+    return response
+
+@app.route('/outcomes', methods=['GET'])
+def get_outcome_summary():
+    """Hypothetical-trade results of past recommendations, per symbol and per model"""
+    if shard_pool is not None:
+        snapshots = [result['snapshot'] for result in shard_pool.broadcast(get_outcomes)]
+    else:
+        snapshots = [get_outcomes()['snapshot']]
+    return jsonify(merge_snapshots(snapshots))
+
+@app.route('/outcomes/<symbol>', methods=['GET'])
+def get_symbol_outcomes(symbol):
+    """Outcome summary and recent scored recommendations for a symbol"""
+    limit = request.args.get('limit', 20, type=int)
+    result = dispatch(symbol, get_outcomes, symbol, limit)
+    if not result['history']:
+        return jsonify({"error": "No recommendations issued for symbol"}), 404
+    summary = merge_snapshots([result['snapshot']])['symbols'].get(symbol)
+    return jsonify({"symbol": symbol, "summary": summary, "recommendations": result['history']})
+
+@app.route('/regime/<symbol>', methods=['GET'])
+def get_regime(symbol):
+    """Regime detector state, recent shifts and analysis triggers for a symbol"""
+    state = dispatch(symbol, get_regime_state, symbol)
+    if state is None:
+        return jsonify({"error": "No bars seen for symbol"}), 404
+    return jsonify({"symbol": symbol, "enabled": REGIME_TRIGGER, "max_age_seconds": REGIME_MAX_AGE_SECONDS,
+                    "retry_seconds": REGIME_RETRY_SECONDS, **state})
 
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Get server statistics"""
+    # Each shard worker holds the market data of the symbols it owns
+    shared_market_data, regimes, spike_indexes, hazards, indicator_states = {}, {}, {}, {}, {}
+    workers = shard_pool.broadcast(get_market_data_stats) if shard_pool is not None else [get_market_data_stats()]
+    for worker_stats in workers:
+        shared_market_data.update(worker_stats['market_data'])
+        regimes.update(worker_stats['regime'])
+        spike_indexes.update(worker_stats['spike_index'])
+        hazards.update(worker_stats['spike_hazard'])
+        indicator_states.update(worker_stats['indicators'])
+    
     with analysis_lock:
         stats = {
             "total_symbols_analyzed": len(analysis_cache),
+            "threshold_sweep_cache": sum_worker_counters([w['threshold_sweep_cache'] for w in workers]),
+            "shards": shard_pool.stats() if shard_pool is not None else None,
+            "admission": admission.stats(),
+            "openai_dispatcher": sum_worker_counters([w['openai_dispatcher'] for w in workers]),
+            "capture": request_capture.stats() if request_capture is not None else None,
+            "tracing": tracer.stats(),
+            "socket": socket_server.stats() if socket_server is not None else None,
+            "market_data": shared_market_data,
+            "regime": {
+                "enabled": REGIME_TRIGGER,
+                "max_age_seconds": REGIME_MAX_AGE_SECONDS,
+                "retry_seconds": REGIME_RETRY_SECONDS,
+                "symbols": {symbol: {k: v for k, v in state.items() if k not in ('recent_alarms', 'detectors')}
+                            for symbol, state in regimes.items()},
+            },
+            "spike_index": {"neighbours": SIMILAR_SPIKES, "symbols": spike_indexes},
+            "spike_hazard": hazards,
+            "indicators": {"rsi_period": RSI_PERIOD, "ema_period": EMA_PERIOD, "atr_period": ATR_PERIOD,
+                           "ea_filters": sorted(EA_FILTERS), "symbols": indicator_states},
+            "precompute": dict(precompute.stats(), enabled=PRECOMPUTE_INTERVAL > 0 and REGIME_TRIGGER),
             "last_analyses": {},
             "server_uptime": "running",
             "openai_model": OPENAI_MODEL
@@ -375,6 +1670,87 @@ def get_stats():
         
         return jsonify(stats)
 
+@app.route('/traces', methods=['GET'])
+def list_traces():
+    """Most recent sampled traces, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"tracing": tracer.stats(), "traces": tracer.recent(limit)})
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """All spans of one trace in start order, with nesting depth"""
+    spans = tracer.get(trace_id)
+    if spans is None:
+        return jsonify({"error": "Trace not found (not sampled, or evicted from the buffer)"}), 404
+    return jsonify({"trace_id": trace_id, "spans": spans})
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def admin_profile():
+    """Arm profiling for the next N /analyze requests or for a symbol"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode', 'cprofile')
+        if mode not in PROFILE_MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(PROFILE_MODES)}"}), 400
+        try:
+            count = int(data.get('count', 0 if data.get('symbol') else 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "count must be an integer"}), 400
+        profiler.arm(count, data.get('symbol'), mode)
+        logger.info(f"Profiling armed: {data}")
+    elif request.method == 'DELETE':
+        profiler.disarm()
+    return jsonify(profiler.stats())
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List stored profiles, newest first"""
+    return jsonify({"profiles": profiler.list()})
+
+@app.route('/admin/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download a stored profile, or a text summary with ?format=text"""
+    if request.args.get('format') == 'text':
+        summary = profiler.summary(name)
+        if summary is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return summary, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    path = profiler.path_for(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=name)
+
+@app.route('/admin/memory', methods=['GET', 'POST', 'DELETE'])
+def admin_memory():
+    """Live memory snapshot of the server and its shard workers
+
+    POST starts tracemalloc (or resets its growth baseline), DELETE stops it.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            frames = int(data.get('frames', 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "frames must be an integer"}), 400
+        if not 1 <= frames <= 64:
+            return jsonify({"error": "frames must be between 1 and 64"}), 400
+        set_memory_tracking(frames)
+        if shard_pool is not None:
+            shard_pool.broadcast(set_memory_tracking, frames)
+    elif request.method == 'DELETE':
+        set_memory_tracking(0)
+        if shard_pool is not None:
+            shard_pool.broadcast(set_memory_tracking, 0)
+    
+    top = request.args.get('top', 10, type=int)
+    snapshot = get_memory_snapshot(top)
+    with analysis_lock:
+        snapshot['state'].update(analysis_cache=len(analysis_cache), last_analysis_time=len(last_analysis_time))
+    snapshot['state']['traces_buffered'] = tracer.stats()['traces_buffered']
+    snapshot['log_bytes'] = log_file_bytes()
+    shards = shard_pool.broadcast(get_memory_snapshot, top) if shard_pool is not None else []
+    return jsonify({"process": snapshot, "shards": shards})
+
 @app.route('/clear_cache', methods=['POST'])
 def clear_cache():
     """Clear analysis cache"""
@@ -391,4 +1767,19 @@ if __name__ == '__main__':
     if OPENAI_API_KEY == 'your-openai-api-key-here':
         logger.warning("Please set OPENAI_API_KEY environment variable")
     
+    # Fork shard workers before Flask starts any threads
+    if SHARD_WORKERS > 0:
+        shard_pool = ShardPool(SHARD_WORKERS, on_event=handle_shard_event)
+    
+    # Persistent TCP endpoint for terminals, next to the HTTP API
+    if SOCKET_PORT > 0:
+        socket_server = SocketServer(socket_analyze, SERVER_HOST, SOCKET_PORT).start()
+    
+    # Refresh tracked symbols in the background so terminals' requests find their analysis ready
+    if PRECOMPUTE_INTERVAL > 0 and REGIME_TRIGGER:
+        precompute.pin(PRECOMPUTE_SYMBOLS)
+        precompute.start()
+    elif PRECOMPUTE_INTERVAL > 0:
+        logger.info("Background precompute needs REGIME_TRIGGER=true; not started")
+    
     app.run(host=SERVER_HOST, port=SERVER_PORT, debug=False, threaded=True) 
\ No newline at end of file
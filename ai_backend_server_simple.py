@@ -11,9 +11,11 @@ import requests
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import threading
 import time
+from local_recommender import LocalRecommender
+from price_ingest import PriceDataError, parse_price_data
 
 # Configure logging
 logging.basicConfig(
@@ -46,6 +48,7 @@ load_config()
 # Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'your-openai-api-key-here')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4')
+RECOMMENDER_ENGINE = os.getenv('RECOMMENDER_ENGINE', 'openai').lower()
 SERVER_PORT = int(os.getenv('SERVER_PORT', 5001))
 SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
 
@@ -67,8 +70,8 @@ class SpikeAnalyzer:
         self.min_spike_size = 50  # pips
         self.spike_threshold_percent = 1.0
         
-    def detect_spikes(self, price_data: List[float]) -> List[Dict]:
-        """Detect spikes in price data"""
+    def detect_spikes(self, price_data: Sequence[float]) -> List[Dict]:
+        """Detect spikes in a sequence of close prices (such as PriceData.close)"""
         spikes = []
         
         if len(price_data) < 3:
@@ -92,6 +95,7 @@ class SpikeAnalyzer:
                     'price': current_price,
                     'spike_size': change_to_current,
                     'is_crash': current_price < prev_price,
+                    'bar_index': i,
                     'recovery_time': self._calculate_recovery_time(price_data, i),
                     'max_retracement': self._calculate_max_retracement(price_data, i)
                 }
@@ -99,7 +103,7 @@ class SpikeAnalyzer:
                 
         return spikes
     
-    def _calculate_recovery_time(self, price_data: List[float], spike_index: int) -> int:
+    def _calculate_recovery_time(self, price_data: Sequence[float], spike_index: int) -> int:
         """Calculate time to recover from spike"""
         spike_price = price_data[spike_index]
         
@@ -109,7 +113,7 @@ class SpikeAnalyzer:
         
         return 300  # Default 5 minutes if no recovery detected
     
-    def _calculate_max_retracement(self, price_data: List[float], spike_index: int) -> float:
+    def _calculate_max_retracement(self, price_data: Sequence[float], spike_index: int) -> float:
         """Calculate maximum retracement after spike"""
         spike_price = price_data[spike_index]
         max_retracement = 0
@@ -126,22 +130,30 @@ class AIAnalyzer:
     def __init__(self):
         self.api_key = OPENAI_API_KEY
         self.model = OPENAI_MODEL
+        self.engine = RECOMMENDER_ENGINE
+        self.local_recommender = LocalRecommender()
         self.base_url = "https://api.openai.com/v1/chat/completions"
         
     def analyze_spikes(self, spikes: List[Dict], market_data: Dict) -> Dict:
-        """Analyze spikes using OpenAI"""
+        """Analyze spikes using OpenAI, falling back to local statistics"""
         if not spikes:
             return self._get_default_recommendations()
+        
+        local = self.local_recommender.recommend(spikes, market_data.get('bar_count', 0))
+        if self.engine == 'local':
+            return local
             
         # Prepare analysis prompt
         prompt = self._create_analysis_prompt(spikes, market_data)
         
         try:
             response = self._call_openai(prompt)
-            return self._parse_ai_response(response)
+            if not response:
+                return local
+            return self._parse_ai_response(response, local)
         except Exception as e:
             logger.error(f"AI analysis failed: {e}")
-            return self._get_default_recommendations()
+            return local
     
     def _create_analysis_prompt(self, spikes: List[Dict], market_data: Dict) -> str:
         """Create analysis prompt for OpenAI"""
@@ -241,22 +253,26 @@ Focus on:
             logger.error(f"OpenAI API call failed: {e}")
             return ""
     
-    def _parse_ai_response(self, response: str) -> Dict:
-        """Parse AI response"""
+    def _parse_ai_response(self, response: str, fallback: Optional[Dict] = None) -> Dict:
+        """Parse AI response over `fallback` (or the defaults), which also fills any field the reply leaves out"""
+        fallback = fallback or self._get_default_recommendations()
         if not response:
-            return self._get_default_recommendations()
+            return fallback
             
         try:
             # Try to extract JSON from response
             start = response.find('{')
             end = response.rfind('}') + 1
             if start != -1 and end != 0:
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except:
+                parsed = json.loads(response[start:end])
+                if isinstance(parsed, dict):
+                    known = self._get_default_recommendations()
+                    return {**fallback, **{k: v for k, v in parsed.items() if k in known}}
+        except ValueError:
             pass
             
-        return self._get_default_recommendations()
+        logger.warning("Could not parse AI response, using local statistics")
+        return fallback
     
     def _get_default_recommendations(self) -> Dict:
         """Get default recommendations when AI is not available"""
@@ -323,20 +339,24 @@ def analyze_market():
                 }), 400
         
         symbol = data.get('symbol', 'CRASH_1000')
-        price_data = data.get('price_data', [])
+        try:
+            price_data = parse_price_data(data.get('price_data'))
+        except PriceDataError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         logger.info(f"Received analysis request for {symbol} with {len(price_data)} price points")
         
         # Detect spikes
-        spikes = spike_analyzer.detect_spikes(price_data)
+        spikes = spike_analyzer.detect_spikes(price_data.close)
         logger.info(f"Detected {len(spikes)} spikes")
         
         # Prepare market data
         market_data = {
             'symbol': symbol,
-            'current_price': price_data[-1] if price_data else 0,
+            'current_price': price_data.close[-1] if price_data else 0,
             'spread': data.get('spread', 0),
-            'volatility': data.get('volatility', 0)
+            'volatility': data.get('volatility', 0),
+            'bar_count': len(price_data)
         }
         
         # Get AI analysis
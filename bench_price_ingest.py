@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark for price_data normalization
+Parse throughput per payload shape, alone and through to the M1 bar arrays the analyzers use
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from price_ingest import parse_price_data
+from timeframes import bars_from_price_data
+
+START = 1700000040  # minute-aligned
+
+def payloads(count: int, seed: int = 1) -> dict:
+    """The same bars in every shape price_data arrives in"""
+    rng = np.random.default_rng(seed)
+    close = np.round(10000 + np.cumsum(rng.normal(0, 5, count)), 2)
+    times = START + 60 * np.arange(count)
+    high, low = close + 2, close - 2
+    rows = [f"{t},{c + 0.5:.2f},{h:.2f},{l:.2f},{c:.2f}" for t, c, h, l in zip(times, close, high, low)]
+    return {
+        'float list': close.tolist(),
+        'ohlc records': [{'time': int(t), 'open': c + 0.5, 'high': h, 'low': l, 'close': c}
+                         for t, c, h, l in zip(times, close.tolist(), high.tolist(), low.tolist())],
+        'columns': {'time': times.tolist(), 'open': (close + 0.5).tolist(), 'high': high.tolist(),
+                    'low': low.tolist(), 'close': close.tolist()},
+        'mql closes string': ','.join(f"{c:.2f}" for c in close) + '\x00',
+        'mql rows string': ';'.join(rows) + '\x00',
+        'mql string list': [row + '\x00' for row in rows],
+    }
+
+def measure(fn, payload, repeat: int) -> float:
+    """Median seconds per call"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price_data parsing per payload shape")
+    parser.add_argument('--bars', default='20,1000,100000', help='comma-separated bar counts')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for count in [int(n) for n in args.bars.split(',')]:
+        repeat = max(3, args.repeat if count <= 10000 else args.repeat // 4)
+        print(f"\n{count} bars")
+        print(f"{'shape':20s} {'parse us':>10s} {'M rows/s':>9s} {'to bars us':>11s} {'M rows/s':>9s}")
+        for shape, payload in payloads(count).items():
+            parse = measure(parse_price_data, payload, repeat)
+            bars = measure(bars_from_price_data, payload, repeat)
+            print(f"{shape:20s} {parse * 1e6:10.1f} {count / parse / 1e6:9.2f} "
+                  f"{bars * 1e6:11.1f} {count / bars / 1e6:9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Overhead benchmark for on-demand profiling
+Compares /analyze with profiling disabled, with the check bypassed, and under each profiler
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Keep the benchmark offline: local statistics instead of OpenAI calls
+os.environ.setdefault('RECOMMENDER_ENGINE', 'local')
+os.environ.setdefault('PROFILE_DIR', tempfile.mkdtemp(prefix='bench-profiles-'))
+os.environ.setdefault('SYMBOL_RATE_PER_SECOND', '1000000')
+os.environ.setdefault('SYMBOL_BURST', '1000000')
+os.environ.setdefault('CLIENT_RATE_PER_SECOND', '1000000')
+os.environ.setdefault('CLIENT_BURST', '1000000')
+
+import ai_backend_server as server
+
+class NeverProfile:
+    """Stand-in with no checks at all, as if profiling did not exist"""
+
+    def requested(self, symbol, header=None):
+        return None
+
+def generate_window(bars, seed=3):
+    """Random walk with spikes, as bare closes like the EA posts"""
+    rng = np.random.default_rng(seed)
+    changes = rng.normal(0, 5, bars)
+    spike_bars = rng.choice(bars - 1, bars // 50, replace=False)
+    jumps = rng.choice([-1, 1], len(spike_bars)) * rng.uniform(60, 300, len(spike_bars))
+    changes[spike_bars] += jumps
+    changes[spike_bars + 1] -= jumps * 0.7
+    return (10000 + np.cumsum(changes)).round(2).tolist()
+
+def time_request(client, body, headers=None):
+    """Seconds for one /analyze request"""
+    server.market_data.clear()  # time the analysis, not the result shared for the bar
+    start = time.perf_counter()
+    response = client.post('/analyze', data=body, headers=headers or {})
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return elapsed
+
+def time_interleaved(client, body, rounds, configurations):
+    """Median seconds per request for each configuration, alternating them every round to cancel drift"""
+    timings = {name: [] for name in configurations}
+    for _ in range(rounds):
+        for name, (profiler, headers) in configurations.items():
+            server.profiler = profiler
+            timings[name].append(time_request(client, body, headers))
+    return {name: float(np.median(values)) for name, values in timings.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure profiling overhead on /analyze")
+    parser.add_argument('--bars', type=int, default=1000, help='M1 bars per request')
+    parser.add_argument('--requests', type=int, default=300, help='requests per configuration')
+    args = parser.parse_args()
+
+    client = server.app.test_client()
+    body = json.dumps({'symbol': 'BENCH', 'price_data': generate_window(args.bars), 'market_info': {}})
+    for _ in range(20):
+        time_request(client, body)  # warm up caches and imports
+
+    # The disabled check on its own
+    profiler = server.profiler
+    profiler.allow_header = True  # the profiled configurations ask by header
+    calls = 1000000
+    start = time.perf_counter()
+    for _ in range(calls):
+        profiler.requested('BENCH', None)
+    check_ns = (time.perf_counter() - start) / calls * 1e9
+
+    medians = time_interleaved(client, body, args.requests, {
+        'bypassed': (NeverProfile(), None),
+        'disabled': (profiler, None),
+    })
+    medians.update(time_interleaved(client, body, max(args.requests // 5, 1), {
+        'cprofile': (profiler, {'X-Profile': 'cprofile'}),
+        'sampling': (profiler, {'X-Profile': 'sampling'}),
+    }))
+    server.profiler = profiler
+    base = medians['bypassed']
+
+    print(f"{args.bars} bars per request, median of interleaved requests")
+    print(f"disabled check     : {check_ns:8.1f} ns per request ({check_ns / (base * 1e9) * 100:.4f}% of a request)")
+    print(f"no profiling hooks : {base * 1000:8.3f} ms")
+    for name, label in (('disabled', 'profiling disabled'), ('cprofile', 'cProfile'), ('sampling', 'sampling')):
+        print(f"{label:19s}: {medians[name] * 1000:8.3f} ms  ({(medians[name] / base - 1) * 100:+.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Evaluation of regime-triggered analysis
+Synthetic M1 series with known regime changes: false alarms, detection latency and LLM call volume
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from regime_detector import RegimeDetector
+
+# (name, volatility, spike probability per bar, mean spike size)
+BASE = ('base', 6.0, 1 / 40, 120.0)
+SHIFTS = [
+    ('volatility x2', 12.0, 1 / 40, 120.0),
+    ('volatility x0.5', 3.0, 1 / 40, 120.0),
+    ('spike rate x3', 6.0, 3 / 40, 120.0),
+    ('spike rate x0.33', 6.0, 1 / 120, 120.0),
+    ('spike size x2', 6.0, 1 / 40, 240.0),
+]
+
+def generate(segments, rng, start=1700000040):
+    """Bars for consecutive (regime, length) segments, with the start index of each segment"""
+    moves, starts = [], []
+    for (_, volatility, rate, size), length in segments:
+        starts.append(sum(len(m) for m in moves))
+        step = rng.normal(0, volatility, length)
+        spikes = rng.random(length) < rate
+        step[spikes] = -rng.exponential(size - 60, spikes.sum()) - 60  # crash spikes of at least 60
+        moves.append(step)
+    close = 10000 + np.cumsum(np.concatenate(moves))
+    return {'time': start + 60 * np.arange(len(close), dtype=np.int64), 'close': close}, starts
+
+def feed(detector, symbol, bars, batch=1):
+    """Stream bars in batches like terminals posting every minute
+
+    Returns (alarms, bar indices where an analysis was triggered, seconds per bar).
+    """
+    alarms, analyses = [], []
+    n = len(bars['time'])
+    elapsed = 0.0
+    for stop in range(2, n + 1, batch):
+        window = {k: v[max(stop - 1000, 0):stop] for k, v in bars.items()}
+        started = time.perf_counter()
+        alarms.extend(detector.update(symbol, window))
+        elapsed += time.perf_counter() - started
+        _, trigger = detector.epoch(symbol, now=float(bars['time'][stop - 1]))
+        if trigger is not None:
+            analyses.append(stop - 1)
+    return alarms, analyses, elapsed / n
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the regime detector on synthetic regimes")
+    parser.add_argument('--trials', type=int, default=20, help='series per scenario')
+    parser.add_argument('--bars', type=int, default=3000, help='bars per regime segment')
+    parser.add_argument('--threshold', type=float, default=8.0, help='CUSUM alarm level (std units)')
+    parser.add_argument('--rate-threshold', type=float, default=6.0, help='spike-rate CUSUM alarm level')
+    parser.add_argument('--max-age', type=float, default=1800, help='seconds before a forced re-analysis')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    def detector():
+        return RegimeDetector(max_age=args.max_age, threshold=args.threshold, rate_threshold=args.rate_threshold)
+
+    # Stationary series: every alarm is a false alarm
+    false_alarms, bars_seen, cost = 0, 0, []
+    for trial in range(args.trials):
+        bars, _ = generate([(BASE, 2 * args.bars)], rng)
+        alarms, _, per_bar = feed(detector(), 'S', bars)
+        false_alarms += len(alarms)
+        bars_seen += len(bars['time'])
+        cost.append(per_bar)
+    print(f"{args.trials} stationary series of {2 * args.bars} bars")
+    print(f"  false alarms      : {false_alarms / bars_seen * 1440:.2f} per day of M1 bars")
+    print(f"  update cost       : {np.median(cost) * 1e6:.1f} us per bar")
+
+    print(f"\n{'change':18s} {'detected':>9s} {'median lag':>11s} {'p90 lag':>8s}  (bars after the change)")
+    for shift in SHIFTS:
+        lags, detected = [], 0
+        for trial in range(args.trials):
+            bars, starts = generate([(BASE, args.bars), (shift, args.bars)], rng)
+            change_time = bars['time'][starts[1]]
+            alarms, _, _ = feed(detector(), 'S', bars)
+            after = [a for a in alarms if a['bar_time'] >= change_time]
+            if after:
+                detected += 1
+                lags.append((after[0]['bar_time'] - change_time) // 60)
+        median = f"{np.median(lags):11.0f}" if lags else f"{'-':>11s}"
+        p90 = f"{np.percentile(lags, 90):8.0f}" if lags else f"{'-':>8s}"
+        print(f"{shift[0]:18s} {detected:4d}/{args.trials:<4d} {median} {p90}")
+
+    # One day with two regime changes, a terminal polling every minute
+    segments = [(BASE, 500), (SHIFTS[0], 500), (SHIFTS[2], 440)]
+    bars, starts = generate(segments, rng)
+    changes = starts[1:]
+    interval_bars = int(args.max_age // 60)
+    print(f"\nOne day (1440 bars) with changes at bars {changes}, polled every minute")
+    print(f"{'policy':30s} {'LLM calls':>9s}  bars from each change to the next analysis")
+    print(f"{'every new bar':30s} {len(bars['time']) - 1:9d}  {[0] * len(changes)}")
+    fixed = list(range(0, len(bars['time']), interval_bars))
+    print(f"{f'fixed {args.max_age:.0f}s interval':30s} {len(fixed):9d}  "
+          f"{[next(a for a in fixed + [len(bars['time'])] if a >= c) - c for c in changes]}")
+    for max_age in (args.max_age, 4 * args.max_age):
+        detector = RegimeDetector(max_age=max_age, threshold=args.threshold, rate_threshold=args.rate_threshold)
+        _, triggered, _ = feed(detector, 'S', bars)
+        delays = [next((a for a in triggered if a >= c), len(bars['time'])) - c for c in changes]
+        print(f"{f'regime-triggered, max age {max_age:.0f}s':30s} {len(triggered):9d}  {delays}")
+
+if __name__ == "__main__":
+    main()
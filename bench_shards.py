@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for symbol-sharded analysis
+Drives run_analysis for many symbols in-process and across shard worker pools
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Keep the benchmark offline: local statistics instead of OpenAI calls
+os.environ.setdefault('RECOMMENDER_ENGINE', 'local')
+
+import ai_backend_server as server
+from shard_pool import ShardPool
+
+def generate_window(bars, seed):
+    """Random walk with spikes, as bare closes like the EA posts"""
+    rng = np.random.default_rng(seed)
+    changes = rng.normal(0, 5, bars)
+    spike_bars = rng.choice(bars - 1, bars // 50, replace=False)
+    jumps = rng.choice([-1, 1], len(spike_bars)) * rng.uniform(60, 300, len(spike_bars))
+    changes[spike_bars] += jumps
+    changes[spike_bars + 1] -= jumps * 0.7
+    return (10000 + np.cumsum(changes)).round(2).tolist()
+
+def analyze_uncached(symbol, window):
+    """One analysis of the window, without reusing the result shared for its latest bar"""
+    server.market_data.clear()
+    return server.run_analysis(symbol, window, {})
+
+def run_load(pool, symbols, windows, requests_per_symbol, concurrency):
+    """Fire analysis requests for all symbols and return requests per second"""
+    def analyze(job):
+        symbol, window = job
+        if pool is None:
+            return analyze_uncached(symbol, window)
+        return pool.call(symbol, analyze_uncached, symbol, window)
+
+    jobs = [(symbol, windows[symbol]) for _ in range(requests_per_symbol) for symbol in symbols]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(analyze, jobs))
+    return len(jobs) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded analysis throughput")
+    parser.add_argument('--symbols', type=int, default=32, help='distinct symbols')
+    parser.add_argument('--bars', type=int, default=5000, help='M1 bars per request')
+    parser.add_argument('--requests', type=int, default=8, help='requests per symbol')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent client threads')
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts')
+    args = parser.parse_args()
+
+    symbols = [f"BENCH_{i}" for i in range(args.symbols)]
+    windows = {symbol: generate_window(args.bars, i) for i, symbol in enumerate(symbols)}
+    print(f"CPU cores: {os.cpu_count()}, {args.symbols} symbols x {args.requests} requests, {args.bars} bars each")
+
+    baseline = run_load(None, symbols, windows, args.requests, args.concurrency)
+    print(f"in-process   : {baseline:8.1f} req/s")
+
+    for workers in [int(w) for w in args.workers.split(',')]:
+        pool = ShardPool(workers)
+        try:
+            # Warm up each worker's imports and caches
+            run_load(pool, symbols, windows, 1, args.concurrency)
+            throughput = run_load(pool, symbols, windows, args.requests, args.concurrency)
+        finally:
+            pool.close()
+        print(f"{workers:2d} worker(s) : {throughput:8.1f} req/s  ({throughput / baseline:.2f}x in-process)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Round-trip latency benchmark: persistent socket protocol vs HTTP
+Runs both endpoints in-process on loopback and times identical analysis requests
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+# Keep the benchmark offline: local statistics instead of OpenAI calls
+os.environ.setdefault('RECOMMENDER_ENGINE', 'local')
+os.environ.setdefault('SYMBOL_RATE_PER_SECOND', '1000000')
+os.environ.setdefault('SYMBOL_BURST', '1000000')
+os.environ.setdefault('CLIENT_RATE_PER_SECOND', '1000000')
+os.environ.setdefault('CLIENT_BURST', '1000000')
+
+import ai_backend_server as server
+from socket_client import SocketClient
+from socket_server import SocketServer
+
+SYMBOL = 'BENCH'
+
+def generate_bars(bars, seed=3):
+    """M1 OHLC bars ending at the current minute"""
+    rng = np.random.default_rng(seed)
+    close = (10000 + np.cumsum(rng.normal(0, 5, bars))).round(2)
+    last = int(time.time()) // 60 * 60
+    return [{'time': last - 60 * (bars - 1 - i), 'open': float(c), 'high': float(c) + 1,
+             'low': float(c) - 1, 'close': float(c)} for i, c in enumerate(close)]
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    return {'p50': np.percentile(values, 50), 'p90': np.percentile(values, 90), 'p99': np.percentile(values, 99)}
+
+def time_calls(fn, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare socket and HTTP round-trip latency")
+    parser.add_argument('--requests', type=int, default=500, help='requests per path')
+    parser.add_argument('--bars', type=int, default=20, help='M1 bars per full upload (the EA posts 20)')
+    args = parser.parse_args()
+
+    http = make_server('127.0.0.1', 0, server.app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{http.server_port}/analyze"
+    endpoint = SocketServer(server.socket_analyze, '127.0.0.1', 0).start()
+    server.socket_server = endpoint
+    client = SocketClient(*endpoint.address)
+    session = requests.Session()
+
+    bars = generate_bars(args.bars)
+    light = {'symbol': SYMBOL, 'last_bar_time': bars[-1]['time']}
+    full = {'symbol': SYMBOL, 'price_data': bars, 'market_info': {}}
+    client.analyze(SYMBOL, bars)  # the first upload computes the shared analysis
+
+    def check(response):
+        assert response.status_code == 200, response.status_code
+
+    paths = {
+        'socket ping': lambda: client.ping(),
+        'socket analyze (bars)': lambda: client.analyze(SYMBOL, bars),
+        'socket analyze (light)': lambda: client.analyze(SYMBOL, last_bar_time=light['last_bar_time']),
+        'http keep-alive (bars)': lambda: check(session.post(url, json=full)),
+        'http keep-alive (light)': lambda: check(session.post(url, json=light)),
+        'http new conn (bars)': lambda: check(requests.post(url, json=full, headers={'Connection': 'close'})),
+        'http new conn (light)': lambda: check(requests.post(url, json=light, headers={'Connection': 'close'})),
+    }
+    for fn in paths.values():
+        for _ in range(20):
+            fn()  # warm up
+
+    print(f"{args.requests} round trips per path over loopback, {args.bars} bars per upload (no TLS)")
+    print(f"{'path':26s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s}")
+    for name, fn in paths.items():
+        result = time_calls(fn, args.requests)
+        print(f"{name:26s} {result['p50']:8.3f} {result['p90']:8.3f} {result['p99']:8.3f}")
+
+    client.close()
+    endpoint.close()
+    http.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the spike similarity index
+Feature extraction, index build time, query latency and recall against an exact scan
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from spike_index import SpikeIndex, spike_features, spike_gaps, spike_outcomes
+from spike_metrics import spike_indices
+
+START = 1700000040  # minute-aligned
+MIN_SPIKE_SIZE = 50.0
+
+def spike_windows(count: int, block_bars: int = 2000000, seed: int = 7):
+    """Feature rows and outcomes for `count` spikes, from synthetic M1 series with a crash every ~20 bars"""
+    rng = np.random.default_rng(seed)
+    vectors, outcomes, bars, rows = [], [], 0, 0
+    while rows < count:
+        volatility = rng.uniform(1.0, 6.0)
+        moves = rng.normal(0, volatility, block_bars) + rng.normal(0.05, 0.02)
+        crashes = np.flatnonzero(rng.random(block_bars - 1) < 0.05)
+        sizes = rng.gamma(3.0, 60.0, len(crashes)) + MIN_SPIKE_SIZE
+        moves[crashes] -= sizes
+        moves[crashes + 1] += sizes * rng.uniform(0.3, 1.0, len(crashes))  # snap-back on the next bar
+        closes = 1e6 + np.cumsum(moves)
+        times = START + 60 * (bars + np.arange(block_bars, dtype=np.int64))
+        indices = spike_indices(closes, MIN_SPIKE_SIZE)
+        gaps = spike_gaps(indices)
+        keep = (indices > 40) & (indices + 100 < block_bars)
+        indices, gaps = indices[keep][:count - rows], gaps[keep][:count - rows]
+        vectors.append(spike_features(closes, indices, gaps))
+        outcomes.append(spike_outcomes(closes, times, indices, MIN_SPIKE_SIZE))
+        bars += block_bars
+        rows += len(indices)
+    return (np.concatenate(vectors), {name: np.concatenate([o[name] for o in outcomes]) for name in outcomes[0]},
+            bars)
+
+def query_latency(index: SpikeIndex, queries: np.ndarray, k: int):
+    """Per-query milliseconds (median, p99) and the spike times found"""
+    timings, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, rows = index.search(query, k)
+        timings.append((time.perf_counter() - started) * 1000)
+        found.append(index.outcomes_at(rows[0])['time'])
+    return float(np.median(timings)), float(np.percentile(timings, 99)), np.array(found)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Share of the exact k nearest that the index returned"""
+    return float(np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spike similarity index build and query")
+    parser.add_argument('--windows', type=int, default=1000000, help='spike windows to index')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--nprobe', default='4,8,16,32', help='comma-separated lists to probe')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    vectors, outcomes, bars = spike_windows(args.windows + args.queries)
+    extract = time.perf_counter() - started
+    queries, vectors = vectors[:args.queries], vectors[args.queries:]
+    outcomes = {name: values[args.queries:] for name, values in outcomes.items()}
+    print(f"{len(vectors)} windows x {vectors.shape[1]} features from {bars / 1e6:.0f}M bars "
+          f"in {extract:.1f}s ({bars / extract / 1e6:.1f}M bars/s)")
+
+    exact = SpikeIndex(exact_limit=len(vectors))
+    started = time.perf_counter()
+    exact.build(vectors, outcomes)
+    print(f"\nexact build {time.perf_counter() - started:.2f}s")
+    median, p99, truth = query_latency(exact, queries, args.k)
+    print(f"exact scan: median {median:.2f} ms, p99 {p99:.2f} ms")
+
+    index = SpikeIndex(exact_limit=0)
+    started = time.perf_counter()
+    index.build(vectors, outcomes)
+    print(f"\nIVF build {time.perf_counter() - started:.2f}s, {len(index.centroids)} lists")
+    print(f"{'nprobe':>6s} {'median ms':>10s} {'p99 ms':>8s} {'recall@' + str(args.k):>10s}")
+    for nprobe in [int(n) for n in args.nprobe.split(',')]:
+        index.nprobe = nprobe
+        median, p99, found = query_latency(index, queries, args.k)
+        print(f"{nprobe:6d} {median:10.2f} {p99:8.2f} {recall(found, truth):10.3f}")
+
+if __name__ == "__main__":
+    main()
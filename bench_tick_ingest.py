@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark for tick ingestion
+Ingest throughput per batch size for column arrays and packed records, alone and feeding M1 bars
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tick_ingest import TICK_DTYPE, TickIngestor
+from timeframes import TimeframeStore
+
+START_MSC = 1700000040 * 1000  # minute-aligned
+
+def make_ticks(count: int, seed: int = 1):
+    """Sorted ticks ~250 ms apart with a random-walk bid and occasional spikes"""
+    rng = np.random.default_rng(seed)
+    time_msc = START_MSC + np.cumsum(rng.integers(50, 450, count))
+    moves = np.where(rng.random(count) < 0.001, -100.0, rng.normal(0, 1, count))
+    bid = np.round(10000 + np.cumsum(moves), 2)
+    return time_msc, bid, bid + 0.5
+
+def measure(ticks, batch: int, packed: bool, with_bars: bool, capacity: int) -> float:
+    """Seconds to ingest every tick in batches of `batch`"""
+    time_msc, bid, ask = ticks
+    store = TimeframeStore()
+    ingestor = TickIngestor(capacity, on_bars=store.ingest_bars if with_bars else None)
+    if packed:
+        records = np.empty(len(time_msc), dtype=TICK_DTYPE)
+        records['time_msc'], records['bid'], records['ask'] = time_msc, bid, ask
+        payloads = [records[i:i + batch].tobytes() for i in range(0, len(records), batch)]
+        started = time.perf_counter()
+        for payload in payloads:
+            ingestor.ingest_packed('BENCH', payload)
+    else:
+        batches = [(time_msc[i:i + batch], bid[i:i + batch], ask[i:i + batch]) for i in range(0, len(time_msc), batch)]
+        started = time.perf_counter()
+        for columns in batches:
+            ingestor.ingest('BENCH', *columns)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tick ingestion per batch size")
+    parser.add_argument('--ticks', type=int, default=200000, help='ticks per run')
+    parser.add_argument('--batches', default='1,10,100,1000,10000', help='comma-separated batch sizes')
+    parser.add_argument('--capacity', type=int, default=100000, help='ring buffer capacity')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ticks = make_ticks(args.ticks)
+    print(f"{args.ticks} ticks, median of {args.repeat} runs")
+    print(f"{'batch':>6s} {'columns M/s':>12s} {'packed M/s':>11s} {'+bars M/s':>10s} {'us/batch':>9s}")
+    for batch in [int(n) for n in args.batches.split(',')]:
+        # Single-tick batches are dominated by per-call overhead; fewer ticks keep the run short
+        count = min(args.ticks, batch * 20000)
+        subset = tuple(column[:count] for column in ticks)
+        rates = []
+        for packed, with_bars in ((False, False), (True, False), (True, True)):
+            seconds = float(np.median([measure(subset, batch, packed, with_bars, args.capacity)
+                                       for _ in range(args.repeat)]))
+            rates.append(count / seconds)
+        per_batch = batch / rates[2] * 1e6
+        print(f"{batch:6d} {rates[0] / 1e6:12.2f} {rates[1] / 1e6:11.2f} {rates[2] / 1e6:10.2f} {per_batch:9.1f}")
+
+if __name__ == "__main__":
+    main()
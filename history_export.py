@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Streaming History Export for MT5 Crash/Boom Scalping EA Backend
+Time-range reads over stored and live series in fixed-size chunks, with decimation and spike extraction
+"""
+
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from spike_metrics import RECOVERY_HORIZON, max_retracement, recovery_profile, spike_indices
+
+EXPORT_CHUNK_ROWS = 50000
+EXPORT_FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'binary': 'application/octet-stream',
+}
+SPIKE_COLUMNS = {
+    'time': '<i8', 'price': '<f8', 'prev_price': '<f8', 'size': '<f8', 'is_crash': '|b1',
+    'recovery_bars': '<i8', 'recovery_seconds': '<i8', 'recovered': '|b1', 'max_retracement': '<f8',
+}
+
+class SeriesView:
+    """Sorted, non-overlapping column segments (e.g. the history store, then live bars) read as one series
+
+    Only the requested slices are copied, so a view over memory-mapped files
+    costs nothing until it is read.
+    """
+
+    def __init__(self, segments: Sequence[Dict[str, np.ndarray]], time_column: str, columns: Dict[str, str]):
+        self.time = time_column
+        self.columns = columns
+        self.segments = [s for s in segments if len(s[time_column])]
+        self.offsets = np.cumsum([0] + [len(s[time_column]) for s in self.segments])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def find(self, value: int, side: str = 'left') -> int:
+        """Row index where `value` would be inserted, by binary search in each segment"""
+        return sum(int(np.searchsorted(s[self.time], value, side=side)) for s in self.segments)
+
+    def range(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """Rows with start <= time <= end (either bound may be None)"""
+        lo = 0 if start is None else self.find(start, 'left')
+        hi = len(self) if end is None else self.find(end, 'right')
+        return lo, max(hi, lo)
+
+    def slice(self, lo: int, hi: int, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Copy of rows lo..hi; columns a segment lacks are zero-filled"""
+        names = list(names or self.columns)
+        parts = {name: [] for name in names}
+        for k, segment in enumerate(self.segments):
+            a = max(lo - self.offsets[k], 0)
+            b = min(hi - self.offsets[k], len(segment[self.time]))
+            if a >= b:
+                continue
+            for name in names:
+                values = segment.get(name)
+                parts[name].append(np.asarray(values[a:b]) if values is not None
+                                   else np.zeros(b - a, dtype=self.columns[name]))
+        return {name: np.concatenate(chunks).astype(self.columns[name], copy=False) if chunks
+                else np.empty(0, dtype=self.columns[name]) for name, chunks in parts.items()}
+
+    def chunks(self, lo: int, hi: int, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+        for start in range(lo, hi, chunk_rows):
+            yield self.slice(start, min(start + chunk_rows, hi))
+
+def decimation_factor(rows: int, max_points: Optional[int], points_per_bucket: int = 1) -> int:
+    """Rows per bucket so that at most `max_points` points come out"""
+    if not max_points or rows <= max_points:
+        return 1
+    return -(-rows * points_per_bucket // max_points)
+
+def _rebucket(chunks: Iterator[Dict[str, np.ndarray]], factor: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Chunks holding whole buckets of `factor` rows (the last may be partial)"""
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = {name: np.concatenate((carry[name], values)) for name, values in chunk.items()}
+        whole = len(next(iter(chunk.values()))) // factor * factor
+        if whole:
+            yield {name: values[:whole] for name, values in chunk.items()}
+        carry = {name: values[whole:] for name, values in chunk.items()}
+    if carry is not None and len(next(iter(carry.values()))):
+        yield carry
+
+def decimate_bars(chunks: Iterator[Dict[str, np.ndarray]], factor: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Merge every `factor` bars into one OHLC bar, so spikes survive in the highs and lows"""
+    if factor <= 1:
+        yield from chunks
+        return
+    for chunk in _rebucket(chunks, factor):
+        starts = np.arange(0, len(chunk['time']), factor)
+        ends = np.append(starts[1:], len(chunk['time'])) - 1
+        merged = {}
+        for name, values in chunk.items():
+            if name == 'high' or name == 'spread':
+                merged[name] = np.maximum.reduceat(values, starts)
+            elif name == 'low':
+                merged[name] = np.minimum.reduceat(values, starts)
+            elif name == 'close':
+                merged[name] = values[ends]
+            elif name in ('tick_volume', 'volume'):
+                merged[name] = np.add.reduceat(values, starts)
+            else:
+                merged[name] = values[starts]  # time, open
+        yield merged
+
+def decimate_ticks(chunks: Iterator[Dict[str, np.ndarray]], factor: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Keep the lowest and highest bid tick of every `factor` ticks, in time order"""
+    if factor <= 1:
+        yield from chunks
+        return
+    for chunk in _rebucket(chunks, factor):
+        bid = chunk['bid']
+        n = len(bid)
+        whole = n // factor * factor
+        rows = []
+        if whole:
+            buckets = bid[:whole].reshape(-1, factor)
+            base = np.arange(0, whole, factor)
+            rows.append(np.stack((base + buckets.argmin(axis=1), base + buckets.argmax(axis=1)), axis=1))
+        if whole < n:
+            tail = bid[whole:]
+            rows.append(np.array([[whole + tail.argmin(), whole + tail.argmax()]]))
+        pairs = np.sort(np.concatenate(rows), axis=1)
+        keep = np.ones(pairs.shape, dtype=bool)
+        keep[:, 1] = pairs[:, 1] != pairs[:, 0]
+        index = pairs[keep]
+        yield {name: values[index] for name, values in chunk.items()}
+
+def iter_spikes(view: SeriesView, lo: int, hi: int, min_spike_size: float,
+                chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+    """Spikes on bars lo..hi of an M1 view, with the same recovery and retracement as /profiles
+
+    Each chunk is read with one bar before it and RECOVERY_HORIZON bars after it,
+    so the results match a pass over the whole series.
+    """
+    for start in range(lo, hi, chunk_rows):
+        stop = min(start + chunk_rows, hi)
+        first = max(start - 1, 0)
+        bars = view.slice(first, min(stop + RECOVERY_HORIZON + 1, len(view)), ('time', 'close'))
+        closes = bars['close'].astype(np.float64)
+        indices = spike_indices(closes, min_spike_size)
+        indices = indices[(indices + first >= start) & (indices + first < stop)]
+        if len(indices) == 0:
+            continue
+        recovery = recovery_profile(closes, indices, min_spike_size * 0.1, times=bars['time'])
+        prev = closes[indices - 1]
+        yield {
+            'time': bars['time'][indices],
+            'price': closes[indices],
+            'prev_price': prev,
+            'size': np.abs(closes[indices] - prev),
+            'is_crash': closes[indices] < prev,
+            'recovery_bars': recovery['bars'].astype(np.int64),
+            'recovery_seconds': recovery['seconds'].astype(np.int64),
+            'recovered': recovery['recovered'],
+            'max_retracement': max_retracement(closes, indices),
+        }
+
+def record_dtype(columns: Dict[str, str]) -> np.dtype:
+    """Packed little-endian record layout of the binary format"""
+    return np.dtype([(name, dtype) for name, dtype in columns.items()])
+
+def encode(chunks: Iterator[Dict[str, np.ndarray]], fmt: str, columns: Dict[str, str]) -> Iterator[bytes]:
+    """Serialize column chunks as JSON Lines, CSV (with a header row) or packed binary records"""
+    names = list(columns)
+    dtype = record_dtype(columns)
+    if fmt == 'csv':
+        yield (','.join(names) + '\n').encode()
+    for chunk in chunks:
+        if len(chunk[names[0]]) == 0:
+            continue
+        if fmt == 'binary':
+            records = np.empty(len(chunk[names[0]]), dtype=dtype)
+            for name in names:
+                records[name] = chunk[name]
+            yield records.tobytes()
+            continue
+        frame = pd.DataFrame({name: chunk[name] for name in names})
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            frame.to_csv(buffer, header=False, index=False)
+        else:
+            frame.to_json(buffer, orient='records', lines=True, double_precision=10)
+            if not buffer.getvalue().endswith('\n'):
+                buffer.write('\n')
+        yield buffer.getvalue().encode()
+
+def dtype_header(columns: Dict[str, str]) -> str:
+    """Value for X-Record-Dtype describing the binary record layout"""
+    return json.dumps([[name, dtype] for name, dtype in columns.items()])
+
+def select_columns(columns: Dict[str, str], fields: Optional[List[str]]) -> Dict[str, str]:
+    """Columns named in `fields` (all when None); raises ValueError on an unknown name"""
+    if not fields:
+        return dict(columns)
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return {name: columns[name] for name in fields}
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Columnar History Store for MT5 Crash/Boom Scalping EA Backend
+Per-symbol, time-sorted, deduplicated column files that can be memory-mapped
+
+Layout:
+
+    <root>/<symbol>/<dataset>/meta.json       row count, time range, column dtypes
+    <root>/<symbol>/<dataset>/<column>.bin    raw little-endian values, one file per column
+    <root>/<symbol>/<dataset>/runs/<id>/      sorted runs written by importers, merged by compact()
+
+Datasets are bar timeframes ('m1', 'm5', 'h1', ...) keyed by bar open time in
+seconds, where a later import replaces a bar with the same time, and 'ticks'
+keyed by time_msc, where only exact duplicate ticks are dropped.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = {
+    'time': '<i8', 'open': '<f8', 'high': '<f8', 'low': '<f8', 'close': '<f8',
+    'tick_volume': '<i8', 'volume': '<i8', 'spread': '<i4',
+}
+TICK_COLUMNS = {
+    'time_msc': '<i8', 'bid': '<f8', 'ask': '<f8', 'last': '<f8', 'volume': '<f8', 'flags': '<i4',
+}
+MERGE_BLOCK_ROWS = 500000
+
+def dataset_columns(dataset: str) -> Dict[str, str]:
+    """Column names and dtypes of a dataset"""
+    return TICK_COLUMNS if dataset == 'ticks' else BAR_COLUMNS
+
+def time_column(dataset: str) -> str:
+    return 'time_msc' if dataset == 'ticks' else 'time'
+
+def symbol_dir_name(symbol: str) -> str:
+    """Filesystem-safe directory name for a symbol ('Crash 1000 Index' -> 'Crash_1000_Index')"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', symbol).strip('_') or 'unknown'
+
+def sort_dedup(columns: Dict[str, np.ndarray], dataset: str) -> Dict[str, np.ndarray]:
+    """Sort rows by time and drop duplicates; for bars the last row for a time wins"""
+    times = columns[time_column(dataset)]
+    if len(times) == 0:
+        return columns
+    if dataset == 'ticks':
+        # Ticks can share a millisecond; only rows equal in every column are duplicates
+        names = list(columns)
+        order = np.lexsort([columns[name] for name in reversed(names)])
+        columns = {name: values[order] for name, values in columns.items()}
+        same = np.ones(len(order) - 1, dtype=bool)
+        for values in columns.values():
+            same &= values[1:] == values[:-1]
+        keep = np.append(True, ~same)
+    else:
+        order = np.argsort(times, kind='stable')
+        columns = {name: values[order] for name, values in columns.items()}
+        times = columns['time']
+        keep = np.append(times[1:] != times[:-1], True)
+    if keep.all():
+        return columns
+    return {name: values[keep] for name, values in columns.items()}
+
+class ColumnFiles:
+    """Appendable set of column files plus meta.json in one directory"""
+
+    def __init__(self, path: str, dataset: str):
+        self.path = path
+        self.dataset = dataset
+        self.columns = dataset_columns(dataset)
+        self.time = time_column(dataset)
+        self.meta = self._read_meta()
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'dataset': self.dataset, 'rows': 0, 'first': None, 'last': None, 'columns': self.columns}
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    @property
+    def rows(self) -> int:
+        return self.meta['rows']
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        """Append rows that are already sorted and follow the stored rows
+
+        meta.json is written last and is what counts: bytes past its row count,
+        left by an append that died before updating it, are cut off first.
+        """
+        n = len(columns[self.time])
+        if n == 0:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for name, dtype in self.columns.items():
+            with open(os.path.join(self.path, f"{name}.bin"), 'ab') as f:
+                f.truncate(self.meta['rows'] * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        times = columns[self.time]
+        if self.meta['first'] is None:
+            self.meta['first'] = int(times[0])
+        self.meta['last'] = int(times[-1])
+        self.meta['rows'] += n
+        self._write_meta()
+
+    def open(self) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column (empty arrays when there are no rows)"""
+        rows = self.rows
+        arrays = {}
+        for name, dtype in self.columns.items():
+            if rows == 0:
+                arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,))
+        return arrays
+
+class RunWriter:
+    """Writes one import's chunks as sorted runs, starting a new run whenever order breaks"""
+
+    def __init__(self, store: 'HistoryStore', symbol: str, dataset: str, sequence: Optional[int] = None):
+        self.store = store
+        self.symbol = symbol
+        self.dataset = dataset
+        self.sequence = time.time_ns() if sequence is None else sequence
+        self.time = time_column(dataset)
+        self.run = None
+        self.rows = 0
+
+    def write(self, columns: Dict[str, np.ndarray]):
+        """Add one parsed chunk (any order, may contain duplicates)"""
+        columns = sort_dedup(columns, self.dataset)
+        times = columns[self.time]
+        if len(times) == 0:
+            return
+        last = self.run.meta['last'] if self.run is not None else None
+        # Bars must strictly increase inside a run; ticks may repeat a millisecond
+        if last is None or times[0] < last or (self.dataset != 'ticks' and times[0] == last):
+            runs = os.path.join(self.store.dataset_path(self.symbol, self.dataset), 'runs')
+            name = f"{self.sequence:020d}-{uuid.uuid4().hex}"
+            self.run = ColumnFiles(os.path.join(runs, name), self.dataset)
+        self.run.append(columns)
+        self.rows += len(times)
+
+class HistoryStore:
+    """Per-symbol columnar history under one root directory"""
+
+    def __init__(self, root: str = 'history'):
+        self.root = root
+
+    def dataset_path(self, symbol: str, dataset: str) -> str:
+        return os.path.join(self.root, symbol_dir_name(symbol), dataset)
+
+    def writer(self, symbol: str, dataset: str, sequence: Optional[int] = None) -> RunWriter:
+        """Writer for one import; its runs are merged into the dataset by compact()
+
+        Where imports overlap, bars from the writer with the higher `sequence`
+        (default: creation time) replace the others.
+        """
+        return RunWriter(self, symbol, dataset, sequence)
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def datasets(self, symbol: str) -> List[str]:
+        path = os.path.join(self.root, symbol_dir_name(symbol))
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name, 'meta.json')))
+
+    def info(self, symbol: str, dataset: str) -> Optional[Dict]:
+        """meta.json of a dataset, or None if it does not exist"""
+        meta = ColumnFiles(self.dataset_path(symbol, dataset), dataset).meta
+        return meta if meta['rows'] else None
+
+    def open(self, symbol: str, dataset: str) -> Dict[str, np.ndarray]:
+        """Memory-mapped columns of a dataset"""
+        return ColumnFiles(self.dataset_path(symbol, dataset), dataset).open()
+
+    def _runs(self, path: str, dataset: str) -> List[ColumnFiles]:
+        runs_path = os.path.join(path, 'runs')
+        if not os.path.isdir(runs_path):
+            return []
+        runs = [ColumnFiles(os.path.join(runs_path, name), dataset) for name in os.listdir(runs_path)]
+        return sorted((run for run in runs if run.rows), key=lambda run: run.meta['first'])
+
+    def compact(self, symbol: str, dataset: str, block_rows: int = MERGE_BLOCK_ROWS) -> Dict:
+        """Merge pending runs into the dataset; memory stays O(runs x block_rows)"""
+        path = self.dataset_path(symbol, dataset)
+        base = ColumnFiles(path, dataset)
+        runs = self._runs(path, dataset)
+        if not runs:
+            return {'rows': base.rows, 'merged_runs': 0, 'rewritten': False}
+
+        # Fast path: every run starts after everything before it, so the files only grow
+        ordered = [base] + runs if base.rows else runs
+        strict = dataset != 'ticks'
+        appendable = all(
+            later.meta['first'] > earlier.meta['last'] or (not strict and later.meta['first'] == earlier.meta['last'])
+            for earlier, later in zip(ordered, ordered[1:])
+        )
+        if appendable:
+            for run in runs:
+                self._copy_into(base, run, block_rows)
+        else:
+            # Runs overlap: write a merged copy next to the base, then swap it in
+            merged = ColumnFiles(os.path.join(path, 'merge-' + uuid.uuid4().hex), dataset)
+            # Run names start with their writer's sequence, so later imports come last and win
+            sources = ([base] if base.rows else []) + sorted(runs, key=lambda run: os.path.basename(run.path))
+            for block in self._merge_blocks(sources, dataset, block_rows):
+                merged.append(block)
+            for name in dataset_columns(dataset):
+                os.replace(os.path.join(merged.path, f"{name}.bin"), os.path.join(path, f"{name}.bin"))
+            base.meta = merged.meta
+            base._write_meta()
+            shutil.rmtree(merged.path, ignore_errors=True)
+        for run in runs:
+            shutil.rmtree(run.path, ignore_errors=True)
+        logger.info(f"Compacted {len(runs)} run(s) into {symbol}/{dataset}: {base.rows} rows")
+        return {'rows': base.rows, 'merged_runs': len(runs), 'rewritten': not appendable}
+
+    def _copy_into(self, base: ColumnFiles, run: ColumnFiles, block_rows: int):
+        arrays = run.open()
+        for start in range(0, run.rows, block_rows):
+            base.append({name: values[start:start + block_rows] for name, values in arrays.items()})
+
+    def _merge_blocks(self, sources: List[ColumnFiles], dataset: str,
+                      block_rows: int) -> Iterator[Dict[str, np.ndarray]]:
+        """K-way merge of sorted sources in time windows holding at most block_rows per source
+
+        Every row with a given time falls in the same window, so duplicates are always
+        seen together. Earlier sources come first, so for bars later imports win.
+        """
+        time = time_column(dataset)
+        arrays = [source.open() for source in sources]
+        positions = [0] * len(sources)
+        while True:
+            live = [k for k, a in enumerate(arrays) if positions[k] < len(a[time])]
+            if not live:
+                return
+            start = min(int(arrays[k][time][positions[k]]) for k in live)
+            end = min(
+                (int(arrays[k][time][positions[k] + block_rows]) for k in live
+                 if positions[k] + block_rows < len(arrays[k][time])),
+                default=None,
+            )
+            if end is not None and end <= start:
+                end = start + 1  # more than block_rows rows share one time; take them all
+            parts = []
+            for k in live:
+                times = arrays[k][time]
+                stop = len(times) if end is None else positions[k] + int(np.searchsorted(times[positions[k]:], end))
+                if stop > positions[k]:
+                    parts.append({name: np.asarray(values[positions[k]:stop]) for name, values in arrays[k].items()})
+                    positions[k] = stop
+            yield sort_dedup({name: np.concatenate([p[name] for p in parts]) for name in parts[0]}, dataset)
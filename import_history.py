@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Bulk Importer for Exported MT5 History
+Streams "Export Bars" and tick exports into the columnar history store, one process per file
+"""
+
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from history_store import HistoryStore, dataset_columns
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 200000
+BAR_FIELDS = {'<OPEN>': 'open', '<HIGH>': 'high', '<LOW>': 'low', '<CLOSE>': 'close',
+              '<TICKVOL>': 'tick_volume', '<VOL>': 'volume', '<SPREAD>': 'spread'}
+TICK_FIELDS = {'<BID>': 'bid', '<ASK>': 'ask', '<LAST>': 'last', '<VOLUME>': 'volume', '<FLAGS>': 'flags'}
+# Default MT5 export names: "<symbol>_M1_202401020000_202403292358.csv" for bars, no timeframe for ticks
+EXPORT_NAME = re.compile(r'^(?P<symbol>.+?)(?:_(?P<timeframe>M\d+|H\d+|D1|W1|MN1))?_\d{12}_\d{12}$')
+
+def detect_encoding(path: str) -> str:
+    """MT5 writes UTF-16 LE with a BOM from some export dialogs and UTF-8 from others"""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return 'utf-16'
+    if head[:3] == b'\xef\xbb\xbf':
+        return 'utf-8-sig'
+    if len(head) >= 2 and head[1:2] == b'\x00':
+        return 'utf-16-le'
+    return 'utf-8'
+
+def describe_file(path: str, symbol: Optional[str] = None,
+                  timeframe: Optional[str] = None) -> Tuple[str, str, str, str, List[str]]:
+    """(symbol, dataset, encoding, separator, header) of an export, from its name and header line"""
+    encoding = detect_encoding(path)
+    with open(path, encoding=encoding) as f:
+        header_line = f.readline().strip()
+    separator = '\t' if '\t' in header_line else (';' if ';' in header_line else ',')
+    header = [name.strip() for name in header_line.split(separator)]
+    if '<DATE>' not in header:
+        raise ValueError(f"{path}: not an MT5 export (header {header_line[:80]!r})")
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = EXPORT_NAME.match(stem)
+    symbol = symbol or (match.group('symbol') if match else stem)
+    if '<BID>' in header:
+        dataset = 'ticks'
+    else:
+        missing = [name for name in ('<OPEN>', '<HIGH>', '<LOW>', '<CLOSE>') if name not in header]
+        if missing:
+            raise ValueError(f"{path}: bar export without {', '.join(missing)}")
+        dataset = (timeframe or (match.group('timeframe') if match and match.group('timeframe') else 'M1')).lower()
+    return symbol, dataset, encoding, separator, header
+
+def _timestamps(chunk: pd.DataFrame, unit: str) -> np.ndarray:
+    """Epoch times from MT5's "2024.01.02" + "13:45[:00[.123]]" columns (server time, stored as-is)"""
+    stamps = chunk['<DATE>'] + ' ' + chunk['<TIME>'] if '<TIME>' in chunk else chunk['<DATE>']
+    sample = stamps.iloc[0]
+    clock = sample.split(' ')[1] if ' ' in sample else ''
+    if '.' in clock:
+        fmt = '%Y.%m.%d %H:%M:%S.%f'
+    elif clock.count(':') == 2:
+        fmt = '%Y.%m.%d %H:%M:%S'
+    elif clock:
+        fmt = '%Y.%m.%d %H:%M'
+    else:
+        fmt = '%Y.%m.%d'
+    return pd.to_datetime(stamps, format=fmt).values.astype(f'datetime64[{unit}]').astype(np.int64)
+
+def read_chunks(path: str, dataset: str, encoding: str, separator: str,
+                header: List[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+    """Parse an export `chunk_rows` lines at a time into store columns"""
+    columns = dataset_columns(dataset)
+    fields = TICK_FIELDS if dataset == 'ticks' else BAR_FIELDS
+    reader = pd.read_csv(path, sep=separator, encoding=encoding, chunksize=chunk_rows,
+                         dtype={'<DATE>': str, '<TIME>': str}, skipinitialspace=True)
+    carry = {}  # tick exports leave a price blank when it did not change; carried across chunks
+    for chunk in reader:
+        chunk.columns = [name.strip() for name in chunk.columns]
+        chunk = chunk.dropna(subset=['<DATE>'])
+        if chunk.empty:
+            continue
+        parsed = {}
+        if dataset == 'ticks':
+            parsed['time_msc'] = _timestamps(chunk, 'ms')
+            for name in ('bid', 'ask', 'last'):
+                source = f'<{name.upper()}>'
+                values = chunk[source].astype(float) if source in chunk else pd.Series(np.nan, index=chunk.index)
+                if name in carry and pd.isna(values.iloc[0]):
+                    values.iloc[0] = carry[name]
+                values = values.ffill()
+                if values.notna().any():
+                    carry[name] = float(values.dropna().iloc[-1])
+                parsed[name] = values.to_numpy()
+        else:
+            parsed['time'] = _timestamps(chunk, 's')
+        for source, name in fields.items():
+            if name not in parsed:
+                parsed[name] = chunk[source].fillna(0).to_numpy() if source in chunk else np.zeros(len(chunk))
+        parsed = {name: np.asarray(parsed[name]).astype(dtype) for name, dtype in columns.items()}
+        if dataset == 'ticks':
+            # Ticks before the first bid and ask are known cannot be used
+            known = ~(np.isnan(parsed['bid']) | np.isnan(parsed['ask']))
+            if not known.all():
+                parsed = {name: values[known] for name, values in parsed.items()}
+            parsed['last'] = np.nan_to_num(parsed['last'])
+        yield parsed
+
+def peak_memory_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def import_file(path: str, root: str, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                chunk_rows: int = CHUNK_ROWS, sequence: Optional[int] = None) -> Dict:
+    """Import one export as sorted runs of its symbol's dataset (merged later by compact)"""
+    started = time.perf_counter()
+    symbol, dataset, encoding, separator, header = describe_file(path, symbol, timeframe)
+    writer = HistoryStore(root).writer(symbol, dataset, sequence)
+    rows = 0
+    for columns in read_chunks(path, dataset, encoding, separator, header, chunk_rows):
+        rows += len(next(iter(columns.values())))
+        writer.write(columns)
+    elapsed = time.perf_counter() - started
+    return {
+        'path': path,
+        'symbol': symbol,
+        'dataset': dataset,
+        'rows': rows,
+        'rows_written': writer.rows,
+        'bytes': os.path.getsize(path),
+        'seconds': round(elapsed, 3),
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+def compact_dataset(root: str, symbol: str, dataset: str) -> Dict:
+    started = time.perf_counter()
+    result = HistoryStore(root).compact(symbol, dataset)
+    return {'symbol': symbol, 'dataset': dataset, **result, 'seconds': round(time.perf_counter() - started, 3)}
+
+def import_files(paths: List[str], root: str, symbol: Optional[str] = None, timeframe: Optional[str] = None,
+                 workers: int = 0, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """Import files in parallel, then merge each touched dataset; returns per-file results and totals
+
+    Where files overlap, bars from files later in `paths` win.
+    """
+    workers = workers or min(len(paths), os.cpu_count() or 1)
+    started = time.perf_counter()
+    sequence = time.time_ns()
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = [pool.submit(import_file, path, root, symbol, timeframe, chunk_rows, sequence + i)
+                   for i, path in enumerate(paths)]
+        files = []
+        for future in futures:
+            try:
+                files.append(future.result())
+            except Exception as e:
+                logger.error(f"Import failed: {e}")
+                files.append({'error': str(e)})
+        imported = [f for f in files if 'error' not in f]
+        parsed = time.perf_counter() - started
+        targets = sorted({(f['symbol'], f['dataset']) for f in imported})
+        compacted = list(pool.map(compact_dataset, [root] * len(targets), *zip(*targets))) if targets else []
+    elapsed = time.perf_counter() - started
+    rows = sum(f['rows'] for f in imported)
+    size = sum(f['bytes'] for f in imported)
+    return {
+        'files': files,
+        'datasets': compacted,
+        'rows': rows,
+        'bytes': size,
+        'workers': workers,
+        'parse_seconds': round(parsed, 3),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else 0,
+        'mb_per_second': round(size / 1e6 / elapsed, 1) if elapsed else 0,
+    }
+
+def expand_paths(paths: List[str]) -> List[str]:
+    """Files as given, plus every .csv/.txt/.tsv inside given directories"""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                   if name.lower().endswith(('.csv', '.txt', '.tsv'))))
+        else:
+            expanded.append(path)
+    return expanded
+
+def main():
+    parser = argparse.ArgumentParser(description="Import exported MT5 bars and ticks into the history store")
+    parser.add_argument('paths', nargs='+', help='export files or directories of them')
+    parser.add_argument('--store', default=os.getenv('HISTORY_DIR', 'history'), help='history store directory')
+    parser.add_argument('--symbol', help='symbol for every file (default: from the export file name)')
+    parser.add_argument('--timeframe', help='bar timeframe, e.g. M1 (default: from the file name, else M1)')
+    parser.add_argument('--workers', type=int, default=0, help='processes (default: one per file, up to the CPU count)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows parsed per chunk; bounds memory')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no export files found")
+    report = import_files(paths, args.store, args.symbol, args.timeframe, args.workers, args.chunk_rows)
+
+    for f in report['files']:
+        if 'error' in f:
+            print(f"  FAILED {f['error']}")
+            continue
+        rate = f['rows'] / f['seconds'] if f['seconds'] else 0
+        print(f"  {os.path.basename(f['path'])}: {f['symbol']}/{f['dataset']} {f['rows']} rows "
+              f"in {f['seconds']:.1f}s ({rate:,.0f} rows/s, {f['bytes'] / 1e6 / max(f['seconds'], 1e-9):.1f} MB/s, "
+              f"peak {f['peak_memory_mb']} MB)")
+    for d in report['datasets']:
+        mode = 'merged' if d['rewritten'] else 'appended'
+        print(f"  {d['symbol']}/{d['dataset']}: {d['rows']} rows stored ({mode} in {d['seconds']:.1f}s)")
+    print(f"Imported {report['rows']:,} rows ({report['bytes'] / 1e6:.1f} MB) from {len(paths)} file(s) "
+          f"with {report['workers']} worker(s) in {report['seconds']:.1f}s: "
+          f"{report['rows_per_second']:,} rows/s, {report['mb_per_second']} MB/s")
+
+if __name__ == "__main__":
+    main()
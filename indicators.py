@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Technical Indicators for MT5 Crash/Boom Scalping EA Backend
+RSI, EMA/SMA, ATR and the EA's volatility measure with MT5's definitions, batch and one bar at a time
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Defaults of the EA inputs (InpRSIPeriod, InpRSIOverBought, InpRSIOverSold, InpEMAPeriod)
+RSI_PERIOD = 14
+RSI_OVERBOUGHT = 70.0
+RSI_OVERSOLD = 30.0
+EMA_PERIOD = 20
+ATR_PERIOD = 14
+
+# Closes GetCurrentVolatility looks at
+VOLATILITY_BARS = 20
+
+def _smooth(values: np.ndarray, alpha: float) -> np.ndarray:
+    """y[0] = x[0], y[i] = alpha * x[i] + (1 - alpha) * y[i-1], in one vectorized pass"""
+    if len(values) == 0:
+        return np.empty(0)
+    return pd.Series(values, dtype=float).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of each window ending at index i >= window - 1 (NaN before)"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window).sum(axis=1)
+    return out
+
+def ema(closes: np.ndarray, period: int = EMA_PERIOD) -> np.ndarray:
+    """iMA MODE_EMA: seeded with the first close, NaN until `period` bars exist"""
+    closes = np.asarray(closes, dtype=float)
+    out = _smooth(closes, 2.0 / (period + 1))
+    out[:period - 1] = np.nan
+    return out
+
+def sma(closes: np.ndarray, period: int = EMA_PERIOD) -> np.ndarray:
+    """iMA MODE_SMA"""
+    return _rolling_sum(np.asarray(closes, dtype=float), period) / period
+
+def rsi_averages(closes: np.ndarray, period: int = RSI_PERIOD):
+    """Wilder-smoothed average gain and loss as in MT5's RSI.mq5 (NaN before bar `period`)
+
+    The first average is the plain mean of the first `period` moves; every
+    later one is (previous * (period - 1) + move) / period.
+    """
+    closes = np.asarray(closes, dtype=float)
+    gain, loss = np.full(len(closes), np.nan), np.full(len(closes), np.nan)
+    if len(closes) <= period:
+        return gain, loss
+    moves = np.diff(closes)
+    ups, downs = np.maximum(moves, 0.0), np.maximum(-moves, 0.0)
+    for out, values in ((gain, ups), (loss, downs)):
+        seeded = np.concatenate(([values[:period].mean()], values[period:]))
+        out[period:] = _smooth(seeded, 1.0 / period)
+    return gain, loss
+
+def rsi_from_averages(gain, loss):
+    """RSI from average gain and loss; 100 with no losses, 50 with no moves at all"""
+    gain, loss = np.asarray(gain, dtype=float), np.asarray(loss, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + gain / loss)
+    return np.where(loss != 0, value, np.where(gain != 0, 100.0, np.where(np.isnan(gain), np.nan, 50.0)))
+
+def rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """iRSI on closes"""
+    return rsi_from_averages(*rsi_averages(closes, period))
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """max(high, previous close) - min(low, previous close); 0 on the first bar, as in ATR.mq5"""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    tr = np.zeros(len(close))
+    tr[1:] = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+    return tr
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = ATR_PERIOD) -> np.ndarray:
+    """iATR: a simple moving average of the true range from bar 1 (NaN before bar `period`)"""
+    tr = true_range(high, low, close)
+    out = np.full(len(tr), np.nan)
+    out[1:] = _rolling_sum(tr[1:], period) / period
+    return out
+
+def ea_volatility(closes: np.ndarray, bars: int = VOLATILITY_BARS) -> np.ndarray:
+    """GetCurrentVolatility: mean absolute move over the last `bars` closes per 1000 of price, capped at 1"""
+    closes = np.asarray(closes, dtype=float)
+    moves = np.abs(np.diff(closes, prepend=np.nan))
+    mean_move = _rolling_sum(moves[1:], bars - 1) / (bars - 1)
+    out = np.full(len(closes), np.nan)
+    out[1:] = np.minimum(mean_move / closes[1:] * 1000, 1.0)
+    return out
+
+class EntryFilters:
+    """The EA's CheckRSIFilter and CheckTrendFilter
+
+    Buying after a crash spike needs RSI at or below `oversold` and price below
+    the EMA; selling after a boom spike needs RSI at or above `overbought` and
+    price above it. A missing value passes, like the EA when CopyBuffer fails.
+    """
+
+    def __init__(self, rsi_period: int = RSI_PERIOD, ema_period: int = EMA_PERIOD,
+                 overbought: float = RSI_OVERBOUGHT, oversold: float = RSI_OVERSOLD,
+                 use_rsi: bool = True, use_trend: bool = True):
+        self.rsi_period = rsi_period
+        self.ema_period = ema_period
+        self.overbought = overbought
+        self.oversold = oversold
+        self.use_rsi = use_rsi
+        self.use_trend = use_trend
+
+    @property
+    def enabled(self) -> bool:
+        return self.use_rsi or self.use_trend
+
+    def passes(self, rsi_value, ema_value, price, crash):
+        """Whether entries pass; works on scalars and arrays alike"""
+        rsi_value, ema_value = np.asarray(rsi_value, dtype=float), np.asarray(ema_value, dtype=float)
+        ok = np.ones(np.broadcast(rsi_value, ema_value, price, crash).shape, dtype=bool)
+        if self.use_rsi:
+            ok &= np.isnan(rsi_value) | np.where(crash, rsi_value <= self.oversold, rsi_value >= self.overbought)
+        if self.use_trend:
+            ok &= np.isnan(ema_value) | np.where(crash, price < ema_value, price > ema_value)
+        return ok
+
+    def mask(self, closes: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Which spike entries at `indices` pass, from batch RSI and EMA over `closes`"""
+        closes = np.asarray(closes, dtype=float)
+        rsi_values = rsi(closes, self.rsi_period)[indices] if self.use_rsi else np.nan
+        ema_values = ema(closes, self.ema_period)[indices] if self.use_trend else np.nan
+        crash = closes[indices] < closes[indices - 1]
+        return self.passes(rsi_values, ema_values, closes[indices], crash)
+
+class IndicatorState:
+    """Indicators of one bar series, advanced one closed bar at a time in O(1)
+
+    Follows the recurrences MT5's indicators use on each new bar, so values
+    match the batch functions above and MT5 on the same bars. EMA and RSI carry
+    their whole history; after a few hundred bars the starting point no longer
+    shows in the values.
+    """
+
+    def __init__(self, rsi_period: int = RSI_PERIOD, ema_period: int = EMA_PERIOD, atr_period: int = ATR_PERIOD,
+                 volatility_bars: int = VOLATILITY_BARS):
+        self.rsi_period = rsi_period
+        self.ema_period = ema_period
+        self.atr_period = atr_period
+        self.volatility_bars = volatility_bars
+        self.alpha = 2.0 / (ema_period + 1)
+        self.count = 0
+        self.last_close = None
+        self.ema = None
+        self.gain = self.loss = 0.0  # summed moves until rsi_period, then the averages
+        self.atr = 0.0  # summed true ranges until atr_period, then the average
+        self.true_ranges = deque(maxlen=atr_period)
+        self.closes = deque(maxlen=ema_period)
+        self.close_sum = 0.0
+        self.moves = deque(maxlen=volatility_bars - 1)
+        self.move_sum = 0.0
+
+    @classmethod
+    def from_bars(cls, high: np.ndarray, low: np.ndarray, close: np.ndarray, **periods) -> 'IndicatorState':
+        """State after every bar given, computed with the batch functions"""
+        state = cls(**periods)
+        n = len(close)
+        if n <= max(state.rsi_period, state.atr_period, state.ema_period, state.volatility_bars):
+            for i in range(n):
+                state.push(high[i], low[i], close[i])
+            return state
+        close = np.asarray(close, dtype=float)
+        gain, loss = rsi_averages(close, state.rsi_period)
+        tr = true_range(high, low, close)
+        state.count = n
+        state.last_close = float(close[-1])
+        state.ema = float(_smooth(close, state.alpha)[-1])
+        state.gain, state.loss = float(gain[-1]), float(loss[-1])
+        state.atr = float(tr[-state.atr_period:].sum() / state.atr_period)
+        state.true_ranges.extend(tr[-state.atr_period:].tolist())
+        state.closes.extend(close[-state.ema_period:].tolist())
+        state.close_sum = float(sum(state.closes))
+        state.moves.extend(np.abs(np.diff(close[-state.volatility_bars:])).tolist())
+        state.move_sum = float(sum(state.moves))
+        return state
+
+    def _next(self, high: float, low: float, close: float) -> Dict:
+        """State after one more bar, without applying it"""
+        n = self.count
+        if n == 0:
+            return {'ema': close, 'gain': 0.0, 'loss': 0.0, 'atr': 0.0, 'tr': None, 'move': None,
+                    'close_sum': close, 'move_sum': 0.0}
+        previous = self.last_close
+        move = close - previous
+        up, down = max(move, 0.0), max(-move, 0.0)
+        p = self.rsi_period
+        if n < p:
+            gain, loss = self.gain + up, self.loss + down
+        elif n == p:
+            gain, loss = (self.gain + up) / p, (self.loss + down) / p
+        else:
+            gain, loss = (self.gain * (p - 1) + up) / p, (self.loss * (p - 1) + down) / p
+
+        tr = max(high, previous) - min(low, previous)
+        if n < self.atr_period:
+            atr_value = self.atr + tr
+        elif n == self.atr_period:
+            atr_value = (self.atr + tr) / self.atr_period
+        else:
+            atr_value = self.atr + (tr - self.true_ranges[0]) / self.atr_period
+
+        dropped = self.closes[0] if len(self.closes) == self.ema_period else 0.0
+        dropped_move = self.moves[0] if len(self.moves) == self.volatility_bars - 1 else 0.0
+        return {'ema': close * self.alpha + self.ema * (1 - self.alpha), 'gain': gain, 'loss': loss,
+                'atr': atr_value, 'tr': tr, 'move': abs(move), 'close_sum': self.close_sum + close - dropped,
+                'move_sum': self.move_sum + abs(move) - dropped_move}
+
+    def push(self, high: float, low: float, close: float):
+        """Commit a closed bar"""
+        high, low, close = float(high), float(low), float(close)
+        step = self._next(high, low, close)
+        self.ema, self.gain, self.loss, self.atr = step['ema'], step['gain'], step['loss'], step['atr']
+        self.close_sum, self.move_sum = step['close_sum'], step['move_sum']
+        if step['tr'] is not None:
+            self.true_ranges.append(step['tr'])
+            self.moves.append(step['move'])
+        self.closes.append(close)
+        self.last_close = close
+        self.count += 1
+
+    def values(self, high: float, low: float, close: float) -> Dict[str, Optional[float]]:
+        """Indicator values on a bar after the committed ones (the forming bar), None while warming up"""
+        high, low, close = float(high), float(low), float(close)
+        step = self._next(high, low, close)
+        n = self.count
+        value = None
+        if n >= self.rsi_period:
+            value = float(rsi_from_averages(step['gain'], step['loss']))
+        volatility = None
+        if n >= self.volatility_bars - 1:
+            volatility = min(step['move_sum'] / (self.volatility_bars - 1) / close * 1000, 1.0)
+        return {
+            'rsi': value,
+            'ema': step['ema'] if n >= self.ema_period - 1 else None,
+            'sma': step['close_sum'] / self.ema_period if n >= self.ema_period - 1 else None,
+            'atr': step['atr'] if n >= self.atr_period else None,
+            'volatility': volatility,
+        }
+
+class IndicatorEngine:
+    """Per-symbol indicator states fed from the canonical M1 bars
+
+    Each call commits the closed bars the state has not seen and evaluates the
+    forming (last) bar on top, the way MT5 recalculates the current bar on
+    every tick. A symbol seen for the first time, or whose bars skipped past
+    the window given, is seeded in one batch pass.
+    """
+
+    def __init__(self, filters: Optional[EntryFilters] = None, atr_period: int = ATR_PERIOD,
+                 volatility_bars: int = VOLATILITY_BARS):
+        self.filters = filters or EntryFilters()
+        self.periods = {'rsi_period': self.filters.rsi_period, 'ema_period': self.filters.ema_period,
+                        'atr_period': atr_period, 'volatility_bars': volatility_bars}
+        self.symbols = {}
+        self.seeded = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbols
+
+    def update(self, symbol: str, bars: Dict[str, np.ndarray]) -> Optional[Dict]:
+        """Advance the symbol's state to these bars and return the latest bar's indicators"""
+        times = bars['time']
+        if len(times) == 0:
+            return None
+        closed = len(times) - 1
+        with self.lock:
+            entry = self.symbols.get(symbol)
+            start = None
+            if entry is not None and entry['last_time'] is not None:
+                start = int(np.searchsorted(times, entry['last_time'], side='right'))
+                if start == 0 or times[start - 1] != entry['last_time']:
+                    start = None
+            if start is None:
+                state = IndicatorState.from_bars(bars['high'][:closed], bars['low'][:closed],
+                                                 bars['close'][:closed], **self.periods)
+                entry = self.symbols[symbol] = {'state': state, 'last_time': None}
+                self.seeded += 1
+            else:
+                state = entry['state']
+                for i in range(start, closed):
+                    state.push(bars['high'][i], bars['low'][i], bars['close'][i])
+            if closed > 0:
+                entry['last_time'] = int(times[closed - 1])
+            close = float(bars['close'][-1])
+            result = state.values(bars['high'][-1], bars['low'][-1], close)
+            entry['latest'] = result = self._describe(result, int(times[-1]), close)
+            return result
+
+    def _describe(self, values: Dict, bar_time: int, close: float) -> Dict:
+        filters = self.filters
+        passes = filters.passes(np.nan if values['rsi'] is None else values['rsi'],
+                                np.nan if values['ema'] is None else values['ema'], close, np.array([True, False]))
+        trend = None
+        if values['ema'] is not None:
+            trend = 'above_ema' if close > values['ema'] else 'below_ema' if close < values['ema'] else 'at_ema'
+        return {
+            'bar_time': bar_time,
+            'close': close,
+            **{name: None if value is None else round(value, 6) for name, value in values.items()},
+            'trend': trend,
+            'periods': {'rsi': filters.rsi_period, 'ema': filters.ema_period,
+                        'atr': self.periods['atr_period'], 'volatility': self.periods['volatility_bars']},
+            'buy_after_crash': bool(passes[0]),
+            'sell_after_boom': bool(passes[1]),
+        }
+
+    def latest(self, symbol: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.symbols.get(symbol)
+            return entry.get('latest') if entry is not None else None
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {symbol: {'bars': entry['state'].count, 'last_time': entry['last_time']}
+                    for symbol, entry in self.symbols.items()}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Local Statistical Recommender for MT5 Crash/Boom Scalping EA
+Derives trading parameters from detected spikes without calling an LLM
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated quantile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+class LocalRecommender:
+    """Recommends threshold, cooldown, SL/TP and risk from spike statistics"""
+
+    def __init__(self, bar_seconds: int = 60, min_cooldown: int = 30, max_cooldown: int = 3600):
+        self.bar_seconds = bar_seconds
+        self.min_cooldown = min_cooldown
+        self.max_cooldown = max_cooldown
+        self.default_cooldown = 300
+        self.min_similar = 5  # nearest past setups needed before they shift SL/TP
+
+    def recommend(self, spikes: List[Dict], total_bars: int = 0, similar: Optional[Dict] = None,
+                  hazard: Optional[Dict] = None, indicators: Optional[Dict] = None) -> Optional[Dict]:
+        """Build recommendations in the same schema as the AI analysis, or None without spikes
+
+        `similar` is the outcome summary of the nearest past spike setups
+        (see spike_index.py); when given, SL/TP lean halfway towards it.
+        `hazard` is the symbol's spike arrival lookup (see spike_hazard.py);
+        its cooldown comes from every gap seen, not just this window's.
+        `indicators` are the latest bar's values (see indicators.py); the stop
+        is kept at least one ATR away when the take profit allows it.
+        """
+        if not spikes:
+            return None
+
+        sizes = sorted(s['spike_size'] for s in spikes)
+        retracements = sorted(s['max_retracement'] for s in spikes)
+        intervals = self._inter_spike_intervals(spikes)
+        crash_count = sum(1 for s in spikes if s['is_crash'])
+        boom_count = len(spikes) - crash_count
+
+        # Enter on spikes at least as large as the lower quartile of observed spikes
+        spike_threshold = quantile(sizes, 0.25)
+
+        # Take profit where half of past spikes retraced to, stop where only the weakest fifth stalled
+        take_profit = quantile(retracements, 0.5)
+        stop_loss = quantile(retracements, 0.2)
+        if take_profit <= 0:
+            take_profit = quantile(sizes, 0.5) * 0.5
+        if similar and similar['neighbours'] >= self.min_similar:
+            take_profit = (take_profit + similar['retracement_p50']) / 2
+            stop_loss = (stop_loss + similar['retracement_p20']) / 2
+        if stop_loss <= 0 or stop_loss >= take_profit:
+            stop_loss = take_profit * 0.5
+        # A stop inside an ordinary bar's range is taken out by noise
+        atr = indicators.get('atr') if indicators else None
+        if atr is not None and stop_loss < atr < take_profit:
+            stop_loss = atr
+
+        # Sit out the shortest quarter of inter-spike gaps to avoid chasing clusters
+        if hazard and hazard['gaps_observed'] >= len(intervals):
+            cooldown = hazard['cooldown_bars'] * self.bar_seconds
+            cooldown = int(min(max(cooldown, self.min_cooldown), self.max_cooldown))
+        elif intervals:
+            cooldown = quantile(intervals, 0.25) * self.bar_seconds
+            cooldown = int(min(max(cooldown, self.min_cooldown), self.max_cooldown))
+        else:
+            cooldown = self.default_cooldown
+
+        risk_score = self._risk_score(sizes, len(spikes), total_bars)
+        confidence = min(90.0, 40.0 + 50.0 * (1 - 1 / math.sqrt(len(spikes))))
+
+        if crash_count > boom_count:
+            market_trend = f"Crash-dominated ({crash_count} of {len(spikes)} spikes)"
+        elif boom_count > crash_count:
+            market_trend = f"Boom-dominated ({boom_count} of {len(spikes)} spikes)"
+        else:
+            market_trend = "Neutral"
+
+        reasoning = (
+            f"Local statistics over {len(spikes)} spike(s): "
+            f"median size {quantile(sizes, 0.5):.1f}, "
+            f"median retracement {quantile(retracements, 0.5):.1f}"
+        )
+        if intervals:
+            reasoning += f", median gap {quantile(intervals, 0.5) * self.bar_seconds:.0f}s"
+        if hazard:
+            reasoning += (
+                f"; next spike expected in {hazard['expected_bars_to_spike']:.0f} bars "
+                f"({hazard['gaps_observed']} gaps seen)"
+            )
+        if indicators and indicators.get('rsi') is not None and atr is not None:
+            reasoning += (
+                f"; RSI({indicators['periods']['rsi']}) {indicators['rsi']:.1f}, "
+                f"ATR({indicators['periods']['atr']}) {atr:.2f}"
+            )
+        if similar and similar['neighbours'] >= self.min_similar:
+            reasoning += (
+                f"; {similar['neighbours']} similar past setups recovered "
+                f"{similar['recovered_rate'] * 100:.0f}% of the time, "
+                f"median retracement {similar['retracement_p50']:.1f}"
+            )
+
+        return {
+            "spike_threshold": round(spike_threshold, 2),
+            "cooldown_seconds": cooldown,
+            "stop_loss_pips": round(stop_loss, 2),
+            "take_profit_pips": round(take_profit, 2),
+            "risk_score": round(risk_score, 1),
+            "confidence": round(confidence, 1),
+            "market_trend": market_trend,
+            "reasoning": reasoning,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _inter_spike_intervals(self, spikes: List[Dict]) -> List[float]:
+        """Bars between consecutive spikes, sorted"""
+        indices = [s['bar_index'] for s in spikes if 'bar_index' in s]
+        return sorted(b - a for a, b in zip(indices, indices[1:]) if b > a)
+
+    def _risk_score(self, sorted_sizes: List[float], spike_count: int, total_bars: int) -> float:
+        """Score 1-10 from spike size dispersion and spike frequency"""
+        mean = sum(sorted_sizes) / len(sorted_sizes)
+        variance = sum((s - mean) ** 2 for s in sorted_sizes) / len(sorted_sizes)
+        dispersion = min(math.sqrt(variance) / mean, 1.0) if mean > 0 else 0.0
+
+        # More than one spike every 20 bars counts as maximally busy
+        frequency = min(spike_count / total_bars * 20, 1.0) if total_bars > 0 else 0.5
+
+        return 1 + 9 * (0.6 * dispersion + 0.4 * frequency)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Shared Market Data for MT5 Crash/Boom Scalping EA Backend
+One canonical M1 series per symbol, fed by every terminal, and one analysis per new bar
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from timeframes import BAR_FIELDS, TimeframeStore
+
+logger = logging.getLogger(__name__)
+
+class _Analysis:
+    """Result slot for one symbol and analysis key; waiters block on `done` while it is computed"""
+
+    __slots__ = ('key', 'done', 'result', 'error', 'computed_at', 'served')
+
+    def __init__(self, key):
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.computed_at = None
+        self.served = 0
+
+class MarketDataPlane:
+    """Merges bars from all terminals into the store and computes each symbol's analysis once per bar
+
+    Posted bars the store already holds are dropped before merging, so N terminals
+    uploading the same window cost one merge of the new bars. Analysis is keyed per
+    symbol by whatever decides that a new one is due (the latest bar time, or a
+    regime epoch): the first request for a new key computes it and concurrent or
+    later requests for the same key share that result.
+    """
+
+    def __init__(self, store: TimeframeStore):
+        self.store = store
+        self.analyses = {}  # symbol -> _Analysis for its latest key
+        self.counters = {}  # symbol -> per-symbol counters
+        self.lock = threading.Lock()
+
+    def _count(self, symbol: str, **deltas):
+        with self.lock:
+            counters = self.counters.get(symbol)
+            if counters is None:
+                counters = self.counters[symbol] = {
+                    'posts': 0, 'bars_received': 0, 'bars_merged': 0,
+                    'computed': 0, 'shared': 0, 'waited': 0, 'timeouts': 0,
+                }
+            for name, delta in deltas.items():
+                counters[name] += delta
+
+    def bar_range(self, symbol: str) -> Optional[Tuple[int, int]]:
+        """(first, latest) bar time of the canonical series, or None before any bars arrive"""
+        with self.store.lock:
+            times = self.store.m1.get(symbol, {}).get('time')
+            if times is None or len(times) == 0:
+                return None
+            return int(times[0]), int(times[-1])
+
+    def ingest(self, symbol: str, m1_bars: Dict[str, np.ndarray]) -> int:
+        """Merge posted M1 bars into the canonical series, returning how many were merged
+
+        Bars strictly inside the stored range are duplicates of what another terminal
+        already sent; the latest bar is still forming so it is always taken.
+        """
+        received = len(m1_bars['time'])
+        current = self.bar_range(symbol)
+        if current is not None and received:
+            times = m1_bars['time']
+            keep = (times < current[0]) | (times >= current[1])
+            if not keep.all():
+                m1_bars = {f: m1_bars[f][keep] for f in BAR_FIELDS}
+        merged = len(m1_bars['time'])
+        if merged:
+            self.store.ingest_bars(symbol, m1_bars)
+        self._count(symbol, posts=1, bars_received=received, bars_merged=merged)
+        return merged
+
+    def analysis(self, symbol: str, key, compute: Callable[[], Dict],
+                 timeout: Optional[float] = None) -> Tuple[Optional[Dict], str]:
+        """Analysis for the symbol and key, computing it only if nobody has
+
+        Returns (result, status) where status is 'computed', 'shared', 'waited' or
+        'timeout' (result None: the in-flight computation did not finish in time).
+        """
+        with self.lock:
+            slot = self.analyses.get(symbol)
+            owner = slot is None or slot.key != key or slot.error is not None
+            if owner:
+                slot = self.analyses[symbol] = _Analysis(key)
+            pending = not owner and not slot.done.is_set()
+
+        if owner:
+            try:
+                slot.result = compute()
+                slot.computed_at = time.time()
+            except Exception as e:
+                slot.error = e
+                raise
+            finally:
+                slot.done.set()
+            self._count(symbol, computed=1)
+            return slot.result, 'computed'
+
+        if pending and not slot.done.wait(timeout):
+            self._count(symbol, timeouts=1)
+            return None, 'timeout'
+        if slot.error is not None:
+            raise slot.error
+        with self.lock:
+            slot.served += 1
+        self._count(symbol, **{'waited' if pending else 'shared': 1})
+        return slot.result, 'waited' if pending else 'shared'
+
+    def upgrade(self, symbol: str, key, result, replaces: Optional[Callable] = None) -> bool:
+        """Replace a shared analysis with a better one that finished later
+
+        `replaces(current)` decides whether `result` is better than the stored result;
+        returns whether it was stored.
+        """
+        with self.lock:
+            slot = self.analyses.get(symbol)
+            if slot is None or slot.key != key or not slot.done.is_set():
+                return False
+            if replaces is not None and not replaces(slot.result):
+                return False
+            slot.result = result
+            return True
+
+    def stats(self) -> Dict:
+        """Per-symbol merge and sharing counters"""
+        with self.lock:
+            counters = {symbol: dict(values) for symbol, values in self.counters.items()}
+            slots = dict(self.analyses)
+        for symbol, values in counters.items():
+            slot = slots.get(symbol)
+            values['analysis_key'] = slot.key if slot is not None else None
+            values['served_current'] = slot.served + 1 if slot is not None and slot.done.is_set() else 0
+            requests = values['computed'] + values['shared'] + values['waited']
+            values['share_ratio'] = round(1 - values['computed'] / requests, 3) if requests else 0.0
+        return counters
+
+    def clear(self):
+        """Forget shared analyses and counters"""
+        with self.lock:
+            self.analyses.clear()
+            self.counters.clear()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Process Memory Snapshots for MT5 Crash/Boom Scalping EA Backend
+RSS, open file descriptors, threads, GC counts and tracemalloc top allocators of the current process
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Frames that only describe tracemalloc itself or module loading
+IGNORED_FRAMES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+                  '<unknown>')
+
+def rss_mb() -> Optional[float]:
+    """Resident set size now, from /proc (None where there is no /proc)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 1048576, 2)
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+def open_fds() -> Optional[int]:
+    """Open file descriptors, from /proc (None where there is no /proc)"""
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+def _allocators(stats: List, top: int) -> List[Dict]:
+    rows = []
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        row = {'where': f"{frame.filename}:{frame.lineno}", 'size_kb': round(stat.size / 1024, 1),
+               'blocks': stat.count}
+        if hasattr(stat, 'size_diff'):
+            row['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+            row['blocks_diff'] = stat.count_diff
+        rows.append(row)
+    return rows
+
+class MemoryTracker:
+    """Process memory snapshot, with tracemalloc top allocators and growth since a baseline when tracing"""
+
+    def __init__(self):
+        self.baseline = None
+        self.baseline_time = None
+        self.lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        """Start tracemalloc (costs CPU and memory on every allocation) and take the growth baseline"""
+        with self.lock:
+            if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+                tracemalloc.stop()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                logger.info(f"tracemalloc started with {frames} frame(s)")
+            self._set_baseline()
+
+    def stop(self):
+        with self.lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc stopped")
+            self.baseline = self.baseline_time = None
+
+    def snapshot(self, top: int = 10) -> Dict:
+        """RSS, descriptors, threads and GC counts, plus tracemalloc sizes when tracing"""
+        result = {
+            'pid': os.getpid(),
+            'time': time.time(),
+            'rss_mb': rss_mb(),
+            'peak_rss_mb': peak_rss_mb(),
+            'open_fds': open_fds(),
+            'threads': threading.active_count(),
+            'gc_objects': len(gc.get_objects()),
+            'gc_counts': list(gc.get_count()),
+            'tracemalloc': None,
+        }
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                return result
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = self._take()
+            traced = {
+                'frames': tracemalloc.get_traceback_limit(),
+                'current_mb': round(current / 1048576, 2),
+                'peak_mb': round(peak / 1048576, 2),
+                'top': _allocators(snapshot.statistics('lineno'), top),
+                'growth': None,
+            }
+            if self.baseline is not None:
+                traced['growth'] = {
+                    'since_seconds': round(time.time() - self.baseline_time, 1),
+                    'top': _allocators(snapshot.compare_to(self.baseline, 'lineno'), top),
+                }
+        result['tracemalloc'] = traced
+        return result
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, name) for name in IGNORED_FRAMES])
+
+    def _set_baseline(self):
+        self.baseline = self._take()
+        self.baseline_time = time.time()
+
+# Shared tracker, started by the server when TRACEMALLOC_FRAMES > 0
+memory_tracker = MemoryTracker()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+OpenAI Request Dispatcher for MT5 Crash/Boom Scalping EA Backend
+Caps concurrent upstream calls, queues by symbol priority and backs off on 429s
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying after a pause
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class DispatcherBusy(Exception):
+    """Raised when a call is dropped: the dispatch queue is full or no slot frees up before its deadline"""
+
+def parse_priorities(spec: str) -> Dict[str, int]:
+    """Parse "SYMBOL:priority,SYMBOL:priority" (lower runs first)"""
+    priorities = {}
+    for item in spec.split(','):
+        if ':' in item:
+            symbol, priority = item.rsplit(':', 1)
+            priorities[symbol.strip()] = int(priority)
+    return priorities
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Delay requested by the server, if it sent a numeric Retry-After"""
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+class OpenAIDispatcher:
+    """Central gate for upstream completion calls
+
+    At most `max_concurrent` calls are in flight. Waiting calls are served by
+    priority, then arrival order. Rate-limited and transient failures are
+    retried with jittered exponential backoff, and a Retry-After from the
+    server pauses every caller, not just the one that got it. Callers with a
+    deadline (a time.monotonic() value) give up instead of waiting past it.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 64, max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0, max_retry_after: float = 20.0,
+                 priorities: Optional[Dict[str, int]] = None, default_priority: int = 10):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.priorities = priorities or {}
+        self.default_priority = default_priority
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrent, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.in_flight = 0
+        self.waiting = []  # heap of (priority, sequence)
+        self.paused_until = 0.0
+        self.counters = {'sent': 0, 'succeeded': 0, 'failed': 0, 'retried': 0,
+                         'rate_limited': 0, 'dropped': 0, 'expired': 0}
+        self.peak_in_flight = 0
+        self.peak_queued = 0
+        self._sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    def priority_for(self, symbol: Optional[str]) -> int:
+        """Queue priority for a symbol (lower runs first)"""
+        return self.priorities.get(symbol, self.default_priority)
+
+    def _acquire(self, priority: int, deadline: Optional[float] = None):
+        """Wait for a slot, serving higher-priority callers first
+
+        Raises DispatcherBusy once `deadline` passes, or straight away if a
+        Retry-After pause already runs past it.
+        """
+        with self.condition:
+            if len(self.waiting) >= self.max_queue:
+                self.counters['dropped'] += 1
+                raise DispatcherBusy(f"OpenAI dispatch queue full ({self.max_queue} waiting)")
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self.waiting, entry)
+            self.peak_queued = max(self.peak_queued, len(self.waiting))
+            try:
+                while True:
+                    now = time.monotonic()
+                    pause = self.paused_until - now
+                    if self.waiting[0] == entry and self.in_flight < self.max_concurrent and pause <= 0:
+                        break
+                    timeout = pause if pause > 0 else None
+                    if deadline is not None:
+                        if now >= deadline or self.paused_until > deadline:
+                            self.counters['expired'] += 1
+                            raise DispatcherBusy("No OpenAI slot free before the caller's deadline")
+                        timeout = deadline - now if timeout is None else min(timeout, deadline - now)
+                    self.condition.wait(timeout=timeout)
+            except BaseException:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+                raise
+            heapq.heappop(self.waiting)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            # The next caller in line may also fit
+            self.condition.notify_all()
+
+    def _release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> Optional[float]:
+        """Seconds to wait before retrying, or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+        # Full jitter keeps a burst of callers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(response) if response is not None else None
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+            with self.condition:
+                # Everyone waits out the server's requested pause
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        return delay
+
+    @contextmanager
+    def request(self, url: str, headers: Dict, payload: Dict, symbol: Optional[str] = None,
+                priority: Optional[int] = None, timeout: float = 30, stream: bool = False,
+                deadline: Optional[float] = None):
+        """POST through the dispatcher, holding a slot until the block exits
+
+        Raises DispatcherBusy when the queue is full or no slot is free by
+        `deadline` (time.monotonic()), and the final HTTP or connection error
+        once retries are exhausted or the next one would start past the deadline.
+        """
+        priority = self.priority_for(symbol) if priority is None else priority
+        attempt = 0
+        while True:
+            with tracer.span('llm_queue_wait', priority=priority, attempt=attempt):
+                self._acquire(priority, deadline)
+            response, error = None, None
+            try:
+                with self.condition:
+                    self.counters['sent'] += 1
+                with tracer.span('llm_upstream', attempt=attempt) as span:
+                    response = self.session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+                    span.set(status=response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                if response.status_code == 429:
+                    with self.condition:
+                        self.counters['rate_limited'] += 1
+            except requests.ConnectionError as e:
+                error = e
+            except BaseException:
+                with self.condition:
+                    self.counters['failed'] += 1
+                self._release()
+                raise
+
+            if response is not None:
+                response.close()
+            self._release()
+            delay = self._backoff(attempt, response)
+            if delay is not None and deadline is not None and time.monotonic() + delay >= deadline:
+                delay = None
+            if delay is None:
+                with self.condition:
+                    self.counters['dropped'] += 1
+                logger.warning(f"Giving up on OpenAI call for {symbol} after {attempt + 1} attempts")
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+            logger.info(f"OpenAI call for {symbol} got "
+                        f"{response.status_code if response is not None else type(error).__name__}, "
+                        f"retrying in {delay:.2f}s")
+            with self.condition:
+                self.counters['retried'] += 1
+            with tracer.span('llm_backoff', seconds=round(delay, 3)):
+                time.sleep(delay)
+            attempt += 1
+
+        try:
+            try:
+                response.raise_for_status()
+            except requests.HTTPError:
+                with self.condition:
+                    self.counters['failed'] += 1
+                raise
+            with self.condition:
+                self.counters['succeeded'] += 1
+            yield response
+        finally:
+            response.close()
+            self._release()
+
+    def post_json(self, url: str, headers: Dict, payload: Dict, symbol: Optional[str] = None,
+                  priority: Optional[int] = None, timeout: float = 30, deadline: Optional[float] = None) -> Dict:
+        """POST through the dispatcher and return the decoded JSON body"""
+        with self.request(url, headers, payload, symbol, priority, timeout, deadline=deadline) as response:
+            return response.json()
+
+    def stats(self) -> Dict:
+        """Limits, current load and call counters"""
+        with self.condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'max_retries': self.max_retries,
+                'in_flight': self.in_flight,
+                'queued': len(self.waiting),
+                'peak_in_flight': self.peak_in_flight,
+                'peak_queued': self.peak_queued,
+                'paused_for_seconds': round(max(self.paused_until - time.monotonic(), 0.0), 3),
+                **self.counters,
+            }
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Outcome Scoring for MT5 Crash/Boom Scalping EA Backend
+Replays each issued recommendation against the bars that followed it
+"""
+
+import itertools
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from indicators import EntryFilters
+from spike_metrics import first_passage
+
+# Longest a hypothetical trade is held before it is closed at market
+MAX_HOLD_BARS = 1440
+
+# Summed per symbol and per model; rates are derived when summarizing
+COUNTERS = ('recommendations', 'latency_ms', 'latency_samples', 'confidence',
+            'trades', 'filtered', 'tp', 'sl', 'expired', 'pnl')
+
+def empty_totals() -> Dict:
+    return {name: 0 for name in COUNTERS}
+
+def entry_signals(closes: np.ndarray, start: int, stop: int, threshold: float) -> np.ndarray:
+    """Bars in [start, stop) where the EA would enter, matching DetectAndTradeSpikes
+
+    A bar qualifies when it moved at least `threshold` while the bar before it
+    moved less than half of that.
+    """
+    start = max(start, 2)
+    if stop <= start:
+        return np.empty(0, dtype=np.int64)
+    current = np.abs(closes[start:stop] - closes[start - 1:stop - 1])
+    previous = np.abs(closes[start - 1:stop - 1] - closes[start - 2:stop - 2])
+    return np.flatnonzero((current >= threshold) & (previous < threshold * 0.5)) + start
+
+def resolve_trades(bars: Dict[str, np.ndarray], indices: np.ndarray, entries: np.ndarray,
+                   buys: np.ndarray, take_profit: np.ndarray, stop_loss: np.ndarray,
+                   max_hold: int = MAX_HOLD_BARS) -> Dict[str, np.ndarray]:
+    """Exit of every trade at once via first passage of the bar highs and lows
+
+    Buys take profit on the highs and stop out on the lows, sells the other
+    way round. When both levels fall inside the same bar the stop is assumed
+    to have hit first.
+    """
+    n = len(bars['close'])
+    horizon = int(min(max_hold, n - 1 - indices.min()))
+    if horizon < 1:
+        outcome = np.full(len(indices), 'open', dtype=object)
+        return {'outcome': outcome, 'exit_index': indices.copy(), 'pnl': np.zeros(len(indices))}
+
+    up_levels = np.where(buys, entries + take_profit, entries + stop_loss)
+    down_levels = np.where(buys, entries - stop_loss, entries - take_profit)
+    up = first_passage(bars['high'], indices, up_levels, np.ones(len(indices), dtype=bool), horizon)
+    down = first_passage(bars['low'], indices, down_levels, np.zeros(len(indices), dtype=bool), horizon)
+
+    tp_bars = np.where(buys, up, down)
+    sl_bars = np.where(buys, down, up)
+    sl_hit = (sl_bars > 0) & ((tp_bars < 0) | (sl_bars <= tp_bars))
+    tp_hit = (tp_bars > 0) & ~sl_hit
+    expired = ~tp_hit & ~sl_hit & (indices + max_hold <= n - 1)
+
+    direction = np.where(buys, 1.0, -1.0)
+    exit_index = np.where(tp_hit, indices + tp_bars,
+                 np.where(sl_hit, indices + sl_bars,
+                 np.where(expired, indices + max_hold, n - 1)))
+    pnl = np.where(tp_hit, take_profit,
+          np.where(sl_hit, -stop_loss, direction * (bars['close'][exit_index] - entries)))
+    outcome = np.where(tp_hit, 'tp', np.where(sl_hit, 'sl', np.where(expired, 'expired', 'open')))
+    return {'outcome': outcome, 'exit_index': exit_index, 'pnl': pnl}
+
+def summarize(totals: Dict, open_trades: int = 0, unrealized: float = 0.0) -> Dict:
+    """Hit rates and averages from summed counters"""
+    closed = totals['tp'] + totals['sl'] + totals['expired']
+    return {
+        'recommendations': totals['recommendations'],
+        'trades': totals['trades'],
+        'filtered_entries': totals['filtered'],
+        'closed': closed,
+        'open': open_trades,
+        'tp_hits': totals['tp'],
+        'sl_hits': totals['sl'],
+        'expired': totals['expired'],
+        'tp_hit_rate': round(totals['tp'] / closed, 4) if closed else None,
+        'sl_hit_rate': round(totals['sl'] / closed, 4) if closed else None,
+        'pnl_points': round(totals['pnl'], 4),
+        'avg_pnl_points': round(totals['pnl'] / closed, 4) if closed else None,
+        'unrealized_points': round(unrealized, 4),
+        'trades_per_recommendation': round(totals['trades'] / totals['recommendations'], 3)
+                                     if totals['recommendations'] else None,
+        'avg_confidence': round(totals['confidence'] / totals['recommendations'], 2)
+                          if totals['recommendations'] else None,
+        'avg_latency_ms': round(totals['latency_ms'] / totals['latency_samples'], 1)
+                          if totals['latency_samples'] else None,
+    }
+
+class OutcomeScorer:
+    """Keeps issued recommendations and scores them as new M1 bars arrive
+
+    The active recommendation for a symbol opens hypothetical trades the way
+    the EA would (spike entry, cooldown, fixed SL/TP) until the next one is
+    issued. With `filters`, spike entries must also pass the EA's RSI and
+    trend filters. Open trades from any recommendation keep being resolved
+    until they hit SL/TP or reach MAX_HOLD_BARS.
+    """
+
+    def __init__(self, max_hold_bars: int = MAX_HOLD_BARS, max_history: int = 200,
+                 filters: Optional[EntryFilters] = None):
+        self.max_hold_bars = max_hold_bars
+        self.max_history = max_history
+        self.filters = filters if filters is not None and filters.enabled else None
+        self.symbols = {}
+        self.symbol_totals = {}
+        self.model_totals = {}
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _state(self, symbol: str) -> Dict:
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = {
+                'active': None,
+                'history': deque(maxlen=self.max_history),
+                'open': [],
+                'last_bar': None,
+                'last_trade_time': None,
+            }
+        return state
+
+    def _add(self, symbol: str, model: str, **amounts):
+        for totals in (self.symbol_totals.setdefault(symbol, empty_totals()),
+                       self.model_totals.setdefault(model, empty_totals())):
+            for name, amount in amounts.items():
+                totals[name] += amount
+
+    def record(self, symbol: str, recommendations: Dict, issued_at: int, model: str,
+               latency_ms: Optional[float] = None) -> Dict:
+        """Start scoring a recommendation that was just returned to the EA"""
+        rec = {
+            'id': next(self._ids),
+            'symbol': symbol,
+            'issued_at': int(issued_at),
+            'superseded_at': None,
+            'model': model,
+            'tier': recommendations.get('tier'),
+            'spike_threshold': float(recommendations['spike_threshold']),
+            'cooldown_seconds': int(recommendations['cooldown_seconds']),
+            'stop_loss_pips': float(recommendations['stop_loss_pips']),
+            'take_profit_pips': float(recommendations['take_profit_pips']),
+            'confidence': float(recommendations.get('confidence', 0)),
+            'latency_ms': latency_ms,
+            'checked_until': int(issued_at),
+            'trades': [],
+        }
+        with self.lock:
+            state = self._state(symbol)
+            if state['active'] is not None:
+                state['active']['superseded_at'] = rec['issued_at']
+            state['active'] = rec
+            state['history'].append(rec)
+            self._add(symbol, model, recommendations=1, confidence=rec['confidence'],
+                      latency_ms=latency_ms or 0, latency_samples=int(latency_ms is not None))
+        return rec
+
+    def update(self, symbol: str, bars: Dict[str, np.ndarray]) -> int:
+        """Score against the latest M1 bars, returning the number of trades closed"""
+        times = bars['time']
+        if len(times) < 3:
+            return 0
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is None or state['last_bar'] == int(times[-1]):
+                return 0
+            state['last_bar'] = int(times[-1])
+            closes = bars['close']
+
+            # New entries for the active recommendation; the last bar is still forming
+            rec = state['active']
+            if rec is not None:
+                start = int(np.searchsorted(times, rec['checked_until'], side='right'))
+                signals = entry_signals(closes, start, len(times) - 1, rec['spike_threshold'])
+                if self.filters is not None and len(signals):
+                    allowed = self.filters.mask(closes, signals)
+                    if not allowed.all():
+                        self._add(symbol, rec['model'], filtered=int((~allowed).sum()))
+                    signals = signals[allowed]
+                for i in signals:
+                    entry_time = int(times[i])
+                    last = state['last_trade_time']
+                    if last is not None and entry_time - last < rec['cooldown_seconds']:
+                        continue
+                    state['last_trade_time'] = entry_time
+                    trade = {
+                        'entry_time': entry_time,
+                        'side': 'buy' if closes[i] < closes[i - 1] else 'sell',
+                        'entry': float(closes[i]),
+                        'outcome': 'open',
+                        'exit_time': None,
+                        'exit': None,
+                        'pnl_points': 0.0,
+                    }
+                    rec['trades'].append(trade)
+                    state['open'].append((rec, trade))
+                    self._add(symbol, rec['model'], trades=1)
+                rec['checked_until'] = int(times[-2])
+
+            if not state['open']:
+                return 0
+            return self._resolve(symbol, state, bars)
+
+    def _resolve(self, symbol: str, state: Dict, bars: Dict[str, np.ndarray]) -> int:
+        """Resolve every open trade of a symbol in one vectorized pass"""
+        times = bars['time']
+        entry_times = np.array([trade['entry_time'] for _, trade in state['open']], dtype=np.int64)
+        indices = np.searchsorted(times, entry_times)
+        # Trades whose entry bar has scrolled out of the stored history can no longer be scored
+        known = (indices < len(times)) & (times[np.minimum(indices, len(times) - 1)] == entry_times)
+        state['open'] = [item for item, ok in zip(state['open'], known) if ok]
+        indices = indices[known]
+        if len(indices) == 0:
+            return 0
+
+        recs = [rec for rec, _ in state['open']]
+        trades = [trade for _, trade in state['open']]
+        result = resolve_trades(
+            bars, indices,
+            np.array([t['entry'] for t in trades]),
+            np.array([t['side'] == 'buy' for t in trades]),
+            np.array([r['take_profit_pips'] for r in recs]),
+            np.array([r['stop_loss_pips'] for r in recs]),
+            self.max_hold_bars,
+        )
+
+        still_open = []
+        closed = 0
+        for k, (rec, trade) in enumerate(state['open']):
+            outcome = str(result['outcome'][k])
+            trade['pnl_points'] = round(float(result['pnl'][k]), 5)
+            if outcome == 'open':
+                still_open.append((rec, trade))
+                continue
+            exit_index = int(result['exit_index'][k])
+            trade.update(outcome=outcome, exit_time=int(times[exit_index]), bars_held=int(exit_index - indices[k]))
+            trade['exit'] = float(trade['entry'] + trade['pnl_points'] * (1 if trade['side'] == 'buy' else -1))
+            self._add(symbol, rec['model'], pnl=trade['pnl_points'], **{outcome: 1})
+            closed += 1
+        state['open'] = still_open
+        return closed
+
+    def snapshot(self, symbol: Optional[str] = None) -> Dict:
+        """Raw counters plus open-trade exposure, mergeable across shard workers"""
+        with self.lock:
+            symbols = [symbol] if symbol is not None else list(self.symbol_totals)
+            result = {'symbols': {}, 'models': {}}
+            for name in symbols:
+                if name not in self.symbol_totals:
+                    continue
+                open_trades = self.symbols[name]['open']
+                result['symbols'][name] = {
+                    'totals': dict(self.symbol_totals[name]),
+                    'open': len(open_trades),
+                    'unrealized': sum(trade['pnl_points'] for _, trade in open_trades),
+                }
+            if symbol is None:
+                model_open = {}
+                for state in self.symbols.values():
+                    for rec, trade in state['open']:
+                        exposure = model_open.setdefault(rec['model'], [0, 0.0])
+                        exposure[0] += 1
+                        exposure[1] += trade['pnl_points']
+                for model, totals in self.model_totals.items():
+                    exposure = model_open.get(model, [0, 0.0])
+                    result['models'][model] = {'totals': dict(totals), 'open': exposure[0],
+                                               'unrealized': exposure[1]}
+            return result
+
+    def history(self, symbol: str, limit: int = 20) -> List[Dict]:
+        """Most recent recommendations for a symbol with their trades, newest first"""
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is None:
+                return []
+            recent = list(state['history'])[-limit:]
+            return [{**rec, 'trades': [dict(t) for t in rec['trades']]} for rec in reversed(recent)]
+
+    def clear(self):
+        """Forget all recommendations and scores"""
+        with self.lock:
+            self.symbols.clear()
+            self.symbol_totals.clear()
+            self.model_totals.clear()
+
+def merge_snapshots(snapshots: List[Dict]) -> Dict:
+    """Combine snapshots from several processes and derive the summaries"""
+    merged = {'symbols': {}, 'models': {}}
+    for group in ('symbols', 'models'):
+        combined = {}
+        for snapshot in snapshots:
+            for key, entry in snapshot.get(group, {}).items():
+                target = combined.setdefault(key, {'totals': empty_totals(), 'open': 0, 'unrealized': 0.0})
+                for name in COUNTERS:
+                    target['totals'][name] += entry['totals'][name]
+                target['open'] += entry['open']
+                target['unrealized'] += entry['unrealized']
+        merged[group] = {key: summarize(entry['totals'], entry['open'], entry['unrealized'])
+                         for key, entry in sorted(combined.items())}
+    return merged
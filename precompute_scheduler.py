@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Background Precompute Scheduler for MT5 Crash/Boom Scalping EA Backend
+Refreshes tracked symbols' analyses on a jittered per-symbol cadence that follows how often each is read
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Tracked:
+    """Read rate and schedule of one tracked symbol"""
+
+    __slots__ = ('symbol', 'context', 'pinned', 'reads', 'hits', 'read_weight', 'first_read', 'last_read',
+                 'interval', 'next_run', 'runs', 'statuses', 'last_status', 'last_duration')
+
+    def __init__(self, symbol: str, pinned: bool):
+        self.symbol = symbol
+        self.context = {}
+        self.pinned = pinned
+        self.reads = 0
+        self.hits = 0
+        self.read_weight = 0.0  # exponentially decayed read count
+        self.first_read = None
+        self.last_read = None
+        self.interval = None
+        self.next_run = None
+        self.runs = 0
+        self.statuses = {}
+        self.last_status = None
+        self.last_duration = None
+
+class PrecomputeScheduler:
+    """Runs each tracked symbol's analysis in the background so client reads find it ready
+
+    A symbol read r times a minute is refreshed every `interval / r` seconds,
+    clamped to [min_interval, max_interval], so it is recomputed about as often
+    as clients ask for it. Every next run is drawn within +/- `jitter` of that
+    cadence and a new symbol starts at a random phase, so terminals polling on
+    the same InpAnalysisInterval do not make the refreshes line up. When several
+    symbols are due at once the most-read run first. `run(symbol, context,
+    ahead)` does the work and returns its status; 'busy' means there was no
+    spare capacity and the symbol is retried after min_interval. Symbols not
+    read for `idle_seconds` stop being tracked unless pinned.
+    """
+
+    def __init__(self, run: Callable[[str, Dict, float], str], interval: float = 60.0,
+                 min_interval: float = 15.0, max_interval: float = 600.0, jitter: float = 0.2,
+                 half_life: float = 600.0, idle_seconds: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic, seed: Optional[int] = None):
+        self.run = run
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.decay_seconds = half_life / math.log(2)
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.symbols = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self._thread = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbols
+
+    def pin(self, symbols: Iterable[str]):
+        """Track symbols whether or not anyone reads them"""
+        with self.lock:
+            now = self.clock()
+            for symbol in symbols:
+                self._add(symbol, now, pinned=True)
+        self.wakeup.set()
+
+    def track(self, symbol: str, context: Optional[Dict] = None, hit: Optional[bool] = None):
+        """Record a read of the symbol's analysis, tracking the symbol from now on
+
+        `context` (the client's market_info) is kept for the next background run;
+        `hit` says whether the read was served without computing.
+        """
+        with self.lock:
+            now = self.clock()
+            state = self._add(symbol, now, pinned=False)
+            if context:
+                state.context = context
+            self._read(state, now, hit)
+        self.wakeup.set()
+
+    def read(self, symbol: str, hit: Optional[bool] = None):
+        """Record a read of a symbol that is already tracked; others are ignored"""
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is not None:
+                self._read(state, self.clock(), hit)
+
+    def _add(self, symbol: str, now: float, pinned: bool) -> _Tracked:
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = _Tracked(symbol, pinned)
+            state.interval = self.max_interval if pinned else self.interval
+            state.next_run = now + self.random.uniform(0, state.interval)
+        state.pinned = state.pinned or pinned
+        return state
+
+    def _read(self, state: _Tracked, now: float, hit: Optional[bool]):
+        if state.last_read is not None:
+            state.read_weight *= math.exp(-(now - state.last_read) / self.decay_seconds)
+        state.read_weight += 1.0
+        if state.first_read is None:
+            state.first_read = now
+        state.last_read = now
+        state.reads += 1
+        if hit:
+            state.hits += 1
+        # A symbol that just got busier should not wait out the slower cadence it was on
+        interval = self._interval(state, now)
+        if interval < state.interval:
+            state.interval = interval
+            state.next_run = min(state.next_run, now + self._spread(interval))
+
+    def reads_per_minute(self, state: _Tracked, now: float) -> float:
+        """Decayed read rate; a recently tracked symbol is measured over the time it has been read"""
+        if state.last_read is None:
+            return 0.0
+        weight = state.read_weight * math.exp(-(now - state.last_read) / self.decay_seconds)
+        window = self.decay_seconds * -math.expm1(-(now - state.first_read) / self.decay_seconds)
+        return weight * 60.0 / max(window, self.interval)
+
+    def _interval(self, state: _Tracked, now: float) -> float:
+        rate = self.reads_per_minute(state, now)
+        interval = self.interval / rate if rate > 0 else self.max_interval
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _spread(self, interval: float) -> float:
+        return interval * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Symbols whose run is due, most-read first; idle unpinned symbols are dropped"""
+        now = self.clock() if now is None else now
+        with self.lock:
+            for symbol, state in list(self.symbols.items()):
+                idle = state.last_read is None or now - state.last_read >= self.idle_seconds
+                if not state.pinned and idle:
+                    del self.symbols[symbol]
+                    self.dropped += 1
+            due = [state for state in self.symbols.values() if state.next_run <= now]
+            due.sort(key=lambda state: (-self.reads_per_minute(state, now), state.next_run))
+            return [state.symbol for state in due]
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Run every due symbol in turn; returns how many ran"""
+        ran = 0
+        for symbol in self.due(now):
+            if self.stopping.is_set():
+                break
+            with self.lock:
+                state = self.symbols.get(symbol)
+                if state is None:
+                    continue
+                context = state.context
+                interval = state.interval = self._interval(state, self.clock())
+            started = time.perf_counter()
+            try:
+                status = self.run(symbol, context, interval)
+            except Exception as e:
+                logger.error(f"Precompute for {symbol} failed: {e}")
+                status = 'error'
+            with self.lock:
+                state.runs += 1
+                state.statuses[status] = state.statuses.get(status, 0) + 1
+                state.last_status = status
+                state.last_duration = round(time.perf_counter() - started, 3)
+                wait = self.min_interval if status == 'busy' else interval
+                state.next_run = self.clock() + self._spread(wait)
+            ran += 1
+        return ran
+
+    def next_wait(self) -> float:
+        """Seconds until the earliest scheduled run"""
+        with self.lock:
+            if not self.symbols:
+                return self.max_interval
+            earliest = min(state.next_run for state in self.symbols.values())
+        return max(earliest - self.clock(), 0.0)
+
+    def start(self) -> 'PrecomputeScheduler':
+        """Run due symbols in a background thread"""
+        self._thread = threading.Thread(target=self._loop, name="precompute", daemon=True)
+        self._thread.start()
+        logger.info(f"Precompute scheduler started ({self.min_interval:g}-{self.max_interval:g}s per symbol)")
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            self.run_due()
+            self.wakeup.clear()
+            self.wakeup.wait(min(self.next_wait(), 1.0))
+
+    def stats(self) -> Dict:
+        """Cadence, read rate, hit rate and run outcomes per tracked symbol"""
+        with self.lock:
+            now = self.clock()
+            symbols = {}
+            reads = hits = 0
+            for symbol, state in self.symbols.items():
+                reads += state.reads
+                hits += state.hits
+                symbols[symbol] = {
+                    'pinned': state.pinned,
+                    'reads': state.reads,
+                    'hit_rate': round(state.hits / state.reads, 3) if state.reads else None,
+                    'reads_per_minute': round(self.reads_per_minute(state, now), 2),
+                    'interval_seconds': round(state.interval, 1),
+                    'next_run_in': round(max(state.next_run - now, 0.0), 1),
+                    'runs': state.runs,
+                    'statuses': dict(state.statuses),
+                    'last_status': state.last_status,
+                    'last_duration': state.last_duration,
+                }
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'tracked': len(symbols),
+                'dropped_idle': self.dropped,
+                'hit_rate': round(hits / reads, 3) if reads else None,
+                'symbols': symbols,
+            }
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Price Payload Normalization for MT5 Crash/Boom Scalping EA Backend
+Turns every price_data shape the EAs send into contiguous typed columns, in one pass with validation
+
+Accepted shapes:
+
+    [1.2345, 1.2346, ...]                                   bare closes, oldest first
+    [{"time": 1700000040, "open": ..., "close": ...}, ...]  OHLC records ("timestamp" ISO strings also work)
+    {"time": [...], "open": [...], ..., "close": [...]}     one array per column
+    "1.2345,1.2346,...\\0"                                  MQL string of closes, NUL padding allowed
+    "1700000040,1.2,1.3,1.1,1.25;..."                       MQL string of rows: close, time+close, OHLC or time+OHLC
+    ["1.2345\\0", "1.2346\\0", ...]                         one MQL string per bar, in any of the row layouts
+
+Only the standard library is used, so the numpy-free simple server shares it.
+"""
+
+import math
+import operator
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+class PriceDataError(ValueError):
+    """Raised for a price_data payload that cannot be used"""
+
+class PriceData:
+    """Typed columns of one payload: array('d') prices, array('q') times or None, oldest first
+
+    Payloads with closes only share one array for open, high, low and close.
+    """
+
+    __slots__ = ('time', 'open', 'high', 'low', 'close', 'shape')
+
+    def __init__(self, close: array, time: Optional[array] = None, open: Optional[array] = None,
+                 high: Optional[array] = None, low: Optional[array] = None, shape: str = 'closes'):
+        self.close = close
+        self.open = close if open is None else open
+        self.high = close if high is None else high
+        self.low = close if low is None else low
+        self.time = time
+        self.shape = shape
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+def _validate(data: PriceData) -> PriceData:
+    n = len(data.close)
+    for name in PRICE_FIELDS:
+        column = getattr(data, name)
+        if len(column) != n:
+            raise PriceDataError(f"price_data column '{name}' has {len(column)} values, expected {n}")
+        if n == 0 or (column is data.close and name != 'close'):
+            continue
+        # sum() and min() run in C; any NaN or infinity makes the sum non-finite
+        if not math.isfinite(sum(column)) or min(column) <= 0:
+            raise PriceDataError(f"price_data column '{name}' must hold finite prices above zero")
+    if n and data.high is not data.low:
+        if any(map(operator.lt, data.high, data.low)):
+            raise PriceDataError("price_data has a bar with high below low")
+    if data.time is not None:
+        if len(data.time) != n:
+            raise PriceDataError(f"price_data column 'time' has {len(data.time)} values, expected {n}")
+        if n and min(data.time) <= 0:
+            raise PriceDataError("price_data times must be unix times in seconds")
+    return data
+
+def _iso_seconds(value: str) -> int:
+    stamp = datetime.fromisoformat(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return int(stamp.timestamp())
+
+def _from_records(records: List[Dict]) -> PriceData:
+    """OHLC dicts, read in a single loop"""
+    time_key = 'time' if 'time' in records[0] else ('timestamp' if 'timestamp' in records[0] else None)
+    times = array('q') if time_key else None
+    opens, highs, lows, closes = array('d'), array('d'), array('d'), array('d')
+    add_open, add_high, add_low, add_close = opens.append, highs.append, lows.append, closes.append
+    try:
+        for index, record in enumerate(records):
+            close = record['close']
+            add_close(close)
+            add_open(record.get('open', close))
+            add_high(record.get('high', close))
+            add_low(record.get('low', close))
+            if time_key == 'time':
+                times.append(int(record['time']))
+            elif time_key == 'timestamp':
+                times.append(_iso_seconds(record['timestamp']))
+    except (KeyError, TypeError, ValueError, AttributeError, OverflowError) as e:
+        raise PriceDataError(f"price_data[{index}] is not a valid bar: {e!r}")
+    return PriceData(closes, times, opens, highs, lows, shape='records')
+
+def _times(values: List) -> array:
+    try:
+        return array('q', values)
+    except TypeError:
+        return array('q', map(int, values))  # float times from JSON such as 1700000040.0
+
+def _from_columns(columns: Dict[str, Any]) -> PriceData:
+    if 'close' not in columns:
+        raise PriceDataError("column-oriented price_data needs a 'close' array")
+    try:
+        close = array('d', columns['close'])
+        prices = {name: array('d', columns[name]) for name in ('open', 'high', 'low') if name in columns}
+        times = _times(columns['time']) if 'time' in columns else None
+    except (TypeError, ValueError, OverflowError) as e:
+        raise PriceDataError(f"column-oriented price_data has a non-numeric value: {e}")
+    return PriceData(close, times, shape='columns', **prices)
+
+def _from_rows(rows: List[str]) -> PriceData:
+    """MQL text rows of 1 (close), 2 (time, close), 4 (OHLC) or 5 (time + OHLC) comma-separated fields"""
+    if not rows:
+        return PriceData(array('d'), shape='text')
+    width = rows[0].count(',') + 1
+    if width not in (1, 2, 4, 5):
+        raise PriceDataError(f"price_data rows need 1, 2, 4 or 5 fields, got {width}")
+    counts = set(map(operator.methodcaller('count', ','), rows))
+    if counts != {width - 1}:
+        raise PriceDataError(f"price_data rows must all have {width} fields")
+    # Parse every field in one pass, then take each column as a strided slice
+    try:
+        values = array('d', map(float, ','.join(rows).split(',')))
+    except ValueError as e:
+        raise PriceDataError(f"price_data rows are not numeric: {e}")
+    timed = width in (2, 5)
+    times = array('q', map(int, values[0::width])) if timed else None
+    columns = [values[k::width] for k in range(timed, width)]
+    if len(columns) == 1:
+        return PriceData(columns[0], times, shape='text')
+    return PriceData(columns[3], times, columns[0], columns[1], columns[2], shape='text')
+
+def _clean(text: str) -> str:
+    """MQL StringToCharArray keeps the terminating NUL, and fixed buffers add more"""
+    return text.split('\x00', 1)[0].strip()
+
+def _from_text(text: str) -> PriceData:
+    text = _clean(text)
+    if not text:
+        return PriceData(array('d'), shape='text')
+    if ';' in text or '\n' in text:
+        rows = [row.strip() for row in text.replace('\n', ';').split(';')]
+        return _from_rows([row for row in rows if row])
+    fields = text.replace(',', ' ').split()
+    try:
+        return PriceData(array('d', map(float, fields)), shape='text')
+    except ValueError as e:
+        raise PriceDataError(f"price_data string is not a list of prices: {e}")
+
+def parse_price_data(payload: Any) -> PriceData:
+    """Normalize any supported price_data payload; raises PriceDataError when it cannot be used"""
+    if isinstance(payload, PriceData):
+        return payload
+    if payload is None:
+        return PriceData(array('d'), shape='empty')
+    if isinstance(payload, str):
+        return _validate(_from_text(payload))
+    if isinstance(payload, dict):
+        return _validate(_from_columns(payload))
+    if not isinstance(payload, (list, tuple)):
+        raise PriceDataError(f"price_data must be a list, object or string, not {type(payload).__name__}")
+    if not payload:
+        return PriceData(array('d'), shape='empty')
+    first = payload[0]
+    if isinstance(first, dict):
+        data = _from_records(payload)
+    elif isinstance(first, str):
+        rows = [_clean(row) for row in payload]
+        data = _from_rows([row for row in rows if row])
+    else:
+        try:
+            data = PriceData(array('d', payload))
+        except TypeError as e:
+            raise PriceDataError(f"price_data must hold numbers: {e}")
+    return _validate(data)
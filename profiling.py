@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+On-Demand Profiling for MT5 Crash/Boom Scalping EA Backend
+Deterministic (cProfile) or sampling profiles of selected requests, stored on disk
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sampling')
+PROFILE_SUFFIXES = {'cprofile': '.prof', 'sampling': '.folded'}
+# One cProfile at a time per process: on Python 3.12+ a second enable() raises, and a profile
+# would also record the other request's calls
+_cprofile_lock = threading.Lock()
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into folded stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        """Stacks in the collapsed format flamegraph tools read"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class Profiler:
+    """Decides which requests to profile and runs them under a profiler
+
+    Arming state (next N requests, or a symbol) lives in the process that
+    routes requests; `run` may execute in a shard worker and writes to the
+    same directory. Only the thread calling `run` is profiled; work it hands
+    to other threads is not. The per-request header is ignored unless
+    `allow_header` is set.
+    """
+
+    def __init__(self, directory: str = 'profiles', max_profiles: int = 100, sample_interval: float = 0.001,
+                 allow_header: bool = False):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.sample_interval = sample_interval
+        self.allow_header = allow_header
+        self.remaining = 0
+        self.remaining_mode = 'cprofile'
+        self.symbols = {}  # symbol -> (mode, remaining or None for until disarmed)
+        self.lock = threading.Lock()
+
+    def arm(self, count: int = 0, symbol: Optional[str] = None, mode: str = 'cprofile'):
+        """Profile the next `count` requests, or requests for `symbol` (all of them when count is 0)"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        with self.lock:
+            if symbol is not None:
+                self.symbols[symbol] = (mode, count or None)
+            else:
+                self.remaining, self.remaining_mode = count, mode
+
+    def disarm(self):
+        """Stop profiling anything not explicitly requested by header"""
+        with self.lock:
+            self.remaining = 0
+            self.symbols.clear()
+
+    def requested(self, symbol: str, header: Optional[str] = None) -> Optional[str]:
+        """Profile mode for this request, or None (the disabled path is three checks)"""
+        if header is None and not self.remaining and not self.symbols:
+            return None
+        if header is not None and self.allow_header:
+            header = header.strip().lower()
+            if header in ('', '0', 'off', 'false'):
+                return None
+            return header if header in PROFILE_MODES else 'cprofile'
+        with self.lock:
+            if symbol in self.symbols:
+                mode, left = self.symbols[symbol]
+                if left is not None:
+                    if left <= 1:
+                        del self.symbols[symbol]
+                    else:
+                        self.symbols[symbol] = (mode, left - 1)
+                return mode
+            if self.remaining > 0:
+                self.remaining -= 1
+                return self.remaining_mode
+        return None
+
+    def run(self, mode: str, label: str, fn, *args) -> Tuple[object, str]:
+        """Call fn(*args) under the profiler and store the profile, returning (result, profile name)
+
+        A cProfile request that overlaps another one (or an external profiler) is
+        sampled instead; the stored name carries the mode actually used.
+        """
+        if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            try:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError as e:
+                    logger.info(f"cProfile unavailable ({e}), sampling {label} instead")
+                else:
+                    started = time.perf_counter()
+                    try:
+                        result = fn(*args)
+                    finally:
+                        profile.disable()
+                    name = self._name(label, mode, (time.perf_counter() - started) * 1000)
+                    profile.dump_stats(self._path(name))
+                    return self._stored(result, mode, name)
+            finally:
+                _cprofile_lock.release()
+        elif mode == 'cprofile':
+            logger.info(f"Another request holds cProfile, sampling {label} instead")
+
+        mode = 'sampling'
+        started = time.perf_counter()
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        sampler.start()
+        try:
+            result = fn(*args)
+        finally:
+            sampler.stop()
+        name = self._name(label, mode, (time.perf_counter() - started) * 1000)
+        with open(self._path(name), 'w') as f:
+            f.write(sampler.folded())
+        return self._stored(result, mode, name)
+
+    def _stored(self, result, mode: str, name: str) -> Tuple[object, str]:
+        logger.info(f"Stored {mode} profile {name}")
+        self._prune()
+        return result, name
+
+    def _name(self, label: str, mode: str, elapsed_ms: float) -> str:
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1e6) % 1000000:06d}"
+        label = re.sub(r'[^A-Za-z0-9.]+', '-', label).strip('-') or 'request'
+        return f"{stamp}_{label}_{mode}_{elapsed_ms:.0f}ms{PROFILE_SUFFIXES[mode]}"
+
+    def _path(self, name: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, name)
+
+    def _prune(self):
+        for name in [p['name'] for p in self.list()][self.max_profiles:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict]:
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            parts = name.rsplit('.', 1)[0].split('_')
+            if len(parts) != 4 or parts[2] not in PROFILE_MODES:
+                continue
+            profiles.append({
+                'name': name,
+                'created': parts[0],
+                'label': parts[1],
+                'mode': parts[2],
+                'elapsed_ms': int(parts[3].rstrip('ms')),
+                'bytes': os.path.getsize(os.path.join(self.directory, name)),
+            })
+        return sorted(profiles, key=lambda p: p['name'], reverse=True)
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Path of a stored profile, refusing anything outside the profile directory"""
+        if name != os.path.basename(name) or name not in {p['name'] for p in self.list()}:
+            return None
+        return os.path.join(self.directory, name)
+
+    def summary(self, name: str, limit: int = 40) -> Optional[str]:
+        """Readable text for a profile: top functions by cumulative time, or the folded stacks"""
+        path = self.path_for(name)
+        if path is None:
+            return None
+        if name.endswith(PROFILE_SUFFIXES['sampling']):
+            with open(path) as f:
+                return f.read()
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def stats(self) -> Dict:
+        """Current arming state"""
+        with self.lock:
+            return {
+                'directory': self.directory,
+                'header_enabled': self.allow_header,
+                'next_requests': self.remaining,
+                'next_requests_mode': self.remaining_mode,
+                'symbols': {symbol: {'mode': mode, 'remaining': left}
+                            for symbol, (mode, left) in self.symbols.items()},
+            }
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Regime Change Detection for MT5 Crash/Boom Scalping EA Backend
+Online CUSUM detectors per symbol decide when a fresh LLM analysis is worth paying for
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class GaussianCusum:
+    """Two-sided CUSUM for a shift in the mean of a roughly normal feature
+
+    The baseline mean and spread are learned from the first `warmup` values
+    after every reset; values are standardized against it. `drift` is the
+    allowance in standard deviations and `threshold` the alarm level.
+    """
+
+    def __init__(self, warmup: int, drift: float = 0.5, threshold: float = 8.0):
+        self.warmup = warmup
+        self.drift = drift
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.std = None
+        self.upper = self.lower = 0.0
+        self.upper_start = self.lower_start = None
+
+    def update(self, value: float, index: int) -> Optional[Tuple[str, int]]:
+        """Feed one value; returns (direction, index where the shift began) on an alarm"""
+        if self.std is None:
+            # Welford's running mean and variance over the warm-up window
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (value - self.mean)
+            if self.count >= self.warmup:
+                spread = math.sqrt(self._m2 / max(self.count - 1, 1))
+                self.std = max(spread, 1e-3 * abs(self.mean), 1e-9)
+            return None
+
+        z = (value - self.mean) / self.std
+        if self.upper == 0.0:
+            self.upper_start = index
+        if self.lower == 0.0:
+            self.lower_start = index
+        self.upper = max(0.0, self.upper + z - self.drift)
+        self.lower = max(0.0, self.lower - z - self.drift)
+        if self.upper > self.threshold:
+            return 'up', self.upper_start
+        if self.lower > self.threshold:
+            return 'down', self.lower_start
+        return None
+
+    def state(self) -> Dict:
+        return {'warm': self.std is not None, 'baseline': self.mean if self.std is not None else None,
+                'upper': round(self.upper, 3), 'lower': round(self.lower, 3)}
+
+class BernoulliCusum:
+    """CUSUM of log-likelihood ratios for a change in an event rate (spikes per bar)
+
+    Tests the warm-up rate p against `ratio` * p and p / `ratio`, so a single
+    spike moves the statistic by about log(ratio) instead of dominating it.
+    """
+
+    def __init__(self, warmup: int, ratio: float = 2.0, threshold: float = 5.0):
+        self.warmup = warmup
+        self.ratio = ratio
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.events = 0
+        self.rate = None
+        self.upper = self.lower = 0.0
+        self.upper_start = self.lower_start = None
+
+    def _weights(self, rate: float) -> Tuple[float, float, float, float]:
+        high = min(rate * self.ratio, 0.999)
+        low = rate / self.ratio
+        return (math.log(high / rate), math.log((1 - high) / (1 - rate)),
+                math.log(low / rate), math.log((1 - low) / (1 - rate)))
+
+    def update(self, event: bool, index: int) -> Optional[Tuple[str, int]]:
+        """Feed one bar; returns (direction, index where the shift began) on an alarm"""
+        if self.rate is None:
+            self.count += 1
+            self.events += bool(event)
+            if self.count >= self.warmup:
+                # Laplace-smoothed so a quiet warm-up still gives a usable rate
+                self.rate = (self.events + 1) / (self.count + 2)
+                self._llr = self._weights(self.rate)
+            return None
+
+        up_hit, up_miss, down_hit, down_miss = self._llr
+        if self.upper == 0.0:
+            self.upper_start = index
+        if self.lower == 0.0:
+            self.lower_start = index
+        self.upper = max(0.0, self.upper + (up_hit if event else up_miss))
+        self.lower = max(0.0, self.lower + (down_hit if event else down_miss))
+        if self.upper > self.threshold:
+            return 'up', self.upper_start
+        if self.lower > self.threshold:
+            return 'down', self.lower_start
+        return None
+
+    def state(self) -> Dict:
+        return {'warm': self.rate is not None, 'baseline': self.rate,
+                'upper': round(self.upper, 3), 'lower': round(self.lower, 3)}
+
+class _SymbolRegime:
+    """Detectors and analysis epoch for one symbol"""
+
+    def __init__(self, detector: 'RegimeDetector'):
+        self.detectors = {
+            'volatility': GaussianCusum(detector.volatility_warmup, threshold=detector.threshold),
+            'spike_rate': BernoulliCusum(detector.rate_warmup, threshold=detector.rate_threshold),
+            'spike_size': GaussianCusum(detector.size_warmup, threshold=detector.threshold),
+        }
+        self.block = []  # ordinary moves of the volatility block being filled
+        self.last_time = None
+        self.last_close = None
+        self.bars = 0
+        self.times = deque(maxlen=detector.max_lookback)  # bar times by index, for change-point times
+        self.epoch = 0
+        self.epoch_started = None
+        self.pending = None  # alarm that has not triggered an analysis yet
+        self.retry_at = None  # when an epoch whose analysis fell back to local statistics expires
+        self.warm = False
+        self.alarms = deque(maxlen=50)
+        self.triggers = {'initial': 0, 'regime_shift': 0, 'max_age': 0, 'retry': 0}
+        self.served_cached = 0
+
+class RegimeDetector:
+    """Watches volatility, spike rate and spike size per symbol on completed M1 bars
+
+    `update` runs on every ingest and costs O(new bars). `epoch` returns a
+    number that changes only when a new analysis is due: the first request,
+    a regime shift flagged by any detector since the last analysis, the
+    last analysis being older than `max_age` seconds, or the time set by
+    `retry` passing. Callers key their cached analysis on it once `warm`
+    says the detectors can see a shift at all. Ages are measured on `clock`.
+    """
+
+    def __init__(self, spike_size: float = 50.0, max_age: float = 1800.0, threshold: float = 8.0,
+                 rate_threshold: float = 6.0, volatility_warmup: int = 40, volatility_block: int = 5,
+                 rate_warmup: int = 600, size_warmup: int = 10, clock: Callable[[], float] = time.time):
+        self.spike_size = spike_size
+        self.max_age = max_age
+        self.threshold = threshold
+        self.rate_threshold = rate_threshold
+        self.volatility_warmup = volatility_warmup
+        self.volatility_block = volatility_block
+        self.rate_warmup = rate_warmup
+        self.size_warmup = size_warmup
+        self.max_lookback = 10000
+        self.clock = clock
+        self.symbols = {}
+        self.lock = threading.Lock()
+
+    def _state(self, symbol: str) -> _SymbolRegime:
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = _SymbolRegime(self)
+        return state
+
+    def update(self, symbol: str, bars: Dict[str, np.ndarray]) -> List[Dict]:
+        """Feed the completed bars not seen yet (the last bar is still forming); returns new alarms"""
+        times, closes = bars['time'], bars['close']
+        alarms = []
+        with self.lock:
+            state = self._state(symbol)
+            start = 0 if state.last_time is None else int(np.searchsorted(times, state.last_time, side='right'))
+            for i in range(start, len(times) - 1):
+                close = float(closes[i])
+                if state.last_close is not None:
+                    alarm = self._observe(state, abs(close - state.last_close), int(times[i]))
+                    if alarm is not None:
+                        alarms.append(alarm)
+                state.last_close = close
+                state.last_time = int(times[i])
+        for alarm in alarms:
+            logger.info(f"Regime shift for {symbol}: {alarm['detector']} {alarm['direction']}, "
+                        f"detected {alarm['latency_bars']} bars after it began")
+        return alarms
+
+    def _observe(self, state: _SymbolRegime, move: float, bar_time: int) -> Optional[Dict]:
+        index = state.bars
+        state.bars += 1
+        state.times.append(bar_time)
+        spike = move >= self.spike_size
+        detectors = state.detectors
+        hits = [('spike_rate', detectors['spike_rate'].update(spike, index))]
+        if not state.warm:
+            state.warm = detectors['volatility'].std is not None and detectors['spike_rate'].rate is not None
+        if spike:
+            hits.append(('spike_size', detectors['spike_size'].update(math.log(move), index)))
+        else:
+            # Log of the mean ordinary move per block of bars, which is close to normal unlike
+            # single moves; spikes are measured by the other two detectors
+            state.block.append(move)
+            if len(state.block) == self.volatility_block:
+                level = math.log(sum(state.block) / len(state.block) + 1e-3 * self.spike_size)
+                state.block = []
+                hits.append(('volatility', detectors['volatility'].update(level, index)))
+        for name, hit in hits:
+            if hit is None:
+                continue
+            direction, began = hit
+            began_time = state.times[max(began - index - 1, -len(state.times))] if began is not None else bar_time
+            alarm = {
+                'detector': name,
+                'direction': direction,
+                'bar_time': bar_time,
+                'change_bar_time': began_time,
+                'latency_bars': index - began if began is not None else 0,
+                'latency_seconds': bar_time - began_time,
+                'detected_at': self.clock(),
+            }
+            state.alarms.append(alarm)
+            state.pending = state.pending or alarm
+            # A new regime: every detector relearns its baseline from here
+            for detector in detectors.values():
+                detector.reset()
+            state.block = []
+            return alarm
+        return None
+
+    def epoch(self, symbol: str, now: Optional[float] = None, ahead: float = 0.0) -> Tuple[int, Optional[str]]:
+        """Current analysis epoch, advancing it when a new analysis is due; returns (epoch, trigger or None)
+
+        With `ahead`, an epoch that would reach max_age within that many seconds is
+        already treated as expired, so a background refresh can replace it early.
+        """
+        now = self.clock() if now is None else now
+        with self.lock:
+            state = self._state(symbol)
+            if state.epoch == 0:
+                trigger = 'initial'
+            elif state.pending is not None:
+                trigger = 'regime_shift'
+            elif now + ahead - state.epoch_started >= self.max_age:
+                trigger = 'max_age'
+            elif state.retry_at is not None and now + ahead >= state.retry_at:
+                trigger = 'retry'
+            else:
+                state.served_cached += 1
+                return state.epoch, None
+            state.epoch += 1
+            state.epoch_started = now
+            state.pending = None
+            state.retry_at = None
+            state.triggers[trigger] += 1
+            return state.epoch, trigger
+
+    def warm(self, symbol: str) -> bool:
+        """Whether the symbol's volatility and spike-rate detectors have learned their first baseline
+
+        Before that no shift can be flagged, so an epoch would only ever end at max_age.
+        """
+        with self.lock:
+            state = self.symbols.get(symbol)
+            return state is not None and state.warm
+
+    def retry(self, symbol: str, epoch: int, after: Optional[float], now: Optional[float] = None):
+        """End the epoch `after` seconds from now, e.g. when its analysis is only a fallback
+
+        `after` None cancels an earlier retry. Ignored once the epoch has moved on.
+        """
+        now = self.clock() if now is None else now
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is not None and state.epoch == epoch:
+                state.retry_at = None if after is None else now + after
+
+    def stats(self, symbol: Optional[str] = None) -> Dict:
+        """Triggers, cached serves, alarm latencies and detector state per symbol"""
+        with self.lock:
+            names = [symbol] if symbol is not None else list(self.symbols)
+            result = {}
+            for name in names:
+                state = self.symbols.get(name)
+                if state is None:
+                    continue
+                latencies = [a['latency_bars'] for a in state.alarms]
+                result[name] = {
+                    'bars': state.bars,
+                    'last_bar_time': state.last_time,
+                    'warm': state.warm,
+                    'epoch': state.epoch,
+                    'analyses': dict(state.triggers),
+                    'served_cached': state.served_cached,
+                    'pending_shift': state.pending is not None,
+                    'retry_pending': state.retry_at is not None,
+                    'alarms': len(state.alarms),
+                    'mean_latency_bars': round(float(np.mean(latencies)), 1) if latencies else None,
+                    'recent_alarms': [{k: v for k, v in a.items() if k != 'detected_at'}
+                                      for a in list(state.alarms)[-5:]],
+                    'detectors': {n: d.state() for n, d in state.detectors.items()},
+                }
+            return result
+
+    def clear(self):
+        """Forget every symbol's detectors and epochs"""
+        with self.lock:
+            self.symbols.clear()
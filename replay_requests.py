@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Replay captured EA traffic against one or two backend builds
+Re-sends captured /analyze requests at the original pacing or N x speed and
+reports latency distribution and response differences
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from request_capture import read_captures
+
+# Response fields compared between builds; timestamps and timings always differ
+NUMERIC_FIELDS = ("spike_threshold", "cooldown_seconds", "stop_loss_pips",
+                  "take_profit_pips", "risk_score", "confidence")
+LABEL_FIELDS = ("tier", "market_trend", "shed")
+
+class Replayer:
+    """Sends captured requests on schedule and keeps per-target results
+
+    Each target gets its own `concurrency` workers and connection pool, so a
+    slow build cannot take request slots from the one it is compared with.
+    """
+
+    def __init__(self, targets: List[str], concurrency: int, timeout: float):
+        self.targets = targets
+        self.timeout = timeout
+        self.sessions = {}
+        self.executors = {}
+        for target in targets:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=concurrency)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self.sessions[target] = session
+            self.executors[target] = ThreadPoolExecutor(max_workers=concurrency)
+        self.results = {target: [] for target in targets}
+        self.lock = threading.Lock()
+
+    def send(self, index: int, target: str, record: Dict, due: float):
+        """POST one captured request and store status, latency and body"""
+        lag = time.monotonic() - due
+        start = time.perf_counter()
+        try:
+            response = self.sessions[target].post(target.rstrip('/') + record['path'], data=record['body'],
+                                         headers=record['headers'], timeout=self.timeout)
+            latency = time.perf_counter() - start
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            result = {'index': index, 'status': response.status_code, 'latency': latency, 'lag': lag, 'body': body}
+        except requests.RequestException as e:
+            result = {'index': index, 'status': None, 'latency': time.perf_counter() - start, 'lag': lag,
+                      'body': None, 'error': type(e).__name__}
+        with self.lock:
+            self.results[target].append(result)
+
+    def run(self, records: List[Dict], speed: float):
+        """Replay every record, keeping the captured gaps divided by `speed` (0 = no pacing)"""
+        if not records:
+            return
+        first = records[0]['ts']
+        start = time.monotonic()
+        for index, record in enumerate(records):
+            due = start + ((record['ts'] - first) / speed if speed > 0 else 0.0)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            for target in self.targets:
+                self.executors[target].submit(self.send, index, target, record, due)
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+
+def latency_report(results: List[Dict]) -> Dict:
+    """Status counts and latency/lag percentiles in milliseconds"""
+    latencies = np.array([r['latency'] for r in results if r['status'] is not None]) * 1000
+    lags = np.array([r['lag'] for r in results]) * 1000
+    statuses = {}
+    for r in results:
+        key = str(r['status']) if r['status'] is not None else r.get('error', 'error')
+        statuses[key] = statuses.get(key, 0) + 1
+    report = {'requests': len(results), 'statuses': statuses}
+    if len(latencies):
+        report['latency_ms'] = {
+            'mean': round(float(latencies.mean()), 1),
+            **{f"p{q}": round(float(np.percentile(latencies, q)), 1) for q in (50, 90, 99)},
+            'max': round(float(latencies.max()), 1),
+        }
+    if len(lags):
+        report['schedule_lag_ms'] = {'p50': round(float(np.percentile(lags, 50)), 1),
+                                     'max': round(float(lags.max()), 1)}
+    return report
+
+def diff_report(base: List[Dict], other: List[Dict], tolerance: float, examples: int = 5) -> Dict:
+    """Compare paired responses field by field"""
+    other_by_index = {r['index']: r for r in other}
+    fields = {name: {'differs': 0, 'mean_abs_diff': 0.0} for name in NUMERIC_FIELDS + LABEL_FIELDS}
+    report = {'compared': 0, 'status_mismatches': 0, 'differing_responses': 0, 'fields': fields, 'examples': []}
+
+    for a in sorted(base, key=lambda r: r['index']):
+        b = other_by_index.get(a['index'])
+        if b is None:
+            continue
+        report['compared'] += 1
+        if a['status'] != b['status']:
+            report['status_mismatches'] += 1
+        body_a, body_b = a['body'] or {}, b['body'] or {}
+
+        changed = {}
+        for name in NUMERIC_FIELDS:
+            va, vb = body_a.get(name), body_b.get(name)
+            if va is None and vb is None:
+                continue
+            if va is None or vb is None or abs(float(va) - float(vb)) > tolerance * max(abs(float(va)), 1.0):
+                fields[name]['differs'] += 1
+                changed[name] = (va, vb)
+            if va is not None and vb is not None:
+                fields[name]['mean_abs_diff'] += abs(float(va) - float(vb))
+        for name in LABEL_FIELDS:
+            if body_a.get(name) != body_b.get(name):
+                fields[name]['differs'] += 1
+                changed[name] = (body_a.get(name), body_b.get(name))
+
+        if changed or a['status'] != b['status']:
+            report['differing_responses'] += 1
+            if len(report['examples']) < examples:
+                report['examples'].append({'index': a['index'], 'status': (a['status'], b['status']),
+                                           'fields': changed})
+
+    for stats in fields.values():
+        stats['mean_abs_diff'] = round(stats['mean_abs_diff'] / max(report['compared'], 1), 4)
+    return report
+
+def print_latency(name: str, report: Dict):
+    print(f"\n{name}: {report['requests']} requests, statuses {report['statuses']}")
+    if 'latency_ms' in report:
+        latency = report['latency_ms']
+        print(f"  latency ms  mean {latency['mean']}  p50 {latency['p50']}  p90 {latency['p90']}  "
+              f"p99 {latency['p99']}  max {latency['max']}")
+    if 'schedule_lag_ms' in report:
+        print(f"  schedule lag ms  p50 {report['schedule_lag_ms']['p50']}  max {report['schedule_lag_ms']['max']}")
+
+def print_diff(report: Dict):
+    print(f"\nDifferences: {report['differing_responses']}/{report['compared']} responses, "
+          f"{report['status_mismatches']} status mismatches")
+    for name, stats in report['fields'].items():
+        if stats['differs']:
+            print(f"  {name:18s} differs {stats['differs']:5d}  mean |diff| {stats['mean_abs_diff']}")
+    for example in report['examples']:
+        print(f"  #{example['index']} status {example['status']} {example['fields']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured /analyze traffic against backend builds")
+    parser.add_argument('captures', nargs='+', help='capture files or CAPTURE_DIR directories')
+    parser.add_argument('--target', default='http://localhost:5001', help='backend to replay against')
+    parser.add_argument('--compare', help='second backend build to diff responses against')
+    parser.add_argument('--speed', type=float, default=1.0, help='pacing multiplier (0 = as fast as possible)')
+    parser.add_argument('--concurrency', type=int, default=8, help='max requests in flight per target')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-request timeout in seconds')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='relative tolerance for numeric fields')
+    parser.add_argument('--report', help='write the full report as JSON to this file')
+    args = parser.parse_args()
+
+    records = sorted(read_captures(args.captures), key=lambda r: r['ts'])[:args.limit]
+    if not records:
+        print("No captured requests found")
+        return
+    span = records[-1]['ts'] - records[0]['ts']
+    print(f"Replaying {len(records)} requests captured over {span:.0f}s "
+          f"at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed")
+
+    targets = [args.target] + ([args.compare] if args.compare else [])
+    replayer = Replayer(targets, args.concurrency, args.timeout)
+    started = time.monotonic()
+    replayer.run(records, args.speed)
+    print(f"Finished in {time.monotonic() - started:.1f}s")
+
+    report = {'targets': {}}
+    for target in targets:
+        report['targets'][target] = latency_report(replayer.results[target])
+        print_latency(target, report['targets'][target])
+    if args.compare:
+        report['diff'] = diff_report(replayer.results[args.target], replayer.results[args.compare], args.tolerance)
+        print_diff(report['diff'])
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+if __name__ == "__main__":
+    main()
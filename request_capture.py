@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Request Capture for MT5 Crash/Boom Scalping EA Backend
+Writes timestamped request bodies to rotating gzip JSONL files for replay
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Request headers that change how the server answers, kept for replay
+CAPTURED_HEADERS = ('Content-Type', 'User-Agent', 'X-Client-Type', 'X-Client-Id', 'X-Deadline-Ms')
+
+class RequestCapture:
+    """Background writer for captured requests
+
+    Requests are handed to a writer thread through a bounded queue, so the
+    request path only pays for a dict and a put. When the writer falls behind,
+    records are dropped rather than slowing the server down.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, max_files: int = 10,
+                 backlog: int = 10000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=backlog)
+        self.captured = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._file = None
+        self._raw = None  # the compressed file under self._file
+        self._path = None
+        self._writer = threading.Thread(target=self._write_loop, name="request-capture", daemon=True)
+        self._writer.start()
+        logger.info(f"Capturing requests to {directory}")
+
+    def record(self, path: str, body: bytes, headers) -> bool:
+        """Queue one request for capture, returning False if it was dropped"""
+        record = {
+            'ts': time.time(),
+            'path': path,
+            'headers': {name: headers[name] for name in CAPTURED_HEADERS if name in headers},
+            # surrogateescape round-trips arbitrary bytes, NUL terminators included
+            'body': body.decode('utf-8', errors='surrogateescape'),
+        }
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write_loop(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            try:
+                # max_bytes bounds the file on disk; compressed output trails the input by at
+                # most the compressor's buffer, and every flush brings it level
+                if self._file is None or self._raw.tell() >= self.max_bytes:
+                    self._rotate()
+                self._file.write((json.dumps(record) + '\n').encode('utf-8'))
+                self.captured += 1
+                if self.queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                logger.error(f"Request capture failed: {e}")
+        if self._file is not None:
+            self._close_file()
+
+    def _close_file(self):
+        self._file.close()  # writes the gzip trailer; the file object under it stays open
+        self._raw.close()
+
+    def _rotate(self):
+        """Start a new capture file and remove the oldest beyond max_files"""
+        if self._file is not None:
+            self._close_file()
+            self.rotations += 1
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self._path = os.path.join(self.directory, f"capture-{stamp}-{self.rotations:04d}.jsonl.gz")
+        self._raw = open(self._path, 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=5)
+        for old in capture_files(self.directory)[:-self.max_files]:
+            os.remove(old)
+
+    def close(self):
+        """Flush queued records and close the current file"""
+        self.queue.put(None)
+        self._writer.join(timeout=10)
+
+    def stats(self) -> Dict:
+        """Capture counters and the file currently written"""
+        return {
+            'directory': self.directory,
+            'current_file': self._path,
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'backlog': self.queue.qsize(),
+            'rotations': self.rotations,
+        }
+
+def capture_files(path: str) -> List[str]:
+    """Capture files in a directory (oldest first), or the path itself"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, 'capture-*.jsonl.gz')))
+    return [path]
+
+def read_captures(paths: List[str]) -> Iterator[Dict]:
+    """Yield captured records from files or directories, body restored to bytes"""
+    for path in paths:
+        for filename in capture_files(path):
+            with gzip.open(filename, 'rt', encoding='utf-8') as f:
+                try:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        record['body'] = record['body'].encode('utf-8', errors='surrogateescape')
+                        yield record
+                except EOFError:
+                    # The file still being written has no gzip trailer yet
+                    logger.warning(f"{filename} is truncated, replaying what was readable")
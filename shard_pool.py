@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Symbol-Sharded Worker Pool for MT5 Crash/Boom Scalping EA
+Pins each symbol to one worker process so its state lives in exactly one place
+"""
+
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set inside worker processes so they can push events back to the router
+_worker_outbox = None
+_worker_index = None
+
+def publish(kind: str, *args) -> bool:
+    """Send an unsolicited event from a worker to the routing process
+
+    Returns False when called outside a worker, so callers can fall back to
+    updating local state directly.
+    """
+    if _worker_outbox is None:
+        return False
+    _worker_outbox.put((None, kind, args))
+    return True
+
+def worker_index() -> Optional[int]:
+    """Index of the current worker process, or None in the routing process"""
+    return _worker_index
+
+class ConsistentHashRing:
+    """Maps keys to nodes with virtual replicas so adding a node moves few keys"""
+
+    def __init__(self, nodes: List[str], replicas: int = 64):
+        self.replicas = replicas
+        self._positions = []
+        self._nodes = []
+        for node in nodes:
+            for replica in range(replicas):
+                position = self._hash(f"{node}#{replica}")
+                index = bisect.bisect(self._positions, position)
+                self._positions.insert(index, position)
+                self._nodes.insert(index, node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, key: str) -> str:
+        """Node owning a key"""
+        index = bisect.bisect(self._positions, self._hash(key)) % len(self._positions)
+        return self._nodes[index]
+
+def _worker_main(index: int, inbox, outbox, threads: int):
+    """Worker loop: run routed calls against this process's own module state"""
+    global _worker_outbox, _worker_index
+    _worker_outbox = outbox
+    _worker_index = index
+
+    def run(request_id, fn, args):
+        try:
+            outbox.put((request_id, True, fn(*args)))
+        except Exception as e:
+            logger.error(f"Shard {index} call {getattr(fn, '__name__', fn)} failed: {e}")
+            outbox.put((request_id, False, f"{type(e).__name__}: {e}"))
+
+    # Threads let I/O-bound work (LLM calls) overlap; CPU work stays on this core
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"shard-{index}")
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        executor.submit(run, *item)
+    executor.shutdown(wait=True)
+
+class ShardPool:
+    """Fixed pool of worker processes with symbols assigned by consistent hashing
+
+    A worker that dies is replaced by a fresh one on the same shard: its
+    in-flight calls fail at once instead of waiting out the timeout, and its
+    symbols start over with empty state (clients resend their bars).
+    """
+
+    def __init__(self, workers: int, threads_per_worker: int = 8,
+                 on_event: Optional[Callable] = None, replicas: int = 64, timeout: float = 30.0,
+                 check_interval: float = 1.0):
+        # Workers are forked so they inherit the already-configured server module
+        self.context = mp.get_context('fork')
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.timeout = timeout
+        self.on_event = on_event
+        self.ring = ConsistentHashRing([str(i) for i in range(workers)], replicas)
+        self.outbox = self.context.Queue()
+        self.inboxes = [None] * workers
+        self.processes = [None] * workers
+        for i in range(workers):
+            self.inboxes[i], self.processes[i] = self._spawn(i)
+
+        self.pending = {}
+        self.calls = [0] * workers
+        self.failures = [0] * workers
+        self.restarts = [0] * workers
+        self.symbols = [set() for _ in range(workers)]
+        self._ids = itertools.count()
+        self.lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._collector = threading.Thread(target=self._collect, name="shard-collector", daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch, args=(check_interval,), name="shard-monitor",
+                                         daemon=True)
+        self._monitor.start()
+        logger.info(f"Started {workers} shard worker processes")
+
+    def _spawn(self, index: int):
+        inbox = self.context.Queue()
+        process = self.context.Process(target=_worker_main, args=(index, inbox, self.outbox, self.threads_per_worker),
+                                       name=f"shard-{index}", daemon=True)
+        process.start()
+        return inbox, process
+
+    def _ensure_alive(self, shard: int):
+        """Replace a dead worker, failing the calls it took with it"""
+        if self._closed.is_set() or self.processes[shard].is_alive():
+            return
+        with self._restart_lock:
+            dead = self.processes[shard]
+            if self._closed.is_set() or dead.is_alive():
+                return  # already replaced
+            # A fresh inbox: the dead worker may have died holding the old one's lock
+            inbox, process = self._spawn(shard)
+            with self.lock:
+                self.inboxes[shard], self.processes[shard] = inbox, process
+                self.restarts[shard] += 1
+                lost = [(request_id, future) for request_id, (future, owner) in self.pending.items() if owner == shard]
+                for request_id, _ in lost:
+                    del self.pending[request_id]
+                self.failures[shard] += len(lost)
+        logger.warning(f"Shard {shard} worker died (exit code {dead.exitcode}); restarted it, "
+                       f"{len(lost)} in-flight call(s) failed")
+        for _, future in lost:
+            future.set_exception(RuntimeError(f"Shard {shard} worker died (exit code {dead.exitcode})"))
+
+    def _watch(self, interval: float):
+        while not self._closed.wait(interval):
+            for shard in range(self.workers):
+                self._ensure_alive(shard)
+
+    def shard_for(self, symbol: str) -> int:
+        """Worker index that owns a symbol"""
+        return int(self.ring.node_for(symbol))
+
+    def submit(self, symbol: str, fn: Callable, *args) -> Future:
+        """Run fn(*args) on the worker owning the symbol
+
+        fn must be a module-level function so it pickles by reference and runs
+        against the worker's copy of the module state.
+        """
+        shard = self.shard_for(symbol)
+        self._ensure_alive(shard)
+        future = Future()
+        with self.lock:
+            request_id = next(self._ids)
+            self.pending[request_id] = (future, shard)
+            self.calls[shard] += 1
+            self.symbols[shard].add(symbol)
+            inbox = self.inboxes[shard]
+        inbox.put((request_id, fn, args))
+        return future
+
+    def call(self, symbol: str, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run fn(*args) on the owning worker and wait for the result"""
+        return self.submit(symbol, fn, *args).result(timeout or self.timeout)
+
+    def broadcast(self, fn: Callable, *args, timeout: Optional[float] = None) -> List:
+        """Run fn(*args) on every worker and return their results in shard order"""
+        futures = []
+        for shard in range(self.workers):
+            self._ensure_alive(shard)
+            future = Future()
+            with self.lock:
+                request_id = next(self._ids)
+                self.pending[request_id] = (future, shard)
+                self.calls[shard] += 1
+                inbox = self.inboxes[shard]
+            inbox.put((request_id, fn, args))
+            futures.append(future)
+        return [future.result(timeout or self.timeout) for future in futures]
+
+    def _collect(self):
+        """Resolve futures and forward worker events as results come back"""
+        while True:
+            try:
+                request_id, ok, payload = self.outbox.get()
+            except (EOFError, OSError):
+                break
+
+            if request_id is None:
+                if self.on_event is not None:
+                    try:
+                        self.on_event(ok, *payload)
+                    except Exception as e:
+                        logger.error(f"Shard event handler failed for {ok}: {e}")
+                continue
+
+            with self.lock:
+                future, shard = self.pending.pop(request_id, (None, None))
+                if future is not None and not ok:
+                    self.failures[shard] += 1
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def stats(self) -> Dict:
+        """Per-shard call counts, failures and symbol assignments"""
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "in_flight": len(self.pending),
+                "shards": [
+                    {
+                        "shard": i,
+                        "alive": self.processes[i].is_alive(),
+                        "calls": self.calls[i],
+                        "failures": self.failures[i],
+                        "restarts": self.restarts[i],
+                        "symbols": sorted(self.symbols[i]),
+                    }
+                    for i in range(self.workers)
+                ],
+            }
+
+    def close(self):
+        """Stop all workers"""
+        self._closed.set()
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
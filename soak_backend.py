@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Soak test for the MT5 Crash/Boom Scalping EA Backend.
+Drives simulated EA traffic for hours at an accelerated clock, samples memory and latency, and
+fails when they drift. It runs against the server in-process, or against a running one with --target.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+START = 1700000040  # minute-aligned
+BARS_PER_POST = 100
+
+class MarketSimulator:
+    """Crash-style M1 closes per symbol, one bar per simulated minute"""
+
+    def __init__(self, symbols: List[str], seed: int = 11, spike_every: int = 50):
+        self.rng = np.random.default_rng(seed)
+        self.symbols = list(symbols)
+        self.spike_every = spike_every
+        self.minute = 0
+        self.closes = {}
+        self.snap_back = {}
+        self.seen = []
+        self.rotated = 0
+        for symbol in self.symbols:
+            self._add(symbol)
+
+    def _add(self, symbol: str):
+        self.closes[symbol] = list(10000 + np.cumsum(self.rng.normal(0, 2, BARS_PER_POST)))
+        self.snap_back[symbol] = 0.0
+        self.seen.append(symbol)
+
+    def now(self) -> float:
+        """Simulated wall-clock time: the open time of the latest bar"""
+        return float(START + 60 * self.minute)
+
+    def rotate(self) -> str:
+        """Replace the longest-running symbol with a new one, as a terminal switching charts would"""
+        old = self.symbols.pop(0)
+        del self.closes[old], self.snap_back[old]
+        self.rotated += 1
+        new = f"{old.split(' #')[0]} #{self.rotated}"
+        self.symbols.append(new)
+        self._add(new)
+        return new
+
+    def advance(self):
+        """Add the next bar for every symbol"""
+        self.minute += 1
+        for symbol in self.symbols:
+            move = self.rng.normal(0.05, 2) + self.snap_back[symbol]
+            self.snap_back[symbol] = 0.0
+            if self.rng.random() < 1 / self.spike_every:
+                size = self.rng.gamma(3.0, 60.0) + 60
+                move -= size
+                self.snap_back[symbol] = size * self.rng.uniform(0.5, 0.9)
+            closes = self.closes[symbol]
+            closes.append(max(closes[-1] + move, 1.0))
+            del closes[:-BARS_PER_POST]
+
+    def payload(self, symbol: str) -> Dict:
+        """The /analyze body an EA posts after a new bar: its latest bars, oldest first"""
+        closes = self.closes[symbol]
+        first = START + 60 * (self.minute - len(closes) + 1)
+        return {
+            'symbol': symbol,
+            'price_data': {
+                'time': [first + 60 * i for i in range(len(closes))],
+                'open': closes, 'high': [c + 1.0 for c in closes], 'low': [c - 1.0 for c in closes],
+                'close': closes,
+            },
+            'market_info': {'spread': 0.5, 'volatility': 2.0},
+        }
+
+class InProcessClient:
+    """Calls the Flask app directly, with the local recommender instead of OpenAI"""
+
+    def __init__(self):
+        for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+            os.environ.setdefault(name, '1000000')
+        import ai_backend_server
+        ai_backend_server.ai_analyzer.engine = 'local'
+        # Keep per-request log lines in the log file, where their growth is measured, but off the console
+        for handler in logging.getLogger().handlers:
+            if not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.WARNING)
+        self.server = ai_backend_server
+        self.client = ai_backend_server.app.test_client()
+        self.lock = threading.Lock()
+
+    def set_clock(self, clock: Optional[Callable[[], float]]) -> bool:
+        """Run the server's wall-clock timers (regime max age and retries) on `clock`; None restores time.time"""
+        self.server.regime_detector.clock = clock or time.time
+        return True
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[Optional[int], Optional[Dict]]:
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    """Calls a running backend over HTTP"""
+
+    def __init__(self, target: str, timeout: float, concurrency: int):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.requests = requests
+        self.target = target.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=concurrency))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=concurrency))
+
+    def set_clock(self, clock: Optional[Callable[[], float]]) -> bool:
+        """A running server keeps its own clock"""
+        return False
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[Optional[int], Optional[Dict]]:
+        try:
+            response = self.session.request(method, self.target + path, json=body, timeout=self.timeout)
+        except self.requests.RequestException:
+            return None, None
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+def memory_totals(snapshot: Dict) -> Dict:
+    """RSS, descriptors and traced memory summed over the server process and its shard workers"""
+    processes = [snapshot['process']] + snapshot.get('shards', [])
+    traced = [p['tracemalloc']['current_mb'] for p in processes if p.get('tracemalloc')]
+    # None where the platform cannot report them (no /proc), rather than a misleading 0
+    rss = [p['rss_mb'] for p in processes]
+    fds = [p['open_fds'] for p in processes]
+    return {
+        'rss_mb': round(sum(rss), 2) if None not in rss else None,
+        'open_fds': sum(fds) if None not in fds else None,
+        'threads': sum(p['threads'] for p in processes),
+        'traced_mb': round(sum(traced), 2) if traced else None,
+        'log_mb': round(sum(snapshot['process'].get('log_bytes', {}).values()) / 1048576, 3),
+        'state': snapshot['process'].get('state', {}),
+    }
+
+def percentiles(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {'p50_ms': None, 'p99_ms': None}
+    values = np.array(latencies) * 1000
+    return {'p50_ms': round(float(np.percentile(values, 50)), 2), 'p99_ms': round(float(np.percentile(values, 99)), 2)}
+
+class SoakRun:
+    """Posts one bar per symbol per simulated minute and samples the server every `sample_every` minutes
+
+    Every `rotate_every` simulated minutes one symbol is replaced by a new one, so per-symbol
+    state has to be bounded for memory to stay flat. In-process, the server's regime timers run
+    on the simulated clock.
+    """
+
+    def __init__(self, client, symbols: List[str], minutes: int, speed: float, sample_every: int,
+                 warmup_minutes: int, tracemalloc_frames: int, concurrency: int, seed: int,
+                 rotate_every: int = 0):
+        self.client = client
+        self.market = MarketSimulator(symbols, seed)
+        self.rotate_every = rotate_every
+        self.minutes = minutes
+        self.speed = speed
+        self.sample_every = sample_every
+        self.warmup_minutes = warmup_minutes
+        self.tracemalloc_frames = tracemalloc_frames
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.window = []  # /analyze latencies since the last sample
+        self.errors = 0
+        self.requests = 0
+        self.samples = []
+        self.latencies = []  # one list per sample
+        self.lock = threading.Lock()
+
+    def post(self, body: Dict):
+        started = time.perf_counter()
+        status, _ = self.client.request('POST', '/analyze', body)
+        latency = time.perf_counter() - started
+        with self.lock:
+            self.requests += 1
+            if status != 200:
+                self.errors += 1
+            else:
+                self.window.append(latency)
+
+    def run(self, on_sample=None) -> List[Dict]:
+        self.client.set_clock(self.market.now)
+        try:
+            return self._run(on_sample)
+        finally:
+            self.client.set_clock(None)
+
+    def _run(self, on_sample=None) -> List[Dict]:
+        if self.tracemalloc_frames > 0:
+            self.client.request('POST', '/admin/memory', {'frames': self.tracemalloc_frames})
+        started = time.monotonic()
+        for minute in range(1, self.minutes + 1):
+            if self.speed > 0:
+                delay = started + minute * 60 / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if self.rotate_every and minute % self.rotate_every == 0:
+                self.market.rotate()
+            self.market.advance()
+            futures = [self.executor.submit(self.post, self.market.payload(s)) for s in self.market.symbols]
+            for future in futures:
+                future.result()
+
+            # Light read traffic, as dashboards and EAs polling recommendations would add
+            symbol = self.market.symbols[minute % len(self.market.symbols)]
+            self.client.request('GET', f'/recommendations/{symbol}')
+            if minute % 15 == 0:
+                self.client.request('GET', f'/hazard/{symbol}')
+                self.client.request('GET', '/stats')
+
+            if minute == self.warmup_minutes and self.tracemalloc_frames > 0:
+                # Allocation growth is measured from the end of the warmup
+                self.client.request('POST', '/admin/memory', {'frames': self.tracemalloc_frames})
+            if minute % self.sample_every == 0 or minute == self.minutes:
+                sample = self.sample(minute, time.monotonic() - started)
+                if on_sample is not None:
+                    on_sample(sample)
+        self.executor.shutdown(wait=True)
+        return self.samples
+
+    def sample(self, minute: int, elapsed: float) -> Dict:
+        _, snapshot = self.client.request('GET', '/admin/memory?top=10')
+        with self.lock:
+            window, self.window = self.window, []
+            requests, errors = self.requests, self.errors
+        self.latencies.append(window)
+        sample = {'minute': minute, 'elapsed_s': round(elapsed, 1), 'requests': requests, 'errors': errors,
+                  'symbols_seen': len(self.market.seen), **percentiles(window)}
+        if snapshot is not None:
+            sample.update(memory_totals(snapshot))
+            traced = snapshot['process'].get('tracemalloc')
+            if traced and traced.get('growth'):
+                sample['growth_top'] = traced['growth']['top']
+        self.samples.append(sample)
+        return sample
+
+def evaluate(samples: List[Dict], latencies: List[List[float]], warmup_minutes: int, limits: Dict) -> Dict:
+    """Growth and drift after the warmup, and the limits they exceed"""
+    steady = [i for i, s in enumerate(samples) if s['minute'] >= warmup_minutes and 'rss_mb' in s]
+    summary = {'failures': []}
+    if len(steady) < 2:
+        summary['failures'].append("not enough samples after the warmup")
+        return summary
+    first, last = samples[steady[0]], samples[steady[-1]]
+    hours = (last['minute'] - first['minute']) / 60
+
+    # RSS and descriptors are None where the platform cannot report them; those checks are skipped
+    measured = [i for i in steady if samples[i]['rss_mb'] is not None]
+    if len(measured) >= 2:
+        rss = np.array([samples[i]['rss_mb'] for i in measured])
+        minutes = np.array([samples[i]['minute'] for i in measured])
+        summary['rss_growth_mb'] = round(float(rss[-1] - rss[0]), 2)
+        summary['rss_slope_mb_per_hour'] = round(float(np.polyfit(minutes / 60, rss, 1)[0]), 3)
+    if first.get('open_fds') is not None and last.get('open_fds') is not None:
+        summary['fd_growth'] = last['open_fds'] - first['open_fds']
+    summary['log_mb_per_hour'] = round((last['log_mb'] - first['log_mb']) / hours, 3) if hours else 0.0
+    if first.get('traced_mb') is not None and last.get('traced_mb') is not None:
+        summary['traced_growth_mb'] = round(last['traced_mb'] - first['traced_mb'], 2)
+
+    # Latency of the first and last quarter of the steady samples
+    quarter = max(len(steady) // 4, 1)
+    early = [x for i in steady[:quarter] for x in latencies[i]]
+    late = [x for i in steady[-quarter:] for x in latencies[i]]
+    summary['latency_early'], summary['latency_late'] = percentiles(early), percentiles(late)
+    for name in ('p50_ms', 'p99_ms'):
+        before, after = summary['latency_early'][name], summary['latency_late'][name]
+        summary[f'{name[:3]}_drift'] = round(after / before, 3) if before and after else None
+
+    checks = [
+        ('rss_growth_mb', limits['max_rss_growth_mb'], "RSS grew {value} MB (limit {limit})"),
+        ('fd_growth', limits['max_fd_growth'], "open file descriptors grew by {value} (limit {limit})"),
+        ('traced_growth_mb', limits['max_traced_growth_mb'], "traced allocations grew {value} MB (limit {limit})"),
+        ('p50_drift', limits['max_latency_drift'], "p50 latency drifted x{value} (limit x{limit})"),
+        ('p99_drift', limits['max_latency_drift'], "p99 latency drifted x{value} (limit x{limit})"),
+    ]
+    for key, limit, message in checks:
+        value = summary.get(key)
+        if value is not None and limit is not None and value > limit:
+            summary['failures'].append(message.format(value=value, limit=limit))
+    if last['errors'] > limits['max_errors']:
+        summary['failures'].append(f"{last['errors']} requests failed (limit {limits['max_errors']})")
+    return summary
+
+def print_sample(sample: Dict):
+    def column(name, width, spec):
+        value = sample.get(name)
+        return f"{value:{width}{spec}}" if value is not None else f"{'-':>{width}s}"
+    print(f"{sample['minute'] / 60:7.1f}h {sample['elapsed_s']:8.1f}s {sample['requests']:8d} {sample['errors']:6d} "
+          f"{column('rss_mb', 8, '.1f')} {column('traced_mb', 8, '.2f')} {column('open_fds', 5, 'd')} "
+          f"{sample.get('symbols_seen', 0):7d} {column('p50_ms', 8, '.2f')} {column('p99_ms', 8, '.2f')}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the backend with simulated EA traffic and check for drift")
+    parser.add_argument('--target', help='running backend to soak (default: the server in-process, local engine)')
+    parser.add_argument('--hours', type=float, default=120.0, help='simulated trading hours (a week is 120)')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='simulated seconds per real second (0 = as fast as the server answers)')
+    parser.add_argument('--symbols', type=int, default=5, help='simulated symbols, one EA each')
+    parser.add_argument('--rotate-hours', type=float, default=24.0,
+                        help='simulated hours between replacing one symbol with a new one (0 = fixed symbols)')
+    parser.add_argument('--sample-minutes', type=int, default=60, help='simulated minutes between samples')
+    parser.add_argument('--warmup', type=float, default=0.2, help='share of the run excluded from drift checks')
+    parser.add_argument('--tracemalloc', type=int, default=1,
+                        help='tracemalloc frames per allocation (0 = RSS only, no tracing overhead)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-request timeout for --target')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=64.0)
+    parser.add_argument('--max-traced-growth-mb', type=float, default=32.0)
+    parser.add_argument('--max-fd-growth', type=int, default=8)
+    parser.add_argument('--max-latency-drift', type=float, default=2.0, help='late / early latency percentile ratio')
+    parser.add_argument('--max-errors', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=11)
+    parser.add_argument('--report', help='write samples and verdict as JSON to this file')
+    args = parser.parse_args()
+
+    client = HttpClient(args.target, args.timeout, args.concurrency) if args.target else InProcessClient()
+    minutes = max(int(args.hours * 60), args.sample_minutes * 2)
+    warmup = int(minutes * args.warmup)
+    symbols = [f"Crash {1000 - 100 * i} Index" for i in range(args.symbols)]
+    print(f"Soaking {args.target or 'in-process server'}: {len(symbols)} symbols, {minutes / 60:g} simulated hours "
+          f"at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed, warmup {warmup / 60:g}h")
+    print(f"{'sim':>8s} {'real':>9s} {'requests':>8s} {'errors':>6s} {'rss MB':>8s} {'traced':>8s} {'fds':>5s} "
+          f"{'symbols':>7s} {'p50 ms':>8s} {'p99 ms':>8s}")
+
+    soak = SoakRun(client, symbols, minutes, args.speed, args.sample_minutes, warmup, args.tracemalloc,
+                   args.concurrency, args.seed, rotate_every=int(args.rotate_hours * 60))
+    samples = soak.run(on_sample=print_sample)
+    limits = {
+        'max_rss_growth_mb': args.max_rss_growth_mb,
+        'max_traced_growth_mb': args.max_traced_growth_mb,
+        'max_fd_growth': args.max_fd_growth,
+        'max_latency_drift': args.max_latency_drift,
+        'max_errors': args.max_errors,
+    }
+    summary = evaluate(samples, soak.latencies, warmup, limits)
+
+    fd_growth = summary.get('fd_growth')
+    print(f"\nRSS {summary.get('rss_growth_mb')} MB after warmup ({summary.get('rss_slope_mb_per_hour')} MB/h), "
+          f"fds {'-' if fd_growth is None else f'{fd_growth:+}'}, log {summary.get('log_mb_per_hour')} MB/h, "
+          f"latency drift p50 x{summary.get('p50_drift')} p99 x{summary.get('p99_drift')}")
+    growth = samples[-1].get('growth_top') or []
+    if growth:
+        print("Top allocation growth since warmup:")
+        for row in growth[:5]:
+            print(f"  {row['size_diff_kb']:+10.1f} KB  {row['where']}")
+    for failure in summary['failures']:
+        print(f"FAIL: {failure}")
+    if not summary['failures']:
+        print("PASS")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'config': vars(args), 'limits': limits, 'summary': summary, 'samples': samples}, f, indent=2)
+        print(f"Report written to {args.report}")
+    sys.exit(1 if summary['failures'] else 0)
+
+if __name__ == "__main__":
+    main()
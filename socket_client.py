@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Reference Client for the Backend Socket Protocol
+Keeps one connection open, matches replies to requests and collects pushed recommendations
+"""
+
+import argparse
+import itertools
+import json
+import queue
+import socket
+import threading
+from typing import Dict, List, Optional
+
+from socket_server import ProtocolError, encode_frame, read_frame
+
+class SocketClient:
+    """Blocking client: `analyze` waits for its reply while pushes queue up in `pushes`"""
+
+    def __init__(self, host: str = 'localhost', port: int = 5002, timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(None)
+        self.timeout = timeout
+        self.pushes = queue.Queue()
+        self._ids = itertools.count(1)
+        self._waiting = {}  # request id -> queue for its reply
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read, name="socket-client", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        try:
+            while True:
+                message = read_frame(self.sock)
+                if message is None:
+                    break
+                with self._lock:
+                    waiter = self._waiting.pop(message.get('id'), None)
+                if waiter is not None:
+                    waiter.put(message)
+                else:
+                    self.pushes.put(message)
+        except (OSError, ProtocolError):
+            pass
+        finally:
+            self._closed = True
+            with self._lock:
+                waiters, self._waiting = list(self._waiting.values()), {}
+            for waiter in waiters:
+                waiter.put({'type': 'error', 'error': 'connection closed'})
+
+    def request(self, message: Dict, timeout: Optional[float] = None) -> Dict:
+        """Send a message and wait for the reply carrying its id"""
+        if self._closed:
+            raise ConnectionError("Socket connection is closed")
+        request_id = next(self._ids)
+        waiter = queue.Queue(maxsize=1)
+        with self._lock:
+            self._waiting[request_id] = waiter
+        self.sock.sendall(encode_frame({**message, 'id': request_id}))
+        try:
+            return waiter.get(timeout=timeout or self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._waiting.pop(request_id, None)
+            raise TimeoutError(f"No reply to {message.get('type')} within {timeout or self.timeout}s")
+
+    def analyze(self, symbol: str, price_data: Optional[List] = None, market_info: Optional[Dict] = None,
+                last_bar_time: Optional[int] = None, deadline_ms: Optional[int] = None) -> Dict:
+        """Post bars (or only the last seen bar time) and return the recommendations"""
+        message = {'type': 'analyze', 'symbol': symbol, 'market_info': market_info or {}}
+        if price_data:
+            message['price_data'] = price_data
+        if last_bar_time is not None:
+            message['last_bar_time'] = last_bar_time
+        if deadline_ms is not None:
+            message['deadline_ms'] = deadline_ms
+        return self.request(message)
+
+    def subscribe(self, *symbols: str) -> Dict:
+        return self.request({'type': 'subscribe', 'symbols': list(symbols)})
+
+    def ping(self) -> Dict:
+        return self.request({'type': 'ping'})
+
+    def next_push(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next pushed recommendation, or None if none arrives in time"""
+        try:
+            return self.pushes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self._reader.join(timeout=1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Talk to the backend socket endpoint")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--symbol', default='CRASH_1000')
+    parser.add_argument('--listen', type=float, default=0, help='seconds to print pushed recommendations')
+    args = parser.parse_args()
+
+    client = SocketClient(args.host, args.port)
+    try:
+        print(json.dumps(client.ping()))
+        print(json.dumps(client.subscribe(args.symbol)))
+        if args.listen:
+            while True:
+                push = client.next_push(timeout=args.listen)
+                if push is None:
+                    break
+                print(json.dumps(push))
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
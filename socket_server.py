@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Socket Protocol Endpoint for MT5 Crash/Boom Scalping EA Backend
+Persistent length-prefixed TCP connections: terminals stream bars and get recommendations pushed
+
+Framing: every message is a 4-byte big-endian length followed by that many
+bytes of UTF-8 JSON (trailing NULs from MQL5 char arrays are ignored). Each
+message has a "type":
+
+    client -> server
+      {"type": "analyze", "id": 1, "symbol": "CRASH_1000", "price_data": [...],
+       "market_info": {...}, "last_bar_time": 1736937000, "deadline_ms": 3000}
+      {"type": "subscribe", "symbols": ["BOOM_1000"]}
+      {"type": "unsubscribe", "symbols": ["BOOM_1000"]}
+      {"type": "ping", "id": 2}
+
+    server -> client
+      {"type": "recommendations", "id": 1, "status": 200, "symbol": ..., ...}
+      {"type": "recommendations", "push": true, "symbol": ..., ...}
+      {"type": "subscribed", "symbols": [...]}
+      {"type": "pong", "id": 2, "server_time": 1736937012.5}
+      {"type": "error", "id": ..., "error": "..."}
+
+A connection that sends "analyze" for a symbol is subscribed to it, and is
+pushed every new analysis of that symbol, whichever client caused it. Pushes
+wait in a short per-connection queue; a terminal that lets it fill up by not
+reading is disconnected.
+"""
+
+import json
+import logging
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 1024 * 1024
+MAX_PENDING_PUSHES = 32
+
+class ProtocolError(Exception):
+    """The peer sent something that is not a valid frame"""
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly `size` bytes, or None if the peer closed the connection first"""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def encode_frame(message: Dict) -> bytes:
+    """Length-prefixed JSON frame for one message"""
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+def read_frame(sock: socket.socket, max_bytes: int = MAX_FRAME_BYTES) -> Optional[Dict]:
+    """Next message from the socket, or None on a clean close"""
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > max_bytes:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {max_bytes} byte limit")
+    body = recv_exact(sock, length)
+    if body is None:
+        raise ProtocolError("Connection closed inside a frame")
+    try:
+        message = json.loads(body.decode('utf-8', errors='ignore').rstrip('\x00'))
+    except ValueError as e:
+        raise ProtocolError(f"Invalid JSON: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("Message must be a JSON object")
+    return message
+
+class Connection:
+    """One terminal's connection; sends are serialized so pushes never interleave with replies"""
+
+    def __init__(self, sock: socket.socket, address: Tuple, max_pending: int = MAX_PENDING_PUSHES):
+        self.sock = sock
+        self.client_id = f"socket:{address[0]}:{address[1]}"
+        self.symbols = set()
+        self.connected_at = time.time()
+        self.requests = 0
+        self.pushes = 0
+        self.send_lock = threading.Lock()
+        self.pending = queue.Queue(maxsize=max_pending)  # push frames for this connection's writer
+        self.dropped = False  # set once for a terminal that stopped reading, until its reader exits
+
+    def queue_push(self, frame: bytes) -> bool:
+        """Hand a push frame to the writer, returning False if the terminal has stopped reading"""
+        try:
+            self.pending.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def disconnect(self):
+        """Shut the socket so the reader and writer threads both finish"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def send(self, message: Dict) -> bool:
+        """Send one message, returning False if the connection is gone"""
+        frame = encode_frame(message)
+        try:
+            with self.send_lock:
+                self.sock.sendall(frame)
+            return True
+        except OSError:
+            return False
+
+class SocketServer:
+    """Threaded TCP server for the frame protocol, next to the Flask app
+
+    `analyze(message, client_id)` does the actual work and returns
+    (status code, body); the server only frames, routes and pushes.
+    """
+
+    def __init__(self, analyze: Callable[[Dict, str], Tuple[int, Dict]], host: str = '0.0.0.0',
+                 port: int = 5002, max_frame_bytes: int = MAX_FRAME_BYTES, idle_timeout: float = 600.0,
+                 max_pending_pushes: int = MAX_PENDING_PUSHES):
+        self.analyze = analyze
+        self.max_frame_bytes = max_frame_bytes
+        self.idle_timeout = idle_timeout
+        self.max_pending_pushes = max_pending_pushes
+        self.connections = set()
+        self.frames_in = 0
+        self.frames_out = 0
+        self.protocol_errors = 0
+        self.pushes_dropped = 0
+        self.slow_disconnects = 0
+        self.lock = threading.Lock()
+        # Pushes are delivered off the analysis thread so a slow terminal cannot hold up a request
+        self.outbox = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._pusher = None
+
+        owner = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                owner._serve(self.request, self.client_address)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server((host, port), Handler)
+        self.address = self.server.server_address
+
+    def start(self) -> 'SocketServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="socket-server", daemon=True)
+        self._thread.start()
+        self._pusher = threading.Thread(target=self._deliver, name="socket-pusher", daemon=True)
+        self._pusher.start()
+        logger.info(f"Socket protocol listening on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def close(self):
+        """Stop accepting and drop every connection"""
+        self.server.shutdown()
+        self.server.server_close()
+        self.outbox.put(None)
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.disconnect()
+
+    def _serve(self, sock: socket.socket, address: Tuple):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.idle_timeout)
+        connection = Connection(sock, address, self.max_pending_pushes)
+        with self.lock:
+            self.connections.add(connection)
+        writer = threading.Thread(target=self._write, args=(connection,), name="socket-writer", daemon=True)
+        writer.start()
+        logger.info(f"Socket client connected: {connection.client_id}")
+        try:
+            while True:
+                try:
+                    message = read_frame(sock, self.max_frame_bytes)
+                except ProtocolError as e:
+                    with self.lock:
+                        self.protocol_errors += 1
+                    connection.send({'type': 'error', 'error': str(e)})
+                    break
+                except (OSError, socket.timeout):
+                    break
+                if message is None:
+                    break
+                with self.lock:
+                    self.frames_in += 1
+                reply = self._handle(connection, message)
+                if reply is not None:
+                    if not connection.send(reply):
+                        break
+                    with self.lock:
+                        self.frames_out += 1
+        finally:
+            with self.lock:
+                self.connections.discard(connection)
+            connection.disconnect()
+            try:
+                connection.pending.put_nowait(None)
+            except queue.Full:
+                pass  # the writer's next send fails on the shut socket
+            writer.join(timeout=1.0)
+            logger.info(f"Socket client disconnected: {connection.client_id}")
+
+    def _write(self, connection: Connection):
+        """Send one connection's pushes; a blocked send only holds up this terminal"""
+        while True:
+            frame = connection.pending.get()
+            if frame is None:
+                return
+            try:
+                with connection.send_lock:
+                    connection.sock.sendall(frame)
+            except OSError:
+                return
+            connection.pushes += 1
+            with self.lock:
+                self.frames_out += 1
+
+    def _handle(self, connection: Connection, message: Dict) -> Optional[Dict]:
+        kind = message.get('type')
+        request_id = message.get('id')
+        if kind == 'ping':
+            return {'type': 'pong', 'id': request_id, 'server_time': time.time()}
+        if kind in ('subscribe', 'unsubscribe'):
+            symbols = message.get('symbols') or []
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            if not isinstance(symbols, list) or not all(isinstance(symbol, str) for symbol in symbols):
+                return {'type': 'error', 'id': request_id, 'error': 'symbols must be a list of symbol names'}
+            if kind == 'subscribe':
+                connection.symbols.update(symbols)
+            else:
+                connection.symbols.difference_update(symbols)
+            return {'type': 'subscribed', 'id': request_id, 'symbols': sorted(connection.symbols)}
+        if kind == 'analyze':
+            symbol = message.get('symbol')
+            if not symbol:
+                return {'type': 'error', 'id': request_id, 'error': 'symbol is required'}
+            if not isinstance(symbol, str):
+                return {'type': 'error', 'id': request_id, 'error': 'symbol must be a symbol name'}
+            connection.symbols.add(symbol)
+            connection.requests += 1
+            try:
+                status, body = self.analyze(message, connection.client_id)
+            except Exception as e:
+                logger.error(f"Socket analysis error for {symbol}: {e}")
+                return {'type': 'error', 'id': request_id, 'error': str(e)}
+            return {'type': 'recommendations', 'id': request_id, 'status': status, 'symbol': symbol, **body}
+        return {'type': 'error', 'id': request_id, 'error': f"Unknown message type: {kind}"}
+
+    def push(self, symbol: str, body: Dict, origin: Optional[str] = None):
+        """Queue a new analysis for every connection subscribed to the symbol, except the one that asked"""
+        try:
+            self.outbox.put_nowait((symbol, body, origin))
+        except queue.Full:
+            with self.lock:
+                self.pushes_dropped += 1
+
+    def _deliver(self):
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                return
+            symbol, body, origin = item
+            with self.lock:
+                targets = [c for c in self.connections
+                           if symbol in c.symbols and c.client_id != origin and not c.dropped]
+            frame = encode_frame({'type': 'recommendations', 'push': True, 'symbol': symbol, **body})
+            for connection in targets:
+                if not connection.queue_push(frame):
+                    connection.dropped = True
+                    logger.warning(f"Socket client {connection.client_id} is not reading pushes, disconnecting")
+                    with self.lock:
+                        self.slow_disconnects += 1
+                    connection.disconnect()
+
+    def stats(self) -> Dict:
+        """Connection and frame counters"""
+        with self.lock:
+            return {
+                'address': f"{self.address[0]}:{self.address[1]}",
+                'connections': len(self.connections),
+                'frames_in': self.frames_in,
+                'frames_out': self.frames_out,
+                'protocol_errors': self.protocol_errors,
+                'pushes_dropped': self.pushes_dropped,
+                'slow_disconnects': self.slow_disconnects,
+                'clients': [{
+                    'client': c.client_id,
+                    'symbols': sorted(c.symbols),
+                    'connected_at': c.connected_at,
+                    'requests': c.requests,
+                    'pushes': c.pushes,
+                } for c in self.connections],
+            }
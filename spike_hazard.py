@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Spike Arrival Hazard for MT5 Crash/Boom Scalping EA
+Per-symbol inter-arrival distributions of spikes, with precomputed tables for O(1) lookups
+"""
+
+import threading
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from spike_metrics import spike_indices
+
+# Longest gap, in bars, with its own histogram bin; longer gaps share a geometric tail
+MAX_GAP = 2880
+
+# Pseudo-gaps of a geometric prior with the observed mean gap, so few observations give a smooth table
+PRIOR_GAPS = 5.0
+
+# Bars ahead reported by default
+HAZARD_HORIZONS = (1, 5, 15, 30, 60, 120)
+
+# Share of gaps the recommended cooldown sits out
+COOLDOWN_QUANTILE = 0.25
+
+class HazardTable:
+    """Survival of the spike inter-arrival distribution, precomputed for every gap up to max_gap
+
+    survival[g] is P(gap > g bars); the hazard at g is the chance of a spike on
+    the next bar given g bars without one. Past max_gap the hazard is the
+    constant tail hazard, so every lookup is a couple of array reads.
+    """
+
+    def __init__(self, counts: np.ndarray, tail_count: int, tail_excess: float, prior_gaps: float = PRIOR_GAPS):
+        max_gap = len(counts) - 1
+        observed = int(counts.sum()) + tail_count
+        self.gaps = observed
+        self.mean_gap = float((np.arange(max_gap + 1) * counts).sum() + tail_count * max_gap + tail_excess) / observed
+
+        # Geometric prior with the same mean, weighted as prior_gaps observations
+        p = min(1.0 / max(self.mean_gap, 1.0), 1.0)
+        prior = np.zeros(max_gap + 1)
+        prior[1:] = p * (1 - p) ** np.arange(max_gap)
+        pmf = (counts + prior_gaps * prior) / (observed + prior_gaps)
+        self.survival = np.maximum(1.0 - np.cumsum(pmf), 0.0)
+        self.survival[0] = 1.0
+
+        # Memoryless tail: the mean excess of observed long gaps, else the prior's
+        tail_mean = tail_excess / tail_count if tail_count else 1.0 / p
+        self.tail_hazard = min(1.0 / max(tail_mean, 1.0), 1.0)
+
+        # Sum of survival from each gap onward, for the expected wait
+        tail_sum = self.survival[-1] * (1 - self.tail_hazard) / self.tail_hazard
+        self.remaining = np.cumsum(self.survival[::-1])[::-1] + tail_sum
+        self.cooldown_bars = self.quantile(COOLDOWN_QUANTILE)
+
+    @property
+    def max_gap(self) -> int:
+        return len(self.survival) - 1
+
+    def survival_at(self, gap: int) -> float:
+        if gap <= self.max_gap:
+            return float(self.survival[gap])
+        return float(self.survival[-1]) * (1 - self.tail_hazard) ** (gap - self.max_gap)
+
+    def probability(self, since: int, k: int) -> float:
+        """P(a spike within the next k bars | `since` bars without one)"""
+        if since >= self.max_gap:
+            return 1.0 - (1 - self.tail_hazard) ** k
+        now = self.survival_at(since)
+        if now <= 0:
+            return 1.0
+        return 1.0 - self.survival_at(since + k) / now
+
+    def expected_wait(self, since: int) -> float:
+        """Expected bars until the next spike, given `since` bars without one"""
+        if since >= self.max_gap:
+            return 1.0 / self.tail_hazard
+        now = self.survival[since]
+        return float(self.remaining[since] / now) if now > 0 else 0.0
+
+    def quantile(self, q: float) -> int:
+        """Smallest gap that a share q of gaps do not exceed"""
+        below = np.flatnonzero(self.survival <= 1.0 - q)
+        if len(below):
+            return int(below[0])
+        return self.max_gap + int(np.ceil(np.log((1.0 - q) / self.survival[-1]) / np.log(1 - self.tail_hazard)))
+
+class SpikeHazard:
+    """Inter-arrival histograms per symbol, updated from detected spikes, with their HazardTable
+
+    Tables are rebuilt when new gaps arrive, so lookups never recompute anything.
+    """
+
+    def __init__(self, min_spike_size: float, bar_seconds: int = 60, max_gap: int = MAX_GAP,
+                 prior_gaps: float = PRIOR_GAPS):
+        self.min_spike_size = min_spike_size
+        self.bar_seconds = bar_seconds
+        self.max_gap = max_gap
+        self.prior_gaps = prior_gaps
+        self.symbols = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbols
+
+    def update(self, symbol: str, times: np.ndarray, closes: np.ndarray) -> int:
+        """Record the spikes in these M1 bars newer than the last one seen; returns how many gaps were added"""
+        times = np.asarray(times, dtype=np.int64)
+        if len(times) == 0:
+            return 0
+        indices = spike_indices(closes, self.min_spike_size)
+        return self.add_spikes(symbol, times[indices], int(times[-1]), int(times[0]))
+
+    def add_spikes(self, symbol: str, spike_times: np.ndarray, last_bar: Optional[int] = None,
+                   first_bar: Optional[int] = None) -> int:
+        """Record spike bar times (ascending) found in bars `first_bar`..`last_bar`
+
+        When those bars start after a hole in the ones seen so far, spikes may have
+        been missed in it, so no gap is measured across it from the previous spike.
+        """
+        spike_times = np.asarray(spike_times, dtype=np.int64)
+        with self.lock:
+            state = self.symbols.setdefault(symbol, {
+                'counts': np.zeros(self.max_gap + 1, dtype=np.int64), 'tail_count': 0, 'tail_excess': 0,
+                'last_spike': None, 'last_bar': None, 'resumed': None, 'table': None,
+            })
+            if (first_bar is not None and state['last_bar'] is not None
+                    and first_bar > state['last_bar'] + self.bar_seconds):
+                state['last_spike'] = None
+                state['resumed'] = first_bar
+            if last_bar is not None and (state['last_bar'] is None or last_bar > state['last_bar']):
+                state['last_bar'] = last_bar
+            if state['last_spike'] is not None:
+                spike_times = spike_times[spike_times > state['last_spike']]
+                spike_times = np.concatenate(([state['last_spike']], spike_times))
+            if len(spike_times):
+                state['last_spike'] = int(spike_times[-1])
+                state['last_bar'] = max(state['last_bar'] or 0, state['last_spike'])
+            if len(spike_times) < 2:
+                return 0
+
+            gaps = np.maximum(np.diff(spike_times) // self.bar_seconds, 1)
+            long = gaps > self.max_gap
+            state['counts'] += np.bincount(gaps[~long], minlength=self.max_gap + 1)
+            state['tail_count'] += int(long.sum())
+            state['tail_excess'] += int((gaps[long] - self.max_gap).sum())
+            state['table'] = HazardTable(state['counts'], state['tail_count'], state['tail_excess'],
+                                         self.prior_gaps)
+            return len(gaps)
+
+    def lookup(self, symbol: str, since: Optional[int] = None,
+               horizons: Sequence[int] = HAZARD_HORIZONS) -> Optional[Dict]:
+        """Spike probabilities over `horizons` bars given `since` bars without a spike (default: now)"""
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is None or state['table'] is None:
+                return None
+            table = state['table']
+            if since is None:
+                # With no spike seen since a hole, the quiet spell is counted from the end of the hole
+                quiet_since = state['last_spike'] if state['last_spike'] is not None else state['resumed']
+                since = max((state['last_bar'] - quiet_since) // self.bar_seconds, 0)
+            return {
+                'bars_since_spike': int(since),
+                'last_spike_time': state['last_spike'],
+                'probabilities': {int(k): round(table.probability(since, int(k)), 4) for k in horizons},
+                'hazard': round(table.probability(since, 1), 6),
+                'expected_bars_to_spike': round(table.expected_wait(since), 1),
+                'mean_gap_bars': round(table.mean_gap, 1),
+                'cooldown_bars': table.cooldown_bars,
+                'gaps_observed': table.gaps,
+            }
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {symbol: {'gaps': state['table'].gaps if state['table'] is not None else 0,
+                             'last_spike': state['last_spike']}
+                    for symbol, state in self.symbols.items()}
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Spike Similarity Index for MT5 Crash/Boom Scalping EA
+Nearest past spike setups by their normalized price context, with what happened after each
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from spike_metrics import RECOVERY_HORIZON, max_retracement, recovery_profile, spike_indices
+
+# Bar-to-bar moves before a spike that describe its setup
+CONTEXT_BARS = 32
+
+# Bars after a spike at which the move back (reversion) is measured
+REVERSION_BARS = 10
+
+# Gaps between spikes are capped here before log scaling
+GAP_CAP = 1000
+
+# Below this many vectors every query scans them all
+EXACT_LIMIT = 50000
+
+OUTCOME_COLUMNS = {
+    'time': '<i8', 'size': '<f8', 'is_crash': '|b1', 'recovery_bars': '<i8', 'recovered': '|b1',
+    'max_retracement': '<f8', 'reversion': '<f8', 'next_spike_bars': '<i8',
+}
+
+def spike_features(closes: np.ndarray, indices: np.ndarray, gaps: np.ndarray,
+                   context: int = CONTEXT_BARS) -> np.ndarray:
+    """One float32 row per spike: the `context` moves before it, its size and the gap since the last spike
+
+    Moves are divided by their mean absolute size, so setups compare across price
+    levels and volatility; the shape block is scaled to about unit norm so it
+    weighs as much as the size and gap terms. Every index must be > context.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    features = np.empty((len(indices), context + 2), dtype=np.float32)
+    if len(indices) == 0:
+        return features
+    moves = np.diff(closes)
+    windows = np.lib.stride_tricks.sliding_window_view(moves, context)[indices - context - 1]
+    scale = np.maximum(np.abs(windows).mean(axis=1), 1e-12)
+    spike = moves[indices - 1] / scale
+    features[:, :context] = windows / scale[:, None] / np.sqrt(context)
+    features[:, context] = 0.5 * np.sign(spike) * np.log1p(np.abs(spike))
+    features[:, context + 1] = np.log1p(np.minimum(gaps, GAP_CAP)) / np.log1p(GAP_CAP)
+    return features
+
+def spike_gaps(indices: np.ndarray) -> np.ndarray:
+    """Bars since the previous spike; the first spike counts the bars before it"""
+    indices = np.asarray(indices, dtype=np.int64)
+    return np.diff(indices, prepend=0)
+
+def spike_outcomes(closes: np.ndarray, times: np.ndarray, indices: np.ndarray,
+                   min_spike_size: float) -> Dict[str, np.ndarray]:
+    """What followed each spike, in OUTCOME_COLUMNS
+
+    reversion is the move REVERSION_BARS later, positive when price went back
+    against the spike; next_spike_bars is -1 when no later spike is in the series.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    every = spike_indices(closes, min_spike_size)
+    following = np.searchsorted(every, indices, side='right')
+    next_spike = np.where(following < len(every), every[np.minimum(following, len(every) - 1)] - indices, -1)
+
+    recovery = recovery_profile(closes, indices, min_spike_size * 0.1)
+    prev = closes[indices - 1]
+    crashed = closes[indices] < prev
+    later = closes[np.minimum(indices + REVERSION_BARS, len(closes) - 1)] - closes[indices]
+    return {
+        'time': np.asarray(times, dtype=np.int64)[indices],
+        'size': np.abs(closes[indices] - prev),
+        'is_crash': crashed,
+        'recovery_bars': recovery['bars'].astype(np.int64),
+        'recovered': recovery['recovered'],
+        'max_retracement': max_retracement(closes, indices),
+        'reversion': np.where(crashed, later, -later),
+        'next_spike_bars': next_spike.astype(np.int64),
+    }
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    """Nearest centroid of every row, in blocks to bound the distance matrix"""
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        block = vectors[start:start + block_rows]
+        labels[start:start + len(block)] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return labels
+
+def _kmeans(sample: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random sample rows"""
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=clusters)
+        sums = np.zeros(centroids.shape, dtype=np.float64)
+        np.add.at(sums, labels, sample)
+        empty = counts == 0
+        centroids = (sums / np.maximum(counts, 1)[:, None]).astype(np.float32)
+        centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+    return centroids
+
+class SpikeIndex:
+    """k-nearest-neighbour search over spike feature vectors, returning their outcomes
+
+    Vectors live in one contiguous float32 matrix. Up to `exact_limit` rows a
+    query scans all of them; past that the rows are grouped into k-means lists
+    (an inverted file) stored back to back, and a query scans only the `nprobe`
+    lists with the closest centroids. Rows added after a build wait in a small
+    buffer that every query scans, until there are enough to rebuild.
+    """
+
+    def __init__(self, exact_limit: int = EXACT_LIMIT, nprobe: int = 16, iterations: int = 10, seed: int = 0):
+        self.exact_limit = exact_limit
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.rng = np.random.default_rng(seed)
+        self.vectors = None
+        self.norms = None
+        self.outcomes = {name: np.empty(0, dtype=dtype) for name, dtype in OUTCOME_COLUMNS.items()}
+        self.centroids = None
+        self.offsets = None
+        self.pending = None  # (vectors, norms, outcomes) added since the last build
+        self.builds = 0
+
+    def __len__(self) -> int:
+        return self._built() + self._pending_rows()
+
+    def build(self, vectors: np.ndarray, outcomes: Dict[str, np.ndarray]):
+        """Replace the index with these rows"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.pending = None
+        self.builds += 1
+        if len(vectors) <= self.exact_limit:
+            self.centroids = self.offsets = None
+            self._store(vectors, outcomes)
+            return
+
+        # About sqrt(n) lists, trained on a sample of 64 rows per list
+        lists = int(min(max(np.sqrt(len(vectors)), 16), 4096))
+        sample = vectors[self.rng.choice(len(vectors), min(len(vectors), lists * 64), replace=False)]
+        self.centroids = _kmeans(sample, lists, self.iterations, self.rng)
+        labels = _assign(vectors, self.centroids)
+        order = np.argsort(labels, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=lists))))
+        self._store(vectors[order], {name: values[order] for name, values in outcomes.items()})
+
+    def add(self, vectors: np.ndarray, outcomes: Dict[str, np.ndarray]):
+        """Add rows; they are searched exactly until the buffer is a tenth of the index"""
+        if len(vectors) == 0:
+            return
+        if self.centroids is None:
+            self.build(*self._concat(self.vectors, self.outcomes, vectors, outcomes))
+            return
+        if self.pending is None:
+            pending_vectors, pending_outcomes = vectors, outcomes
+        else:
+            pending_vectors, pending_outcomes = self._concat(self.pending[0], self.pending[2], vectors, outcomes)
+        pending_vectors = np.ascontiguousarray(pending_vectors, dtype=np.float32)
+        if len(pending_vectors) > max(1000, self._built() // 10):
+            self.build(*self._concat(self.vectors, self.outcomes, pending_vectors, pending_outcomes))
+            return
+        self.pending = (pending_vectors, np.einsum('ij,ij->i', pending_vectors, pending_vectors), pending_outcomes)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Squared distances and rows of the k nearest neighbours of each query, nearest first
+
+        Rows index the built matrix followed by the pending buffer; missing
+        neighbours (fewer than k rows) are -1 with an infinite distance.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        if len(self) == 0:
+            return distances, rows
+        built = self._built()
+        extra = self.pending
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        probes = None
+        if self.centroids is not None:
+            nprobe = min(self.nprobe, len(self.centroids))
+            to_centroids = np.einsum('ij,ij->i', self.centroids, self.centroids) - 2 * queries @ self.centroids.T
+            probes = np.argpartition(to_centroids, nprobe - 1, axis=1)[:, :nprobe]
+
+        for q, query in enumerate(queries):
+            if probes is None:
+                candidates = np.arange(built)
+                found = self.norms - 2 * (self.vectors @ query)
+            else:
+                spans = [(self.offsets[p], self.offsets[p + 1]) for p in probes[q]]
+                candidates = np.concatenate([np.arange(a, b) for a, b in spans])
+                found = np.concatenate([self.norms[a:b] - 2 * (self.vectors[a:b] @ query) for a, b in spans])
+            if extra is not None:
+                candidates = np.concatenate((candidates, np.arange(built, built + len(extra[0]))))
+                found = np.concatenate((found, extra[1] - 2 * (extra[0] @ query)))
+            count = min(k, len(found))
+            if count == 0:
+                continue
+            nearest = np.argpartition(found, count - 1)[:count] if count < len(found) else np.arange(len(found))
+            nearest = nearest[np.argsort(found[nearest], kind='stable')]
+            distances[q, :count] = np.maximum(found[nearest] + query_norms[q], 0)
+            rows[q, :count] = candidates[nearest]
+        return distances, rows
+
+    def query(self, vector: np.ndarray, k: int) -> Dict[str, np.ndarray]:
+        """Outcome columns of the k nearest rows, plus their 'distance'"""
+        distances, rows = self.search(vector, k)
+        found = rows[0] >= 0
+        result = self.outcomes_at(rows[0][found])
+        result['distance'] = np.sqrt(distances[0][found])
+        return result
+
+    def outcomes_at(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Outcome columns at search rows"""
+        built = self._built()
+        inside = rows < built
+        if inside.all():
+            return {name: values[rows] for name, values in self.outcomes.items()}
+        result = {}
+        for name, values in self.outcomes.items():
+            column = np.empty(len(rows), dtype=values.dtype)
+            column[inside] = values[rows[inside]]
+            column[~inside] = self.pending[2][name][rows[~inside] - built]
+            result[name] = column
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            'rows': len(self),
+            'pending': self._pending_rows(),
+            'lists': len(self.centroids) if self.centroids is not None else 0,
+            'nprobe': self.nprobe,
+            'builds': self.builds,
+        }
+
+    def _store(self, vectors: np.ndarray, outcomes: Dict[str, np.ndarray]):
+        self.vectors = vectors
+        self.norms = np.einsum('ij,ij->i', vectors, vectors)
+        self.outcomes = {name: np.asarray(outcomes[name], dtype=dtype) for name, dtype in OUTCOME_COLUMNS.items()}
+
+    def _built(self) -> int:
+        return len(self.vectors) if self.vectors is not None else 0
+
+    def _pending_rows(self) -> int:
+        return len(self.pending[0]) if self.pending is not None else 0
+
+    @staticmethod
+    def _concat(vectors: Optional[np.ndarray], outcomes: Dict[str, np.ndarray], more_vectors: np.ndarray,
+                more_outcomes: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        if vectors is None:
+            return more_vectors, more_outcomes
+        return (np.concatenate((vectors, np.asarray(more_vectors, dtype=np.float32))),
+                {name: np.concatenate((outcomes[name], np.asarray(more_outcomes[name], dtype=dtype)))
+                 for name, dtype in OUTCOME_COLUMNS.items()})
+
+class SpikeLibrary:
+    """One SpikeIndex per symbol, grown as bars arrive
+
+    A spike is indexed once the bars after it cover the recovery horizon, so
+    every stored outcome is final.
+    """
+
+    def __init__(self, min_spike_size: float, exact_limit: int = EXACT_LIMIT, nprobe: int = 16):
+        self.min_spike_size = min_spike_size
+        self.exact_limit = exact_limit
+        self.nprobe = nprobe
+        self.indexes = {}
+        self.indexed_until = {}  # symbol -> time of the newest indexed spike
+        self.lock = threading.Lock()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.indexes
+
+    def update(self, symbol: str, times: np.ndarray, closes: np.ndarray) -> int:
+        """Index the spikes in these bars that are complete and newer than any indexed; returns how many"""
+        closes = np.asarray(closes, dtype=np.float64)
+        times = np.asarray(times, dtype=np.int64)
+        indices = spike_indices(closes, self.min_spike_size)
+        gaps = spike_gaps(indices)
+        with self.lock:
+            index = self.indexes.setdefault(symbol, SpikeIndex(self.exact_limit, self.nprobe))
+            until = self.indexed_until.get(symbol)
+        keep = (indices > CONTEXT_BARS) & (indices + RECOVERY_HORIZON < len(closes))
+        if until is not None:
+            keep &= times[indices] > until
+        indices, gaps = indices[keep], gaps[keep]
+        if len(indices) == 0:
+            return 0
+
+        vectors = spike_features(closes, indices, gaps)
+        outcomes = spike_outcomes(closes, times, indices, self.min_spike_size)
+        with self.lock:
+            if self.indexed_until.get(symbol) != until:
+                return 0  # another update indexed these bars first
+            index.add(vectors, outcomes)
+            self.indexed_until[symbol] = int(times[indices[-1]])
+        return len(indices)
+
+    def similar(self, symbol: str, times: np.ndarray, closes: np.ndarray, k: int) -> Optional[Dict]:
+        """How the k past spikes most like the latest spike in these bars played out, or None"""
+        closes = np.asarray(closes, dtype=np.float64)
+        times = np.asarray(times, dtype=np.int64)
+        indices = spike_indices(closes, self.min_spike_size)
+        gaps = spike_gaps(indices)
+        usable = indices > CONTEXT_BARS
+        with self.lock:
+            index = self.indexes.get(symbol)
+            if index is None or len(index) == 0 or not usable.any():
+                return None
+            latest, gap = indices[usable][-1:], gaps[usable][-1:]
+            query_time = int(times[latest[0]])
+            found = index.query(spike_features(closes, latest, gap)[0], k + 1)
+
+        # The latest spike is itself indexed once its outcome is complete
+        other = found['time'] != query_time
+        found = {name: values[other][:k] for name, values in found.items()}
+        if len(found['time']) == 0:
+            return None
+        return summarize_neighbours(found, query_time, len(index))
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {symbol: index.stats() for symbol, index in self.indexes.items()}
+
+def summarize_neighbours(found: Dict[str, np.ndarray], query_time: int, indexed: int, matches: int = 5) -> Dict:
+    """Outcome statistics of the neighbours, with the closest few listed"""
+    recovered = found['recovered']
+    retracement = found['max_retracement']
+    next_spike = found['next_spike_bars'][found['next_spike_bars'] > 0]
+    return {
+        'neighbours': int(len(found['time'])),
+        'indexed': int(indexed),
+        'query_time': query_time,
+        'mean_distance': round(float(found['distance'].mean()), 4),
+        'recovered_rate': round(float(recovered.mean()), 4),
+        'median_recovery_bars': float(np.median(found['recovery_bars'][recovered])) if recovered.any() else None,
+        'retracement_p20': round(float(np.quantile(retracement, 0.2)), 4),
+        'retracement_p50': round(float(np.quantile(retracement, 0.5)), 4),
+        'median_reversion': round(float(np.median(found['reversion'])), 4),
+        'median_next_spike_bars': float(np.median(next_spike)) if len(next_spike) else None,
+        'matches': [
+            {name: values[i].item() for name, values in found.items()}
+            for i in range(min(matches, len(found['time'])))
+        ],
+    }
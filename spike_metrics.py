@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Vectorized Spike Metrics for MT5 Crash/Boom Scalping EA
+Whole-series spike statistics computed with numpy instead of per-spike loops
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Bars after a spike scanned for retracement, matching SpikeAnalyzer
+RETRACEMENT_HORIZON = 49
+
+# Bars after a spike scanned for a return to the pre-spike level
+RECOVERY_HORIZON = 99
+
+def spike_indices(closes: np.ndarray, min_spike_size: float) -> np.ndarray:
+    """Bars with a sudden large movement followed by a follow-through of at least half"""
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) < 3:
+        return np.empty(0, dtype=np.int64)
+    change_to_current = np.abs(np.diff(closes[:-1]))
+    change_from_current = np.abs(np.diff(closes[1:]))
+    is_spike = (change_to_current > min_spike_size) & (change_from_current > change_to_current * 0.5)
+    return np.flatnonzero(is_spike) + 1
+
+def forward_windows(closes: np.ndarray, indices: np.ndarray, horizon: int) -> np.ndarray:
+    """Prices of the next `horizon` bars after each index, NaN-padded past the end"""
+    padded = np.concatenate((closes[1:], np.full(horizon, np.nan)))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, horizon)
+    return windows[indices]
+
+def max_retracement(closes: np.ndarray, indices: np.ndarray, horizon: int = RETRACEMENT_HORIZON) -> np.ndarray:
+    """Largest distance from the spike price over the following bars, for every index at once"""
+    return retracement_curves(closes, indices, horizon)[:, -1]
+
+def retracement_curves(closes: np.ndarray, indices: np.ndarray, horizon: int = RETRACEMENT_HORIZON) -> np.ndarray:
+    """Max distance from the spike price within 1..horizon bars, one row per spike
+
+    Row k, column h-1 is the largest move away from closes[indices[k]] over the
+    next h bars. The curve stays flat once the series runs out.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    if len(indices) == 0:
+        return np.empty((0, horizon), dtype=np.float64)
+    distances = np.abs(forward_windows(closes, indices, horizon) - closes[indices, None])
+    return np.fmax.accumulate(np.nan_to_num(distances, nan=0.0), axis=1)
+
+def first_passage(closes: np.ndarray, indices: np.ndarray, levels: np.ndarray,
+                  upward: np.ndarray, horizon: int) -> np.ndarray:
+    """Bars until price first reaches a level after each index, -1 if it never does
+
+    Upward rows wait for the running max to reach the level, downward rows for
+    the running min. Running extremes are monotone, so the first passage is the
+    number of entries still short of the level (a per-row searchsorted).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    if len(indices) == 0:
+        return np.empty(0, dtype=np.int64)
+    windows = forward_windows(closes, indices, horizon)
+    upward = np.asarray(upward, dtype=bool)
+    levels = np.asarray(levels, dtype=np.float64)
+
+    # Mirror downward rows so every query becomes "running max reaches level"
+    signed = np.where(upward[:, None], windows, -windows)
+    signed_levels = np.where(upward, levels, -levels)
+    running_max = np.fmax.accumulate(np.nan_to_num(signed, nan=-np.inf), axis=1)
+    short = (running_max < signed_levels[:, None]).sum(axis=1)
+    return np.where(short < horizon, short + 1, -1)
+
+def recovery_profile(closes: np.ndarray, indices: np.ndarray, tolerance: float,
+                     horizon: int = RECOVERY_HORIZON, times: Optional[np.ndarray] = None,
+                     bar_seconds: int = 60) -> Dict[str, np.ndarray]:
+    """Bars and seconds until price gets back within tolerance of its pre-spike level"""
+    closes = np.asarray(closes, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.int64)
+    pre_spike = closes[indices - 1]
+    crashed = closes[indices] < pre_spike
+
+    # A crash recovers upwards to just under the old level, a boom downwards to just above it
+    levels = np.where(crashed, pre_spike - tolerance, pre_spike + tolerance)
+    bars = first_passage(closes, indices, levels, crashed, horizon)
+    recovered = bars > 0
+
+    if times is not None:
+        times = np.asarray(times, dtype=np.int64)
+        target = np.minimum(indices + np.maximum(bars, 0), len(closes) - 1)
+        seconds = np.where(recovered, times[target] - times[indices], 0)
+    else:
+        seconds = np.where(recovered, bars * bar_seconds, 0)
+
+    # Unrecovered spikes report how long they were observed for
+    observed = np.minimum(horizon, len(closes) - 1 - indices)
+    seconds = np.where(recovered, seconds, observed * bar_seconds)
+    return {'bars': bars, 'seconds': seconds, 'recovered': recovered}
+
+def threshold_sweep(closes: Sequence[float], thresholds: Sequence[float],
+                    horizon: int = RETRACEMENT_HORIZON) -> Dict[str, List]:
+    """Score every threshold in one pass over the bar-to-bar changes
+
+    For each threshold T this returns the number of jumps larger than T, the
+    number SpikeAnalyzer would flag as spikes at min_spike_size=T, the share of
+    jumps that reversed by at least half their size on the next bar, and the
+    mean max retracement of the spikes.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    thresholds = np.asarray(sorted(thresholds), dtype=np.float64)
+    result = {
+        'thresholds': thresholds.tolist(),
+        'jumps': [0] * len(thresholds),
+        'spikes': [0] * len(thresholds),
+        'reversal_rate': [0.0] * len(thresholds),
+        'mean_retracement': [0.0] * len(thresholds),
+    }
+    if len(closes) < 3 or len(thresholds) == 0:
+        return result
+
+    # Bar i (1..n-2) moved by change_to[i-1] and then by change_from[i-1]
+    deltas = np.diff(closes)
+    change_to = deltas[:-1]
+    change_from = deltas[1:]
+    size = np.abs(change_to)
+
+    # Only bars above the smallest threshold can count anywhere in the sweep
+    candidates = np.flatnonzero(size > thresholds[0])
+    if len(candidates) == 0:
+        return result
+    cand_size = size[candidates]
+    is_spike = np.abs(change_from[candidates]) > cand_size * 0.5
+    reversed_ = is_spike & (np.sign(change_from[candidates]) == -np.sign(change_to[candidates]))
+    retracement = np.zeros(len(candidates))
+    retracement[is_spike] = max_retracement(closes, candidates[is_spike] + 1, horizon)
+
+    # Sort once by size (descending); each threshold is then a prefix of the order
+    order = np.argsort(-cand_size, kind='stable')
+    sorted_size = cand_size[order]
+    cum_spikes = np.cumsum(is_spike[order])
+    cum_reversed = np.cumsum(reversed_[order])
+    cum_retracement = np.cumsum(retracement[order])
+
+    # Number of candidates strictly larger than each threshold
+    counts = np.searchsorted(-sorted_size, -thresholds, side='left')
+    last = np.maximum(counts - 1, 0)
+    spikes = np.where(counts > 0, cum_spikes[last], 0)
+    reversals = np.where(counts > 0, cum_reversed[last], 0)
+    retracement_sum = np.where(counts > 0, cum_retracement[last], 0.0)
+
+    result['jumps'] = counts.tolist()
+    result['spikes'] = spikes.tolist()
+    result['reversal_rate'] = np.round(np.divide(reversals, counts, out=np.zeros(len(counts)),
+                                                 where=counts > 0), 4).tolist()
+    result['mean_retracement'] = np.round(np.divide(retracement_sum, spikes, out=np.zeros(len(counts)),
+                                                    where=spikes > 0), 4).tolist()
+    return result
+
+def default_thresholds(closes: Sequence[float], steps: int = 20) -> List[float]:
+    """Evenly spaced thresholds from 10 points up to the largest bar-to-bar move"""
+    closes = np.asarray(closes, dtype=np.float64)
+    largest = float(np.abs(np.diff(closes)).max()) if len(closes) > 1 else 0.0
+    upper = max(largest, 10.0 * (steps + 1))
+    return np.round(np.linspace(10.0, upper, steps), 2).tolist()
+
+class ThresholdSweepCache:
+    """Caches sweep results per symbol, window and latest bar"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, symbol: str, closes: np.ndarray, last_bar_time: int,
+            thresholds: Optional[Sequence[float]] = None) -> Dict:
+        """Return the cached sweep for this data, computing it on a miss"""
+        thresholds = tuple(thresholds) if thresholds else tuple(default_thresholds(closes))
+        key = (symbol, len(closes), int(last_bar_time), float(closes[-1]) if len(closes) else 0.0, thresholds)
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        result = threshold_sweep(closes, thresholds)
+        result['window'] = len(closes)
+        result['last_bar_time'] = int(last_bar_time)
+
+        with self.lock:
+            self.entries[key] = result
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Drop all cached sweeps"""
+        with self.lock:
+            self.entries.clear()
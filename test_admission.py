@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control
+Checks the order requests are shed in, queue timeouts, low-priority shedding and rate tokens
+"""
+
+import threading
+import time
+
+from admission import CRITICAL, LOW, AdmissionController
+
+def hold(controller, count):
+    """Admit `count` critical requests and keep their slots"""
+    for _ in range(count):
+        assert controller.acquire(CRITICAL) is None
+
+def test_shedding_order():
+    """Rate limits are checked before capacity; a full queue sheds without waiting"""
+    print("=== Testing Shedding Order ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=2.0,
+                                     client_rate=0.001, client_burst=1, symbol_rate=0.001, symbol_burst=2)
+    hold(controller, 1)
+    waiter = threading.Thread(target=controller.acquire, args=(CRITICAL,))
+    waiter.start()
+    time.sleep(0.05)
+    assert controller.queued == 1
+
+    started = time.monotonic()
+    assert controller.acquire(CRITICAL, client='A', symbol='X') == 'queue_full'
+    assert time.monotonic() - started < 0.1
+    controller.release()
+    waiter.join()
+    controller.release()
+
+    assert controller.acquire(CRITICAL, client='A', symbol='X') is None
+    controller.release()
+    assert controller.acquire(CRITICAL, client='A', symbol='X') == 'client_rate'
+    assert controller.acquire(CRITICAL, client='B', symbol='X') is None
+    controller.release()
+    assert controller.acquire(CRITICAL, client='C', symbol='X') == 'symbol_rate'
+    assert controller.stats()['shed'] == {'queue_full': 1, 'client_rate': 1, 'symbol_rate': 1}
+    print("✓ queue_full, then client_rate before symbol_rate")
+
+def test_queue_timeout():
+    """A queued request is shed after the queue timeout, or its own shorter deadline"""
+    print("\n=== Testing Queue Timeout ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.2)
+    hold(controller, 1)
+    started = time.monotonic()
+    assert controller.acquire(CRITICAL) == 'queue_timeout'
+    assert 0.18 < time.monotonic() - started < 0.4
+    started = time.monotonic()
+    assert controller.acquire(CRITICAL, timeout=0.05) == 'queue_timeout'
+    assert time.monotonic() - started < 0.15
+
+    # A slot freed while waiting admits the queued request
+    threading.Timer(0.05, controller.release).start()
+    assert controller.acquire(CRITICAL) is None
+    stats = controller.stats()
+    assert stats['queued'] == 0 and stats['in_flight'] == 1 and stats['peak_queued'] == 1
+    print("✓ shed after 0.2s, or the caller's 0.05s; admitted when a slot frees")
+
+def test_low_priority_sheds():
+    """Low-priority requests only take spare capacity and never queue"""
+    print("\n=== Testing Low Priority ===")
+    controller = AdmissionController(max_concurrent=2, max_queue=4, queue_timeout=1.0)
+    assert controller.acquire(LOW) is None
+    hold(controller, 1)
+    started = time.monotonic()
+    assert controller.acquire(LOW) == 'busy'
+    assert time.monotonic() - started < 0.05
+    controller.release()
+
+    # Spare capacity exists, but a critical request is already waiting for it
+    hold(controller, 1)
+    waiter = threading.Thread(target=controller.acquire, args=(CRITICAL,))
+    waiter.start()
+    time.sleep(0.05)
+    with controller.condition:
+        controller.in_flight -= 1  # a slot frees; the waiter has not been woken yet
+        assert controller.queued == 1 and controller.acquire(LOW) == 'busy'
+        controller.condition.notify()
+    waiter.join()
+    assert controller.stats()['admitted'] == {CRITICAL: 3, LOW: 1}
+    assert controller.stats()['shed'] == {'busy': 2}
+    print("✓ low priority shed as busy without queueing")
+
+def test_tokens_only_spent_on_admission():
+    """Requests shed for capacity leave their client's and symbol's tokens alone; 0 turns a limit off"""
+    print("\n=== Testing Rate Tokens ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=0, client_rate=0.001, client_burst=1,
+                                     symbol_rate=0.001, symbol_burst=1)
+    hold(controller, 1)
+    for _ in range(5):
+        assert controller.acquire(CRITICAL, client='A', symbol='X') == 'queue_full'
+    controller.release()
+    assert controller.acquire(CRITICAL, client='A', symbol='X') is None
+    controller.release()
+    assert controller.acquire(CRITICAL, client='A', symbol='Y') == 'client_rate'
+    assert controller.acquire(CRITICAL, client='B', symbol='Y') is None  # client A's shed spent nothing
+    controller.release()
+
+    unlimited = AdmissionController(max_concurrent=1)
+    for _ in range(100):
+        assert unlimited.acquire(CRITICAL, client='A', symbol='X') is None
+        unlimited.release()
+    assert unlimited.stats()['tracked_clients'] == 0 and unlimited.stats()['shed'] == {}
+    print("✓ five capacity sheds cost no tokens; rate 0 never sheds")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_shedding_order,
+        test_queue_timeout,
+        test_low_priority_sheds,
+        test_tokens_only_spent_on_admission,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Test script for deadline-aware analysis tiers
+Checks caller deadlines, which tier a hedged analysis answers from, and late primary results upgrading the cache
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+import ai_backend_server as server
+
+START = 1700000040  # minute-aligned
+FALLBACK = {'spike_threshold': 70.0, 'tier': 'local'}
+
+def test_resolve_deadline():
+    """An explicit X-Deadline-Ms wins over the client type; both leave the safety margin"""
+    print("=== Testing Caller Deadlines ===")
+    margin = server.DEADLINE_MARGIN_MS
+    mt5 = (server.MT5_DEADLINE_MS - margin) / 1000.0
+    assert server.resolve_deadline({'X-Deadline-Ms': '2000'}) == (2000 - margin) / 1000.0
+    assert server.resolve_deadline({'X-Deadline-Ms': '2000', 'X-Client-Type': 'MT5'}) == (2000 - margin) / 1000.0
+    assert server.resolve_deadline({'X-Deadline-Ms': str(margin / 2)}) == 0
+    assert server.resolve_deadline({'X-Client-Type': 'mt5-ea'}) == mt5
+    assert server.resolve_deadline({'User-Agent': 'MetaTrader 5 Terminal/5.0'}) == mt5
+    assert server.resolve_deadline({'X-Deadline-Ms': 'soon', 'X-Client-Type': 'MT5'}) == mt5
+    assert server.resolve_deadline({'X-Deadline-Ms': 'soon'}) is None
+    assert server.resolve_deadline({'User-Agent': 'python-requests/2.31'}) is None
+    assert server.resolve_deadline({}) is None
+    print(f"✓ header deadline minus {margin} ms, MT5 clients get {mt5:g} s, others none")
+
+def hedged(primary, fast, deadline=0.2, on_late_result=None):
+    """Run a hedged analysis with fake tiers: each is (seconds to answer, result or None)"""
+    analyzer = server.AIAnalyzer()
+    analyzer.model, analyzer.fast_model = 'primary-model', 'fast-model'
+
+    def run_tier(prompt, model, on_update=None, symbol=None, deadline=None):
+        delay, result = primary if model == 'primary-model' else fast
+        time.sleep(delay)
+        return dict(result) if result is not None else None
+
+    analyzer._run_tier = run_tier
+    started = time.monotonic()
+    best = analyzer._analyze_hedged('prompt', deadline, dict(FALLBACK), on_late_result, 'HEDGE')
+    return best, time.monotonic() - started
+
+def test_hedged_tier_selection():
+    """The best tier ready by the deadline answers; a slow or failed primary falls back to fast, then local"""
+    print("\n=== Testing Hedged Tier Selection ===")
+    answer = {'spike_threshold': 90.0}
+    best, elapsed = hedged((0.01, answer), (0.05, {'spike_threshold': 80.0}))
+    assert best['tier'] == 'primary' and best['spike_threshold'] == 90.0 and elapsed < 0.15
+
+    # Primary too slow: the fast tier answers at the deadline
+    best, elapsed = hedged((1.0, answer), (0.01, {'spike_threshold': 80.0}))
+    assert best['tier'] == 'fast' and best['spike_threshold'] == 80.0 and 0.15 < elapsed < 0.5
+
+    # Primary fails: no need to wait for the deadline once both tiers are done
+    best, elapsed = hedged((0.01, None), (0.02, {'spike_threshold': 80.0}))
+    assert best['tier'] == 'fast' and elapsed < 0.15
+
+    # Both fail or are too slow: local statistics
+    best, _ = hedged((0.01, None), (0.01, None))
+    assert best['tier'] == 'local' and best['spike_threshold'] == 70.0
+    best, elapsed = hedged((1.0, answer), (1.0, answer))
+    assert best['tier'] == 'local' and best['elapsed_ms'] >= 200 and elapsed < 0.5
+
+    # The slow primary keeps going and is handed over when it lands
+    late = []
+    best, _ = hedged((0.4, answer), (0.01, None), on_late_result=late.append)
+    assert best['tier'] == 'local' and late == []
+    time.sleep(0.4)
+    assert late == [{'spike_threshold': 90.0, 'tier': 'primary', 'late': True}], late
+    print("✓ primary, fast and local answers chosen by readiness at the deadline; late primary delivered")
+
+def test_late_result_upgrades_cache():
+    """A primary result landing after the response replaces the cached and shared fallback"""
+    print("\n=== Testing Late Result Upgrade ===")
+    release = threading.Event()
+    calls = []
+
+    def run_tier(prompt, model, on_update=None, symbol=None, deadline=None):
+        calls.append(model)
+        if model != server.ai_analyzer.model:
+            return None  # the fast tier fails
+        release.wait(5)
+        return server.ai_analyzer._build_recommendations({'spike_threshold': 95, 'reasoning': 'LLM'})
+
+    analyzer = server.ai_analyzer
+    engine, analyzer.engine = analyzer.engine, 'openai'
+    fast_model, analyzer.fast_model = analyzer.fast_model, 'fast-model'
+    analyzer._run_tier = run_tier
+    regime_trigger, server.REGIME_TRIGGER = server.REGIME_TRIGGER, True
+    symbol = 'LATE CRASH'
+    index = np.arange(700)
+    closes = 10000 + np.cumsum(np.select([index % 40 == 0, index % 40 == 1], [-120.0, 80.0], 0.5))
+    payload = {'time': (START + 60 * index).tolist(), 'close': closes.tolist()}
+    last_bar = payload['time'][-1]
+    try:
+        status, body, _ = server.analyze_symbol(symbol, server.parse_price_data(payload), {}, deadline=0.2)
+        assert status == 200 and body['tier'] == 'local' and body['analysis'] == 'computed'
+        assert server.regime_detector.stats(symbol)[symbol]['retry_pending']
+
+        release.set()
+        for _ in range(100):
+            if server.analysis_cache[symbol]['recommendations']['tier'] == 'primary':
+                break
+            time.sleep(0.02)
+        cached = server.analysis_cache[symbol]['recommendations']
+        assert cached['tier'] == 'primary' and cached['late'] and cached['spike_threshold'] == 95
+        # The shared analysis for the bar is upgraded too, and the fallback retry is no longer needed
+        _, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {}, last_bar_time=last_bar)
+        assert body['analysis'] == 'shared' and body['tier'] == 'primary' and body['spike_threshold'] == 95
+        assert not server.regime_detector.stats(symbol)[symbol]['retry_pending']
+        assert server.app.test_client().get(f'/recommendations/{symbol}').get_json()['recommendations']['late']
+        assert sorted(calls) == ['fast-model', analyzer.model]
+        # The late result is scored under its own model from the bar it arrived at
+        scored = server.outcome_scorer.history(symbol)
+        assert [(rec['tier'], rec['model']) for rec in scored] == [('primary', analyzer.model), ('local', 'local')]
+        assert scored[0]['issued_at'] == last_bar and scored[1]['superseded_at'] == last_bar
+    finally:
+        release.set()
+        del analyzer._run_tier
+        analyzer.engine, analyzer.fast_model = engine, fast_model
+        server.REGIME_TRIGGER = regime_trigger
+        server.precompute.symbols.pop(symbol, None)
+        server.timeframe_store.m1.pop(symbol, None)
+        server.timeframe_store.resamplers.pop(symbol, None)
+        server.regime_detector.symbols.pop(symbol, None)
+        server.market_data.analyses.pop(symbol, None)
+        server.analysis_cache.pop(symbol, None)
+        server.outcome_scorer.symbols.pop(symbol, None)
+    print("✓ late primary result replaced the local fallback in the cache and the shared slot")
+
+def test_late_fast_result_keeps_primary():
+    """A streamed fast result landing after the late primary one does not replace it"""
+    print("\n=== Testing Late Fast Result After Primary ===")
+    release_primary, release_fast = threading.Event(), threading.Event()
+    retries = []
+
+    def run_tier(prompt, model, on_update=None, symbol=None, deadline=None):
+        primary = model == server.ai_analyzer.model
+        (release_primary if primary else release_fast).wait(5)
+        recommendations = server.ai_analyzer._build_recommendations(
+            {'spike_threshold': 95 if primary else 85, 'reasoning': 'LLM'})
+        recommendations['tier'] = 'primary' if primary else 'fast'
+        if not primary and on_update is not None:
+            on_update(recommendations)  # the streamed reasoning completes
+        return recommendations
+
+    analyzer = server.ai_analyzer
+    engine, analyzer.engine = analyzer.engine, 'openai'
+    fast_model, analyzer.fast_model = analyzer.fast_model, 'fast-model'
+    analyzer._run_tier = run_tier
+    regime_trigger, server.REGIME_TRIGGER = server.REGIME_TRIGGER, True
+    retry = server.regime_detector.retry
+    server.regime_detector.retry = lambda *args: retries.append(args) or retry(*args)
+    symbol = 'LATE FAST CRASH'
+    index = np.arange(700)
+    closes = 10000 + np.cumsum(np.select([index % 40 == 0, index % 40 == 1], [-120.0, 80.0], 0.5))
+    payload = {'time': (START + 60 * index).tolist(), 'close': closes.tolist()}
+    last_bar = payload['time'][-1]
+    try:
+        status, body, _ = server.analyze_symbol(symbol, server.parse_price_data(payload), {}, deadline=0.2)
+        assert status == 200 and body['tier'] == 'local'
+
+        release_primary.set()
+        for _ in range(100):
+            if server.analysis_cache[symbol]['recommendations']['tier'] == 'primary':
+                break
+            time.sleep(0.02)
+        release_fast.set()
+        time.sleep(0.2)
+        cached = server.analysis_cache[symbol]['recommendations']
+        assert cached['tier'] == 'primary' and cached['spike_threshold'] == 95
+        _, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {}, last_bar_time=last_bar)
+        assert body['analysis'] == 'shared' and body['tier'] == 'primary' and body['spike_threshold'] == 95
+        # Only the primary upgrade settles the pending regime retry and is scored
+        assert [args for args in retries if args[2] is None] == [(symbol, 1, None)], retries
+        assert [rec['tier'] for rec in server.outcome_scorer.history(symbol)] == ['primary', 'local']
+    finally:
+        release_primary.set()
+        release_fast.set()
+        del analyzer._run_tier
+        del server.regime_detector.retry
+        analyzer.engine, analyzer.fast_model = engine, fast_model
+        server.REGIME_TRIGGER = regime_trigger
+        server.precompute.symbols.pop(symbol, None)
+        server.timeframe_store.m1.pop(symbol, None)
+        server.timeframe_store.resamplers.pop(symbol, None)
+        server.regime_detector.symbols.pop(symbol, None)
+        server.market_data.analyses.pop(symbol, None)
+        server.analysis_cache.pop(symbol, None)
+        server.outcome_scorer.symbols.pop(symbol, None)
+    print("✓ late fast result left the late primary result in the cache and the shared slot")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_resolve_deadline,
+        test_hedged_tier_selection,
+        test_late_result_upgrades_cache,
+        test_late_fast_result_keeps_primary,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for request capture and replay
+Checks that captured requests replay byte-for-byte, rotation on file size, and per-target concurrency
+"""
+
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from replay_requests import Replayer, latency_report
+from request_capture import RequestCapture, capture_files, read_captures
+
+class Target:
+    """Local HTTP server that records what it receives and how many requests overlapped"""
+
+    def __init__(self, delay=0.0):
+        self.received = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        target = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with target.lock:
+                    target.in_flight += 1
+                    target.max_in_flight = max(target.max_in_flight, target.in_flight)
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                time.sleep(delay)
+                with target.lock:
+                    target.in_flight -= 1
+                    target.received.append((self.path, body, self.headers.get('X-Client-Type')))
+                reply = json.dumps({'tier': 'local', 'spike_threshold': len(body)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def test_capture_replay_round_trip():
+    """Bodies with NUL terminators and invalid UTF-8 reach the target exactly as captured"""
+    print("=== Testing Capture -> Replay Round Trip ===")
+    bodies = [b'{"symbol": "Crash 500 Index", "price_data": [1.5, 2.5]}\x00',
+              b'{"symbol": "Boom 1000 Index", "note": "caf\xc3\xa9 \xff\xfe"}',
+              b'']
+    with tempfile.TemporaryDirectory() as root:
+        capture = RequestCapture(root)
+        for i, body in enumerate(bodies * 4):
+            assert capture.record('/analyze', body, {'X-Client-Type': 'MT5', 'Authorization': 'secret', 'i': i})
+        capture.close()
+        records = list(read_captures([root]))
+        assert [r['body'] for r in records] == bodies * 4 and capture.stats()['captured'] == 12
+        assert records[0]['headers'] == {'X-Client-Type': 'MT5'}
+
+        target = Target()
+        try:
+            replayer = Replayer([target.url], concurrency=2, timeout=5.0)
+            replayer.run(records, speed=0)
+        finally:
+            target.close()
+        assert sorted(target.received) == sorted(('/analyze', body, 'MT5') for body in bodies * 4)
+        report = latency_report(replayer.results[target.url])
+        assert report['requests'] == 12 and report['statuses'] == {'200': 12}
+    print("✓ 12 captured requests replayed with identical bytes and headers")
+
+def test_rotation_counts_compressed_bytes():
+    """Files rotate at max_bytes on disk, not at max_bytes of uncompressed JSON"""
+    print("\n=== Testing Capture Rotation ===")
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as root:
+        # Repetitive bars compress well: 400 KB of JSON is far less on disk
+        capture = RequestCapture(root, max_bytes=20000, max_files=100)
+        compressible = json.dumps({'price_data': [10000.5] * 1000}).encode()
+        for _ in range(50):
+            capture.record('/analyze', compressible, {})
+        capture.close()
+        files = capture_files(root)
+        assert len(files) == 1 and os.path.getsize(files[0]) < 20000
+        assert sum(len(line) for line in gzip.open(files[0])) > 20 * 20000
+
+        # Random prices barely compress, so the same limit rotates
+        capture = RequestCapture(os.path.join(root, 'random'), max_bytes=20000, max_files=3)
+        for _ in range(60):
+            body = json.dumps({'price_data': [round(rng.uniform(9000, 11000), 2) for _ in range(500)]}).encode()
+            capture.record('/analyze', body, {})
+            time.sleep(0.001)  # let the writer flush between records
+        capture.close()
+        files = capture_files(os.path.join(root, 'random'))
+        assert capture.stats()['rotations'] >= 3 and len(files) == 3, (capture.stats(), files)
+        # The compressed size can pass the limit by at most what the compressor held back
+        assert all(os.path.getsize(path) < 20000 + 70000 for path in files)
+        assert len(list(read_captures(files))) < 60
+    print(f"✓ compressible capture kept in one file; incompressible one rotated {capture.stats()['rotations']} times")
+
+def test_concurrency_is_per_target():
+    """A slow target holds at most `concurrency` requests and does not slow down the other"""
+    print("\n=== Testing Per-Target Concurrency ===")
+    records = [{'ts': float(i), 'path': '/analyze', 'headers': {}, 'body': b'{}'} for i in range(12)]
+    slow, fast = Target(delay=0.1), Target(delay=0.0)
+    try:
+        replayer = Replayer([slow.url, fast.url], concurrency=3, timeout=5.0)
+        replayer.run(records, speed=0)
+    finally:
+        slow.close()
+        fast.close()
+    assert slow.max_in_flight == 3 and fast.max_in_flight <= 3, (slow.max_in_flight, fast.max_in_flight)
+    assert len(slow.received) == len(fast.received) == 12
+    slow_latency = latency_report(replayer.results[slow.url])['latency_ms']['p50']
+    fast_latency = latency_report(replayer.results[fast.url])['latency_ms']['p50']
+    assert fast_latency < 50 < slow_latency, (fast_latency, slow_latency)
+    print(f"✓ 3 in flight per target; p50 {slow_latency} ms slow vs {fast_latency} ms fast")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_capture_replay_round_trip,
+        test_rotation_counts_compressed_bytes,
+        test_concurrency_is_per_target,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming history and spike export
+Checks range lookups across stored and live bars, decimation, spike extraction and every output format
+"""
+
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+import ai_backend_server as server
+from history_export import SPIKE_COLUMNS, SeriesView, decimate_bars, decimate_ticks, iter_spikes
+from history_store import BAR_COLUMNS, HistoryStore
+from spike_metrics import max_retracement, recovery_profile, spike_indices
+
+START = 1700000040  # minute-aligned
+
+def make_bars(first, count, seed=3):
+    """M1 bars with a crash every 40 bars"""
+    rng = np.random.default_rng(seed)
+    index = np.arange(first, first + count)
+    close = 10000 + np.cumsum(rng.normal(0, 3, count)) - np.where(index % 40 == 0, 150.0, 0.0)
+    return {'time': START + 60 * index.astype(np.int64), 'open': close + 0.5, 'high': close + 2,
+            'low': close - 2, 'close': close, 'tick_volume': np.full(count, 60, dtype=np.int64),
+            'volume': np.zeros(count, dtype=np.int64), 'spread': np.full(count, 5, dtype=np.int32)}
+
+def test_ranges_span_segments():
+    """Time ranges are found by binary search and read across the stored and live segments"""
+    print("=== Testing Range Lookups ===")
+    bars = make_bars(0, 1000)
+    live = {f: bars[f][700:] for f in ('time', 'open', 'high', 'low', 'close')}
+    view = SeriesView([{f: v[:700] for f, v in bars.items()}, live], 'time', BAR_COLUMNS)
+    assert len(view) == 1000
+    assert view.range(START + 60 * 650, START + 60 * 749) == (650, 750)
+    assert view.range(None, START - 1) == (0, 0)
+    rows = list(view.chunks(650, 750, chunk_rows=30))
+    assert [len(c['time']) for c in rows] == [30, 30, 30, 10]
+    times = np.concatenate([c['time'] for c in rows])
+    assert np.array_equal(times, bars['time'][650:750])
+    assert rows[-1]['tick_volume'][-1] == 0  # live bars carry only OHLC
+    print("✓ 100 bars read across two segments in 4 chunks")
+
+def test_decimation_keeps_extremes():
+    """Decimated bars keep every bucket's high and low; decimated ticks keep min and max bids"""
+    print("\n=== Testing Decimation ===")
+    bars = make_bars(0, 1000)
+    view = SeriesView([bars], 'time', BAR_COLUMNS)
+    merged = list(decimate_bars(view.chunks(0, 1000, chunk_rows=64), 100))
+    merged = {f: np.concatenate([c[f] for c in merged]) for f in BAR_COLUMNS}
+    assert len(merged['time']) == 10
+    assert np.array_equal(merged['low'], bars['low'].reshape(10, 100).min(axis=1))
+    assert np.array_equal(merged['close'], bars['close'][99::100])
+    assert merged['tick_volume'][0] == 6000
+
+    bid = np.array([5.0, 1.0, 9.0, 4.0, 3.0, 8.0, 2.0])
+    ticks = {'time_msc': np.arange(7, dtype=np.int64), 'bid': bid}
+    kept = np.concatenate([c['time_msc'] for c in decimate_ticks(iter([ticks]), 3)])
+    assert list(kept) == [1, 2, 4, 5, 6]
+    print("✓ 1000 bars into 10 OHLC buckets; ticks keep bucket extremes")
+
+def test_spikes_match_whole_series():
+    """Chunked spike extraction equals one pass over the whole series"""
+    print("\n=== Testing Spike Export ===")
+    bars = make_bars(0, 3000)
+    view = SeriesView([bars], 'time', BAR_COLUMNS)
+    chunks = list(iter_spikes(view, 0, 3000, 50.0, chunk_rows=257))
+    spikes = {f: np.concatenate([c[f] for c in chunks]) for f in SPIKE_COLUMNS}
+
+    closes = bars['close']
+    indices = spike_indices(closes, 50.0)
+    recovery = recovery_profile(closes, indices, 5.0, times=bars['time'])
+    assert np.array_equal(spikes['time'], bars['time'][indices])
+    assert np.array_equal(spikes['recovery_seconds'], recovery['seconds'])
+    assert np.allclose(spikes['max_retracement'], max_retracement(closes, indices))
+    assert spikes['is_crash'].all() and len(indices) == 74
+    print(f"✓ {len(indices)} spikes identical in 257-bar chunks")
+
+def test_endpoints_stream_formats():
+    """/history and /spikes stream stored plus live bars in every format"""
+    print("\n=== Testing Export Endpoints ===")
+    bars = make_bars(0, 2000)
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root)
+        store.writer('CRASH', 'm1').write({f: v[:1500] for f, v in bars.items()})
+        store.compact('CRASH', 'm1')
+        server.history_store = store
+        server.timeframe_store.ingest_bars('CRASH', {f: bars[f][1400:] for f in ('time', 'open', 'high', 'low', 'close')})
+        client = server.app.test_client()
+        try:
+            t0, t1 = int(bars['time'][1490]), int(bars['time'][1509])
+            response = client.get(f'/history/CRASH?from={t0}&to={t1}')
+            rows = [json.loads(line) for line in response.data.decode().splitlines()]
+            assert response.status_code == 200 and response.headers['X-Rows'] == '20'
+            assert [r['time'] for r in rows] == list(bars['time'][1490:1510])
+
+            response = client.get(f'/history/CRASH?format=csv&fields=time,close&max_points=100')
+            frame = pd.read_csv(io.StringIO(response.data.decode()))
+            assert list(frame.columns) == ['time', 'close'] and len(frame) == 100
+            assert response.headers['X-Decimation'] == '20'
+
+            response = client.get('/history/CRASH?format=binary')
+            dtype = np.dtype([tuple(c) for c in json.loads(response.headers['X-Record-Dtype'])])
+            records = np.frombuffer(response.data, dtype=dtype)
+            assert np.array_equal(records['time'], bars['time']) and np.array_equal(records['close'], bars['close'])
+
+            response = client.get(f'/spikes/CRASH?format=csv&to={t1}')
+            spikes = pd.read_csv(io.StringIO(response.data.decode()))
+            assert len(spikes) == 37 and spikes['time'].max() <= t1
+
+            assert client.get('/history/CRASH?format=xml').status_code == 400
+            assert client.get('/history/CRASH?fields=bogus').status_code == 400
+            assert client.get('/history/NOTHING').status_code == 404
+        finally:
+            server.history_store = None
+            server.timeframe_store.m1.pop('CRASH', None)
+            server.timeframe_store.resamplers.pop('CRASH', None)
+    print("✓ jsonl, csv (decimated) and binary bars plus csv spikes")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_ranges_span_segments,
+        test_decimation_keeps_extremes,
+        test_spikes_match_whole_series,
+        test_endpoints_stream_formats,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the columnar history store and the MT5 export importer
+Checks sorted, deduplicated appends, overlap merges and parsing of bar and tick exports
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from history_store import HistoryStore
+from import_history import describe_file, import_files
+
+START = 1704153600  # 2024.01.02 00:00
+
+def bars(start_minute, count, close_offset=0.0):
+    times = START + 60 * np.arange(start_minute, start_minute + count, dtype=np.int64)
+    close = 10000 + np.arange(start_minute, start_minute + count) + close_offset
+    return {'time': times, 'open': close - 1, 'high': close + 2, 'low': close - 3, 'close': close,
+            'tick_volume': np.full(count, 60), 'volume': np.zeros(count, dtype=np.int64),
+            'spread': np.full(count, 5)}
+
+def write_bar_export(path, start_minute, count, close_offset=0.0, encoding='utf-16'):
+    """A file in MT5's "Export Bars" layout"""
+    data = bars(start_minute, count, close_offset)
+    lines = ['<DATE>\t<TIME>\t<OPEN>\t<HIGH>\t<LOW>\t<CLOSE>\t<TICKVOL>\t<VOL>\t<SPREAD>']
+    for i in range(count):
+        stamp = np.datetime64(int(data['time'][i]), 's').astype(object)
+        lines.append(f"{stamp:%Y.%m.%d}\t{stamp:%H:%M:%S}\t{data['open'][i]:.2f}\t{data['high'][i]:.2f}\t"
+                     f"{data['low'][i]:.2f}\t{data['close'][i]:.2f}\t60\t0\t5")
+    with open(path, 'w', encoding=encoding) as f:
+        f.write('\n'.join(lines) + '\n')
+
+def test_appends_and_merges():
+    """Later chunks append in place; overlapping ones are merged with the newest bar winning"""
+    print("=== Testing Store Appends and Merges ===")
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root)
+        writer = store.writer('Crash 1000 Index', 'm1')
+        writer.write(bars(0, 100))
+        writer.write(bars(100, 100))
+        assert store.compact('Crash 1000 Index', 'm1') == {'rows': 200, 'merged_runs': 1, 'rewritten': False}
+
+        # Overlaps the stored tail, arrives out of order and repeats a bar inside the chunk
+        chunk = bars(150, 100, close_offset=0.5)
+        chunk = {k: np.concatenate([v[::-1], v[:1]]) for k, v in chunk.items()}
+        store.writer('Crash 1000 Index', 'm1').write(chunk)
+        result = store.compact('Crash 1000 Index', 'm1', block_rows=32)
+        assert result['rows'] == 250 and result['rewritten'], result
+
+        data = store.open('Crash 1000 Index', 'm1')
+        times = np.asarray(data['time'])
+        assert np.all(np.diff(times) == 60) and times[0] == START
+        assert data['close'][149] == 10149 and data['close'][150] == 10150.5
+        assert store.info('Crash 1000 Index', 'm1')['last'] == int(times[-1])
+        assert store.symbols() == ['Crash_1000_Index'] and store.datasets('Crash 1000 Index') == ['m1']
+        assert not os.listdir(os.path.join(store.dataset_path('Crash 1000 Index', 'm1'), 'runs'))
+    print("✓ 200 bars appended, 100 overlapping bars merged into 250 sorted unique bars")
+
+def test_interrupted_append_recovers():
+    """Column bytes written by an append that died before meta.json are discarded by the next append"""
+    print("\n=== Testing Interrupted Appends ===")
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root)
+        store.writer('Boom 500 Index', 'm1').write(bars(0, 100))
+        store.compact('Boom 500 Index', 'm1')
+        path = store.dataset_path('Boom 500 Index', 'm1')
+        # A crash mid-compact: some columns got a partial block, meta.json still says 100 rows
+        for name, dtype in (('time', '<i8'), ('close', '<f8')):
+            with open(os.path.join(path, f"{name}.bin"), 'ab') as f:
+                f.write(np.arange(37, dtype=dtype).tobytes())
+        assert store.info('Boom 500 Index', 'm1')['rows'] == 100
+
+        store.writer('Boom 500 Index', 'm1').write(bars(100, 50))
+        assert store.compact('Boom 500 Index', 'm1')['rewritten'] is False
+        data = store.open('Boom 500 Index', 'm1')
+        assert np.array_equal(data['time'], bars(0, 150)['time'])
+        assert np.array_equal(data['close'], bars(0, 150)['close'])
+        for name, dtype in (('time', '<i8'), ('close', '<f8'), ('spread', '<i4')):
+            assert os.path.getsize(os.path.join(path, f"{name}.bin")) == 150 * np.dtype(dtype).itemsize
+    print("✓ stray bytes from an interrupted append dropped; columns stay aligned")
+
+def test_ticks_keep_same_millisecond():
+    """Ticks sharing a millisecond are kept; exact repeats are dropped"""
+    print("\n=== Testing Tick Deduplication ===")
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root)
+        ticks = {'time_msc': np.array([1000, 1000, 1001, 1002], dtype=np.int64),
+                 'bid': np.array([1.0, 1.1, 1.2, 1.3]), 'ask': np.array([1.5, 1.6, 1.7, 1.8]),
+                 'last': np.zeros(4), 'volume': np.zeros(4), 'flags': np.full(4, 6)}
+        store.writer('BOOM', 'ticks').write(ticks)
+        store.compact('BOOM', 'ticks')
+        store.writer('BOOM', 'ticks').write({k: v[1:] for k, v in ticks.items()})
+        assert store.compact('BOOM', 'ticks')['rows'] == 4
+        assert list(store.open('BOOM', 'ticks')['bid']) == [1.0, 1.1, 1.2, 1.3]
+    print("✓ 4 ticks kept after re-importing 3 of them")
+
+def test_import_exports():
+    """Overlapping UTF-16 bar exports and a tick export with blank prices import in parallel"""
+    print("\n=== Testing Export Import ===")
+    with tempfile.TemporaryDirectory() as root:
+        first = os.path.join(root, 'Boom 500 Index_M1_202401020000_202401021000.csv')
+        second = os.path.join(root, 'Boom 500 Index_M1_202401020500_202401021500.csv')
+        write_bar_export(first, 0, 600)
+        write_bar_export(second, 300, 600, close_offset=0.25, encoding='utf-8')
+        ticks = os.path.join(root, 'Boom 500 Index_202401020000_202401020001.csv')
+        with open(ticks, 'w') as f:
+            f.write('<DATE>\t<TIME>\t<BID>\t<ASK>\t<LAST>\t<VOLUME>\t<FLAGS>\n'
+                    '2024.01.02\t00:00:00.100\t5000.5\t5001.0\t\t\t6\n'
+                    '2024.01.02\t00:00:00.250\t5000.7\t\t\t\t2\n'
+                    '2024.01.02\t00:00:00.250\t\t5001.4\t\t\t4\n')
+        assert describe_file(first)[:3] == ('Boom 500 Index', 'm1', 'utf-16')
+
+        store_root = os.path.join(root, 'store')
+        report = import_files([first, second, ticks], store_root, workers=2, chunk_rows=128)
+        assert all('error' not in f for f in report['files']), report['files']
+        assert report['rows'] == 1203 and report['rows_per_second'] > 0
+
+        store = HistoryStore(store_root)
+        data = store.open('Boom 500 Index', 'm1')
+        assert len(data['time']) == 900 and np.all(np.diff(data['time']) == 60)
+        assert data['close'][299] == 10299 and data['close'][300] == 10300.25
+        tick_data = store.open('Boom 500 Index', 'ticks')
+        assert list(tick_data['time_msc'] - START * 1000) == [100, 250, 250]
+        assert list(tick_data['bid']) == [5000.5, 5000.7, 5000.7]
+        assert list(tick_data['ask']) == [5001.0, 5001.0, 5001.4]
+    print(f"✓ 1203 rows imported into 900 bars and 3 ticks at {report['rows_per_second']:,} rows/s")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_appends_and_merges,
+        test_interrupted_append_recovers,
+        test_ticks_keep_same_millisecond,
+        test_import_exports,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
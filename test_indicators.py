@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test script for the indicator engine
+Checks batch and incremental indicators against line-by-line ports of MT5's indicator code,
+the EA's entry filters, and the indicators reaching the prompt, recommender and outcome scorer
+"""
+
+import os
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from indicators import (
+    EntryFilters, IndicatorEngine, IndicatorState, atr, ea_volatility, ema, rsi, sma
+)
+from local_recommender import LocalRecommender
+from outcome_scoring import OutcomeScorer
+
+START = 1700000040  # minute-aligned
+
+def generate_bars(count=3000, seed=5):
+    """Crash-style M1 bars: small drift up with occasional large drops"""
+    rng = np.random.default_rng(seed)
+    moves = rng.normal(0.3, 1.0, count) - np.where(rng.random(count) < 0.01, rng.uniform(50, 150, count), 0.0)
+    close = 10000 + np.cumsum(moves)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 2, count)
+    low = np.minimum(open_, close) - rng.uniform(0, 2, count)
+    return {'time': START + 60 * np.arange(count, dtype=np.int64), 'open': open_, 'high': high,
+            'low': low, 'close': close}
+
+def mt5_rsi(price, period):
+    """RSI.mq5, first calculation and per-bar loop"""
+    n = len(price)
+    pos, neg, out = [0.0] * n, [0.0] * n, [np.nan] * n
+    sum_pos = sum_neg = 0.0
+    for i in range(1, period + 1):
+        diff = price[i] - price[i - 1]
+        sum_pos += diff if diff > 0 else 0.0
+        sum_neg += -diff if diff < 0 else 0.0
+    pos[period], neg[period] = sum_pos / period, sum_neg / period
+    for i in range(period, n):
+        if i > period:
+            diff = price[i] - price[i - 1]
+            pos[i] = (pos[i - 1] * (period - 1) + (diff if diff > 0 else 0.0)) / period
+            neg[i] = (neg[i - 1] * (period - 1) + (-diff if diff < 0 else 0.0)) / period
+        if neg[i] != 0.0:
+            out[i] = 100.0 - (100.0 / (1.0 + pos[i] / neg[i]))
+        else:
+            out[i] = 100.0 if pos[i] != 0.0 else 50.0
+    return np.array(out)
+
+def mt5_ema(price, period):
+    """Custom Moving Average.mq5, CalculateEMA"""
+    factor = 2.0 / (1.0 + period)
+    out = [price[0]]
+    for i in range(1, len(price)):
+        out.append(price[i] * factor + out[-1] * (1.0 - factor))
+    return np.array(out)
+
+def mt5_atr(high, low, close, period):
+    """ATR.mq5"""
+    n = len(close)
+    tr, out = [0.0] * n, [np.nan] * n
+    for i in range(1, n):
+        tr[i] = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+    out[period] = sum(tr[1:period + 1]) / period
+    for i in range(period + 1, n):
+        out[i] = out[i - 1] + (tr[i] - tr[i - period]) / period
+    return np.array(out)
+
+def ea_volatility_at(close, i, bars=20):
+    """GetCurrentVolatility with close[0] at bar i"""
+    series = close[i - bars + 1:i + 1][::-1]
+    total = sum(abs(series[k - 1] - series[k]) for k in range(1, bars))
+    return min(total / (bars - 1) / series[0] * 1000, 1.0)
+
+def close_enough(a, b, tol=1e-8):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return bool(np.all((np.isnan(a) & np.isnan(b)) | (np.abs(a - b) <= tol * np.maximum(1.0, np.abs(b)))))
+
+def test_batch_matches_mt5():
+    """Vectorized indicators equal straight ports of MT5's indicator loops"""
+    print("=== Testing Batch Indicators ===")
+    bars = generate_bars()
+    close, high, low = bars['close'], bars['high'], bars['low']
+    assert close_enough(rsi(close, 14), mt5_rsi(close, 14))
+    reference = mt5_ema(close, 20)
+    reference[:19] = np.nan
+    assert close_enough(ema(close, 20), reference)
+    assert close_enough(atr(high, low, close, 14), mt5_atr(high, low, close, 14))
+    assert close_enough(sma(close, 20)[19:], [close[i - 19:i + 1].mean() for i in range(19, len(close))])
+    volatility = ea_volatility(close)
+    assert np.isnan(volatility[:19]).all()
+    assert close_enough(volatility[19:], [ea_volatility_at(close, i) for i in range(19, len(close))])
+    flat = np.full(30, 100.0)
+    assert rsi(flat, 14)[-1] == 50.0 and rsi(np.arange(30.0) + 1, 14)[-1] == 100.0
+    print("✓ RSI, EMA, SMA, ATR and EA volatility match MT5 over 3000 bars")
+
+def test_incremental_matches_batch():
+    """One bar at a time, seeded or from scratch, gives the batch values on every bar"""
+    print("\n=== Testing Incremental Updates ===")
+    bars = generate_bars(800, seed=8)
+    close, high, low = bars['close'], bars['high'], bars['low']
+    expected = {'rsi': rsi(close), 'ema': ema(close), 'sma': sma(close), 'atr': atr(high, low, close),
+                'volatility': ea_volatility(close)}
+    state = IndicatorState()
+    for i in range(len(close)):
+        values = state.values(high[i], low[i], close[i])
+        for name, series in expected.items():
+            value = np.nan if values[name] is None else values[name]
+            assert close_enough(value, series[i]), (name, i, value, series[i])
+        state.push(high[i], low[i], close[i])
+
+    seeded = IndicatorState.from_bars(high[:500], low[:500], close[:500])
+    for i in range(500, len(close)):
+        values = seeded.values(high[i], low[i], close[i])
+        for name, series in expected.items():
+            assert close_enough(values[name], series[i]), (name, i)
+        seeded.push(high[i], low[i], close[i])
+
+    engine = IndicatorEngine()
+    for stop in (300, 301, 301, 450, 700, 800):  # overlapping windows of the growing series
+        window = {f: bars[f][max(stop - 300, 0):stop] for f in bars}
+        latest = engine.update('CRASH', window)
+        assert latest['bar_time'] == bars['time'][stop - 1] and close_enough(latest['rsi'], expected['rsi'][stop - 1])
+    assert engine.seeded == 1 and engine.stats()['CRASH']['bars'] == 799
+    print("✓ 800 bars pushed one at a time, after a batch seed, and through the engine")
+
+def test_entry_filters():
+    """CheckRSIFilter/CheckTrendFilter: oversold below the EMA buys, overbought above it sells"""
+    print("\n=== Testing Entry Filters ===")
+    filters = EntryFilters()
+    assert filters.passes(25.0, 105.0, 100.0, True) and not filters.passes(35.0, 105.0, 100.0, True)
+    assert not filters.passes(25.0, 95.0, 100.0, True) and filters.passes(75.0, 95.0, 100.0, False)
+    assert filters.passes(np.nan, np.nan, 100.0, False)  # no indicator data yet: the EA lets it through
+    assert EntryFilters(use_rsi=False).passes(50.0, 105.0, 100.0, True)
+
+    bars = generate_bars()
+    close = bars['close']
+    indices = np.flatnonzero(np.abs(np.diff(close[20:])) > 40) + 21
+    mask = filters.mask(close, indices)
+    values, ema_values = rsi(close)[indices], ema(close)[indices]
+    crash = close[indices] < close[indices - 1]
+    assert np.array_equal(mask, np.where(crash, (values <= 30) & (close[indices] < ema_values),
+                                         (values >= 70) & (close[indices] > ema_values)))
+    print(f"✓ {mask.sum()} of {len(indices)} spike entries pass the EA filters")
+
+def test_scorer_recommender_and_prompt():
+    """The outcome scorer skips filtered entries; the recommender and prompt get the values"""
+    print("\n=== Testing Scorer, Recommender and Prompt ===")
+    bars = generate_bars()
+    rec = {'spike_threshold': 40.0, 'cooldown_seconds': 0, 'stop_loss_pips': 30.0, 'take_profit_pips': 60.0}
+    plain, filtered = OutcomeScorer(), OutcomeScorer(filters=EntryFilters(overbought=101.0, oversold=-1.0))
+    for scorer in (plain, filtered):
+        scorer.record('CRASH', rec, bars['time'][100], 'local')
+        scorer.update('CRASH', bars)
+    totals = plain.snapshot()['symbols']['CRASH']['totals']
+    assert totals['trades'] > 0 and totals['filtered'] == 0
+    totals = filtered.snapshot()['symbols']['CRASH']['totals']
+    assert totals['trades'] == 0 and totals['filtered'] > 0
+
+    indicators = IndicatorEngine().update('CRASH', bars)
+    spikes = [{'spike_size': 100.0, 'max_retracement': r, 'is_crash': True, 'bar_index': i}
+              for i, r in ((10, 5.0), (40, 10.0), (90, 15.0))]
+    result = LocalRecommender().recommend(spikes, 1000, indicators=dict(indicators, atr=8.5))
+    assert result['stop_loss_pips'] == 8.5 and 'ATR(14) 8.50' in result['reasoning']
+
+    import ai_backend_server as server
+    prompt = server.ai_analyzer._create_analysis_prompt([], {'indicators': indicators,
+                                                             'volatility': indicators['volatility']})
+    assert 'INDICATORS' in prompt and f"RSI(14): {indicators['rsi']:.1f}" in prompt
+    assert f"Volatility: {indicators['volatility']}" in prompt
+
+    client = server.app.test_client()
+    server.timeframe_store.ingest_bars('IND CRASH', {f: bars[f][-1000:] for f in bars})
+    try:
+        body = client.get('/indicators/IND CRASH').get_json()
+        assert body['bar_time'] == bars['time'][-1] and close_enough(body['rsi'], indicators['rsi'], 1e-6)
+        assert client.get('/indicators/NOTHING').status_code == 404
+    finally:
+        server.timeframe_store.m1.pop('IND CRASH', None)
+        server.timeframe_store.resamplers.pop('IND CRASH', None)
+        server.indicator_engine.symbols.pop('IND CRASH', None)
+    print(f"✓ {totals['filtered']} entries filtered; RSI {indicators['rsi']:.1f} in the prompt and /indicators")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_batch_matches_mt5,
+        test_incremental_matches_batch,
+        test_entry_filters,
+        test_scorer_recommender_and_prompt,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared market-data plane
+Checks bar deduplication across terminals and one analysis per symbol and bar
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+# Keep the server import out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from market_data import MarketDataPlane
+from timeframes import TIMEFRAMES, TimeframeStore, aggregate_bars
+
+START = 1700000040  # minute-aligned
+
+def make_bars(first, count, offset=0.0):
+    """M1 bar arrays for `count` minutes starting at bar index `first`"""
+    close = 10000 + np.arange(first, first + count, dtype=np.float64) + offset
+    return {
+        'time': START + 60 * np.arange(first, first + count, dtype=np.int64),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+    }
+
+def test_terminals_merge_into_one_series():
+    """Overlapping uploads from several terminals keep one copy of each bar"""
+    print("=== Testing Bar Deduplication ===")
+    store = TimeframeStore()
+    plane = MarketDataPlane(store)
+    assert plane.ingest('CRASH', make_bars(0, 100)) == 100
+    # Nine more terminals post the same last 20 bars; only the forming bar is re-taken
+    for _ in range(9):
+        assert plane.ingest('CRASH', make_bars(80, 20)) == 1
+    # A terminal with deeper history backfills, another brings the next bar
+    assert plane.ingest('CRASH', make_bars(-50, 60)) == 50
+    assert plane.ingest('CRASH', make_bars(95, 6, offset=0.5)) == 2
+
+    series = store.get_bars('CRASH', 'M1', 1000)
+    assert len(series['time']) == 151 and np.all(np.diff(series['time']) == 60)
+    assert plane.bar_range('CRASH') == (START - 50 * 60, START + 100 * 60)
+    assert series['close'][-2] == 10099.5  # the forming bar took the latest upload
+    counters = plane.stats()['CRASH']
+    assert counters['posts'] == 12 and counters['bars_merged'] == 161
+    print(f"✓ {counters['bars_received']} bars posted, {len(series['time'])} kept")
+
+def test_bar_counts():
+    """Zero or negative counts give no bars, not the whole series; /timeframes rejects them"""
+    print("\n=== Testing Bar Counts ===")
+    store = TimeframeStore()
+    store.ingest_bars('CRASH', make_bars(0, 100))
+    for timeframe in ('M1', 'M5'):
+        for count in (0, -1, -500):
+            bars = store.get_bars('CRASH', timeframe, count)
+            assert all(len(values) == 0 for values in bars.values()), (timeframe, count)
+            assert bars['close'].dtype == np.float64
+    assert list(store.get_bars('CRASH', 'M1', 3)['time']) == list(START + 60 * np.arange(97, 100))
+    assert len(store.get_bars('CRASH', 'M5', 2)['time']) == 2
+
+    import ai_backend_server as server
+    client = server.app.test_client()
+    server.timeframe_store.ingest_bars('COUNT CRASH', make_bars(0, 100))
+    try:
+        for count in (0, -3):
+            response = client.get(f'/timeframes/COUNT CRASH?tf=M1&count={count}')
+            assert response.status_code == 400 and 'count' in response.get_json()['error']
+        response = client.get('/timeframes/COUNT CRASH?tf=M5&count=2')
+        assert response.status_code == 200 and len(response.get_json()['bars']) == 2
+    finally:
+        server.timeframe_store.m1.pop('COUNT CRASH', None)
+        server.timeframe_store.resamplers.pop('COUNT CRASH', None)
+    print("✓ counts <= 0 return no bars; /timeframes answers 400")
+
+def test_backfill_reaches_higher_timeframes():
+    """Backfilled and out-of-order M1 bars re-aggregate the higher-timeframe buckets they fall in"""
+    print("\n=== Testing Resampler Backfill ===")
+    rng = np.random.default_rng(7)
+    store = TimeframeStore()
+    posts = [(120, 200), (300, 10), (0, 130), (150, 30), (250, 60), (-40, 20), (200, 5)]
+    for first, count in posts:
+        bars = make_bars(first, count, offset=float(rng.normal()))
+        bars['high'] = bars['high'] + rng.uniform(0, 5, count)
+        bars['low'] = bars['low'] - rng.uniform(0, 5, count)
+        store.ingest_bars('CRASH', bars)
+        m1 = store.get_bars('CRASH', 'M1', 10000)
+        for timeframe, seconds in TIMEFRAMES.items():
+            expected = aggregate_bars(m1, seconds)
+            actual = store.get_bars('CRASH', timeframe, 10000)
+            for field in expected:
+                assert np.array_equal(actual[field], expected[field]), (first, timeframe, field)
+    print(f"✓ {len(posts)} out-of-order posts: M5/M15/H1 match a batch resample of the M1 series")
+
+def test_one_analysis_per_bar():
+    """Concurrent requests for the same bar share one computation"""
+    print("\n=== Testing Shared Analysis ===")
+    plane = MarketDataPlane(TimeframeStore())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'spike_threshold': 60.0}
+
+    statuses = []
+    def request():
+        result, status = plane.analysis('BOOM', START, compute, timeout=5)
+        assert result == {'spike_threshold': 60.0}
+        statuses.append(status)
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and statuses.count('computed') == 1
+    assert plane.analysis('BOOM', START, compute)[1] == 'shared'
+    assert plane.analysis('BOOM', START + 60, compute)[1] == 'computed' and len(calls) == 2
+    print(f"✓ 21 requests, 1 computation; statuses {sorted(set(statuses))}")
+
+def test_waiter_timeout_and_failure():
+    """Waiters give up at their deadline and a failed computation is retried"""
+    print("\n=== Testing Timeouts and Failures ===")
+    plane = MarketDataPlane(TimeframeStore())
+    release = threading.Event()
+    owner = threading.Thread(target=plane.analysis, args=('X', START, lambda: release.wait(5) and {}))
+    owner.start()
+    time.sleep(0.02)
+    assert plane.analysis('X', START, dict, timeout=0.01) == (None, 'timeout')
+    release.set()
+    owner.join()
+
+    def fail():
+        raise RuntimeError("upstream down")
+    try:
+        plane.analysis('Y', START, fail)
+        assert False, "expected the computation error"
+    except RuntimeError:
+        pass
+    assert plane.analysis('Y', START, lambda: {'ok': True}) == ({'ok': True}, 'computed')
+    print("✓ Timed-out waiter returned without a result; failed bar recomputed")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_terminals_merge_into_one_series,
+        test_bar_counts,
+        test_backfill_reaches_higher_timeframes,
+        test_one_analysis_per_bar,
+        test_waiter_timeout_and_failure,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
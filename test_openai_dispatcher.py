@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI dispatcher
+Runs against a local stand-in for the completions API that emits 429s
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from openai_dispatcher import DispatcherBusy, OpenAIDispatcher
+
+COMPLETION = {
+    "spike_threshold": 60, "cooldown_seconds": 240, "stop_loss_pips": 15,
+    "take_profit_pips": 35, "risk_score": 4, "confidence": 80,
+    "market_trend": "Bullish", "reasoning": "Stand-in completion"
+}
+
+class StandIn:
+    """Local completions endpoint: the first `rate_limited` calls get 429"""
+
+    def __init__(self, rate_limited=0, retry_after=None, delay=0.0):
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak_active = 0
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stand_in.lock:
+                    stand_in.calls.append((time.monotonic(), body.get('tag')))
+                    limited = len(stand_in.calls) <= stand_in.rate_limited
+                    stand_in.active += 1
+                    stand_in.peak_active = max(stand_in.peak_active, stand_in.active)
+                try:
+                    time.sleep(stand_in.delay)
+                    if limited:
+                        self.send_response(429)
+                        if stand_in.retry_after is not None:
+                            self.send_header('Retry-After', str(stand_in.retry_after))
+                        payload = b'{"error": {"message": "Rate limit reached"}}'
+                    else:
+                        self.send_response(200)
+                        payload = json.dumps({"choices": [{"message": {"content": json.dumps(COMPLETION)}}]}).encode()
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stand_in.lock:
+                        stand_in.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def test_retries_honour_retry_after():
+    """429s are retried after the server's Retry-After, then succeed"""
+    print("=== Testing Retry-After Backoff ===")
+    stand_in = StandIn(rate_limited=2, retry_after=0.3)
+    dispatcher = OpenAIDispatcher(max_concurrent=2, base_delay=0.01, max_delay=0.05)
+    try:
+        start = time.monotonic()
+        result = dispatcher.post_json(stand_in.url, {}, {"tag": "a"})
+        elapsed = time.monotonic() - start
+    finally:
+        stand_in.close()
+    assert result['choices'][0]['message']['content']
+    stats = dispatcher.stats()
+    assert stats['rate_limited'] == 2 and stats['retried'] == 2 and stats['succeeded'] == 1
+    assert elapsed >= 0.6, elapsed
+    print(f"✓ Succeeded after 2 rate-limited attempts in {elapsed:.2f}s")
+
+def test_gives_up_after_max_retries():
+    """A persistently rate-limited call is dropped with the upstream error"""
+    print("\n=== Testing Retry Exhaustion ===")
+    stand_in = StandIn(rate_limited=100)
+    dispatcher = OpenAIDispatcher(max_retries=2, base_delay=0.01, max_delay=0.02)
+    try:
+        try:
+            dispatcher.post_json(stand_in.url, {}, {"tag": "a"})
+            assert False, "expected HTTPError"
+        except requests.HTTPError as e:
+            assert e.response.status_code == 429
+    finally:
+        stand_in.close()
+    stats = dispatcher.stats()
+    assert len(stand_in.calls) == 3 and stats['retried'] == 2 and stats['dropped'] == 1
+    print("✓ Dropped after 3 attempts")
+
+def test_concurrency_cap():
+    """Never more upstream calls in flight than the semaphore allows"""
+    print("\n=== Testing Concurrency Cap ===")
+    stand_in = StandIn(delay=0.05)
+    dispatcher = OpenAIDispatcher(max_concurrent=3)
+    try:
+        threads = [threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": i}))
+                   for i in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        stand_in.close()
+    stats = dispatcher.stats()
+    assert stand_in.peak_active <= 3 and stats['peak_in_flight'] <= 3
+    assert stats['succeeded'] == 15 and stats['in_flight'] == 0 and stats['queued'] == 0
+    print(f"✓ 15 calls with peak {stand_in.peak_active} in flight, peak queue {stats['peak_queued']}")
+
+def test_symbol_priority_order():
+    """Waiting calls for higher-priority symbols are sent first"""
+    print("\n=== Testing Symbol Priority ===")
+    stand_in = StandIn(delay=0.2)
+    dispatcher = OpenAIDispatcher(max_concurrent=1, priorities={"Boom 1000 Index": 0})
+    try:
+        blocker = threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": "blocker"}))
+        blocker.start()
+        time.sleep(0.05)
+        threads = []
+        for tag, symbol in [("low-1", "Crash 500 Index"), ("low-2", "Crash 500 Index"), ("high", "Boom 1000 Index")]:
+            thread = threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": tag}),
+                                      kwargs={"symbol": symbol})
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.02)
+        for thread in [blocker] + threads:
+            thread.join()
+    finally:
+        stand_in.close()
+    order = [tag for _, tag in stand_in.calls]
+    assert order == ["blocker", "high", "low-1", "low-2"], order
+    print(f"✓ Served in order {order}")
+
+def test_queue_bound_drops():
+    """Calls beyond the queue bound are dropped immediately"""
+    print("\n=== Testing Queue Bound ===")
+    stand_in = StandIn(delay=0.3)
+    dispatcher = OpenAIDispatcher(max_concurrent=1, max_queue=1)
+    try:
+        first = threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": 1}))
+        second = threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": 2}))
+        first.start()
+        time.sleep(0.05)
+        second.start()
+        time.sleep(0.05)
+        try:
+            dispatcher.post_json(stand_in.url, {}, {"tag": 3})
+            assert False, "expected DispatcherBusy"
+        except DispatcherBusy:
+            pass
+        first.join()
+        second.join()
+    finally:
+        stand_in.close()
+    assert dispatcher.stats()['dropped'] == 1 and len(stand_in.calls) == 2
+    print("✓ Third call dropped while one runs and one waits")
+
+def test_deadline_expires_wait():
+    """A caller with a deadline gives up on a busy or paused dispatcher instead of waiting forever"""
+    print("\n=== Testing Caller Deadlines ===")
+    stand_in = StandIn(delay=0.5)
+    dispatcher = OpenAIDispatcher(max_concurrent=1)
+    try:
+        first = threading.Thread(target=dispatcher.post_json, args=(stand_in.url, {}, {"tag": 1}))
+        first.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        try:
+            dispatcher.post_json(stand_in.url, {}, {"tag": 2}, deadline=started + 0.1)
+            assert False, "expected DispatcherBusy"
+        except DispatcherBusy:
+            pass
+        assert 0.09 < time.monotonic() - started < 0.3
+        first.join()
+
+        dispatcher.paused_until = time.monotonic() + 5.0  # a Retry-After pause outlasting the deadline
+        started = time.monotonic()
+        try:
+            dispatcher.post_json(stand_in.url, {}, {"tag": 3}, deadline=started + 1.0)
+            assert False, "expected DispatcherBusy"
+        except DispatcherBusy:
+            pass
+        assert time.monotonic() - started < 0.05
+    finally:
+        stand_in.close()
+    stats = dispatcher.stats()
+    assert stats['expired'] == 2 and stats['queued'] == 0 and len(stand_in.calls) == 1
+    print("✓ Waits past the deadline or behind a longer pause raise DispatcherBusy")
+
+def test_hedged_tiers_respect_deadline():
+    """Hedged tiers queued behind a full dispatcher give up at the deadline and free their threads"""
+    print("\n=== Testing Hedged Deadline ===")
+    import ai_backend_server as server
+    stand_in = StandIn(delay=1.0)
+    analyzer = server.AIAnalyzer()
+    analyzer.engine = 'openai'
+    analyzer.stream = False
+    analyzer.base_url = stand_in.url
+    analyzer.dispatcher = OpenAIDispatcher(max_concurrent=1)
+    spikes = [{'timestamp': '', 'price': 10000.0, 'spike_size': 80.0, 'is_crash': True, 'bar_index': 5,
+               'recovery_time': 120, 'recovery_bars': 2, 'recovered': True, 'max_retracement': 40.0}]
+    try:
+        busy = threading.Thread(target=analyzer.dispatcher.post_json, args=(stand_in.url, {}, {"tag": 0}))
+        busy.start()
+        time.sleep(0.05)
+        recommendations = analyzer.analyze_spikes(spikes, {'symbol': 'Crash 500 Index', 'bar_count': 20},
+                                                  deadline=0.2)
+        assert recommendations['tier'] in ('local', 'default')
+        time.sleep(0.1)
+        # Neither tier is left waiting for a slot once the response has gone out
+        assert analyzer.dispatcher.stats()['queued'] == 0
+        busy.join()
+    finally:
+        stand_in.close()
+        analyzer.executor.shutdown(wait=False)
+    assert analyzer.dispatcher.stats()['expired'] >= 1 and len(stand_in.calls) == 1
+    print(f"✓ Answered from {recommendations['tier']} tier; queued tiers expired")
+
+def test_analyzer_recovers_from_429():
+    """AIAnalyzer returns a primary-tier answer instead of defaults after a 429"""
+    print("\n=== Testing AIAnalyzer Integration ===")
+    os.environ.setdefault('RECOMMENDER_ENGINE', 'openai')
+    import ai_backend_server as server
+    stand_in = StandIn(rate_limited=1, retry_after=0.1)
+    analyzer = server.AIAnalyzer()
+    analyzer.engine = 'openai'
+    analyzer.stream = False
+    analyzer.base_url = stand_in.url
+    spikes = [{'timestamp': '', 'price': 10000.0, 'spike_size': 80.0, 'is_crash': True, 'bar_index': 5,
+               'recovery_time': 120, 'recovery_bars': 2, 'recovered': True, 'max_retracement': 40.0}]
+    try:
+        recommendations = analyzer.analyze_spikes(spikes, {'symbol': 'Crash 500 Index', 'bar_count': 20})
+    finally:
+        stand_in.close()
+    assert recommendations['tier'] == 'primary'
+    assert recommendations['spike_threshold'] == 60.0
+    assert analyzer.dispatcher.stats()['rate_limited'] == 1
+    print("✓ Primary recommendations returned after one 429")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_retries_honour_retry_after,
+        test_gives_up_after_max_retries,
+        test_concurrency_cap,
+        test_symbol_priority_order,
+        test_queue_bound_drops,
+        test_deadline_expires_wait,
+        test_hedged_tiers_respect_deadline,
+        test_analyzer_recovers_from_429,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
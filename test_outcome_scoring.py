@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for recommendation outcome scoring
+Checks incremental vectorized scoring against a bar-by-bar replay of the EA
+"""
+
+import numpy as np
+
+from outcome_scoring import OutcomeScorer, merge_snapshots
+
+RECOMMENDATION = {
+    'spike_threshold': 60.0, 'cooldown_seconds': 300, 'stop_loss_pips': 40.0,
+    'take_profit_pips': 70.0, 'confidence': 75.0, 'tier': 'primary'
+}
+
+def generate_bars(bars=3000, seed=11):
+    """M1 OHLC bars with spikes that partly snap back"""
+    rng = np.random.default_rng(seed)
+    changes = rng.normal(0, 6, bars)
+    spike_bars = rng.choice(bars - 1, bars // 30, replace=False)
+    jumps = rng.choice([-1, 1], len(spike_bars)) * rng.uniform(60, 200, len(spike_bars))
+    changes[spike_bars] += jumps
+    changes[spike_bars + 1] -= jumps * rng.uniform(0.2, 1.0, len(spike_bars))
+    close = 10000 + np.cumsum(changes)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    wick = np.abs(rng.normal(0, 8, bars))
+    return {
+        'time': 1700000000 + np.arange(bars, dtype=np.int64) * 60,
+        'open': open_,
+        'high': np.maximum(open_, close) + wick,
+        'low': np.minimum(open_, close) - wick[::-1],
+        'close': close,
+    }
+
+def brute_force(bars, issue_index, rec, max_hold):
+    """Walk the bars one at a time the way the EA and the broker would"""
+    close, high, low, times = bars['close'], bars['high'], bars['low'], bars['time']
+    n = len(close)
+    trades, last_trade = [], None
+    for i in range(max(issue_index + 1, 2), n - 1):
+        current = abs(close[i] - close[i - 1])
+        previous = abs(close[i - 1] - close[i - 2])
+        if current < rec['spike_threshold'] or previous >= rec['spike_threshold'] * 0.5:
+            continue
+        if last_trade is not None and times[i] - last_trade < rec['cooldown_seconds']:
+            continue
+        last_trade = times[i]
+        buy = close[i] < close[i - 1]
+        entry = close[i]
+        tp = entry + rec['take_profit_pips'] if buy else entry - rec['take_profit_pips']
+        sl = entry - rec['stop_loss_pips'] if buy else entry + rec['stop_loss_pips']
+        outcome, pnl = 'open', None
+        for j in range(i + 1, min(i + max_hold, n - 1) + 1):
+            sl_hit = low[j] <= sl if buy else high[j] >= sl
+            tp_hit = high[j] >= tp if buy else low[j] <= tp
+            if sl_hit:
+                outcome, pnl = 'sl', -rec['stop_loss_pips']
+                break
+            if tp_hit:
+                outcome, pnl = 'tp', rec['take_profit_pips']
+                break
+        if outcome == 'open' and i + max_hold <= n - 1:
+            outcome = 'expired'
+            pnl = (close[i + max_hold] - entry) * (1 if buy else -1)
+        trades.append((int(times[i]), outcome, pnl))
+    return trades
+
+def slice_bars(bars, stop):
+    return {name: values[:stop] for name, values in bars.items()}
+
+def test_incremental_matches_brute_force():
+    """Scoring bar batches as they arrive matches one bar-by-bar replay"""
+    print("=== Testing Incremental Scoring ===")
+    bars = generate_bars()
+    scorer = OutcomeScorer(max_hold_bars=120)
+    issue_index = 100
+    scorer.update('CRASH', slice_bars(bars, issue_index + 1))
+    scorer.record('CRASH', RECOMMENDATION, bars['time'][issue_index], 'gpt-4', 850.0)
+    for stop in range(issue_index + 1, len(bars['time']) + 1, 37):
+        scorer.update('CRASH', slice_bars(bars, stop))
+    scorer.update('CRASH', bars)
+
+    expected = brute_force(bars, issue_index, RECOMMENDATION, 120)
+    trades = scorer.history('CRASH')[0]['trades']
+    assert len(trades) == len(expected) > 10, (len(trades), len(expected))
+    for trade, (entry_time, outcome, pnl) in zip(trades, expected):
+        assert trade['entry_time'] == entry_time
+        assert trade['outcome'] == outcome, (trade, outcome)
+        if outcome != 'open':
+            assert abs(trade['pnl_points'] - pnl) < 1e-6
+    print(f"✓ {len(trades)} trades match: "
+          f"{sum(t['outcome'] == 'tp' for t in trades)} TP, {sum(t['outcome'] == 'sl' for t in trades)} SL")
+
+def test_superseded_recommendation_stops_entering():
+    """Only the active recommendation opens trades; older ones still resolve"""
+    print("\n=== Testing Recommendation Handover ===")
+    bars = generate_bars(2000, seed=5)
+    scorer = OutcomeScorer(max_hold_bars=60)
+    scorer.update('BOOM', slice_bars(bars, 101))
+    scorer.record('BOOM', RECOMMENDATION, bars['time'][100], 'gpt-4')
+    scorer.update('BOOM', slice_bars(bars, 1001))
+    scorer.record('BOOM', {**RECOMMENDATION, 'tier': 'local'}, bars['time'][1000], 'local')
+    scorer.update('BOOM', bars)
+
+    newer, older = scorer.history('BOOM')
+    assert all(t['entry_time'] <= bars['time'][1000] for t in older['trades'])
+    assert all(t['entry_time'] > bars['time'][1000] for t in newer['trades'])
+    assert older['superseded_at'] == bars['time'][1000] and newer['superseded_at'] is None
+
+    summary = merge_snapshots([scorer.snapshot()])
+    assert set(summary['models']) == {'gpt-4', 'local'}
+    total = summary['symbols']['BOOM']
+    assert total['recommendations'] == 2
+    assert total['trades'] == len(older['trades']) + len(newer['trades'])
+    assert total['tp_hits'] + total['sl_hits'] + total['expired'] + total['open'] == total['trades']
+    print(f"✓ {len(older['trades'])} trades before handover, {len(newer['trades'])} after; "
+          f"PnL {total['pnl_points']} points")
+
+def test_merge_across_processes():
+    """Snapshots from several shard workers add up"""
+    print("\n=== Testing Snapshot Merge ===")
+    bars = generate_bars(1500, seed=9)
+    snapshots = []
+    for symbol in ('A', 'B'):
+        scorer = OutcomeScorer()
+        scorer.update(symbol, slice_bars(bars, 11))
+        scorer.record(symbol, RECOMMENDATION, bars['time'][10], 'gpt-4', 1000.0)
+        scorer.update(symbol, bars)
+        snapshots.append(scorer.snapshot())
+    merged = merge_snapshots(snapshots)
+    single = merged['symbols']['A']
+    assert merged['models']['gpt-4']['trades'] == 2 * single['trades']
+    assert abs(merged['models']['gpt-4']['pnl_points'] - 2 * single['pnl_points']) < 1e-3
+    assert merged['models']['gpt-4']['avg_latency_ms'] == 1000.0
+    print("✓ Per-model totals are the sum of per-worker totals")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_incremental_matches_brute_force,
+        test_superseded_recommendation_stops_entering,
+        test_merge_across_processes,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the background precompute scheduler
+Checks read-adaptive cadence, jittered phases, busy retries and idle drops, and precompute in the server
+"""
+
+import os
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from precompute_scheduler import PrecomputeScheduler
+
+START = 1700000040  # minute-aligned
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def simulate(scheduler, clock, seconds, reads):
+    """Advance the clock a second at a time, reading each symbol every reads[symbol] seconds"""
+    for second in range(seconds):
+        clock.now = float(second)
+        for symbol, every in reads.items():
+            if second % every == 0:
+                scheduler.track(symbol, hit=True)
+        scheduler.run_due()
+
+def test_cadence_follows_reads():
+    """Busier symbols are refreshed more often, within the interval bounds, most-read first"""
+    print("=== Testing Read-Adaptive Cadence ===")
+    clock, runs = Clock(), []
+    scheduler = PrecomputeScheduler(lambda symbol, context, ahead: runs.append((clock.now, symbol)) or 'shared',
+                                    clock=clock, seed=1)
+    simulate(scheduler, clock, 7200, {'HOT': 5, 'WARM': 60, 'COLD': 300})
+    counts = {symbol: sum(1 for _, s in runs if s == symbol) for symbol in ('HOT', 'WARM', 'COLD')}
+    stats = scheduler.stats()['symbols']
+    assert stats['HOT']['interval_seconds'] == 15.0  # 12 reads a minute, clamped to min_interval
+    assert 50 < stats['WARM']['interval_seconds'] < 70 and 250 < stats['COLD']['interval_seconds'] < 350
+    assert counts['HOT'] > 3 * counts['WARM'] > 3 * counts['COLD'] > 0, counts
+    assert scheduler.stats()['hit_rate'] == 1.0
+
+    clock.now += 1000
+    for symbol in ('COLD', 'HOT', 'WARM'):
+        scheduler.symbols[symbol].next_run = 0
+    assert scheduler.due() == ['HOT', 'WARM', 'COLD']
+    print(f"✓ runs over two hours: {counts}")
+
+def test_jitter_spreads_load():
+    """Symbols that start together and are read in lockstep do not refresh together"""
+    print("\n=== Testing Jittered Phases ===")
+    clock, runs = Clock(), []
+    scheduler = PrecomputeScheduler(lambda symbol, context, ahead: runs.append(clock.now) or 'shared',
+                                    clock=clock, seed=2)
+    # Forty terminals' symbols, all read on the same 60s InpAnalysisInterval
+    simulate(scheduler, clock, 3600, {f'SYM{i}': 60 for i in range(40)})
+    per_second = np.bincount(np.array(runs, dtype=np.int64))
+    assert len(runs) > 40 * 40 and per_second.max() <= 6, per_second.max()
+    assert (per_second[:60] > 0).sum() > 20  # first runs land across the first interval
+    print(f"✓ {len(runs)} runs, at most {per_second.max()} in any second (40 symbols read together)")
+
+def test_busy_retry_and_idle_drop():
+    """A run shed for lack of capacity retries soon; unread symbols are dropped unless pinned"""
+    print("\n=== Testing Busy Retry and Idle Drop ===")
+    clock, statuses = Clock(), ['busy', 'computed']
+    scheduler = PrecomputeScheduler(lambda symbol, context, ahead: statuses.pop(0) if statuses else 'shared',
+                                    min_interval=15, max_interval=600, idle_seconds=900, clock=clock, seed=3)
+    scheduler.track('A', {'spread': 2})
+    scheduler.pin(['PINNED'])
+    clock.now = scheduler.symbols['A'].next_run
+    scheduler.symbols['PINNED'].next_run = 10 ** 6
+    assert scheduler.run_due() == 1 and scheduler.symbols['A'].last_status == 'busy'
+    assert scheduler.symbols['A'].next_run - clock.now <= 15 * 1.2
+    clock.now = scheduler.symbols['A'].next_run
+    scheduler.run_due()
+    assert scheduler.symbols['A'].statuses == {'busy': 1, 'computed': 1}
+    assert scheduler.symbols['A'].context == {'spread': 2}
+
+    scheduler.read('UNTRACKED')
+    assert 'UNTRACKED' not in scheduler
+    clock.now += 900
+    scheduler.due()
+    assert 'A' not in scheduler and 'PINNED' in scheduler and scheduler.dropped == 1
+    print("✓ busy runs retried after min_interval; idle symbols dropped, pinned ones kept")
+
+def test_server_precompute():
+    """A precomputed analysis is what the next client request is served, and refreshes expiring epochs"""
+    print("\n=== Testing Server Precompute ===")
+    import ai_backend_server as server
+    server.ai_analyzer.engine = 'local'  # offline: local statistics instead of OpenAI calls
+    regime_trigger = server.REGIME_TRIGGER
+    symbol = 'PRECOMPUTE CRASH'
+    index = np.arange(700)  # enough bars for the regime detectors' warm-up
+    closes = 10000 + np.cumsum(np.where(index % 40 == 0, -120.0, 0.5))
+    payload = {'time': (START + 60 * index).tolist(), 'close': closes.tolist()}
+    try:
+        server.REGIME_TRIGGER = False
+        assert server.precompute_symbol('NO BARS', {}, 60.0) == 'regime_off'
+        server.REGIME_TRIGGER = True
+        assert server.precompute_symbol('NO BARS', {}, 60.0) == 'need_bars'
+        status, body, _ = server.analyze_symbol(symbol, server.parse_price_data(payload), {'spread': 3})
+        assert status == 200 and body['analysis'] == 'computed'
+        assert server.precompute.symbols[symbol].context == {'spread': 3}
+
+        # Unchanged epoch: the background run shares the analysis the client computed
+        deadlines, run_analysis = [], server.run_analysis
+        server.run_analysis = lambda *args: deadlines.append(args[3]) or run_analysis(*args)
+        try:
+            assert server.precompute_symbol(symbol, {'spread': 3}, 60.0) == 'shared'
+        finally:
+            server.run_analysis = run_analysis
+        assert deadlines == [server.PRECOMPUTE_DEADLINE_MS / 1000.0]
+        # An epoch about to reach max_age is replaced in the background, not on the next request
+        epoch = server.regime_detector.symbols[symbol].epoch
+        server.regime_detector.symbols[symbol].epoch_started -= server.REGIME_MAX_AGE_SECONDS - 30
+        assert server.precompute_symbol(symbol, {'spread': 3}, 60.0) == 'computed'
+        assert server.regime_detector.symbols[symbol].epoch == epoch + 1
+        assert server.analysis_cache[symbol]['bar_time'] == payload['time'][-1]
+
+        status, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {'spread': 3},
+                                                last_bar_time=payload['time'][-1])
+        assert status == 200 and body['analysis'] == 'shared'
+        stats = server.precompute.stats()['symbols'][symbol]
+        assert stats['reads'] == 2 and stats['hit_rate'] == 0.5
+        assert server.app.test_client().get('/stats').get_json()['precompute']['tracked'] >= 1
+    finally:
+        server.REGIME_TRIGGER = regime_trigger
+        for name in (symbol, 'NO BARS'):
+            server.precompute.symbols.pop(name, None)
+            server.timeframe_store.m1.pop(name, None)
+            server.timeframe_store.resamplers.pop(name, None)
+            server.regime_detector.symbols.pop(name, None)
+            server.market_data.analyses.pop(name, None)
+            server.analysis_cache.pop(name, None)
+    print("✓ background run computed the new epoch; the client's request shared it")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_cadence_follows_reads,
+        test_jitter_spreads_load,
+        test_busy_retry_and_idle_drop,
+        test_server_precompute,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for price_data normalization
+Checks that every payload shape gives the same typed columns and that bad payloads are rejected
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from price_ingest import PriceData, PriceDataError, parse_price_data
+from timeframes import bars_from_price_data
+
+START = 1700000040  # minute-aligned
+
+TIMES = [START, START + 60, START + 120]
+OPEN = [100.5, 101.0, 99.0]
+HIGH = [101.5, 102.0, 100.0]
+LOW = [99.5, 98.0, 97.5]
+CLOSE = [101.0, 99.0, 98.5]
+
+def test_shapes_agree():
+    """Records, columns and MQL strings all parse to the same columns"""
+    print("=== Testing Payload Shapes ===")
+    rows = [f"{t},{o},{h},{l},{c}" for t, o, h, l, c in zip(TIMES, OPEN, HIGH, LOW, CLOSE)]
+    shapes = {
+        'records': [{'time': t, 'open': o, 'high': h, 'low': l, 'close': c}
+                    for t, o, h, l, c in zip(TIMES, OPEN, HIGH, LOW, CLOSE)],
+        'columns': {'time': TIMES, 'open': OPEN, 'high': HIGH, 'low': LOW, 'close': CLOSE},
+        'text': ';'.join(rows) + '\x00\x00',
+        'string list': [row + '\x00' for row in rows],
+        'float times': {'time': [float(t) for t in TIMES], 'open': OPEN, 'high': HIGH, 'low': LOW, 'close': CLOSE},
+    }
+    for name, payload in shapes.items():
+        data = parse_price_data(payload)
+        assert data.time.typecode == 'q' and data.close.typecode == 'd', name
+        assert (list(data.time), list(data.open), list(data.high), list(data.low), list(data.close)) == \
+            (TIMES, OPEN, HIGH, LOW, CLOSE), name
+    print(f"✓ {len(shapes)} shapes give identical typed columns")
+
+def test_closes_only():
+    """Bare closes, as floats or as an MQL string, share one array for every price column"""
+    print("\n=== Testing Close-Only Payloads ===")
+    for payload in (CLOSE, '101.0,99.0,98.5\x00', ['101.0\x00', '99.0', '98.5']):
+        data = parse_price_data(payload)
+        assert list(data.close) == CLOSE and data.time is None
+        assert data.open is data.close and data.low is data.close
+    assert len(parse_price_data([])) == 0 and len(parse_price_data(None)) == 0
+    assert len(parse_price_data('\x00')) == 0
+
+    # The main server views the arrays in numpy and stamps bars back from the current minute
+    bars = bars_from_price_data(pickle.loads(pickle.dumps(parse_price_data(CLOSE))), now=START + 125)
+    assert list(bars['time']) == TIMES and np.array_equal(bars['close'], CLOSE)
+    print("✓ float list, closes string and string list; pickles for shard workers")
+
+def test_rejects_bad_payloads():
+    """Invalid payloads raise PriceDataError with a reason instead of failing later"""
+    print("\n=== Testing Validation ===")
+    bad = {
+        'NaN': [101.0, float('nan')],
+        'negative': [101.0, -1.0],
+        'missing close': [{'open': 1.0}],
+        'ragged columns': {'close': [1.0, 2.0], 'open': [1.0]},
+        'high below low': [{'close': 100.0, 'high': 99.0, 'low': 99.5}],
+        'mixed types': [1.0, 'x'],
+        'text': 'abc',
+        'ragged rows': '1,2,3,4;1,2,3',
+        'number': 5,
+    }
+    for name, payload in bad.items():
+        try:
+            parse_price_data(payload)
+            assert False, f"{name} accepted"
+        except PriceDataError:
+            pass
+    assert isinstance(parse_price_data(CLOSE), PriceData)
+    print(f"✓ {len(bad)} malformed payloads rejected")
+
+def test_servers_reject_with_400():
+    """Both servers answer a malformed price_data with 400 instead of 500"""
+    print("\n=== Testing Server Responses ===")
+    import ai_backend_server
+    import ai_backend_server_simple
+    for module in (ai_backend_server, ai_backend_server_simple):
+        client = module.app.test_client()
+        response = client.post('/analyze', json={'symbol': 'X', 'price_data': [1.0, float('inf')]})
+        assert response.status_code == 400, (module.__name__, response.status_code)
+    response = ai_backend_server_simple.app.test_client().post(
+        '/analyze', json={'symbol': 'X', 'price_data': [{'time': t, 'close': c} for t, c in zip(TIMES, CLOSE)]})
+    assert response.status_code == 200 and response.get_json()['success']
+    print("✓ 400 from both servers; the simple server now accepts OHLC records")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_shapes_agree,
+        test_closes_only,
+        test_rejects_bad_payloads,
+        test_servers_reject_with_400,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for on-demand request profiling
+Checks that the X-Profile header is opt-in and that overlapping cProfile requests fall back to sampling
+"""
+
+import os
+import tempfile
+import threading
+
+from profiling import Profiler
+
+def busy(started, release):
+    started.set()
+    release.wait(5)
+    return sum(range(10000))
+
+def test_header_needs_opt_in():
+    """Clients cannot turn profiling on by header unless the server allows it"""
+    print("=== Testing X-Profile Opt-In ===")
+    with tempfile.TemporaryDirectory() as root:
+        profiler = Profiler(root)
+        assert profiler.requested('BOOM', 'cprofile') is None and profiler.requested('BOOM', None) is None
+        profiler.arm(1, mode='sampling')
+        assert profiler.requested('BOOM', 'cprofile') == 'sampling' and profiler.requested('BOOM', None) is None
+
+        profiler.allow_header = True
+        assert profiler.requested('BOOM', 'sampling') == 'sampling' and profiler.requested('BOOM', 'yes') == 'cprofile'
+        assert profiler.requested('BOOM', 'off') is None and profiler.stats()['header_enabled']
+    print("✓ header ignored by default, honored with allow_header")
+
+def test_overlapping_cprofile_samples():
+    """A cProfile request that overlaps another one is sampled instead of failing"""
+    print("\n=== Testing Overlapping cProfile ===")
+    with tempfile.TemporaryDirectory() as root:
+        profiler = Profiler(root)
+        started, release = threading.Event(), threading.Event()
+        names = []
+        first = threading.Thread(target=lambda: names.append(profiler.run('cprofile', 'first', busy, started, release)[1]))
+        first.start()
+        assert started.wait(5)
+        # The first still holds cProfile until the second request lets it finish
+        result, second = profiler.run('cprofile', 'second', lambda: release.set() or 42)
+        first.join()
+        assert result == 42
+        assert '_first_cprofile_' in names[0] and '_second_sampling_' in second, (names, second)
+        assert {p['mode'] for p in profiler.list()} == {'cprofile', 'sampling'}
+
+        # Once the first is done, cProfile is available again
+        assert '_third_cprofile_' in profiler.run('cprofile', 'third', sum, [1, 2])[1]
+        assert profiler.summary(second) is not None and os.path.exists(profiler.path_for(names[0]))
+    print("✓ second concurrent cProfile request stored as a sampling profile")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_header_needs_opt_in,
+        test_overlapping_cprofile_samples,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
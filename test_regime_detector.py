@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for regime-change detection
+Checks detection on known shifts, quiet stationary periods, the analysis epoch rules
+and the server retrying an epoch whose LLM call failed
+"""
+
+import os
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from regime_detector import RegimeDetector
+
+START = 1700000040  # minute-aligned
+
+def generate(segments, seed=4):
+    """M1 closes for consecutive (volatility, spike probability, spike size, bars) segments"""
+    rng = np.random.default_rng(seed)
+    moves = []
+    for volatility, rate, size, length in segments:
+        step = rng.normal(0, volatility, length)
+        spikes = rng.random(length) < rate
+        step[spikes] = -size - rng.exponential(20, spikes.sum())
+        moves.append(step)
+    close = 10000 + np.cumsum(np.concatenate(moves))
+    return {'time': START + 60 * np.arange(len(close), dtype=np.int64), 'close': close}
+
+def stream(detector, symbol, bars, batch=7):
+    """Feed bars the way terminals post them: a growing series, a few new bars at a time"""
+    alarms = []
+    for stop in range(2, len(bars['time']) + batch, batch):
+        alarms.extend(detector.update(symbol, {k: v[:stop] for k, v in bars.items()}))
+    return alarms
+
+def test_detects_volatility_shift():
+    """Doubling volatility raises an alarm shortly after the change, and none before it"""
+    print("=== Testing Volatility Shift ===")
+    bars = generate([(6.0, 1 / 40, 100.0, 2000), (12.0, 1 / 40, 100.0, 1000)])
+    alarms = stream(RegimeDetector(), 'CRASH', bars)
+    change = START + 2000 * 60
+    assert alarms, "no alarm raised"
+    first = alarms[0]
+    assert first['bar_time'] >= change, first
+    assert first['detector'] == 'volatility' and first['direction'] == 'up'
+    assert (first['bar_time'] - change) // 60 < 200
+    assert first['change_bar_time'] <= first['bar_time'] and first['latency_bars'] >= 0
+    print(f"✓ Detected {(first['bar_time'] - change) // 60} bars after the change "
+          f"(estimated start {(first['change_bar_time'] - change) // 60:+d} bars)")
+
+def test_batches_match_single_pass():
+    """Feeding bars in batches gives the same alarms as one pass over the whole series"""
+    print("\n=== Testing Incremental Updates ===")
+    bars = generate([(6.0, 1 / 40, 100.0, 1500), (6.0, 1 / 8, 100.0, 1500)], seed=8)
+    batched = stream(RegimeDetector(), 'BOOM', bars, batch=13)
+    single = RegimeDetector().update('BOOM', {k: np.append(v, v[-1]) for k, v in bars.items()})
+    strip = lambda alarms: [{k: v for k, v in a.items() if k != 'detected_at'} for a in alarms]
+    assert strip(batched) == strip(single) and single
+    assert any(a['detector'] == 'spike_rate' and a['direction'] == 'up' for a in single)
+    print(f"✓ {len(single)} identical alarms either way")
+
+def test_quiet_market_keeps_cached_analysis():
+    """A stationary series triggers at most rare alarms"""
+    print("\n=== Testing Stationary Series ===")
+    bars = generate([(6.0, 1 / 40, 100.0, 6000)], seed=2)
+    alarms = stream(RegimeDetector(), 'QUIET', bars, batch=50)
+    assert len(alarms) <= 2, alarms
+    print(f"✓ {len(alarms)} alarms over {len(bars['time'])} stationary bars")
+
+def test_epoch_rules():
+    """New epochs only on the first request, a pending shift or the max age"""
+    print("\n=== Testing Analysis Epochs ===")
+    detector = RegimeDetector(max_age=600)
+    bars = generate([(6.0, 1 / 40, 100.0, 600), (14.0, 1 / 40, 100.0, 400)], seed=6)
+    detector.update('X', {k: v[:600] for k, v in bars.items()})
+    assert detector.epoch('X', now=0) == (1, 'initial')
+    assert detector.epoch('X', now=300) == (1, None)
+    assert detector.epoch('X', now=600) == (2, 'max_age')
+    assert detector.update('X', bars), "the volatility change was not detected"
+    assert detector.epoch('X', now=601) == (3, 'regime_shift')
+    assert detector.epoch('X', now=602) == (3, None)
+    detector.retry('X', 2, 0, now=602)  # an epoch that has moved on is left alone
+    detector.retry('X', 3, 60, now=602)
+    assert detector.epoch('X', now=650) == (3, None)
+    assert detector.epoch('X', now=662) == (4, 'retry')
+    detector.retry('X', 4, 60, now=662)
+    detector.retry('X', 4, None)
+    assert detector.epoch('X', now=800) == (4, None)
+    stats = detector.stats('X')['X']
+    assert stats['analyses'] == {'initial': 1, 'regime_shift': 1, 'max_age': 1, 'retry': 1}
+    assert stats['served_cached'] == 4 and not stats['retry_pending']
+    print("✓ initial, cached, max_age, regime_shift and retry transitions")
+
+def test_fallback_epoch_retried():
+    """A local-tier answer for a failed LLM call is redone on the next poll; warm-up analyzes per bar"""
+    print("\n=== Testing Fallback Retry ===")
+    import ai_backend_server as server
+    calls = []
+
+    def run_tier(prompt, model, on_update=None, symbol=None, deadline=None):
+        calls.append(model)
+        if len(calls) == 1:
+            return None  # the LLM call fails
+        return server.ai_analyzer._build_recommendations({'spike_threshold': 95, 'reasoning': 'LLM'})
+
+    engine, server.ai_analyzer.engine = server.ai_analyzer.engine, 'openai'
+    server.ai_analyzer._run_tier = run_tier
+    regime_trigger, server.REGIME_TRIGGER = server.REGIME_TRIGGER, True
+    symbol, cold = 'RETRY CRASH', 'COLD CRASH'
+    index = np.arange(700)
+    # Crash spikes every 40 bars that snap most of the way back
+    closes = 10000 + np.cumsum(np.select([index % 40 == 0, index % 40 == 1], [-120.0, 80.0], 0.5))
+    payload = {'time': (START + 60 * index).tolist(), 'close': closes.tolist()}
+    last_bar = payload['time'][-1]
+    try:
+        status, body, _ = server.analyze_symbol(symbol, server.parse_price_data(payload), {})
+        assert status == 200 and body['tier'] == 'local' and server.regime_detector.warm(symbol)
+        assert server.market_data.analyses[symbol].key == ('regime', 1)
+        # Within the retry window other polls share the fallback
+        _, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {}, last_bar_time=last_bar)
+        assert body['analysis'] == 'shared' and body['tier'] == 'local' and len(calls) == 1
+        # The next poll after it gets a fresh LLM call instead of waiting out REGIME_MAX_AGE_SECONDS
+        server.regime_detector.symbols[symbol].retry_at -= server.REGIME_RETRY_SECONDS
+        _, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {}, last_bar_time=last_bar)
+        assert body['analysis'] == 'computed' and body['tier'] == 'primary' and body['spike_threshold'] == 95
+        state = server.regime_detector.stats(symbol)[symbol]
+        assert state['epoch'] == 2 and state['analyses']['retry'] == 1 and not state['retry_pending']
+        _, body, _ = server.analyze_symbol(symbol, server.parse_price_data(None), {}, last_bar_time=last_bar)
+        assert body['analysis'] == 'shared' and body['tier'] == 'primary' and len(calls) == 2
+
+        # A symbol with too few bars for the detectors is keyed per bar
+        short = {k: v[:100] for k, v in payload.items()}
+        server.analyze_symbol(cold, server.parse_price_data(short), {})
+        assert not server.regime_detector.warm(cold) and server.market_data.analyses[cold].key == short['time'][-1]
+    finally:
+        del server.ai_analyzer._run_tier
+        server.ai_analyzer.engine = engine
+        server.REGIME_TRIGGER = regime_trigger
+        for name in (symbol, cold):
+            server.precompute.symbols.pop(name, None)
+            server.timeframe_store.m1.pop(name, None)
+            server.timeframe_store.resamplers.pop(name, None)
+            server.regime_detector.symbols.pop(name, None)
+            server.market_data.analyses.pop(name, None)
+            server.analysis_cache.pop(name, None)
+    print("✓ failed LLM call retried on the next poll after the retry window")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_detects_volatility_shift,
+        test_batches_match_single_pass,
+        test_quiet_market_keeps_cached_analysis,
+        test_epoch_rules,
+        test_fallback_epoch_retried,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
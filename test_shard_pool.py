@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for the symbol-sharded worker pool
+Checks consistent-hash routing, broadcasts and replacing a worker that dies
+"""
+
+import os
+import time
+
+from shard_pool import ConsistentHashRing, ShardPool, worker_index
+
+SYMBOLS = [f"{kind} {size} Index #{i}" for kind in ('Crash', 'Boom') for size in (300, 500, 1000) for i in range(100)]
+
+def test_routing_is_stable():
+    """Every ring built from the same nodes agrees; adding a node only moves keys onto it"""
+    print("=== Testing Consistent-Hash Routing ===")
+    ring = ConsistentHashRing(['0', '1', '2', '3'])
+    owners = {symbol: ring.node_for(symbol) for symbol in SYMBOLS}
+    assert owners == {symbol: ConsistentHashRing(['0', '1', '2', '3']).node_for(symbol) for symbol in SYMBOLS}
+    load = [list(owners.values()).count(str(i)) for i in range(4)]
+    assert min(load) > len(SYMBOLS) / 4 * 0.5, load
+
+    grown = ConsistentHashRing(['0', '1', '2', '3', '4'])
+    moved = [symbol for symbol in SYMBOLS if grown.node_for(symbol) != owners[symbol]]
+    assert all(grown.node_for(symbol) == '4' for symbol in moved)
+    assert 0.1 < len(moved) / len(SYMBOLS) < 0.35, len(moved)
+    print(f"✓ load {load} over 4 nodes; a 5th node took {len(moved)}/{len(SYMBOLS)} symbols, all from others")
+
+def test_pool_routes_and_broadcasts():
+    """Calls for a symbol always run on its owning worker; broadcasts reach every worker once"""
+    print("\n=== Testing Pool Routing and Broadcast ===")
+    pool = ShardPool(3, threads_per_worker=2, timeout=10.0)
+    try:
+        assert pool.broadcast(worker_index) == [0, 1, 2]
+        for symbol in SYMBOLS[::20]:
+            assert pool.call(symbol, worker_index) == pool.shard_for(symbol) == pool.call(symbol, worker_index)
+        pids = pool.broadcast(os.getpid)
+        assert len(set(pids)) == 3 and os.getpid() not in pids
+
+        try:
+            pool.call('Crash 500 Index', divmod, 1, 0)
+            assert False, "exception in a worker not raised"
+        except RuntimeError as e:
+            assert 'ZeroDivisionError' in str(e)
+        stats = pool.stats()
+        assert stats['in_flight'] == 0 and sum(s['failures'] for s in stats['shards']) == 1
+        assert 'Crash 500 Index' in stats['shards'][pool.shard_for('Crash 500 Index')]['symbols']
+    finally:
+        pool.close()
+    print(f"✓ {len(SYMBOLS[::20])} symbols pinned to their shards; broadcast reached 3 workers")
+
+def count_sweep_hits(hits):
+    """Runs in a shard worker: bump its own threshold sweep cache counter"""
+    import ai_backend_server as server
+    server.sweep_cache.hits += hits
+    return server.sweep_cache.hits
+
+def test_stats_add_up_workers():
+    """/stats reports dispatcher and sweep cache counters summed over the workers that hold them"""
+    print("\n=== Testing Stats Across Workers ===")
+    for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+        os.environ.setdefault(name, '1000000')
+    import ai_backend_server as server
+    pool = ShardPool(2, threads_per_worker=2, timeout=10.0)
+    try:
+        server.shard_pool = pool
+        base = server.sweep_cache.hits
+        assert sorted(pool.broadcast(count_sweep_hits, 5)) == [base + 5, base + 5]
+        stats = server.app.test_client().get('/stats').get_json()
+        assert stats['threshold_sweep_cache']['hits'] == 2 * (base + 5) and server.sweep_cache.hits == base
+        dispatcher = server.ai_analyzer.dispatcher.stats()
+        assert stats['openai_dispatcher']['max_concurrent'] == 2 * dispatcher['max_concurrent']
+        assert stats['openai_dispatcher']['max_retries'] == dispatcher['max_retries']
+    finally:
+        server.shard_pool = None
+        pool.close()
+    print(f"✓ sweep cache hits from 2 workers: {stats['threshold_sweep_cache']['hits']}")
+
+def test_dead_worker_is_replaced():
+    """Calls in flight on a worker that dies fail at once; the shard gets a fresh worker"""
+    print("\n=== Testing Worker Recovery ===")
+    pool = ShardPool(2, threads_per_worker=2, timeout=10.0, check_interval=0.05)
+    try:
+        symbol = 'Boom 1000 Index'
+        shard = pool.shard_for(symbol)
+        other = 1 - shard
+        old_pid = pool.call(symbol, os.getpid)
+        slow = pool.submit(symbol, time.sleep, 30)
+        survivor = pool.submit(SYMBOLS[[pool.shard_for(s) for s in SYMBOLS].index(other)], time.sleep, 0.2)
+
+        started = time.monotonic()
+        pool.processes[shard].kill()
+        try:
+            slow.result(5)
+            assert False, "call on a dead worker succeeded"
+        except RuntimeError as e:
+            assert 'died' in str(e), e
+        assert time.monotonic() - started < 2
+        assert survivor.result(5) is None  # the other shard is unaffected
+
+        new_pid = pool.call(symbol, os.getpid)
+        assert new_pid != old_pid and pool.call(symbol, worker_index) == shard
+        stats = pool.stats()['shards']
+        assert stats[shard]['restarts'] == 1 and stats[shard]['alive'] and stats[other]['restarts'] == 0
+        assert pool.stats()['in_flight'] == 0
+    finally:
+        pool.close()
+
+    # A call to a dead shard replaces the worker itself rather than waiting for the monitor
+    pool = ShardPool(2, threads_per_worker=2, timeout=10.0, check_interval=60.0)
+    try:
+        pool.processes[shard].kill()
+        pool.processes[shard].join(5)
+        assert pool.call(symbol, worker_index) == shard and pool.stats()['shards'][shard]['restarts'] == 1
+    finally:
+        pool.close()
+    print("✓ in-flight call failed within 2 s of the worker dying; later calls served by its replacement")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_routing_is_stable,
+        test_pool_routes_and_broadcasts,
+        test_stats_add_up_workers,
+        test_dead_worker_is_replaced,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
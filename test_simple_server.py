@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the simplified backend's AI fallback
+Checks that an unparseable model reply falls back to local statistics, not fixed defaults
+"""
+
+import ai_backend_server_simple as simple
+
+def spikes():
+    return [{'spike_size': 80.0 + 10 * i, 'is_crash': i % 2 == 0, 'recovery_time': 120 + 30 * i,
+             'max_retracement': 15.0 + i, 'index': 40 * i} for i in range(8)]
+
+def test_unparseable_reply_uses_local():
+    """Prose, a JSON array or broken JSON from the model returns the local-tier result"""
+    print("=== Testing AI Reply Fallback ===")
+    analyzer = simple.AIAnalyzer()
+    engine, analyzer.engine = analyzer.engine, 'openai'
+    local = analyzer.local_recommender.recommend(spikes(), 400)
+    defaults = analyzer._get_default_recommendations()
+    assert local != defaults
+    try:
+        for reply in ('I cannot help with that.', '[1, 2, 3]', '{"spike_threshold": 90,', '{not json}'):
+            analyzer._call_openai = lambda prompt, reply=reply: reply
+            result = analyzer.analyze_spikes(spikes(), {'symbol': 'Crash 500 Index', 'bar_count': 400})
+            assert dict(result, timestamp=None) == dict(local, timestamp=None), reply
+
+        # A partial reply keeps the local values for the fields it leaves out; unknown keys are dropped
+        analyzer._call_openai = lambda prompt: ('Here you go: {"spike_threshold": 90, "confidence": 60, '
+                                                '"leverage": 500} Good luck!')
+        result = analyzer.analyze_spikes(spikes(), {'bar_count': 400})
+        assert result == {**local, 'spike_threshold': 90, 'confidence': 60, 'timestamp': result.get('timestamp')}
+    finally:
+        analyzer.engine = engine
+    assert analyzer._parse_ai_response('no json') == defaults
+    assert analyzer.analyze_spikes([], {}) == defaults
+    print(f"✓ 4 unparseable replies answered with local statistics (threshold {local['spike_threshold']})")
+
+def test_partial_reply_through_route():
+    """/analyze answers a partial model reply with every field instead of a 500"""
+    print("\n=== Testing Partial AI Reply ===")
+    analyzer = simple.ai_analyzer
+    engine, analyzer.engine = analyzer.engine, 'openai'
+    analyzer._call_openai = lambda prompt: '{"spike_threshold": 90}'
+    closes = [10000 + (i % 40 == 0) * -120 + (i % 40 == 1) * 80 + 0.5 * i for i in range(400)]
+    try:
+        response = simple.app.test_client().post('/analyze', json={'symbol': 'PARTIAL CRASH',
+                                                                   'price_data': closes})
+        body = response.get_json()
+        assert response.status_code == 200 and body['success'], body
+        assert body['spike_threshold'] == 90 and body['spikes_detected'] > 0
+        assert all(body[k] is not None for k in analyzer._get_default_recommendations())
+    finally:
+        del analyzer._call_openai
+        analyzer.engine = engine
+        simple.analysis_cache.pop('PARTIAL CRASH', None)
+        simple.last_analysis_time.pop('PARTIAL CRASH', None)
+    print(f"✓ partial reply answered 200 with threshold {body['spike_threshold']}, cooldown {body['cooldown_seconds']}")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_unparseable_reply_uses_local,
+        test_partial_reply_through_route,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
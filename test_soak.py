@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for memory snapshots and the soak harness
+Checks leak attribution, drift evaluation, /admin/memory and a short in-process soak
+"""
+
+import os
+import time
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from memory_monitor import MemoryTracker
+from soak_backend import START, InProcessClient, SoakRun, evaluate, print_sample
+
+LIMITS = {'max_rss_growth_mb': 64.0, 'max_traced_growth_mb': 32.0, 'max_fd_growth': 8,
+          'max_latency_drift': 2.0, 'max_errors': 0}
+
+leaked = []
+
+def leak(count):
+    leaked.extend(bytearray(4096) for _ in range(count))
+
+def test_growth_names_the_leak():
+    """tracemalloc growth since the baseline points at the allocating line"""
+    print("=== Testing Memory Snapshot ===")
+    tracker = MemoryTracker()
+    snapshot = tracker.snapshot()
+    assert snapshot['tracemalloc'] is None and snapshot['threads'] >= 1
+    assert snapshot['rss_mb'] is None or snapshot['rss_mb'] > 0
+    tracker.start(1)
+    try:
+        leak(500)
+        snapshot = tracker.snapshot(top=3)
+        growth = snapshot['tracemalloc']['growth']['top'][0]
+        line = leak.__code__.co_firstlineno + 1
+        assert growth['where'].endswith(f'test_soak.py:{line}') and growth['size_diff_kb'] > 1900, growth
+    finally:
+        tracker.stop()
+        leaked.clear()
+    assert tracker.snapshot()['tracemalloc'] is None
+    print(f"✓ {growth['size_diff_kb']:.0f} KB of growth attributed to {os.path.basename(growth['where'])}")
+
+def sample(minute, rss, fds=5, errors=0):
+    return {'minute': minute, 'rss_mb': rss, 'open_fds': fds, 'log_mb': 0.0, 'errors': errors, 'traced_mb': None}
+
+def test_evaluate_flags_drift():
+    """Growth and drift are measured after the warmup and checked against the limits"""
+    print("\n=== Testing Drift Evaluation ===")
+    steady = [[0.010] * 50 for _ in range(8)]
+    flat = [sample(60 * i, 100.0 + (50.0 if i == 0 else 0.0)) for i in range(8)]
+    summary = evaluate(flat, steady, 60, LIMITS)
+    assert summary['failures'] == [] and summary['rss_growth_mb'] == 0.0 and summary['p99_drift'] == 1.0
+
+    growing = [sample(60 * i, 100.0 + 20.0 * i, fds=5 + 3 * i, errors=i) for i in range(8)]
+    slower = [[0.010 * (1 + i)] * 50 for i in range(8)]
+    summary = evaluate(growing, slower, 60, LIMITS)
+    failures = ' / '.join(summary['failures'])
+    assert summary['rss_slope_mb_per_hour'] == 20.0
+    for text in ('RSS grew 120.0 MB', 'descriptors grew by 18', 'p50 latency drifted', 'requests failed'):
+        assert text in failures, failures
+    print(f"✓ {len(summary['failures'])} limits exceeded on a leaking run, none on a flat one")
+
+def test_evaluate_without_process_metrics():
+    """Platforms without /proc report no RSS or descriptors; only the other checks run"""
+    print("\n=== Testing Evaluation Without RSS ===")
+    samples = [sample(60 * i, None, fds=None) for i in range(8)]
+    summary = evaluate(samples, [[0.010] * 50 for _ in range(8)], 60, LIMITS)
+    assert summary['failures'] == [], summary['failures']
+    assert 'rss_growth_mb' not in summary and 'fd_growth' not in summary
+    print_sample(dict(samples[-1], elapsed_s=1.0, requests=10, p50_ms=None, p99_ms=None))
+    print("✓ missing RSS and descriptor counts skipped, not compared as zero")
+
+def test_admin_memory_and_short_soak():
+    """/admin/memory serves live snapshots, and a short simulated soak with rotating symbols stays within the limits"""
+    print("\n=== Testing Admin Endpoint and Soak ===")
+    import ai_backend_server as server
+    client = InProcessClient()
+    status, body = client.request('GET', '/admin/memory')
+    assert status == 200 and body['process']['tracemalloc'] is None and body['shards'] == []
+    assert 'analysis_cache' in body['process']['state'] and isinstance(body['process']['log_bytes'], dict)
+    assert client.request('POST', '/admin/memory', {'frames': 0})[0] == 400
+
+    symbols = ['SOAK A', 'SOAK B']
+    soak = SoakRun(client, symbols, minutes=240, speed=0, sample_every=30, warmup_minutes=60,
+                   tracemalloc_frames=1, concurrency=2, seed=3, rotate_every=60)
+    try:
+        clock = []
+        samples = soak.run(on_sample=lambda s: clock.append(server.regime_detector.clock() - START))
+        summary = evaluate(samples, soak.latencies, 60, dict(LIMITS, max_latency_drift=5.0))
+        assert len(samples) == 8 and samples[-1]['requests'] == 480 and samples[-1]['errors'] == 0
+        assert samples[-1]['traced_mb'] is not None and samples[-1]['growth_top']
+        assert summary['failures'] == [], summary['failures']
+        assert samples[-1]['symbols_seen'] == 6 and soak.market.symbols == ['SOAK A #3', 'SOAK B #4']
+        # Regime timers ran on the simulated clock and are back on wall-clock time afterwards
+        assert clock == [60 * s['minute'] for s in samples] and server.regime_detector.clock is time.time
+    finally:
+        client.request('DELETE', '/admin/memory')
+        for symbol in soak.market.seen:
+            server.timeframe_store.m1.pop(symbol, None)
+            server.timeframe_store.resamplers.pop(symbol, None)
+            server.analysis_cache.pop(symbol, None)
+            server.regime_detector.symbols.pop(symbol, None)
+    assert client.request('GET', '/admin/memory')[1]['process']['tracemalloc'] is None
+    print(f"✓ 4 simulated hours, RSS {summary['rss_growth_mb']:+.1f} MB, p99 drift x{summary['p99_drift']}")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_growth_names_the_leak,
+        test_evaluate_flags_drift,
+        test_evaluate_without_process_metrics,
+        test_admin_memory_and_short_soak,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent socket protocol
+Runs the socket endpoint in-process and talks to it with the reference client
+"""
+
+import os
+import socket
+import struct
+import time
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+import ai_backend_server as server
+from socket_client import SocketClient
+from socket_server import SocketServer, ProtocolError, encode_frame, read_frame
+
+START = 1700000040  # minute-aligned
+
+def make_bars(first, count):
+    """OHLC bars with a crash every 25 minutes"""
+    bars = []
+    for i in range(first, first + count):
+        close = 10000.0 + i - (120.0 if i % 25 == 0 else 0.0)
+        bars.append({'time': START + 60 * i, 'open': close, 'high': close + 1, 'low': close - 1, 'close': close})
+    return bars
+
+def start_server():
+    server.ai_analyzer.engine = 'local'  # offline: local statistics instead of OpenAI calls
+    server.REGIME_TRIGGER = False  # a new analysis on every new bar, so pushes are predictable
+    endpoint = SocketServer(server.socket_analyze, '127.0.0.1', 0).start()
+    server.socket_server = endpoint
+    return endpoint
+
+def stop_server(endpoint):
+    endpoint.close()
+    server.socket_server = None
+
+def test_framing():
+    """Frames round-trip, tolerate MQL5 NUL padding and enforce the size limit"""
+    print("=== Testing Framing ===")
+    left, right = socket.socketpair()
+    try:
+        left.sendall(encode_frame({'type': 'ping', 'id': 1}))
+        assert read_frame(right) == {'type': 'ping', 'id': 1}
+        body = b'{"type":"ping"}\x00\x00'
+        left.sendall(struct.pack('>I', len(body)) + body)
+        assert read_frame(right) == {'type': 'ping'}
+        left.sendall(struct.pack('>I', 100) + b'x' * 100)
+        try:
+            read_frame(right, max_bytes=50)
+            assert False, "oversized frame accepted"
+        except ProtocolError:
+            pass
+        assert len(right.recv(100)) == 100  # the rejected body is left unread
+        left.close()
+        assert read_frame(right) is None
+    finally:
+        right.close()
+    print("✓ Length prefix, NUL padding and size limit")
+
+def test_analyze_round_trip():
+    """Bars in, recommendations out over one connection; light requests share the analysis"""
+    print("\n=== Testing Analyze Round Trip ===")
+    server.market_data.clear()
+    endpoint = start_server()
+    client = SocketClient(*endpoint.address)
+    try:
+        assert client.ping()['type'] == 'pong'
+        bars = make_bars(0, 200)
+        reply = client.analyze('CRASH_T', bars, {'spread': 10})
+        assert reply['type'] == 'recommendations' and reply['status'] == 200, reply
+        assert reply['analysis'] == 'computed' and reply['bar_time'] == bars[-1]['time']
+        assert 'spike_threshold' in reply
+
+        reply = client.analyze('CRASH_T', last_bar_time=bars[-1]['time'])
+        assert reply['status'] == 200 and reply['analysis'] == 'shared'
+        reply = client.analyze('CRASH_T', last_bar_time=bars[-1]['time'] + 60)
+        assert reply['status'] == 409 and reply['need_bars']
+        assert client.request({'type': 'bogus'})['type'] == 'error'
+        # An unhashable symbol is refused without dropping the connection
+        for symbol in (['CRASH_T'], {'name': 'CRASH_T'}, 5):
+            reply = client.request({'type': 'analyze', 'symbol': symbol}, timeout=5)
+            assert reply['type'] == 'error' and 'symbol' in reply['error'], reply
+        assert client.ping()['type'] == 'pong'
+        assert endpoint.stats()['connections'] == 1
+    finally:
+        client.close()
+        stop_server(endpoint)
+    print("✓ Computed, shared and need_bars replies over one connection")
+
+def test_push_to_subscribers():
+    """A new bar from one terminal is pushed to the others, not echoed to the sender"""
+    print("\n=== Testing Push ===")
+    server.market_data.clear()
+    endpoint = start_server()
+    sender = SocketClient(*endpoint.address)
+    listener = SocketClient(*endpoint.address)
+    try:
+        assert listener.subscribe('BOOM_T')['symbols'] == ['BOOM_T']
+        sender.analyze('BOOM_T', make_bars(0, 100))
+        push = listener.next_push(timeout=5)
+        assert push is not None and push['push'] and push['symbol'] == 'BOOM_T'
+        assert push['bar_time'] == START + 99 * 60
+
+        # The listener reusing the shared result does not trigger another push
+        assert listener.analyze('BOOM_T', last_bar_time=START + 99 * 60)['analysis'] == 'shared'
+        sender.analyze('BOOM_T', make_bars(100, 1))
+        push = listener.next_push(timeout=5)
+        assert push is not None and push['bar_time'] == START + 100 * 60
+        assert sender.next_push(timeout=0.2) is None
+    finally:
+        sender.close()
+        listener.close()
+        stop_server(endpoint)
+    print("✓ Subscribers receive each new bar's analysis once")
+
+def test_slow_subscriber_disconnected():
+    """A terminal that stops reading is dropped without holding up pushes to the others"""
+    print("\n=== Testing Slow Subscriber ===")
+    endpoint = SocketServer(lambda message, client: (200, {}), '127.0.0.1', 0, max_pending_pushes=4).start()
+    slow = socket.socket()
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    slow.connect(endpoint.address)
+    fast = SocketClient(*endpoint.address)
+    try:
+        slow.sendall(encode_frame({'type': 'subscribe', 'symbols': 'CRASH_S'}))  # one name, not a list
+        assert read_frame(slow)['symbols'] == ['CRASH_S']
+        assert fast.subscribe('CRASH_S')['symbols'] == ['CRASH_S']
+        pad = 'x' * 200000
+        started = time.time()
+        for i in range(200):
+            endpoint.push('CRASH_S', {'n': i, 'pad': pad})
+            push = fast.next_push(timeout=2)
+            assert push is not None and push['n'] == i, i
+            if endpoint.stats()['slow_disconnects']:
+                break
+        stats = endpoint.stats()
+        assert stats['slow_disconnects'] == 1 and time.time() - started < 10
+        deadline = time.time() + 2
+        while endpoint.stats()['connections'] > 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert endpoint.stats()['connections'] == 1
+        endpoint.push('CRASH_S', {'n': -1})
+        assert fast.next_push(timeout=2)['n'] == -1
+
+        reply = fast.request({'type': 'subscribe', 'symbols': 5})
+        assert reply['type'] == 'error' and 'list' in reply['error']
+    finally:
+        slow.close()
+        fast.close()
+        endpoint.close()
+    print(f"✓ Stalled reader dropped after {i + 1} pushes; the other subscriber kept up")
+
+def test_bad_frame_closes_connection():
+    """Invalid JSON gets an error frame and the connection is dropped"""
+    print("\n=== Testing Protocol Errors ===")
+    endpoint = start_server()
+    sock = socket.create_connection(endpoint.address, timeout=5)
+    try:
+        sock.sendall(struct.pack('>I', 5) + b'{oops')
+        reply = read_frame(sock)
+        assert reply['type'] == 'error' and 'Invalid JSON' in reply['error']
+        assert read_frame(sock) is None
+        deadline = time.time() + 2
+        while endpoint.stats()['connections'] and time.time() < deadline:
+            time.sleep(0.01)
+        assert endpoint.stats()['protocol_errors'] == 1 and endpoint.stats()['connections'] == 0
+    finally:
+        sock.close()
+        stop_server(endpoint)
+    print("✓ Error frame sent and connection closed")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_framing,
+        test_analyze_round_trip,
+        test_push_to_subscribers,
+        test_slow_subscriber_disconnected,
+        test_bad_frame_closes_connection,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
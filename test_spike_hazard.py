@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the spike arrival hazard tables
+Checks the tables against empirical gap frequencies, incremental updates and the /hazard endpoint
+"""
+
+import os
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from local_recommender import LocalRecommender
+from spike_hazard import HazardTable, SpikeHazard
+
+START = 1700000040  # minute-aligned
+
+def spike_times(gaps):
+    """Bar times of spikes separated by `gaps` bars"""
+    return START + 60 * np.concatenate(([0], np.cumsum(gaps))).astype(np.int64)
+
+def test_table_matches_empirical():
+    """Without a prior, lookups equal the empirical conditional frequencies"""
+    print("=== Testing Hazard Table ===")
+    rng = np.random.default_rng(4)
+    gaps = rng.integers(100, 201, 5000)  # never under 100 bars, never over 200
+    hazard = SpikeHazard(50.0, prior_gaps=0)
+    assert hazard.add_spikes('CRASH', spike_times(gaps)) == 5000
+    table = hazard.symbols['CRASH']['table']
+    for since, k in [(0, 50), (0, 150), (120, 30), (150, 40), (199, 1)]:
+        survivors = gaps[gaps > since]
+        expected = np.mean(survivors <= since + k)
+        assert abs(table.probability(since, k) - expected) < 1e-9, (since, k)
+    assert table.probability(0, 99) == 0.0 and table.probability(200, 1) >= 0
+    assert abs(table.expected_wait(0) - gaps.mean()) < 1e-6
+    assert abs(table.expected_wait(150) - (gaps[gaps > 150] - 150).mean()) < 1e-6
+    assert table.quantile(0.25) == int(np.ceil(np.quantile(gaps, 0.25)))
+    print("✓ conditional probabilities, expected waits and quantiles match 5000 gaps")
+
+def test_prior_and_tail():
+    """Few gaps lean on a geometric prior; gaps past max_gap share a memoryless tail"""
+    print("\n=== Testing Prior and Tail ===")
+    table = HazardTable(np.bincount([300, 300], minlength=2881), 0, 0)
+    assert 0 < table.probability(0, 100) < table.probability(0, 299) < table.probability(0, 300) < 1
+
+    counts = np.zeros(101, dtype=np.int64)
+    table = HazardTable(counts, 10, 500, prior_gaps=0)  # ten gaps of 150 bars, past max_gap=100
+    assert abs(table.tail_hazard - 1 / 50) < 1e-12 and table.probability(0, 100) == 0.0
+    assert abs(table.probability(400, 10) - (1 - (1 - 1 / 50) ** 10)) < 1e-12
+    assert abs(table.expected_wait(100) - 50) < 1e-9 and table.quantile(0.5) > 100
+    print("✓ smoothed sparse table; geometric tail past max_gap")
+
+def test_incremental_updates():
+    """Overlapping bar windows add every gap once, and the default 'since' is measured to the newest bar"""
+    print("\n=== Testing Incremental Updates ===")
+    count = 3000
+    index = np.arange(count)
+    moves = np.where(index % 50 == 0, -200.0, 0.0) + np.where(index % 50 == 1, 150.0, 0.0) + 0.1
+    times, closes = START + 60 * index.astype(np.int64), 10000 + np.cumsum(moves)
+    hazard = SpikeHazard(50.0, prior_gaps=0)
+    hazard.update('CRASH', times[:1000], closes[:1000])
+    hazard.update('CRASH', times[500:2000], closes[500:2000])
+    hazard.update('CRASH', times[1900:], closes[1900:])
+    state = hazard.symbols['CRASH']
+    assert state['counts'][50] == state['counts'].sum() == 58
+    result = hazard.lookup('CRASH', horizons=(5, 10))
+    assert result['bars_since_spike'] == 49 and result['probabilities'] == {5: 1.0, 10: 1.0}
+    assert result['mean_gap_bars'] == 50.0 and result['cooldown_bars'] == 50
+    assert hazard.lookup('OTHER') is None
+
+    # Bars that resume after a hole start a fresh gap instead of measuring one across it
+    gapped = SpikeHazard(50.0, prior_gaps=0)
+    gapped.update('CRASH', times[:1000], closes[:1000])
+    gapped.update('CRASH', times[1500:], closes[1500:])
+    counts = gapped.symbols['CRASH']['counts']
+    assert counts[50] == counts.sum() == 18 + 28
+    adjacent = SpikeHazard(50.0, prior_gaps=0)
+    adjacent.update('CRASH', times[:1000], closes[:1000])
+    adjacent.update('CRASH', times[999:], closes[999:])
+    assert adjacent.symbols['CRASH']['counts'][50] == 58
+
+    # No spike yet after a hole: the quiet spell is counted from where the bars resumed
+    quiet = SpikeHazard(50.0, prior_gaps=0)
+    quiet.update('CRASH', times[:1000], closes[:1000])
+    quiet.update('CRASH', times[1510:1540], closes[1510:1540])
+    result = quiet.lookup('CRASH', horizons=(5,))
+    assert result['bars_since_spike'] == 29 and result['last_spike_time'] is None
+    print("✓ 58 gaps of 50 bars from three overlapping windows; none measured across a hole")
+
+def test_endpoint_and_recommender():
+    """/hazard serves lookups and the local recommender takes its cooldown from the table"""
+    print("\n=== Testing Endpoint and Recommender ===")
+    import ai_backend_server as server
+    rng = np.random.default_rng(6)
+    server.spike_hazard.add_spikes('CRASH', spike_times(rng.geometric(1 / 20, 400)))
+    client = server.app.test_client()
+    try:
+        body = client.get('/hazard/CRASH?since=10&k=5&k=60').get_json()
+        assert body['bars_since_spike'] == 10 and set(body['probabilities']) == {'5', '60'}
+        assert body['probabilities']['5'] < body['probabilities']['60']
+        assert client.get('/hazard/CRASH?k=0').status_code == 400
+        assert client.get('/hazard/NOTHING').status_code == 404
+
+        hazard = server.spike_hazard.lookup('CRASH')
+        spikes = [{'spike_size': 100.0, 'max_retracement': 40.0, 'is_crash': True, 'bar_index': i} for i in (10, 12)]
+        result = LocalRecommender().recommend(spikes, 1000, hazard=hazard)
+        assert result['cooldown_seconds'] == max(hazard['cooldown_bars'] * 60, 30)
+        assert 'next spike expected' in result['reasoning']
+        assert 'SPIKE ARRIVAL' in server.ai_analyzer._create_analysis_prompt([], {'spike_hazard': hazard})
+    finally:
+        server.spike_hazard.symbols.pop('CRASH', None)
+    print("✓ /hazard lookups; cooldown from 400 gaps instead of 1")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_table_matches_empirical,
+        test_prior_and_tail,
+        test_incremental_updates,
+        test_endpoint_and_recommender,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
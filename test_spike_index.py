@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the spike similarity index
+Checks exact and partitioned search, incremental indexing and the analysis wiring
+"""
+
+import os
+
+import numpy as np
+
+# Keep the test out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from spike_index import OUTCOME_COLUMNS, SpikeIndex, SpikeLibrary, spike_features, spike_gaps, spike_outcomes
+from spike_metrics import max_retracement, spike_indices
+
+START = 1700000040  # minute-aligned
+
+def make_bars(count, seed=5):
+    """M1 closes with a crash every 40 bars and a partial snap-back after each"""
+    rng = np.random.default_rng(seed)
+    index = np.arange(count)
+    moves = rng.normal(0, 3, count)
+    sizes = rng.uniform(100, 300, (index % 40 == 0).sum())
+    moves[index % 40 == 0] -= sizes
+    moves[index % 40 == 1] += 0.7 * sizes[:(index % 40 == 1).sum()]
+    return START + 60 * index.astype(np.int64), 10000 + np.cumsum(moves)
+
+def outcomes_for(rows):
+    """Outcome columns whose time is the row number"""
+    return {name: (np.arange(rows) if name == 'time' else np.zeros(rows)).astype(dtype)
+            for name, dtype in OUTCOME_COLUMNS.items()}
+
+def test_exact_search():
+    """Small indexes scan every row and return the true nearest neighbours in order"""
+    print("=== Testing Exact Search ===")
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(500, 34)).astype(np.float32)
+    index = SpikeIndex()
+    index.build(vectors, outcomes_for(500))
+    query = rng.normal(size=34).astype(np.float32)
+    found = index.query(query, 10)
+    truth = np.argsort(((vectors - query) ** 2).sum(axis=1))[:10]
+    assert list(found['time']) == list(truth)
+    assert np.allclose(found['distance'], np.sqrt(((vectors[truth] - query) ** 2).sum(axis=1)), atol=1e-3)
+    assert len(SpikeIndex().query(query, 5)['time']) == 0
+    print("✓ 10 nearest of 500 match a brute-force sort")
+
+def test_partitioned_search():
+    """Past exact_limit rows go into k-means lists; probing a few lists finds most true neighbours"""
+    print("\n=== Testing Partitioned Search ===")
+    rng = np.random.default_rng(2)
+    centers = rng.normal(scale=4, size=(40, 34))
+    vectors = (centers[rng.integers(0, 40, 20000)] + rng.normal(size=(20000, 34))).astype(np.float32)
+    index = SpikeIndex(exact_limit=1000, nprobe=8)
+    index.build(vectors, outcomes_for(20000))
+    assert index.stats()['lists'] == 141 and index.offsets[-1] == 20000
+
+    queries = vectors[:50] + rng.normal(scale=0.1, size=(50, 34)).astype(np.float32)
+    recall = []
+    for query in queries:
+        truth = set(np.argsort(((vectors - query) ** 2).sum(axis=1))[:10])
+        recall.append(len(truth & set(index.query(query, 10)['time'])) / 10)
+    assert np.mean(recall) >= 0.9, np.mean(recall)
+
+    # Added rows are searched exactly until the buffer is worth a rebuild
+    extra = rng.normal(size=(5, 34)).astype(np.float32) + 100
+    more = outcomes_for(5)
+    more['time'] += 20000
+    index.add(extra, more)
+    assert index.stats()['pending'] == 5 and len(index) == 20005
+    assert index.query(extra[3], 1)['time'][0] == 20003
+    index.add(np.repeat(extra, 400, axis=0), outcomes_for(2000))
+    assert index.stats()['pending'] == 0 and index.builds == 2
+    print(f"✓ recall@10 {np.mean(recall):.2f} probing 8 of 141 lists; added rows found before and after rebuild")
+
+def test_library_indexes_once():
+    """Spikes are indexed once their outcome is complete, however the bar windows overlap"""
+    print("\n=== Testing Spike Library ===")
+    times, closes = make_bars(3000)
+    library = SpikeLibrary(50.0)
+    assert library.update('CRASH', times[:1500], closes[:1500]) > 0
+    library.update('CRASH', times[1000:2500], closes[1000:2500])
+    library.update('CRASH', times, closes)
+
+    indices = spike_indices(closes, 50.0)
+    complete = indices[(indices > 32) & (indices + 99 < len(closes))]
+    index = library.indexes['CRASH']
+    assert len(index) == len(complete)
+    assert np.array_equal(np.sort(index.outcomes['time']), times[complete])
+    outcomes = spike_outcomes(closes, times, complete, 50.0)
+    assert np.allclose(outcomes['max_retracement'], max_retracement(closes, complete))
+    assert (outcomes['next_spike_bars'][:-1] == 40).all() and outcomes['is_crash'].all()
+
+    # Every indexed setup has finite features; the latest spike never matches itself
+    features = spike_features(closes, complete, spike_gaps(complete))
+    assert features.shape == (len(complete), 34) and np.isfinite(features).all()
+    similar = library.similar('CRASH', times[-1000:], closes[-1000:], 10)
+    assert similar['neighbours'] == 10 and similar['indexed'] == len(complete)
+    assert all(m['time'] != similar['query_time'] for m in similar['matches'])
+    assert library.similar('OTHER', times, closes, 10) is None
+    print(f"✓ {len(complete)} spikes indexed once across 3 overlapping updates")
+
+def test_analysis_uses_similar_setups():
+    """The prompt and the local recommender both see the nearest past setups"""
+    print("\n=== Testing Analysis Wiring ===")
+    import ai_backend_server as server
+    server.ai_analyzer.engine = 'local'
+    times, closes = make_bars(4000)
+    bars = {'time': times, 'open': closes, 'high': closes + 1, 'low': closes - 1, 'close': closes}
+    server.timeframe_store.ingest_bars('CRASH', bars)
+    try:
+        recommendations, spikes, _ = server.analyze_latest_bar('CRASH', int(times[-1]), None, {})
+        assert spikes > 0 and 'similar past setups' in recommendations['reasoning']
+        assert server.get_market_data_stats()['spike_index']['CRASH']['rows'] > 0
+
+        similar = server.spike_library.similar('CRASH', times[-1000:], closes[-1000:], 20)
+        prompt = server.ai_analyzer._create_analysis_prompt([], {'similar_spikes': similar})
+        assert 'SIMILAR PAST SETUPS (20 nearest' in prompt
+    finally:
+        server.timeframe_store.m1.pop('CRASH', None)
+        server.timeframe_store.resamplers.pop('CRASH', None)
+        server.spike_library.indexes.pop('CRASH', None)
+        server.spike_library.indexed_until.pop('CRASH', None)
+    print("✓ recommendations and prompt include the similar setups")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_exact_search,
+        test_partitioned_search,
+        test_library_indexes_once,
+        test_analysis_uses_similar_setups,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
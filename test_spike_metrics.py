@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for vectorized spike metrics
+Checks accuracy and speed against brute-force per-spike loops
+"""
+
+import time
+import numpy as np
+
+from spike_metrics import (
+    first_passage, max_retracement, recovery_profile, retracement_curves, threshold_sweep
+)
+
+MIN_SPIKE_SIZE = 50
+
+def generate_prices(bars=20000, seed=7):
+    """Random walk with injected crash and boom spikes that partly snap back"""
+    rng = np.random.default_rng(seed)
+    changes = rng.normal(0, 5, bars)
+    spike_bars = rng.choice(bars - 1, bars // 40, replace=False)
+    jumps = rng.choice([-1, 1], len(spike_bars)) * rng.uniform(60, 300, len(spike_bars))
+    changes[spike_bars] += jumps
+    changes[spike_bars + 1] -= jumps * rng.uniform(0.3, 1.0, len(spike_bars))
+    return 10000 + np.cumsum(changes)
+
+def brute_spike_indices(closes):
+    """SpikeAnalyzer's original per-bar loop"""
+    indices = []
+    for i in range(1, len(closes) - 1):
+        change_to_current = abs(closes[i] - closes[i-1])
+        change_from_current = abs(closes[i+1] - closes[i])
+        if change_to_current > MIN_SPIKE_SIZE and change_from_current > change_to_current * 0.5:
+            indices.append(i)
+    return np.array(indices, dtype=np.int64)
+
+def brute_retracement_curve(closes, i, horizon):
+    """Max distance from the spike price within 1..horizon bars, one bar at a time"""
+    curve = []
+    best = 0.0
+    for h in range(1, horizon + 1):
+        if i + h < len(closes):
+            best = max(best, abs(closes[i + h] - closes[i]))
+        curve.append(best)
+    return curve
+
+def brute_recovery_bars(closes, i, tolerance, horizon):
+    """Scan forward until price is back within tolerance of the pre-spike level"""
+    pre_spike = closes[i - 1]
+    crashed = closes[i] < pre_spike
+    for h in range(1, horizon + 1):
+        if i + h >= len(closes):
+            break
+        if crashed and closes[i + h] >= pre_spike - tolerance:
+            return h
+        if not crashed and closes[i + h] <= pre_spike + tolerance:
+            return h
+    return -1
+
+def test_retracement_matches_brute_force():
+    """Retracement curves and max retracement match the per-spike loop"""
+    print("=== Testing Retracement Curves ===")
+    closes = generate_prices(5000)
+    indices = brute_spike_indices(closes)
+    curves = retracement_curves(closes, indices, 60)
+    expected = np.array([brute_retracement_curve(closes, i, 60) for i in indices])
+    assert np.allclose(curves, expected)
+    assert np.allclose(max_retracement(closes, indices), expected[:, 48])
+    print(f"✓ {len(indices)} spike curves match over 60 horizons")
+
+def test_recovery_matches_brute_force():
+    """First-passage recovery bars match the per-spike loop, including the series tail"""
+    print("\n=== Testing Recovery First Passage ===")
+    closes = generate_prices(5000)
+    indices = brute_spike_indices(closes)
+    tolerance = MIN_SPIKE_SIZE * 0.1
+    profile = recovery_profile(closes, indices, tolerance, horizon=99)
+    expected = np.array([brute_recovery_bars(closes, i, tolerance, 99) for i in indices])
+    assert np.array_equal(profile['bars'], expected)
+    assert np.array_equal(profile['recovered'], expected > 0)
+    assert np.array_equal(profile['seconds'][expected > 0], expected[expected > 0] * 60)
+    print(f"✓ {len(indices)} recoveries match, {int((expected > 0).sum())} recovered")
+
+def test_first_passage_directions():
+    """Upward and downward passages on a hand-made series"""
+    print("\n=== Testing First Passage Directions ===")
+    closes = np.array([100.0, 40.0, 50.0, 70.0, 95.0, 120.0, 80.0])
+    bars = first_passage(closes, np.array([1, 5]), np.array([90.0, 85.0]), np.array([True, False]), 5)
+    assert bars.tolist() == [3, 1]
+    bars = first_passage(closes, np.array([1]), np.array([500.0]), np.array([True]), 5)
+    assert bars.tolist() == [-1]
+    print("✓ Passage bars correct in both directions")
+
+def test_threshold_sweep_matches_rescans():
+    """One sweep matches rescanning the series at every threshold"""
+    print("\n=== Testing Threshold Sweep ===")
+    closes = generate_prices(3000)
+    thresholds = [20, 50, 80, 120, 200, 280]
+    sweep = threshold_sweep(closes, thresholds)
+    for k, threshold in enumerate(thresholds):
+        spikes = []
+        for i in range(1, len(closes) - 1):
+            change_to_current = abs(closes[i] - closes[i-1])
+            if change_to_current > threshold and abs(closes[i+1] - closes[i]) > change_to_current * 0.5:
+                spikes.append(i)
+        assert sweep['spikes'][k] == len(spikes)
+        if spikes:
+            mean = np.mean([brute_retracement_curve(closes, i, 49)[-1] for i in spikes])
+            assert abs(sweep['mean_retracement'][k] - mean) < 1e-3
+    print(f"✓ {len(thresholds)} thresholds match brute-force rescans")
+
+def test_vectorized_speed():
+    """Vectorized profiles are much faster than the per-spike loops"""
+    print("\n=== Testing Speed ===")
+    closes = generate_prices(50000)
+    indices = brute_spike_indices(closes)
+    tolerance = MIN_SPIKE_SIZE * 0.1
+
+    start = time.perf_counter()
+    recovery_profile(closes, indices, tolerance, horizon=99)
+    retracement_curves(closes, indices, 49)
+    vectorized = time.perf_counter() - start
+
+    closes_list = closes.tolist()
+    start = time.perf_counter()
+    for i in indices:
+        brute_recovery_bars(closes_list, i, tolerance, 99)
+        brute_retracement_curve(closes_list, i, 49)
+    brute = time.perf_counter() - start
+
+    print(f"  {len(indices)} spikes: vectorized {vectorized * 1000:.1f} ms, brute force {brute * 1000:.1f} ms")
+    assert vectorized < brute
+    print(f"✓ Vectorized is {brute / vectorized:.0f}x faster")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_retracement_matches_brute_force,
+        test_recovery_matches_brute_force,
+        test_first_passage_directions,
+        test_threshold_sweep_matches_rescans,
+        test_vectorized_speed,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
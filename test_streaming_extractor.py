@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming JSON field extractor
+Checks that fields come out the same however the model's reply is split into chunks
+"""
+
+import json
+import os
+import random
+
+# Keep the server import out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from ai_backend_server import NUMERIC_RECOMMENDATION_FIELDS, StreamingFieldExtractor
+
+REPLY = ('Sure! Here is the analysis you asked for.\n```json\n'
+         '{"spike_threshold": 123.456, "cooldown_seconds": 30, "stop_loss_pips": -1.5e2,\n'
+         ' "reasoning": "Spikes \\"cluster\\" after {quiet} runs, see [1]: a\\\\b \\u00e9",\n'
+         ' "levels": {"support": [1, 2, {"x": "}"}], "note": "]"},\n'
+         ' "take_profit_pips": 250, "risk_score": 0.7, "confidence": 0.82,\n'
+         ' "enabled": true, "filter": null}\n```\nLet me know if you need more.')
+
+EXPECTED = {
+    'spike_threshold': 123.456, 'cooldown_seconds': 30, 'stop_loss_pips': -150.0,
+    'reasoning': 'Spikes "cluster" after {quiet} runs, see [1]: a\\b \u00e9',
+    'take_profit_pips': 250, 'risk_score': 0.7, 'confidence': 0.82, 'enabled': True, 'filter': None,
+}
+
+def chunks(text, rng, largest):
+    """Split text into random-sized pieces of 1 to `largest` characters"""
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, largest)
+        yield text[position:position + size]
+        position += size
+
+def extract(pieces):
+    extractor = StreamingFieldExtractor()
+    for piece in pieces:
+        extractor.feed(piece)
+    return extractor
+
+def test_whole_reply():
+    """Prose and code fences before the object are skipped; nested values are not extracted"""
+    print("=== Testing Whole Reply ===")
+    extractor = extract([REPLY])
+    assert extractor.complete and extractor.fields == EXPECTED, extractor.fields
+    assert extractor.has_fields(NUMERIC_RECOMMENDATION_FIELDS)
+    assert json.loads(REPLY[REPLY.index('{'):REPLY.rindex('}') + 1])['levels']['note'] == ']'
+    print(f"✓ {len(EXPECTED)} top-level fields extracted, nested 'levels' skipped")
+
+def test_one_character_at_a_time():
+    """Numbers, strings and escapes split at every position parse the same"""
+    print("\n=== Testing Character Chunks ===")
+    extractor = extract(REPLY)
+    assert extractor.fields == EXPECTED, extractor.fields
+    print(f"✓ {len(REPLY)} one-character chunks give the same fields")
+
+def test_random_chunks():
+    """Random chunk sizes, including splits inside escapes and numbers, parse the same"""
+    print("\n=== Testing Random Chunks ===")
+    rng = random.Random(7)
+    for trial in range(200):
+        extractor = extract(chunks(REPLY, rng, rng.choice([2, 5, 17, 64])))
+        assert extractor.complete and extractor.fields == EXPECTED, (trial, extractor.fields)
+    print("✓ 200 random splits give the same fields")
+
+def test_fields_appear_as_they_complete():
+    """A number is only reported once the character after it arrives; nothing after the object is read"""
+    print("\n=== Testing Incremental Fields ===")
+    extractor = StreamingFieldExtractor()
+    assert extractor.feed('{"spike_threshold": 12') == {}
+    assert extractor.feed('3.5') == {}
+    assert extractor.feed(', "reasoning": "a \\"') == {'spike_threshold': 123.5}
+    assert not extractor.has_fields(['reasoning'])
+    assert extractor.feed('quoted\\" word"') == {'spike_threshold': 123.5, 'reasoning': 'a "quoted" word'}
+    extractor.feed(', "risk_score": 1}{"risk_score": 2}')
+    assert extractor.complete and extractor.fields['risk_score'] == 1
+    assert not extractor.has_fields(NUMERIC_RECOMMENDATION_FIELDS)
+    print("✓ fields reported as soon as they end; text after the object ignored")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_whole_reply,
+        test_one_character_at_a_time,
+        test_random_chunks,
+        test_fields_appear_as_they_complete,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
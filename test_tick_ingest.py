@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for tick ingestion
+Checks ring buffer wraparound, M1 bars built from tick batches and tick-to-tick spike detection
+"""
+
+import json
+import os
+
+import numpy as np
+
+from tick_ingest import TICK_DTYPE, TickIngestor, TickRingBuffer
+from timeframes import TimeframeStore
+
+START_MSC = 1700000040 * 1000  # minute-aligned
+
+def make_ticks(count, seed=5, spikes=()):
+    """Sorted ticks a few hundred ms apart with a random-walk bid and jumps at the given indices"""
+    rng = np.random.default_rng(seed)
+    time_msc = START_MSC + np.cumsum(rng.integers(50, 700, count))
+    moves = rng.normal(0, 1, count)
+    for index, size in spikes:
+        moves[index] = size
+    bid = np.round(10000 + np.cumsum(moves), 2)
+    return time_msc, bid, bid + 0.5
+
+def reference_bars(time_msc, bid):
+    """M1 bars from all ticks at once, minute by minute"""
+    minutes = time_msc // 1000 // 60 * 60
+    bars = {key: [] for key in ('time', 'open', 'high', 'low', 'close')}
+    for minute in np.unique(minutes):
+        prices = bid[minutes == minute]
+        for key, value in zip(bars, (minute, prices[0], prices.max(), prices.min(), prices[-1])):
+            bars[key].append(value)
+    return {key: np.array(values) for key, values in bars.items()}
+
+def test_ring_buffer_wraps():
+    """The buffer keeps the newest `capacity` ticks in time order across wraparound"""
+    print("=== Testing Ring Buffer Wraparound ===")
+    ring = TickRingBuffer(capacity=10)
+    assert ring.last_time() is None and len(ring.latest()['time_msc']) == 0
+    times = np.arange(100, dtype=np.int64)
+    ring.extend(times[:7], times[:7] * 1.0, times[:7] + 0.5)
+    ring.extend(times[7:14], times[7:14] * 1.0, times[7:14] + 0.5)  # wraps past the end
+    latest = ring.latest()
+    assert ring.count == 10 and list(latest['time_msc']) == list(range(4, 14))
+    assert list(latest['bid']) == list(range(4, 14)) and list(latest['ask']) == [t + 0.5 for t in range(4, 14)]
+    assert list(ring.latest(3)['time_msc']) == [11, 12, 13] and ring.last_time() == 13
+
+    # A batch larger than the buffer keeps only its tail, then batches wrap at every offset
+    position = 14
+    for size in (25, 1, 3, 9, 10, 6):
+        batch = times[position:position + size]
+        ring.extend(batch, batch * 1.0, batch + 0.5)
+        position += size
+        assert list(ring.latest()['time_msc']) == list(range(position - 10, position)), size
+        assert ring.last_time() == position - 1 and ring.count == 10
+    print("✓ newest 10 ticks kept in order through partial, exact and oversized batches")
+
+def test_bars_from_tick_batches():
+    """Bars built batch by batch, split mid-minute, match bars built from all ticks at once"""
+    print("\n=== Testing Tick-Built M1 Bars ===")
+    time_msc, bid, ask = make_ticks(3000)
+    expected = reference_bars(time_msc, bid)
+    store = TimeframeStore()
+    ingestor = TickIngestor(capacity=1000, on_bars=store.ingest_bars)
+    rng = np.random.default_rng(1)
+    cuts = np.sort(rng.choice(np.arange(1, len(time_msc)), 40, replace=False))
+    for start, end in zip(np.append(0, cuts), np.append(cuts, len(time_msc))):
+        result = ingestor.ingest('TICK CRASH', time_msc[start:end], bid[start:end], ask[start:end])
+        assert result['accepted'] == end - start and result['bars_updated'] >= 1
+
+    bars = store.get_bars('TICK CRASH', 'M1', len(expected['time']) + 10)
+    for key in ('time', 'open', 'high', 'low', 'close'):
+        assert np.array_equal(bars[key], expected[key]), key
+    forming = ingestor.symbols['TICK CRASH']['bars'].forming
+    assert forming == tuple(expected[key][-1] for key in ('time', 'open', 'high', 'low', 'close'))
+    stats = ingestor.stats('TICK CRASH')
+    assert stats['received'] == 3000 and stats['buffered_ticks'] == 1000 and stats['last_tick_msc'] == time_msc[-1]
+    print(f"✓ {len(expected['time'])} M1 bars from 41 batches match a single pass")
+
+def test_tick_spikes():
+    """Jumps at or above the threshold are flagged, including across batches; stale ticks are dropped"""
+    print("\n=== Testing Tick Spike Detection ===")
+    time_msc, bid, ask = make_ticks(200, spikes=[(50, -120.0), (100, 75.0), (150, -49.0)])
+    ingestor = TickIngestor(spike_threshold=50.0)
+    first = ingestor.ingest('CRASH', time_msc[:100], bid[:100], ask[:100])
+    # The second batch starts with the boom, measured against the first batch's last tick
+    second = ingestor.ingest('CRASH', time_msc[100:], bid[100:], ask[100:])
+    assert [(s['time_msc'], s['is_crash']) for s in first['spikes']] == [(int(time_msc[50]), True)]
+    assert [(s['time_msc'], s['is_crash']) for s in second['spikes']] == [(int(time_msc[100]), False)]
+    assert abs(first['spikes'][0]['spike_size'] - 120.0) < 1e-6 and second['spikes'][0]['price'] == bid[100]
+
+    # Ticks older than the newest one held are dropped; a shuffled batch is sorted first
+    later = time_msc[-1] + np.array([300, 100, 200])
+    result = ingestor.ingest('CRASH', np.append(time_msc[-5:], later), np.full(8, bid[-1] - 60.0), np.full(8, bid[-1]))
+    stats = ingestor.stats('CRASH')
+    assert result['accepted'] == 4 and stats['dropped_out_of_order'] == 4 and stats['last_tick_msc'] == later[0]
+    assert len(result['spikes']) == 1 and len(stats['recent_spikes']) == 3
+
+    records = np.zeros(2, dtype=TICK_DTYPE)
+    records['time_msc'], records['bid'], records['ask'] = later[0] + [1, 2], bid[-1], bid[-1] + 0.5
+    assert len(ingestor.ingest_packed('CRASH', records.tobytes())['spikes']) == 1
+    try:
+        ingestor.ingest_packed('CRASH', records.tobytes()[:-1])
+        assert False, "truncated packed payload accepted"
+    except ValueError:
+        pass
+    print("✓ crash and boom spikes flagged across a batch boundary; 49-point move and stale ticks ignored")
+
+def test_rejects_bad_batches():
+    """Non-finite or non-positive prices and malformed rows are refused before touching any state"""
+    print("\n=== Testing Bad Tick Batches ===")
+    time_msc, bid, ask = make_ticks(10)
+    ingestor = TickIngestor(spike_threshold=50.0)
+    for bad_bid, bad_ask in ((np.nan, 1.0), (np.inf, 1.0), (0.0, 1.0), (1.0, -1.0)):
+        try:
+            ingestor.ingest('CRASH', time_msc[:2], [bid[0], bad_bid], [ask[0], bad_ask])
+            assert False, f"bid {bad_bid} / ask {bad_ask} accepted"
+        except ValueError:
+            pass
+    assert ingestor.stats('CRASH') is None or ingestor.stats('CRASH')['received'] == 0
+
+    for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+        os.environ.setdefault(name, '1000000')
+    import ai_backend_server as server
+    client = server.app.test_client()
+    t, b = int(time_msc[0]), float(bid[0])
+    batches = [
+        {'ticks': [[t, b], [t + 1, b]]},  # two columns
+        {'ticks': [[t, b, b + 0.5, 7], [t + 1, b, b + 0.5, 7]]},  # four columns
+        {'ticks': [[t, b, b + 0.5], [t + 1, b]]},  # ragged
+        {'ticks': [t, b, b + 0.5]},  # flat
+        {'ticks': [[t, -b, b + 0.5]]},
+        {'time_msc': [t], 'bid': [b], 'ask': [0]},
+    ]
+    try:
+        for batch in batches:
+            response = client.post('/ticks', data=json.dumps({'symbol': 'BAD TICKS', **batch}),
+                                   content_type='application/json')
+            assert response.status_code == 400, (batch, response.status_code)
+        assert client.get('/ticks/BAD TICKS').status_code == 404
+        response = client.post('/ticks', data=json.dumps({'symbol': 'BAD TICKS', 'ticks': []}),
+                               content_type='application/json')
+        assert response.status_code == 200 and response.get_json()['accepted'] == 0
+    finally:
+        server.tick_ingestor.symbols.pop('BAD TICKS', None)
+    print(f"✓ {len(batches)} malformed batches answered 400; an empty batch is accepted")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_ring_buffer_wraps,
+        test_bars_from_tick_batches,
+        test_tick_spikes,
+        test_rejects_bad_batches,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for request tracing
+Checks the sampling rate, span nesting across executor threads and shard workers, and buffer bounds
+"""
+
+import contextvars
+import json
+import os
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep the server import out of the admission limits
+for name in ('CLIENT_BURST', 'SYMBOL_BURST', 'CLIENT_RATE_PER_SECOND', 'SYMBOL_RATE_PER_SECOND'):
+    os.environ.setdefault(name, '1000000')
+
+from tracing import NOOP_SPAN, Tracer, tracer
+
+def traced_work(label):
+    """Runs in a shard worker under the server's tracer"""
+    with tracer.span('work', label=label) as span:
+        span.set(pid=os.getpid())
+        return os.getpid()
+
+def test_sampling_rate():
+    """About sample_rate of requests are traced; forced ones always are; unsampled ones pay for no-op spans"""
+    print("=== Testing Sampling Rate ===")
+    random.seed(4)
+    sampler = Tracer(sample_rate=0.2)
+    sampled = 0
+    for _ in range(5000):
+        trace_id, root = sampler.begin('request')
+        assert len(trace_id) == 16
+        if root is None:
+            assert sampler.span('child') is NOOP_SPAN
+            continue
+        sampled += 1
+        with sampler.span('child'):
+            pass
+        root.__exit__(None, None, None)
+    assert 900 < sampled < 1100, sampled
+    assert sampler.stats()['requests'] == 5000 and sampler.stats()['sampled'] == sampled
+
+    off = Tracer(sample_rate=0.0)
+    assert all(off.begin('request')[1] is None for _ in range(1000))
+    trace_id, root = off.begin('request', trace_id='abc', force=True)
+    root.__exit__(None, None, None)
+    assert trace_id == 'abc' and [s['name'] for s in off.get('abc')] == ['request']
+    print(f"✓ {sampled}/5000 requests sampled at rate 0.2; forced trace kept at rate 0")
+
+def test_nesting_across_threads():
+    """Spans in executor threads join the trace only when they run in a copy of the request's context"""
+    print("\n=== Testing Nesting Across Executor Threads ===")
+    nester = Tracer(sample_rate=1.0)
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tier")
+
+    def tier(name):
+        with nester.span(name) as span:
+            with nester.span('parse'):
+                pass
+            return span
+
+    trace_id, root = nester.begin('analyze')
+    with nester.span('analyze_spikes'):
+        joined = executor.submit(contextvars.copy_context().run, tier, 'primary').result()
+        detached = executor.submit(tier, 'orphan').result()
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        root.__exit__(ValueError, e, None)
+    executor.shutdown()
+
+    spans = {s['name']: s for s in nester.get(trace_id)}
+    assert detached is NOOP_SPAN and 'orphan' not in spans
+    assert spans['analyze']['parent_id'] is None and 'ValueError: boom' == spans['analyze']['attrs']['error']
+    assert spans['analyze_spikes']['parent_id'] == spans['analyze']['span_id']
+    assert spans['primary']['parent_id'] == spans['analyze_spikes']['span_id'] == joined.parent_id
+    assert spans['parse']['parent_id'] == spans['primary']['span_id']
+    assert [spans[n]['depth'] for n in ('analyze', 'analyze_spikes', 'primary', 'parse')] == [0, 1, 2, 3]
+    assert spans['primary']['thread'].startswith('tier') and not spans['analyze']['thread'].startswith('tier')
+    print("✓ tier thread spans nested under the request, 4 levels deep")
+
+def test_nesting_across_shards():
+    """Spans finished in a shard worker are forwarded and nest under the routing process's span"""
+    print("\n=== Testing Nesting Across Shard Workers ===")
+    import ai_backend_server as server
+    from shard_pool import ShardPool
+    pool = ShardPool(2, threads_per_worker=2, on_event=server.handle_shard_event, timeout=10.0)
+    sample_rate = tracer.sample_rate
+    try:
+        server.shard_pool = pool
+        trace_id, root = tracer.begin('analyze_market', force=True)
+        with tracer.span('dispatch'):
+            worker_pid = server.dispatch('TRACE CRASH', traced_work, 'first')
+        root.__exit__(None, None, None)
+        # Outside a sampled trace nothing is forwarded
+        tracer.sample_rate = 0.0
+        assert server.dispatch('TRACE CRASH', traced_work, 'unsampled') == worker_pid
+    finally:
+        tracer.sample_rate = sample_rate
+        server.shard_pool = None
+        pool.close()
+
+    spans = {s['name']: s for s in tracer.get(trace_id)}
+    assert set(spans) == {'analyze_market', 'dispatch', 'shard', 'work'}, set(spans)
+    assert spans['shard']['parent_id'] == spans['dispatch']['span_id']
+    assert spans['work']['parent_id'] == spans['shard']['span_id'] and spans['work']['attrs']['label'] == 'first'
+    assert spans['shard']['attrs']['shard'] == pool.shard_for('TRACE CRASH')
+    assert spans['shard']['pid'] == spans['work']['pid'] == worker_pid != os.getpid() == spans['dispatch']['pid']
+    assert [spans[n]['depth'] for n in ('analyze_market', 'dispatch', 'shard', 'work')] == [0, 1, 2, 3]
+    print(f"✓ spans from shard worker pid {worker_pid} stored in the routing process under the dispatch span")
+
+def test_buffer_bounds():
+    """Only the newest max_traces traces are kept; the file sink keeps every span"""
+    print("\n=== Testing Trace Buffer Bounds ===")
+    with tempfile.TemporaryDirectory() as root_dir:
+        path = os.path.join(root_dir, 'spans.jsonl')
+        bounded = Tracer(sample_rate=1.0, max_traces=5, path=path)
+        trace_ids = []
+        for i in range(12):
+            trace_id, root = bounded.begin('request', index=i)
+            with bounded.span('child'):
+                pass
+            root.__exit__(None, None, None)
+            trace_ids.append(trace_id)
+
+        assert bounded.stats()['traces_buffered'] == 5 and len(bounded.traces) == 5
+        assert all(bounded.get(t) is None for t in trace_ids[:7])
+        recent = bounded.recent()
+        assert [r['trace_id'] for r in recent] == trace_ids[:6:-1]
+        assert recent[0]['attrs']['index'] == 11 and recent[0]['spans'] == 2
+        assert [r['trace_id'] for r in bounded.recent(limit=2)] == trace_ids[:9:-1]
+        bounded._file.close()
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 24 and {line['trace_id'] for line in lines} == set(trace_ids)
+    print("✓ 12 traces recorded, newest 5 kept in memory, all 24 spans in the file")
+
+def main():
+    """Run all tests"""
+    tests = [
+        test_sampling_rate,
+        test_nesting_across_threads,
+        test_nesting_across_shards,
+        test_buffer_bounds,
+    ]
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+if __name__ == "__main__":
+    main()
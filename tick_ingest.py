@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Tick Ingestion for MT5 Crash/Boom Scalping EA
+Keeps per-symbol tick ring buffers, detects spikes tick by tick and builds M1 bars
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from timeframes import M1_SECONDS, empty_bars
+
+# Packed binary tick record: time_msc (int64), bid (float64), ask (float64), little-endian
+TICK_DTYPE = np.dtype([('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+
+class TickRingBuffer:
+    """Fixed-size circular buffer of ticks backed by preallocated arrays"""
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self.time_msc = np.zeros(capacity, dtype=np.int64)
+        self.bid = np.zeros(capacity, dtype=np.float64)
+        self.ask = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self._head = 0  # next write position
+
+    def extend(self, time_msc: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        """Append a batch of ticks, overwriting the oldest when full"""
+        n = len(time_msc)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            time_msc, bid, ask = time_msc[-self.capacity:], bid[-self.capacity:], ask[-self.capacity:]
+            n = self.capacity
+
+        first = min(n, self.capacity - self._head)
+        second = n - first
+        for target, source in ((self.time_msc, time_msc), (self.bid, bid), (self.ask, ask)):
+            target[self._head:self._head + first] = source[:first]
+            if second:
+                target[:second] = source[first:]
+
+        self._head = (self._head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def latest(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Most recent ticks in time order"""
+        n = self.count if n is None else min(n, self.count)
+        indices = (self._head - n + np.arange(n)) % self.capacity
+        return {
+            'time_msc': self.time_msc[indices],
+            'bid': self.bid[indices],
+            'ask': self.ask[indices],
+        }
+
+    def last_time(self) -> Optional[int]:
+        """Time of the newest tick, if any"""
+        if self.count == 0:
+            return None
+        return int(self.time_msc[(self._head - 1) % self.capacity])
+
+class TickBarBuilder:
+    """Builds bid-based M1 bars from ticks, carrying the forming bar between batches"""
+
+    def __init__(self):
+        self.forming = None  # (time, open, high, low, close)
+
+    def update(self, time_msc: np.ndarray, bid: np.ndarray) -> Dict[str, np.ndarray]:
+        """Aggregate a sorted tick batch and return every M1 bar it touched"""
+        if len(time_msc) == 0:
+            return empty_bars()
+
+        minutes = time_msc // 1000 // M1_SECONDS * M1_SECONDS
+        starts = np.flatnonzero(np.append(True, minutes[1:] != minutes[:-1]))
+        ends = np.append(starts[1:], len(minutes)) - 1
+        bars = {
+            'time': minutes[starts],
+            'open': bid[starts],
+            'high': np.maximum.reduceat(bid, starts),
+            'low': np.minimum.reduceat(bid, starts),
+            'close': bid[ends],
+        }
+
+        # Fold the bar carried over from the previous batch into the first minute
+        if self.forming is not None and self.forming[0] == bars['time'][0]:
+            bars['open'][0] = self.forming[1]
+            bars['high'][0] = max(bars['high'][0], self.forming[2])
+            bars['low'][0] = min(bars['low'][0], self.forming[3])
+
+        self.forming = (int(bars['time'][-1]), float(bars['open'][-1]), float(bars['high'][-1]),
+                        float(bars['low'][-1]), float(bars['close'][-1]))
+        return bars
+
+class TickSpikeDetector:
+    """Flags tick-to-tick jumps at or above a threshold"""
+
+    def __init__(self, threshold: float = 50.0, history: int = 500):
+        self.threshold = threshold
+        self.last_bid = None
+        self.recent = deque(maxlen=history)
+
+    def update(self, time_msc: np.ndarray, bid: np.ndarray) -> List[Dict]:
+        """Detect spikes in a sorted tick batch, continuing from the previous batch"""
+        if len(bid) == 0:
+            return []
+
+        previous = np.empty_like(bid)
+        previous[0] = bid[0] if self.last_bid is None else self.last_bid
+        previous[1:] = bid[:-1]
+        changes = bid - previous
+        hits = np.flatnonzero(np.abs(changes) >= self.threshold)
+        self.last_bid = float(bid[-1])
+
+        spikes = [{
+            'time_msc': int(time_msc[i]),
+            'price': float(bid[i]),
+            'spike_size': float(abs(changes[i])),
+            'is_crash': bool(changes[i] < 0),
+        } for i in hits]
+        self.recent.extend(spikes)
+        return spikes
+
+def check_prices(bid: np.ndarray, ask: np.ndarray):
+    """Reject ticks whose bid or ask is NaN, infinite or not positive"""
+    if not (np.isfinite(bid).all() and np.isfinite(ask).all() and (bid > 0).all() and (ask > 0).all()):
+        raise ValueError("bid and ask must be finite and positive")
+
+class TickIngestor:
+    """Routes tick batches to per-symbol buffers, spike detectors and bar builders"""
+
+    def __init__(self, capacity: int = 100000, spike_threshold: float = 50.0, on_bars=None):
+        self.capacity = capacity
+        self.spike_threshold = spike_threshold
+        self.on_bars = on_bars  # called with (symbol, bars) for every batch
+        self.symbols = {}
+        self.lock = threading.Lock()
+
+    def _state(self, symbol: str) -> Dict:
+        with self.lock:
+            state = self.symbols.get(symbol)
+            if state is None:
+                state = {
+                    'buffer': TickRingBuffer(self.capacity),
+                    'bars': TickBarBuilder(),
+                    'spikes': TickSpikeDetector(self.spike_threshold),
+                    'lock': threading.Lock(),
+                    'received': 0,
+                    'dropped': 0,
+                }
+                self.symbols[symbol] = state
+            return state
+
+    def ingest(self, symbol: str, time_msc: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> Dict:
+        """Ingest one batch of ticks for a symbol"""
+        time_msc = np.asarray(time_msc, dtype=np.int64)
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        if not (len(time_msc) == len(bid) == len(ask)):
+            raise ValueError("time_msc, bid and ask must have the same length")
+        check_prices(bid, ask)
+
+        if len(time_msc) > 1 and (np.diff(time_msc) < 0).any():
+            order = np.argsort(time_msc, kind='stable')
+            time_msc, bid, ask = time_msc[order], bid[order], ask[order]
+
+        state = self._state(symbol)
+        with state['lock']:
+            # Ticks older than what we already hold would corrupt the bars
+            last_time = state['buffer'].last_time()
+            if last_time is not None and len(time_msc) and time_msc[0] < last_time:
+                start = np.searchsorted(time_msc, last_time)
+                state['dropped'] += int(start)
+                time_msc, bid, ask = time_msc[start:], bid[start:], ask[start:]
+
+            state['received'] += len(time_msc)
+            state['buffer'].extend(time_msc, bid, ask)
+            spikes = state['spikes'].update(time_msc, bid)
+            bars = state['bars'].update(time_msc, bid)
+
+            # Under the symbol's lock so concurrent batches hand their bars over in tick order
+            if self.on_bars is not None and len(bars['time']):
+                self.on_bars(symbol, bars)
+
+        return {
+            'accepted': int(len(time_msc)),
+            'spikes': spikes,
+            'bars_updated': int(len(bars['time'])),
+        }
+
+    def ingest_packed(self, symbol: str, payload: bytes) -> Dict:
+        """Ingest packed little-endian (time_msc, bid, ask) records"""
+        if len(payload) % TICK_DTYPE.itemsize:
+            raise ValueError(f"Packed tick payload must be a multiple of {TICK_DTYPE.itemsize} bytes")
+        records = np.frombuffer(payload, dtype=TICK_DTYPE)
+        return self.ingest(symbol, records['time_msc'], records['bid'], records['ask'])
+
+    def stats(self, symbol: str) -> Optional[Dict]:
+        """Buffer and detection state for one symbol"""
+        with self.lock:
+            state = self.symbols.get(symbol)
+        if state is None:
+            return None
+        with state['lock']:
+            return {
+                'buffered_ticks': state['buffer'].count,
+                'capacity': state['buffer'].capacity,
+                'received': state['received'],
+                'dropped_out_of_order': state['dropped'],
+                'last_tick_msc': state['buffer'].last_time(),
+                'recent_spikes': list(state['spikes'].recent)[-20:],
+            }
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Multi-Timeframe Resampling for MT5 Crash/Boom Scalping EA
+Derives M5/M15/H1 OHLC bars from the M1 data posted by the EA
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from price_ingest import parse_price_data
+
+M1_SECONDS = 60
+
+# Higher timeframes derived from M1, in MT5 naming
+TIMEFRAMES = {
+    'M5': 300,
+    'M15': 900,
+    'H1': 3600,
+}
+
+BAR_FIELDS = ('time', 'open', 'high', 'low', 'close')
+
+def empty_bars() -> Dict[str, np.ndarray]:
+    """Empty column-oriented bar arrays"""
+    return {
+        'time': np.empty(0, dtype=np.int64),
+        'open': np.empty(0, dtype=np.float64),
+        'high': np.empty(0, dtype=np.float64),
+        'low': np.empty(0, dtype=np.float64),
+        'close': np.empty(0, dtype=np.float64),
+    }
+
+def bars_from_price_data(price_data: Any, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Convert an EA price_data payload (any shape price_ingest accepts) into M1 bar arrays"""
+    data = parse_price_data(price_data)
+    if len(data) == 0:
+        return empty_bars()
+
+    # The parsed columns are contiguous typed arrays, so numpy views them without copying
+    close = np.frombuffer(data.close, dtype=np.float64)
+    open_ = np.frombuffer(data.open, dtype=np.float64)
+    high = np.frombuffer(data.high, dtype=np.float64)
+    low = np.frombuffer(data.low, dtype=np.float64)
+    times = np.frombuffer(data.time, dtype=np.int64) if data.time is not None else None
+
+    if times is None:
+        # Bare closes are the last N M1 bars, the final one being the current minute
+        now = time.time() if now is None else now
+        last_bar = int(now) // M1_SECONDS * M1_SECONDS
+        times = last_bar - M1_SECONDS * np.arange(len(close) - 1, -1, -1, dtype=np.int64)
+
+    times = times // M1_SECONDS * M1_SECONDS
+    order = np.argsort(times, kind='stable')
+    return {
+        'time': times[order],
+        'open': open_[order],
+        'high': high[order],
+        'low': low[order],
+        'close': close[order],
+    }
+
+def _all_present(values: np.ndarray, sorted_times: np.ndarray) -> bool:
+    """Check every value occurs in a sorted array"""
+    positions = np.searchsorted(sorted_times, values)
+    if positions[-1] >= len(sorted_times):
+        return False
+    return bool((sorted_times[positions] == values).all())
+
+def merge_bars(existing: Dict[str, np.ndarray], incoming: Dict[str, np.ndarray],
+               max_bars: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Merge sorted bars by time, letting incoming bars replace existing ones at the same time"""
+    if len(incoming['time']) == 0:
+        return existing
+    start = np.searchsorted(existing['time'], incoming['time'][0])
+    tail = existing['time'][start:]
+    if len(tail) == 0 or (incoming['time'][-1] >= tail[-1] and _all_present(tail, incoming['time'])):
+        # Common case: incoming bars overlap only the newest existing bars
+        merged = {f: np.concatenate((existing[f][:start], incoming[f])) for f in BAR_FIELDS}
+    else:
+        # Keep the last occurrence of each time; incoming bars come after existing ones
+        combined = {f: np.concatenate((existing[f], incoming[f])) for f in BAR_FIELDS}
+        order = np.argsort(combined['time'], kind='stable')
+        times = combined['time'][order]
+        keep = np.append(times[1:] != times[:-1], True)
+        merged = {f: combined[f][order][keep] for f in BAR_FIELDS}
+    if max_bars is None:
+        return merged
+    return {f: merged[f][-max_bars:] for f in BAR_FIELDS}
+
+def aggregate_bars(bars: Dict[str, np.ndarray], period_seconds: int) -> Dict[str, np.ndarray]:
+    """Aggregate sorted bars into period buckets in one vectorized pass"""
+    if len(bars['time']) == 0:
+        return empty_bars()
+    buckets = bars['time'] // period_seconds * period_seconds
+    starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+    ends = np.append(starts[1:], len(buckets)) - 1
+    return {
+        'time': buckets[starts],
+        'open': bars['open'][starts],
+        'high': np.maximum.reduceat(bars['high'], starts),
+        'low': np.minimum.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+    }
+
+class IncrementalResampler:
+    """Resamples M1 bars to one higher timeframe, caching completed bars"""
+
+    def __init__(self, period_seconds: int, max_bars: int = 500):
+        self.period = period_seconds
+        self.max_bars = max_bars
+        self.completed = empty_bars()
+        self.forming = empty_bars()
+        self._pending = empty_bars()  # M1 bars of the still-forming bucket
+
+    def update(self, m1_bars: Dict[str, np.ndarray], history: Optional[Dict[str, np.ndarray]] = None):
+        """Fold new M1 bars in, recomputing only the still-forming bar
+
+        Bars inside already completed buckets (backfill, out-of-order posts) re-aggregate
+        those buckets from `history`, the full sorted M1 series they were merged into;
+        without it they are dropped.
+        """
+        if len(self.completed['time']):
+            boundary = self.completed['time'][-1] + self.period
+            if history is not None and len(m1_bars['time']) and m1_bars['time'][0] < boundary:
+                self._rebuild(m1_bars['time'][0], history)
+                return
+            start = np.searchsorted(m1_bars['time'], boundary)
+            m1_bars = {f: m1_bars[f][start:] for f in BAR_FIELDS}
+        if len(m1_bars['time']) == 0:
+            return
+
+        self._pending = merge_bars(self._pending, m1_bars)
+        aggregated = aggregate_bars(self._pending, self.period)
+
+        # Every bucket before the last one has been closed by a later M1 bar
+        if len(aggregated['time']) > 1:
+            newly_completed = {f: aggregated[f][:-1] for f in BAR_FIELDS}
+            self.completed = merge_bars(self.completed, newly_completed, self.max_bars)
+            last_bucket = aggregated['time'][-1]
+            start = np.searchsorted(self._pending['time'], last_bucket)
+            self._pending = {f: self._pending[f][start:] for f in BAR_FIELDS}
+        self.forming = {f: aggregated[f][-1:] for f in BAR_FIELDS}
+
+    def _rebuild(self, since: int, history: Dict[str, np.ndarray]):
+        """Re-aggregate every bucket from the one holding `since` onwards out of the M1 history"""
+        if len(history['time']) == 0:
+            return
+        # Buckets older than the retained M1 history keep their cached bars
+        first_bucket = max(since, history['time'][0]) // self.period * self.period
+        start = np.searchsorted(history['time'], first_bucket)
+        aggregated = aggregate_bars({f: history[f][start:] for f in BAR_FIELDS}, self.period)
+        keep = np.searchsorted(self.completed['time'], first_bucket)
+        self.completed = {
+            f: np.concatenate((self.completed[f][:keep], aggregated[f][:-1]))[-self.max_bars:]
+            for f in BAR_FIELDS
+        }
+        start = np.searchsorted(history['time'], aggregated['time'][-1])
+        self._pending = {f: history[f][start:] for f in BAR_FIELDS}
+        self.forming = {f: aggregated[f][-1:] for f in BAR_FIELDS}
+
+    def bars(self, include_forming: bool = True) -> Dict[str, np.ndarray]:
+        """Completed bars, optionally followed by the forming bar"""
+        if not include_forming or len(self.forming['time']) == 0:
+            return self.completed
+        return {f: np.concatenate((self.completed[f], self.forming[f])) for f in BAR_FIELDS}
+
+class TimeframeStore:
+    """Per-symbol M1 history with incrementally resampled higher timeframes"""
+
+    def __init__(self, max_m1_bars: int = 5000, max_bars: int = 500):
+        self.max_m1_bars = max_m1_bars
+        self.max_bars = max_bars
+        self.m1 = {}
+        self.resamplers = {}
+        self.lock = threading.Lock()
+
+    def ingest(self, symbol: str, price_data: Any):
+        """Add posted M1 data for a symbol and update every higher timeframe"""
+        self.ingest_bars(symbol, bars_from_price_data(price_data))
+
+    def ingest_bars(self, symbol: str, m1_bars: Dict[str, np.ndarray]):
+        """Add M1 bar arrays for a symbol and update every higher timeframe"""
+        with self.lock:
+            self.m1[symbol] = merge_bars(self.m1.get(symbol, empty_bars()), m1_bars, self.max_m1_bars)
+            resamplers = self.resamplers.get(symbol)
+            if resamplers is None:
+                resamplers = {tf: IncrementalResampler(seconds, self.max_bars)
+                              for tf, seconds in TIMEFRAMES.items()}
+                self.resamplers[symbol] = resamplers
+            for resampler in resamplers.values():
+                resampler.update(m1_bars, self.m1[symbol])
+
+    def get_bars(self, symbol: str, timeframe: str, count: int = 100,
+                 include_forming: bool = True) -> Dict[str, np.ndarray]:
+        """Most recent `count` bars for a symbol and timeframe (none when count <= 0)"""
+        with self.lock:
+            if timeframe == 'M1':
+                bars = self.m1.get(symbol, empty_bars())
+            elif symbol in self.resamplers and timeframe in self.resamplers[symbol]:
+                bars = self.resamplers[symbol][timeframe].bars(include_forming)
+            else:
+                bars = empty_bars()
+            # bars[-0:] would be every bar
+            return {f: bars[f][-count:] if count > 0 else bars[f][:0] for f in BAR_FIELDS}
+
+    def summarize(self, symbol: str, lookback: int = 12) -> Dict[str, Dict]:
+        """Compact per-timeframe context for prompts and analysis"""
+        summary = {}
+        for timeframe in TIMEFRAMES:
+            bars = self.get_bars(symbol, timeframe, lookback)
+            if len(bars['time']) == 0:
+                continue
+            ranges = bars['high'] - bars['low']
+            summary[timeframe] = {
+                'bars': int(len(bars['time'])),
+                'close': float(bars['close'][-1]),
+                'change': float(bars['close'][-1] - bars['open'][0]),
+                'high': float(bars['high'].max()),
+                'low': float(bars['low'].min()),
+                'avg_range': float(ranges.mean()),
+                'max_range': float(ranges.max()),
+            }
+        return summary
+
+    def clear(self):
+        """Drop all stored history"""
+        with self.lock:
+            self.m1.clear()
+            self.resamplers.clear()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Request Tracing for MT5 Crash/Boom Scalping EA Backend
+Sampled, nested spans kept in a ring buffer and optionally appended to a file
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (trace_id, span_id) of the innermost open span; None when the request is not sampled
+_current = contextvars.ContextVar('trace_span', default=None)
+
+def new_id() -> str:
+    return '%016x' % random.getrandbits(64)
+
+class Span:
+    """One timed stage; use as a context manager"""
+
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'attrs', 'start', '_started', '_token')
+
+    def __init__(self, tracer: 'Tracer', trace_id: str, parent_id: Optional[str], name: str, attrs: Dict):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes to the span"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current.set((self.trace_id, self.span_id))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(duration_ms, 3),
+            'attrs': self.attrs,
+            'thread': threading.current_thread().name,
+            'pid': os.getpid(),
+        })
+        return False
+
+class _NoopSpan:
+    """Returned for unsampled requests so instrumentation costs almost nothing"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Creates spans for sampled requests and keeps the most recent traces"""
+
+    def __init__(self, sample_rate: float = 0.01, max_traces: int = 200, path: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self.path = path
+        self.forward = None  # Optional callable; returns True when it took the span elsewhere
+        self.traces = OrderedDict()
+        self.started = 0
+        self.sampled = 0
+        self.lock = threading.Lock()
+        self._file = None
+
+    def configure(self, sample_rate: Optional[float] = None, max_traces: Optional[int] = None,
+                  path: Optional[str] = None, forward: Optional[Callable[[Dict], bool]] = None):
+        """Apply settings to the shared tracer"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if max_traces is not None:
+            self.max_traces = max_traces
+        if path is not None:
+            self.path = path or None
+        if forward is not None:
+            self.forward = forward
+
+    def begin(self, name: str, trace_id: Optional[str] = None, force: bool = False, **attrs):
+        """Start a request's root span, returning (trace_id, span or None if unsampled)"""
+        trace_id = trace_id or new_id()
+        with self.lock:
+            self.started += 1
+        if not force and random.random() >= self.sample_rate:
+            return trace_id, None
+        with self.lock:
+            self.sampled += 1
+        return trace_id, Span(self, trace_id, None, name, attrs).__enter__()
+
+    def span(self, name: str, **attrs):
+        """Child span of the current span, or a no-op outside a sampled trace"""
+        current = _current.get()
+        if current is None:
+            return NOOP_SPAN
+        return Span(self, current[0], current[1], name, attrs)
+
+    def current_context(self) -> Optional[tuple]:
+        """(trace_id, span_id) to hand to another process, or None"""
+        return _current.get()
+
+    def resume(self, context: tuple, name: str, **attrs):
+        """Continue a trace started in another process"""
+        return Span(self, context[0], context[1], name, attrs)
+
+    def _finish(self, record: Dict):
+        if self.forward is not None and self.forward(record):
+            return
+        self.store(record)
+
+    def store(self, record: Dict):
+        """Add a finished span to its trace and the file sink"""
+        with self.lock:
+            spans = self.traces.get(record['trace_id'])
+            if spans is None:
+                spans = self.traces[record['trace_id']] = []
+                while len(self.traces) > self.max_traces:
+                    self.traces.popitem(last=False)
+            spans.append(record)
+            if self.path:
+                try:
+                    if self._file is None:
+                        self._file = open(self.path, 'a', buffering=1)
+                    self._file.write(json.dumps(record) + '\n')
+                except OSError as e:
+                    logger.error(f"Failed to write span to {self.path}: {e}")
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Summaries of the most recent traces, newest first"""
+        with self.lock:
+            items = list(self.traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(items):
+            root = next((s for s in spans if s['parent_id'] is None), None)
+            summaries.append({
+                'trace_id': trace_id,
+                'name': root['name'] if root else None,
+                'start': root['start'] if root else min(s['start'] for s in spans),
+                'duration_ms': root['duration_ms'] if root else None,
+                'spans': len(spans),
+                'attrs': root['attrs'] if root else {},
+            })
+        return summaries
+
+    def get(self, trace_id: str) -> Optional[List[Dict]]:
+        """Spans of one trace ordered by start, each with its nesting depth"""
+        with self.lock:
+            spans = list(self.traces.get(trace_id, []))
+        if not spans:
+            return None
+        parents = {s['span_id']: s['parent_id'] for s in spans}
+        result = []
+        for span in sorted(spans, key=lambda s: s['start']):
+            depth, parent = 0, span['parent_id']
+            while parent is not None and depth < 64:
+                depth += 1
+                parent = parents.get(parent)
+            result.append({**span, 'depth': depth})
+        return result
+
+    def stats(self) -> Dict:
+        """Sampling settings and counters"""
+        with self.lock:
+            return {
+                'sample_rate': self.sample_rate,
+                'requests': self.started,
+                'sampled': self.sampled,
+                'traces_buffered': len(self.traces),
+                'file': self.path,
+            }
+
+# Shared tracer, configured by the server at startup
+tracer = Tracer()